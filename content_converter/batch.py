@@ -0,0 +1,450 @@
+"""
+Batch module
+-----------
+
+ディレクトリ単位のバッチ変換を提供するモジュール
+"""
+
+import contextlib
+import hashlib
+import os
+import signal
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .converter import ContentConverter
+from .cpu_pool import CPUStagePool
+from .deadline import Cancelled, Deadline, DeadlineExceeded, deadline_scope
+from .incremental import default_state_path
+from .journal import PENDING, JobJournal, JournalJob
+from .pipeline import DEFAULT_QUEUE_SIZE, Pipeline, PipelineResult, Stage, StageStats
+from .profiling import Profiler
+from .render import RenderSettings, html_renderer
+from .scheduler import priority_scope
+from .stages import PreparedRequest
+from .writer import UNCHANGED, OutputWriter
+
+# 出力ディレクトリに作成するデフォルトのジャーナルファイル名
+DEFAULT_JOURNAL_NAME = ".content-converter-journal.sqlite"
+
+
+def sha256_text(text: str) -> str:
+    """テキストのSHA-256ハッシュを返す"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def iter_jobs(
+    input_dir: str, output_dir: str, pattern: str = "*.md"
+) -> Iterator[Tuple[str, str]]:
+    """
+    入力ディレクトリから変換対象のファイルを順に探し、出力先パスとの組を返す
+
+    ディレクトリを走査しながら1件ずつ返すため、ファイル数が多くても一覧をメモリに保持しない。
+
+    Args:
+        input_dir: 入力ディレクトリ
+        output_dir: 出力ディレクトリ（入力ディレクトリと同じ相対パスで出力する）
+        pattern: 対象ファイルのglobパターン（再帰的に検索する）
+
+    Returns:
+        Iterator[Tuple[str, str]]: (入力パス, 出力パス)（ディレクトリごとに名前順）
+    """
+    root = Path(input_dir)
+    out_root = Path(output_dir).resolve()
+    for dirpath, dirnames, filenames in os.walk(root):
+        # 出力ディレクトリが入力ディレクトリ内にある場合は出力を再変換しない
+        dirnames[:] = sorted(d for d in dirnames if Path(dirpath, d).resolve() != out_root)
+        for name in sorted(filenames):
+            path = Path(dirpath, name)
+            relative = path.relative_to(root)
+            if relative.match(pattern) and path.is_file():
+                yield str(path), str(Path(output_dir) / relative)
+
+
+def discover_jobs(
+    input_dir: str, output_dir: str, pattern: str = "*.md"
+) -> List[Tuple[str, str]]:
+    """
+    入力ディレクトリから変換対象のファイルを探し、出力先パスとの組を返す
+
+    Args:
+        input_dir: 入力ディレクトリ
+        output_dir: 出力ディレクトリ（入力ディレクトリと同じ相対パスで出力する）
+        pattern: 対象ファイルのglobパターン（再帰的に検索する）
+
+    Returns:
+        List[Tuple[str, str]]: (入力パス, 出力パス) のリスト
+    """
+    return list(iter_jobs(input_dir, output_dir, pattern))
+
+
+class BatchResult:
+    """バッチ変換の結果"""
+
+    def __init__(self) -> None:
+        """初期化メソッド"""
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pending = 0
+        self.written = 0
+        self.unchanged = 0
+        self.interrupted = False
+        # バッチ全体の制限時間に達して打ち切ったかどうか
+        self.timed_out = False
+        self.errors: Dict[str, str] = {}
+        # ステージごとの処理件数と待ち行列の深さ（並列数の調整用）
+        self.stages: List[StageStats] = []
+
+    @property
+    def ok(self) -> bool:
+        """全ジョブが成功（またはスキップ）したかどうか"""
+        return self.failed == 0 and self.pending == 0
+
+    def summary(self) -> str:
+        """結果の要約文字列を返す"""
+        text = (
+            f"完了 {self.done} / 失敗 {self.failed} / スキップ {self.skipped} / 未処理 {self.pending}"
+            f"（書き込み {self.written} / 変更なし {self.unchanged}）"
+        )
+        if self.timed_out:
+            text += "（制限時間に達しました。--resume で再開できます）"
+        elif self.interrupted:
+            text += "（中断されました。--resume で再開できます）"
+        return text
+
+
+class _BatchItem:
+    """パイプラインを流れる1件のジョブ（テキストは使い終わったステージで解放する）"""
+
+    __slots__ = ("input_path", "output_path", "skipped", "text", "prepared", "output", "status")
+
+    def __init__(self, input_path: str, output_path: str):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.skipped = False
+        self.text: Optional[str] = None
+        self.prepared: Optional[PreparedRequest] = None
+        self.output: Optional[str] = None
+        self.status: Optional[str] = None
+
+
+class BatchRunner:
+    """
+    ジョブジャーナルを使ってバッチ変換を実行するクラス
+
+    読み込み → LLM前処理 → LLM → LLM後処理 → 書き込み のステージを有界キューでつないだ
+    パイプラインで処理する。ステージごとに並列数を設定でき、変換結果は書き込んだ時点で解放するため、
+    入力ファイルがいくら多くてもメモリ使用量は一定に保たれる。
+    """
+
+    def __init__(
+        self,
+        converter: ContentConverter,
+        template_path: Optional[str],
+        prompt_path: Optional[str] = None,
+        max_workers: int = 4,
+        journal: Optional[JobJournal] = None,
+        fsync_batch_size: int = 64,
+        incremental: bool = False,
+        cpu_workers: int = 0,
+        io_workers: int = 2,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        job_timeout: Optional[float] = None,
+        batch_timeout: Optional[float] = None,
+        priority: Optional[Callable[[str], Optional[str]]] = None,
+        profiler: Optional[Profiler] = None,
+        html: Optional[RenderSettings] = None,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            converter: コンテンツコンバーター
+            template_path: テンプレートファイルのパス（ルールエンジンだけで変換する場合は省略可）
+            prompt_path: プロンプトファイルのパス（省略可）
+            max_workers: 同時にLLMで変換するジョブ数
+            journal: ジョブジャーナル（省略時は記録しない）
+            fsync_batch_size: 出力ファイルをまとめてfsyncする件数
+            incremental: 出力ごとのセクション状態ファイルを使い、変更されたセクションだけを再変換するかどうか
+            cpu_workers: LLM前後のCPU処理（ルール・縮小・マスク）を実行するプロセス数
+                （0の場合はジョブのスレッドで処理する。LLM呼び出しは常にスレッドで行う）
+            io_workers: ファイルの読み込みと書き込みのそれぞれの並列数
+            queue_size: ステージ間のキューの大きさ（同時にメモリ上に置くジョブ数の目安）
+            job_timeout: 1件のジョブのLLM変換の制限時間（秒）。再試行・セクション・続きの生成を含めた合計で、
+                超えたジョブは失敗になる
+            batch_timeout: バッチ全体の制限時間（秒）。超えると新しいジョブの開始を止め、
+                実行中のLLM呼び出しを中断する（中断したジョブは未処理として残る）
+            priority: 入力パスから優先度クラス名（"interactive" / "bulk"）を返す関数。
+                LLMプロバイダーが ScheduledProvider の場合にリクエストの優先度として使う
+            profiler: ステージごとに計測するプロファイラー（省略時は計測しない）
+            html: 変換結果をHTMLにレンダリングする場合の設定。LLM後処理のステージでレンダリングし、
+                cpu_workers が2以上の場合はワーカープロセスで並列に処理する
+        """
+        self.converter = converter
+        self.incremental = incremental
+        self.max_workers = max(1, max_workers)
+        self.cpu_workers = cpu_workers
+        self.io_workers = max(1, io_workers)
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.batch_timeout = batch_timeout
+        self.priority = priority
+        self.profiler = profiler
+        self.html = html
+        # バッチ全体の期限（ジョブの期限の親。キャンセルもここから全ジョブに伝わる）
+        self._deadline: Optional[Deadline] = None
+        self._cancel = threading.Event()
+        self._cpu_pool: Optional[CPUStagePool] = None
+        self._pipeline: Optional[Pipeline] = None
+        self._resume = False
+        self.journal = journal
+        self._stop = threading.Event()
+        # 出力のfsyncはファイルごとではなくまとめて行う
+        self.writer = OutputWriter(fsync="batch", batch_size=fsync_batch_size)
+        # 書き込んだがfsyncを確認していないため、まだジャーナルに完了と記録していないジョブ
+        self._unsynced: List[Tuple[str, str]] = []
+
+        self.template = ""
+        if template_path:
+            with open(template_path, "r", encoding="utf-8") as f:
+                self.template = f.read()
+        self.prompt = None
+        if prompt_path:
+            with open(prompt_path, "r", encoding="utf-8") as f:
+                self.prompt = f.read()
+
+    def stop(self, cancel: bool = False) -> None:
+        """
+        新しいジョブの開始を止める
+
+        Args:
+            cancel: 実行中のLLM呼び出しも中断するかどうか（Falseの場合は完了まで待つ）
+        """
+        self._stop.set()
+        if cancel:
+            self._cancel.set()
+            if self._deadline is not None:
+                self._deadline.cancel()
+        if self._pipeline is not None:
+            self._pipeline.stop()
+
+    @contextlib.contextmanager
+    def handle_signals(self) -> Iterator[None]:
+        """
+        SIGINT/SIGTERM を受けたら停止するようにする
+
+        SIGINT（Ctrl-C）では実行中のLLM呼び出しを中断し（中断したジョブは未処理として残る）、
+        SIGTERM では実行中のジョブを完了させてから停止する。
+        2回目のSIGINTでは通常どおり KeyboardInterrupt を送出する。
+        メインスレッド以外では何もしない。
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        def handler(signum: int, frame: Any) -> None:
+            if self._stop.is_set() and signum == signal.SIGINT:
+                raise KeyboardInterrupt
+            self.stop(cancel=signum == signal.SIGINT)
+
+        previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            yield
+        finally:
+            for sig, prev in previous.items():
+                signal.signal(sig, prev)
+
+    def _read(self, item: _BatchItem) -> _BatchItem:
+        """入力を読み込み、ジャーナルに登録する（再開時に完了済みのジョブはスキップする）"""
+        with open(item.input_path, "rb") as f:
+            data = f.read()
+        if self.journal is not None:
+            job = JournalJob(
+                item.input_path, item.input_path, item.output_path,
+                hashlib.sha256(data).hexdigest(), PENDING, None, None, 0,
+            )
+            if not self.journal.add_job(job, resume=self._resume):
+                item.skipped = True
+                return item
+        item.text = data.decode("utf-8")
+        return item
+
+    def _prepare(self, item: _BatchItem) -> _BatchItem:
+        """LLM前のCPU処理（ルール・縮小・マスク）を行う"""
+        if not item.skipped and self._cpu_pool is not None:
+            assert item.text is not None
+            item.prepared = self._cpu_pool.prepare(item.text, self.prompt)
+        return item
+
+    def _convert(self, item: _BatchItem) -> _BatchItem:
+        """LLMで変換する"""
+        if item.skipped:
+            return item
+        if self.journal is not None:
+            self.journal.mark_running(item.input_path)
+        priority = self.priority(item.input_path) if self.priority is not None else None
+        with deadline_scope(Deadline(self.job_timeout, parent=self._deadline)), priority_scope(priority):
+            self._send(item)
+        item.text = None
+        return item
+
+    def _send(self, item: _BatchItem) -> None:
+        """ジョブの期限の中でLLMに送信する"""
+        if item.prepared is not None:
+            item.output = ""
+            if item.prepared.final is None:
+                item.output = self.converter.send_prepared(item.prepared, self.template)
+            return
+        assert item.text is not None
+        if self.incremental:
+            item.output = self.converter.convert_incremental(
+                item.text, self.template, self.prompt, default_state_path(item.output_path)
+            ).text
+        else:
+            item.output = self.converter.convert(item.text, self.template, self.prompt)
+
+    def _finish(self, item: _BatchItem) -> _BatchItem:
+        """LLM後のCPU処理（復元・ルール・HTMLレンダリング）を行う"""
+        if item.skipped:
+            return item
+        assert item.output is not None
+        if item.prepared is not None and self._cpu_pool is not None:
+            # HTMLへのレンダリングもCPUプールで行う
+            item.output, report = self._cpu_pool.finish(item.prepared, item.output)
+            self.converter.record_prepared(item.prepared, report)
+            item.prepared = None
+        elif self.html is not None:
+            item.output = html_renderer(self.html).render(item.output)
+        return item
+
+    def _write(self, item: _BatchItem) -> Tuple[_BatchItem, str]:
+        """変換結果を書き込み、出力のハッシュを返す（変換結果はここで解放する）"""
+        if item.skipped:
+            return item, ""
+        assert item.output is not None
+        os.makedirs(os.path.dirname(item.output_path) or ".", exist_ok=True)
+        item.status = self.writer.write(item.output_path, item.output)
+        output_hash = sha256_text(item.output)
+        item.output = None
+        return item, output_hash
+
+    def _stages(self) -> List[Stage]:
+        """パイプラインのステージを返す"""
+        cpu_workers = max(1, self.cpu_workers)
+        stages = [
+            Stage("read", self._read, self.io_workers),
+            Stage("prepare", self._prepare, cpu_workers),
+            Stage("llm", self._convert, self.max_workers),
+            # LLMの結果は停止要求後も捨てずに書き込む
+            Stage("finish", self._finish, cpu_workers, cancellable=False),
+            Stage("write", self._write, self.io_workers, cancellable=False),
+        ]
+        if self.profiler is not None:
+            stages = [stage._replace(func=self.profiler.wrap(stage.name, stage.func)) for stage in stages]
+        return stages
+
+    def run(self, jobs: Iterable[Tuple[str, str]], resume: bool = False) -> BatchResult:
+        """
+        バッチ変換を実行する
+
+        Args:
+            jobs: (入力パス, 出力パス) の列（iter_jobs のように1件ずつ生成してもよい）
+            resume: ジャーナルに完了と記録されたジョブをスキップするかどうか
+
+        Returns:
+            BatchResult: 実行結果
+        """
+        result = BatchResult()
+        self._resume = resume
+        pending_jobs = iter(jobs)
+        source = (_BatchItem(input_path, output_path) for input_path, output_path in pending_jobs)
+
+        self._deadline = Deadline(self.batch_timeout)
+        if self._cancel.is_set():
+            self._deadline.cancel()
+        timer: Optional[threading.Timer] = None
+        if self.batch_timeout is not None:
+            # 実行中の呼び出しは期限切れで中断するため、ここでは新しいジョブの投入だけを止める
+            timer = threading.Timer(self.batch_timeout, self.stop)
+            timer.daemon = True
+            timer.start()
+
+        self._unsynced = []
+        with contextlib.ExitStack() as stack:
+            # 中断された場合も、書き込み済みの出力をfsyncしてから完了を記録する（最後に実行される）
+            stack.callback(self._sync)
+            if timer is not None:
+                stack.callback(timer.cancel)
+            if not self.incremental and self.converter.supports_cpu_pool:
+                # cpu_workers が1以下の場合はプロセスを作らず、ステージのスレッドで処理する
+                settings = self.converter.stage_settings._replace(html=self.html)
+                self._cpu_pool = stack.enter_context(
+                    CPUStagePool(settings, max_workers=max(1, self.cpu_workers))
+                )
+            self._pipeline = Pipeline(self._stages(), queue_size=self.queue_size)
+            if self._stop.is_set():
+                self._pipeline.stop()
+            for outcome in self._pipeline.run(source):
+                self._record(result, outcome)
+            result.stages = self._pipeline.stats
+            self._pipeline = None
+            self._cpu_pool = None
+
+        # 停止要求により投入しなかったジョブはpendingのまま残る
+        result.pending += sum(1 for _ in pending_jobs)
+        result.interrupted = self._stop.is_set() and result.pending > 0
+        result.timed_out = result.interrupted and self._deadline.expired() is not None
+        return result
+
+    def _aborted(self, error: Optional[BaseException]) -> bool:
+        """ジョブ自身ではなくバッチ全体のキャンセル・期限切れで中断したかどうか"""
+        if isinstance(error, Cancelled):
+            return True
+        return isinstance(error, DeadlineExceeded) and error.deadline is self._deadline
+
+    def _record(self, result: BatchResult, outcome: PipelineResult) -> None:
+        """1件の結果を集計し、ジャーナルに記録する"""
+        if outcome.cancelled:
+            result.pending += 1
+            return
+        if self._aborted(outcome.error):
+            # Ctrl-C やバッチ全体の期限切れで中断したジョブは失敗にせず、再開時にやり直す
+            result.pending += 1
+            if self.journal is not None and isinstance(outcome.value, _BatchItem):
+                self.journal.mark_pending(outcome.value.input_path)
+            return
+        if outcome.error is not None:
+            item = outcome.value
+            job_id = item.input_path if isinstance(item, _BatchItem) else outcome.stage or "source"
+            result.failed += 1
+            result.errors[job_id] = str(outcome.error)
+            if self.journal is not None and isinstance(item, _BatchItem):
+                self.journal.mark_failed(job_id, str(outcome.error))
+            return
+        item, output_hash = outcome.value
+        if item.skipped:
+            result.skipped += 1
+            return
+        result.done += 1
+        if item.status == UNCHANGED:
+            result.unchanged += 1
+        else:
+            result.written += 1
+        if self.journal is not None:
+            self._unsynced.append((item.input_path, output_hash))
+            if len(self._unsynced) >= self.writer.batch_size:
+                self._sync()
+
+    def _sync(self) -> None:
+        """
+        出力をfsyncしてから、完了を待っているジョブをまとめてジャーナルに記録する
+
+        ジャーナルに完了と記録したジョブの出力は必ずfsync済みになるため、
+        クラッシュしても出力のないジョブが完了として残らない。
+        """
+        self.writer.flush()
+        done, self._unsynced = self._unsynced, []
+        if self.journal is not None and done:
+            self.journal.mark_done_many(done)
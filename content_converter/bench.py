@@ -0,0 +1,531 @@
+"""
+Bench module
+-----------
+
+実際の ContentConverter とLLMプロバイダーに負荷をかけ、スループット・レイテンシ・エラー率・
+トークン数/秒を計測する負荷生成ツールを提供するモジュール
+
+``content-converter bench`` または ``python -m content_converter.bench`` で実行する。
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .converter import ContentConverter
+from .core.tokens import estimate_tokens
+from .factory import ConverterFactory, LLMProviderFactory
+from .llm.base import LLMProvider, Message
+from .llm.batching import DEFAULT_LINGER_SECONDS, DEFAULT_MAX_BATCH_SIZE, MicroBatchingProvider
+from .llm.cassette import Cassette, ReplayProvider
+from .summarizer import DEFAULT_CHUNK_TOKENS, MapReduceSummarizer
+
+CONVERT = "convert"
+SUMMARY = "summary"
+OPERATIONS = (CONVERT, SUMMARY)
+
+PERCENTILES = (50, 95, 99)
+
+# MicroBatchingProvider がまとめたリクエストのコンテンツの区切り行
+_CONTENT_MARKER_RE = re.compile(r"^=====CONTENT: (\d+)=====[ \t]*$", re.MULTILINE)
+
+
+class StubProvider(LLMProvider):
+    """
+    ネットワークに接続せず、一定の応答時間（とばらつき）の後に入力に基づいた応答を返すプロバイダー
+
+    トークン使用量は入力と出力の推定トークン数で記録する。
+    MicroBatchingProvider がまとめた要約のリクエストには、コンテンツごとに区切り行つきで応答する。
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            latency: 応答時間の平均（秒）
+            jitter: 応答時間のばらつき（平均からの最大の差、秒）
+            error_rate: エラーにするリクエストの割合（0〜1）
+            seed: 乱数のシード（省略時は毎回異なる）
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt: str, output: str) -> str:
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("スタブプロバイダーの擬似エラー")
+        self.record_usage(estimate_tokens(prompt), estimate_tokens(output))
+        return output
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """全メッセージを連結し、最後のメッセージを応答として返す（まとめた要約は区切り行つきで返す）"""
+        prompt = "\n\n".join(m["content"] for m in messages)
+        output = messages[-1]["content"] if messages else ""
+        # [区切り行の前, 番号, 本文, 番号, 本文, ...]
+        parts = _CONTENT_MARKER_RE.split(output)
+        if len(parts) > 1:
+            output = "\n".join(
+                f"=====SUMMARY: {index}=====\n{body.strip()}" for index, body in zip(parts[1::2], parts[2::2])
+            )
+        return self._respond(prompt, output)
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """入力をそのまま応答として返す"""
+        return self._respond(content, content)
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """入力の先頭 max_length 文字を要約として返す"""
+        return self._respond(content, content[:max_length])
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    リクエストの構成（例: "convert=0.8,summary=0.2"）を操作ごとの割合にする
+
+    Args:
+        value: 操作=重み のカンマ区切り（重みを省略すると1）
+
+    Returns:
+        Dict[str, float]: 操作ごとの割合（合計1）
+
+    Raises:
+        ValueError: 不明な操作・負の重み・重みの合計が0の場合
+    """
+    weights: Dict[str, float] = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"不明な操作です: {name}（{' / '.join(OPERATIONS)}）")
+        weights[name] = float(weight) if weight.strip() else 1.0
+        if weights[name] < 0:
+            raise ValueError(f"重みは0以上にしてください: {part}")
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError(f"リクエストの構成の重みの合計が0です: {value}")
+    return {name: weight / total for name, weight in weights.items() if weight > 0}
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    最近傍順位法でパーセンタイルを求める
+
+    Args:
+        values: 昇順に並べた値
+        p: パーセンタイル（0〜100）
+
+    Returns:
+        float: パーセンタイル値（値がない場合は0）
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class OperationReport(NamedTuple):
+    """1つの操作（または全体）の計測結果"""
+
+    operation: str
+    requests: int
+    errors: int
+    # 成功したリクエストのレイテンシ（秒）のパーセンタイル（PERCENTILES の順）
+    latencies: Tuple[float, ...]
+    # エラーの種類ごとの件数
+    error_types: Dict[str, int]
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+
+class BenchReport(NamedTuple):
+    """1つの並列数での計測結果"""
+
+    concurrency: int
+    seconds: float
+    prompt_tokens: int
+    completion_tokens: int
+    # 操作ごとの結果と、最後に全体の結果（operation は "total"）
+    operations: List[OperationReport]
+
+    @property
+    def total(self) -> OperationReport:
+        return self.operations[-1]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.total.requests / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return (self.prompt_tokens + self.completion_tokens) / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSONに書き出す形式にする"""
+        return {
+            "concurrency": self.concurrency,
+            "seconds": round(self.seconds, 3),
+            "requests_per_second": round(self.requests_per_second, 3),
+            "tokens_per_second": round(self.tokens_per_second, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "operations": {
+                op.operation: {
+                    "requests": op.requests,
+                    "errors": op.errors,
+                    "error_rate": round(op.error_rate, 4),
+                    "error_types": op.error_types,
+                    **{f"p{p}_ms": round(v * 1000, 1) for p, v in zip(PERCENTILES, op.latencies)},
+                }
+                for op in self.operations
+            },
+        }
+
+
+def _operation_report(name: str, samples: List[Tuple[str, float, Optional[str]]]) -> OperationReport:
+    latencies = sorted(seconds for _, seconds, error in samples if error is None)
+    error_types: Dict[str, int] = {}
+    for _, _, error in samples:
+        if error is not None:
+            error_types[error] = error_types.get(error, 0) + 1
+    return OperationReport(
+        name,
+        len(samples),
+        sum(error_types.values()),
+        tuple(percentile(latencies, p) for p in PERCENTILES),
+        error_types,
+    )
+
+
+def _schedule(mix: Dict[str, float], seed: Optional[int]) -> Iterator[str]:
+    """構成の割合に従って操作を無限に生成する"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while True:
+        yield rng.choices(names, weights)[0]
+
+
+def run_bench(
+    converter: ContentConverter,
+    corpus: Sequence[str],
+    template: str = "",
+    prompt: Optional[str] = None,
+    concurrency: int = 4,
+    duration: float = 30.0,
+    max_requests: Optional[int] = None,
+    mix: Optional[Dict[str, float]] = None,
+    summary_length: int = 200,
+    seed: Optional[int] = None,
+    summarize: Optional[Callable[[str, int], str]] = None,
+) -> BenchReport:
+    """
+    並列数 concurrency のスレッドで、時間または件数の上限までリクエストを送り続けて計測する
+
+    Args:
+        converter: コンテンツコンバーター（要約には converter.llm_provider を使う）
+        corpus: 入力テキストのリスト（順に繰り返して使う）
+        template: 変換に使うテンプレート
+        prompt: 変換に使うカスタムプロンプト（省略可）
+        concurrency: 同時に送るリクエスト数
+        duration: 計測時間（秒。この時間を過ぎると新しいリクエストを送らない）
+        max_requests: 送るリクエスト数の上限（省略時は時間だけで止める）
+        mix: 操作ごとの割合（省略時は変換のみ）
+        summary_length: 要約の最大文字数
+        seed: 操作の順序を決める乱数のシード
+        summarize: 要約に使う関数（テキスト, 最大文字数）→ 要約
+            （省略時は converter.llm_provider.generate_summary。例: MapReduceSummarizer.summarize）
+
+    Returns:
+        BenchReport: 計測結果
+    """
+    if not corpus:
+        raise ValueError("入力テキストが1件もありません。")
+    mix = mix or {CONVERT: 1.0}
+    provider = converter.llm_provider
+    if SUMMARY in mix and provider is None:
+        raise ValueError("要約にはLLMプロバイダーが必要です。")
+    if summarize is None and provider is not None:
+        summarize = provider.generate_summary
+
+    lock = threading.Lock()
+    operations = _schedule(mix, seed)
+    texts = itertools.cycle(corpus)
+    issued = itertools.count()
+    samples: List[Tuple[str, float, Optional[str]]] = []
+    usage_before = dict(getattr(provider, "usage_totals", None) or {})
+    start = time.monotonic()
+    stop_at = start + duration
+
+    def worker() -> None:
+        while time.monotonic() < stop_at:
+            with lock:
+                if max_requests is not None and next(issued) >= max_requests:
+                    return
+                operation = next(operations)
+                text = next(texts)
+            began = time.monotonic()
+            error: Optional[str] = None
+            try:
+                if operation == CONVERT:
+                    converter.convert(text, template, prompt)
+                else:
+                    summarize(text, summary_length)  # type: ignore[misc]
+            except Exception as e:
+                error = type(e).__name__
+            with lock:
+                samples.append((operation, time.monotonic() - began, error))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.monotonic() - start
+
+    usage_after = getattr(provider, "usage_totals", None) or {}
+    reports = [
+        _operation_report(name, [s for s in samples if s[0] == name]) for name in OPERATIONS if name in mix
+    ]
+    reports.append(_operation_report("total", samples))
+    return BenchReport(
+        concurrency,
+        seconds,
+        usage_after.get("prompt_tokens", 0) - usage_before.get("prompt_tokens", 0),
+        usage_after.get("completion_tokens", 0) - usage_before.get("completion_tokens", 0),
+        reports,
+    )
+
+
+def format_reports(reports: Sequence[BenchReport]) -> str:
+    """計測結果を表形式の文字列にする（並列数・操作ごとに1行）"""
+    header = (
+        f"{'conc':>4}  {'operation':<9}  {'requests':>8}  {'errors':>6}  {'req/s':>7}"
+        f"  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'tokens/s':>9}"
+    )
+    lines = [header]
+    for report in reports:
+        for op in report.operations:
+            rate = op.requests / report.seconds if report.seconds else 0.0
+            tokens = f"{report.tokens_per_second:>9.1f}" if op.operation == "total" else f"{'':>9}"
+            p50, p95, p99 = (v * 1000 for v in op.latencies)
+            lines.append(
+                f"{report.concurrency:>4}  {op.operation:<9}  {op.requests:>8}  {op.error_rate:>6.1%}  {rate:>7.2f}"
+                f"  {p50:>8.1f}  {p95:>8.1f}  {p99:>8.1f}  {tokens}"
+            )
+    return "\n".join(lines)
+
+
+def load_corpus(paths: Sequence[str], pattern: str = "*.md") -> List[str]:
+    """
+    入力ファイル（ディレクトリの場合は pattern に一致するファイル）を読み込む
+
+    Args:
+        paths: ファイルまたはディレクトリのパス
+        pattern: ディレクトリから読み込むファイルのglobパターン
+
+    Returns:
+        List[str]: 入力テキストのリスト
+    """
+    texts = []
+    for path in paths:
+        files = sorted(Path(path).rglob(pattern)) if os.path.isdir(path) else [Path(path)]
+        for file in files:
+            texts.append(file.read_text(encoding="utf-8"))
+    return texts
+
+
+def _split_ints(value: str) -> List[int]:
+    try:
+        counts = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数のカンマ区切りで指定してください: {value}")
+    if not counts or min(counts) < 1:
+        raise argparse.ArgumentTypeError(f"1以上の整数を指定してください: {value}")
+    return counts
+
+
+def _create_provider(args: argparse.Namespace) -> LLMProvider:
+    """引数で指定したプロバイダー（スタブ・カセット・実際のプロバイダー）を作成する"""
+    if args.stub:
+        return StubProvider(args.stub_latency, args.stub_jitter, args.stub_error_rate, seed=args.seed)
+    if args.replay:
+        return ReplayProvider(Cassette(args.replay), latency="recorded")
+    from .cli import KEYLESS_PROVIDERS, _pool_options, get_api_key
+
+    api_key = None
+    try:
+        api_key = get_api_key(args.llm_provider, args.api_key, args.api_key_file)
+    except ValueError:
+        # ローカルサーバー向けのプロバイダーはAPIキーなしでも使える
+        if args.llm_provider not in KEYLESS_PROVIDERS:
+            raise
+    options: Dict[str, Any] = {}
+    if args.base_url:
+        options["base_url"] = args.base_url
+    if args.request_timeout is not None:
+        options["timeout"] = args.request_timeout
+    return LLMProviderFactory.create(
+        provider_type=args.llm_provider,
+        api_key=api_key,
+        model=args.model,
+        provider_options=options or None,
+        pool_options=_pool_options(args) or None,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """負荷生成のコマンドラインエントリーポイント"""
+    parser = argparse.ArgumentParser(
+        prog="content-converter bench",
+        description="実際のコンバーターとLLMプロバイダーに負荷をかけ、スループット・レイテンシ・エラー率・トークン数/秒を計測する",
+    )
+    parser.add_argument("corpus", nargs="+", help="入力ファイルまたはディレクトリ")
+    parser.add_argument("--pattern", default="*.md", help="ディレクトリから読み込むファイルのglobパターン（デフォルト: *.md）")
+    parser.add_argument("--template", help="変換に使うテンプレートファイル（変換を含む場合は必須）")
+    parser.add_argument("--prompt", help="変換に使うプロンプトファイル")
+    parser.add_argument(
+        "--concurrency", type=_split_ints, default=[4],
+        help="同時に送るリクエスト数（カンマ区切りで複数指定すると順に計測する。デフォルト: 4）",
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="並列数ごとの計測時間（秒、デフォルト: 30）")
+    parser.add_argument("--requests", type=int, help="並列数ごとに送るリクエスト数の上限")
+    parser.add_argument(
+        "--mix", default=CONVERT,
+        help="リクエストの構成（例: convert=0.8,summary=0.2。デフォルト: convert）",
+    )
+    parser.add_argument("--summary-length", type=int, default=200, help="要約の最大文字数（デフォルト: 200）")
+    parser.add_argument(
+        "--map-reduce", action="store_true",
+        help="要約を MapReduceSummarizer でチャンクごとに並行して要約し、階層的にまとめる（長い文書向け）",
+    )
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+        help=f"--map-reduce の1つのチャンクの推定トークン数の上限（デフォルト: {DEFAULT_CHUNK_TOKENS}）",
+    )
+    parser.add_argument(
+        "--micro-batch", action="store_true",
+        help="プロバイダーを MicroBatchingProvider で包み、同時に送られた要約を1回のリクエストにまとめる",
+    )
+    parser.add_argument(
+        "--micro-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+        help=f"1回のリクエストにまとめる要約の件数の上限（デフォルト: {DEFAULT_MAX_BATCH_SIZE}）",
+    )
+    parser.add_argument(
+        "--micro-batch-linger", type=float, default=DEFAULT_LINGER_SECONDS,
+        help=f"最初の要約が後続の要約を待つ秒数（デフォルト: {DEFAULT_LINGER_SECONDS}）",
+    )
+    parser.add_argument("--json", metavar="PATH", help="計測結果をJSONで書き出すパス（- で標準出力）")
+    parser.add_argument("--seed", type=int, help="操作の順序とスタブの応答時間の乱数のシード")
+
+    provider = parser.add_argument_group("プロバイダー")
+    provider.add_argument(
+        "--llm-provider", default="gemini", choices=["gemini", "openrouter", "openai-compatible"],
+        help="使用するLLMプロバイダー（デフォルト: gemini）",
+    )
+    provider.add_argument("--model", help="使用するモデル名")
+    provider.add_argument("--api-key", help="APIキー（省略時は環境変数）")
+    provider.add_argument("--api-key-file", help="APIキーを1行に1つ記載したファイル")
+    provider.add_argument(
+        "--key-requests-per-minute", type=int, metavar="N",
+        help="複数キーを使う場合のキーごとの1分あたりの最大リクエスト数",
+    )
+    provider.add_argument(
+        "--key-cooldown", type=float, metavar="SECONDS",
+        help="複数キーを使う場合に429/クォータエラーを受けたキーを休止させる秒数（デフォルト: 60）",
+    )
+    provider.add_argument("--base-url", help="openai-compatible のサーバーのURL")
+    provider.add_argument("--request-timeout", type=float, metavar="SECONDS", help="1回のリクエストのタイムアウト秒数")
+    provider.add_argument("--replay", metavar="CASSETTE", help="カセットファイルの応答を記録した応答時間で再生する")
+    provider.add_argument("--stub", action="store_true", help="ネットワークに接続しないスタブプロバイダーを使う")
+    provider.add_argument("--stub-latency", type=float, default=0.2, help="スタブの応答時間の平均（秒、デフォルト: 0.2）")
+    provider.add_argument("--stub-jitter", type=float, default=0.05, help="スタブの応答時間のばらつき（秒、デフォルト: 0.05）")
+    provider.add_argument("--stub-error-rate", type=float, default=0.0, help="スタブがエラーにする割合（0〜1）")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if CONVERT in mix and not args.template:
+        parser.error("変換を含む場合は --template を指定してください")
+
+    try:
+        corpus = load_corpus(args.corpus, args.pattern)
+        template = Path(args.template).read_text(encoding="utf-8") if args.template else ""
+        prompt = Path(args.prompt).read_text(encoding="utf-8") if args.prompt else None
+        llm_provider = _create_provider(args)
+    except (OSError, ValueError) as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+    if not corpus:
+        print("エラー: 入力テキストが1件もありません", file=sys.stderr)
+        return 1
+    batching: Optional[MicroBatchingProvider] = None
+    if args.micro_batch:
+        llm_provider = batching = MicroBatchingProvider(
+            llm_provider, max_batch_size=args.micro_batch_size, linger_seconds=args.micro_batch_linger
+        )
+
+    summarizer: Optional[MapReduceSummarizer] = None
+    if args.map_reduce:
+        summarizer = MapReduceSummarizer(llm_provider, chunk_tokens=args.chunk_tokens)
+
+    converter = ConverterFactory.create_converter(llm_provider=llm_provider, model=args.model)
+    reports = []
+    for concurrency in args.concurrency:
+        reports.append(run_bench(
+            converter, corpus, template, prompt,
+            concurrency=concurrency,
+            duration=args.duration,
+            max_requests=args.requests,
+            mix=mix,
+            summary_length=args.summary_length,
+            seed=args.seed,
+            summarize=summarizer.summarize if summarizer is not None else None,
+        ))
+        print(f"並列数 {concurrency}: {reports[-1].total.requests}件を計測しました", file=sys.stderr)
+
+    print(format_reports(reports))
+    if summarizer is not None:
+        print(f"map-reduce 要約: {summarizer.stats.summary()}", file=sys.stderr)
+    if batching is not None:
+        print(f"まとめ送信: {batching.stats.summary()}", file=sys.stderr)
+    if args.json:
+        data = json.dumps([r.to_dict() for r in reports], ensure_ascii=False, indent=2)
+        if args.json == "-":
+            print(data)
+        else:
+            Path(args.json).write_text(data + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
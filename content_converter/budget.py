@@ -0,0 +1,197 @@
+"""
+Budget module
+------------
+
+入力の大きさと、過去の変換から学習したテンプレートごとの出力/入力比から、
+リクエストごとの出力トークン数の上限（max_tokens）を決めるモジュール
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .writer import OutputWriter
+
+BUDGET_VERSION = 1
+
+
+class ModelLimits(NamedTuple):
+    """モデルのコンテキスト長と最大出力トークン数"""
+
+    context: int
+    max_output: int
+
+
+# モデル名（プロバイダーの接頭辞 "google/" などを除いたもの）の前方一致で引く上限
+# 上から順に照合するため、より具体的な名前を先に置く
+MODEL_LIMITS: Tuple[Tuple[str, ModelLimits], ...] = (
+    ("gemini-2.5", ModelLimits(1_048_576, 65_536)),
+    ("gemini-2.0", ModelLimits(1_048_576, 8_192)),
+    ("gemini-1.5", ModelLimits(1_048_576, 8_192)),
+    ("claude-3-5", ModelLimits(200_000, 8_192)),
+    ("claude-3.5", ModelLimits(200_000, 8_192)),
+    ("claude-3", ModelLimits(200_000, 4_096)),
+    ("gpt-4.1", ModelLimits(1_047_576, 32_768)),
+    ("gpt-4o", ModelLimits(128_000, 16_384)),
+)
+
+# 上限が分からないモデル（ローカルモデルなど）の控えめな上限
+DEFAULT_LIMITS = ModelLimits(32_768, 4_096)
+
+
+def model_limits(model: Optional[str]) -> ModelLimits:
+    """
+    モデル名からコンテキスト長と最大出力トークン数を返す
+
+    Args:
+        model: モデル名（"google/gemini-2.5-flash" のような接頭辞付きでもよい）
+
+    Returns:
+        ModelLimits: 上限（不明なモデルは DEFAULT_LIMITS）
+    """
+    name = (model or "").rsplit("/", 1)[-1].lower()
+    for prefix, limits in MODEL_LIMITS:
+        if name.startswith(prefix):
+            return limits
+    return DEFAULT_LIMITS
+
+
+class OutputBudget:
+    """
+    テンプレートごとの出力/入力トークン比を学習し、リクエストごとの max_tokens を決めるクラス
+
+    比の学習値は指数移動平均で更新し、path を指定するとJSONファイルに保存して次回の実行に引き継ぐ。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default_ratio: float = 1.5,
+        margin: float = 1.3,
+        min_tokens: int = 256,
+        limits: Optional[ModelLimits] = None,
+        smoothing: float = 0.3,
+        save_every: int = 16,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            path: 学習した比を保存するJSONファイルのパス（Noneの場合はメモリ上のみ）
+            default_ratio: 学習値がないテンプレートの出力/入力比
+            margin: 見込みの出力トークン数に掛ける余裕の倍率
+            min_tokens: max_tokens の下限
+            limits: モデルの上限の指定（省略時はモデル名から決める）
+            smoothing: 指数移動平均で新しい観測値に与える重み（0〜1）
+            save_every: 何件の観測ごとにファイルへ保存するか
+        """
+        self.path = path
+        self.default_ratio = default_ratio
+        self.margin = margin
+        self.min_tokens = min_tokens
+        self.limits = limits
+        self.smoothing = smoothing
+        self.save_every = max(1, save_every)
+        # テンプレートのキー → (出力/入力比, 観測数)
+        self.ratios: Dict[str, Tuple[float, int]] = {}
+        self.requests = 0
+        self.reserved_tokens = 0
+        self.output_tokens = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if path:
+            self._load(path)
+
+    def _load(self, path: str) -> None:
+        """学習した比を読み込む（ファイルがない・壊れている場合は何もしない）"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if not isinstance(data, dict) or data.get("version") != BUDGET_VERSION:
+            return
+        for key, entry in data.get("ratios", {}).items():
+            self.ratios[key] = (float(entry["ratio"]), int(entry["samples"]))
+
+    def save(self) -> None:
+        """学習した比をファイルにアトミックに書き込む（path を指定していない場合は何もしない）"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "version": BUDGET_VERSION,
+                "ratios": {
+                    key: {"ratio": round(ratio, 4), "samples": samples}
+                    for key, (ratio, samples) in self.ratios.items()
+                },
+            }
+            self._unsaved = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        OutputWriter(fsync="never").write(self.path, json.dumps(data, indent=1))
+
+    def ratio(self, key: str) -> float:
+        """テンプレートの出力/入力比（学習値がない場合はデフォルト）"""
+        with self._lock:
+            entry = self.ratios.get(key)
+        return entry[0] if entry else self.default_ratio
+
+    def max_tokens(
+        self, key: str, input_tokens: int, prompt_tokens: int, model: Optional[str] = None
+    ) -> int:
+        """
+        1件のリクエストの max_tokens を決める
+
+        Args:
+            key: テンプレート（と追加の指示）を表すキー
+            input_tokens: 変換する入力テキストの推定トークン数
+            prompt_tokens: 送信するプロンプト全体の推定トークン数
+            model: モデル名
+
+        Returns:
+            int: max_tokens（モデルの最大出力とコンテキストの残りを超えない）
+        """
+        limits = self.limits or model_limits(model)
+        expected = math.ceil(input_tokens * self.ratio(key) * self.margin)
+        ceiling = max(1, min(limits.max_output, limits.context - prompt_tokens))
+        budget = min(max(expected, self.min_tokens), ceiling)
+        with self._lock:
+            self.requests += 1
+            self.reserved_tokens += budget
+        return budget
+
+    def record(self, key: str, input_tokens: int, output_tokens: int) -> None:
+        """
+        1件の変換の入力と出力のトークン数から比を学習する
+
+        Args:
+            key: テンプレート（と追加の指示）を表すキー
+            input_tokens: 入力テキストの推定トークン数
+            output_tokens: 出力テキストの推定トークン数
+        """
+        if input_tokens <= 0:
+            return
+        observed = output_tokens / input_tokens
+        with self._lock:
+            self.output_tokens += output_tokens
+            entry = self.ratios.get(key)
+            if entry is None:
+                self.ratios[key] = (observed, 1)
+            else:
+                ratio, samples = entry
+                self.ratios[key] = (ratio + self.smoothing * (observed - ratio), samples + 1)
+            self._unsaved += 1
+            save_now = self._unsaved >= self.save_every
+        if save_now:
+            self.save()
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        used = self.output_tokens / self.reserved_tokens * 100 if self.reserved_tokens else 0.0
+        return (
+            f"{self.requests}件 / 予約した出力トークン {self.reserved_tokens}"
+            f" → 推定出力 {self.output_tokens}（{used:.1f}%）"
+            f" / 学習済みテンプレート {len(self.ratios)}"
+        )
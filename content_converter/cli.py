@@ -6,11 +6,37 @@ CLI module
 """
 
 import argparse
+import contextlib
+import itertools
 import os
+import re
 import sys
-from typing import Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union, cast
 
+from .batch import DEFAULT_JOURNAL_NAME, BatchRunner, iter_jobs
+from .budget import OutputBudget
+from .converter import RULES_MODES
+from .core.masking import MASK_KINDS, MaskingStats
+from .core.minify import MinifyStats
+from .deadline import DEFAULT_REQUEST_TIMEOUT, Deadline, deadline_scope
 from .factory import ConverterFactory, LLMProviderFactory
+from .incremental import default_state_path
+from .journal import JobJournal
+from .jsonl import JsonlRunner
+from .llm.base import LLMProvider
+from .llm.cassette import Cassette, RecordingProvider, ReplayProvider
+from .llm.fallback import FallbackProvider
+from .llm.scheduled import ScheduledProvider
+from .pipeline import DEFAULT_QUEUE_SIZE
+from .profiling import Profiler
+from .render import DEFAULT_EXTENSIONS, RenderSettings, html_renderer
+from .rules import RULESETS
+from .scheduler import BULK, INTERACTIVE, PriorityScheduler, priority_classes
+from .similarity import SimilarityCache
+from .writer import UNCHANGED
+
+LLM_PROVIDERS = ("gemini", "openrouter", "openai-compatible")
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,17 +50,41 @@ def parse_args() -> argparse.Namespace:
         description="Content-Converter: テキストを指定されたプロンプトとテンプレートに基づいて変換するツール"
     )
 
-    # 必須引数
+    # 入力（--input または --jsonl のいずれかが必須）
     parser.add_argument(
         "--input",
-        required=True,
-        help="変換する入力ファイルのパス（必須）"
+        help="変換する入力ファイルのパス（--jsonl を使わない場合は必須）。ディレクトリを指定するとバッチ変換"
+    )
+    parser.add_argument(
+        "--jsonl",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="JSON Lines のジョブレコードをファイル（省略時は標準入力）から読み込んで並行に変換し、"
+             "完了したジョブから結果レコードを1行ずつ標準出力に書き出す"
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="--jsonl の結果レコードを入力順に出力する（先に完了した結果は --queue-size 件まで保持して待つ）"
     )
 
     parser.add_argument(
         "--template",
-        required=True,
-        help="使用するテンプレートファイルのパス（必須）"
+        help="使用するテンプレートファイルのパス（--target を使わない場合は必須）"
+    )
+
+    parser.add_argument(
+        "--target",
+        action="append",
+        metavar="TEMPLATE[=OUTPUT]",
+        help="変換ターゲット（テンプレートと出力先の組）。複数指定すると入力を1回だけ読み込んで並行変換"
+    )
+
+    parser.add_argument(
+        "--single-request",
+        action="store_true",
+        help="複数ターゲットを1回のLLMリクエストでまとめて生成する"
     )
 
     # オプション引数
@@ -54,9 +104,26 @@ def parse_args() -> argparse.Namespace:
 
     parser.add_argument(
         "--llm-provider",
-        choices=["gemini", "openrouter"],
+        choices=list(LLM_PROVIDERS),
         default="gemini",
-        help="使用するLLMプロバイダー（デフォルト: gemini）"
+        help="使用するLLMプロバイダー（デフォルト: gemini）。openai-compatible はllama.cpp・Ollama・vLLMなどのOpenAI互換サーバー"
+    )
+
+    parser.add_argument(
+        "--base-url",
+        help="APIのベースURL（openai-compatible: 省略時は http://localhost:8080/v1、openrouter: 省略時は公式エンドポイント）"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="ストリーミングで応答を受け取る（openai-compatible のみ）"
+    )
+
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        help="サーバーの並列スロット数。同時リクエスト数をこの数に制限する（openai-compatible のみ）"
     )
 
     parser.add_argument(
@@ -64,69 +131,878 @@ def parse_args() -> argparse.Namespace:
         help="使用するLLMモデル（省略時はプロバイダーのデフォルト）"
     )
 
+    parser.add_argument(
+        "--fallback",
+        action="append",
+        metavar="PROVIDER[:MODEL]",
+        help="--llm-provider が失敗した場合や回路が開いている場合に使うプロバイダーとモデル。"
+             "指定した順に試す（複数指定可。例: openrouter:anthropic/claude-3.5-sonnet）"
+    )
+    parser.add_argument(
+        "--breaker-error-rate",
+        type=float,
+        default=0.5,
+        help="--fallback 使用時に回路を開くエラー率（直近20件、0〜1、デフォルト: 0.5）"
+    )
+    parser.add_argument(
+        "--breaker-slow-call",
+        type=float,
+        metavar="SECONDS",
+        help="--fallback 使用時に失敗として数える応答時間（秒、省略時は応答時間を見ない）"
+    )
+    parser.add_argument(
+        "--breaker-open-seconds",
+        type=float,
+        default=30.0,
+        help="--fallback 使用時に回路を開いてから試行リクエストを送るまでの秒数（デフォルト: 30）"
+    )
+
+    parser.add_argument(
+        "--output-budget",
+        nargs="?",
+        const=True,
+        metavar="PATH",
+        help="入力の大きさとテンプレートごとに学習した出力/入力比からリクエストごとの max_tokens を決める"
+        "（PATH を指定すると学習値を保存して次回に引き継ぐ）"
+    )
+
+    parser.add_argument(
+        "--context-limit",
+        type=int,
+        help="--output-budget で使うモデルのコンテキスト長（ローカルモデルなど、既知のモデル以外で指定）"
+    )
+
+    parser.add_argument(
+        "--max-output-tokens",
+        type=int,
+        help="--output-budget で使うモデルの最大出力トークン数"
+    )
+
+    parser.add_argument(
+        "--max-continuations",
+        type=int,
+        help="出力が最大トークン数で途切れた場合に続きを生成する最大回数（デフォルト: 3、0で無効）"
+    )
+
     parser.add_argument(
         "--api-key",
-        help="APIキー（形式: 'provider:key' 例: 'gemini:your-api-key'）"
+        help="APIキー（形式: 'provider:key' 例: 'gemini:your-api-key'）。カンマ区切りで複数指定するとキープールを使用"
+    )
+
+    parser.add_argument(
+        "--api-key-file",
+        help="APIキーを1行に1つ記載したファイルのパス（複数キーでリクエストを分散）"
     )
+    parser.add_argument(
+        "--key-requests-per-minute",
+        type=int,
+        metavar="N",
+        help="複数キーを使う場合のキーごとの1分あたりの最大リクエスト数（デフォルト: 無制限）"
+    )
+    parser.add_argument(
+        "--key-cooldown",
+        type=float,
+        metavar="SECONDS",
+        help="複数キーを使う場合に429/クォータエラーを受けたキーを休止させる秒数"
+             "（Retry-After がない場合。デフォルト: 60）"
+    )
+
+    parser.add_argument(
+        "--prompt-cache",
+        action="store_true",
+        help="テンプレート・プロンプトを不変なプレフィックスとして送信し、プロバイダーのプロンプトキャッシュを使う"
+    )
+
+    parser.add_argument(
+        "--style-guide",
+        help="プロンプトキャッシュ使用時にプレフィックスへ含めるスタイルガイドファイルのパス"
+    )
+
+    parser.add_argument(
+        "--similarity-cache",
+        help="類似キャッシュの履歴ファイルのパス。指定するとセクション単位で変換し、入力が類似したセクションは過去の結果を再利用"
+    )
+
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        default=0.95,
+        help="類似キャッシュで再利用する類似度のしきい値（0〜1、デフォルト: 0.95）"
+    )
+
+    # バッチ変換オプション（--input にディレクトリを指定した場合）
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="バッチ変換で同時にLLMで変換するジョブ数（デフォルト: 4）"
+    )
+    parser.add_argument(
+        "--cpu-workers",
+        type=int,
+        default=0,
+        help="バッチ変換でLLM前後のCPU処理（ルール・縮小・マスク）を実行するプロセス数"
+        "（デフォルト: 0 = ジョブのスレッドで処理）"
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=2,
+        help="バッチ変換でファイルの読み込み・書き込みをそれぞれ同時に行う数（デフォルト: 2）"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"バッチ変換のステージ間のキューの大きさ（デフォルト: {DEFAULT_QUEUE_SIZE}）"
+    )
+
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="LLMへの1回のリクエストのタイムアウト秒数"
+        f"（デフォルト: {DEFAULT_REQUEST_TIMEOUT:g}、openai-compatible は600）"
+    )
+    parser.add_argument(
+        "--job-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="1件の変換の制限時間（秒）。再試行・セクションごとの変換・続きの生成を含めた合計で、超えると失敗にする"
+    )
+    parser.add_argument(
+        "--batch-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="バッチ変換全体の制限時間（秒）。超えると実行中の変換を中断し、残りを未処理として終了する（--resume で再開可能）"
+    )
+
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        help="LLMリクエスト全体の1分あたりのトークン数の上限（入力の推定トークン数と max_tokens の合計で数える）"
+    )
+    parser.add_argument(
+        "--interactive-pattern",
+        action="append",
+        metavar="GLOB",
+        help="バッチ変換で優先して変換するファイルのglobパターン（複数指定可）。一致したファイルを先に処理し、"
+             "LLMの同時実行数とトークン数/分の一部を予約する"
+    )
+    parser.add_argument(
+        "--interactive-share",
+        type=float,
+        default=0.25,
+        help="--interactive-pattern のファイルに予約する同時実行数・トークン数/分の割合（0〜1、デフォルト: 0.25）"
+    )
+
+    parser.add_argument(
+        "--pattern",
+        default="*.md",
+        help="バッチ変換の対象ファイルのglobパターン（デフォルト: *.md）"
+    )
+
+    parser.add_argument(
+        "--journal",
+        help=f"バッチ変換のジョブジャーナルのパス（デフォルト: 出力ディレクトリ/{DEFAULT_JOURNAL_NAME}）"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="ジョブジャーナルで完了済みのジョブをスキップして前回のバッチ変換を再開する"
+    )
+
+    parser.add_argument(
+        "--mask",
+        nargs="?",
+        const=",".join(MASK_KINDS),
+        metavar="KINDS",
+        help=f"LLMに送る前にコードブロックなどをプレースホルダーに置き換え、変換後に元に戻す。"
+             f"種類をカンマ区切りで指定可能（{','.join(MASK_KINDS)}、省略時はすべて）"
+    )
+
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="入力テキストとプロンプトから余分な空白・空行・HTMLコメントを取り除いて送信する（コードブロックは変更しない）"
+    )
+
+    parser.add_argument(
+        "--minify-strip",
+        action="append",
+        metavar="REGEX",
+        help="--minify で追加で取り除く部分の正規表現（複数指定可）"
+    )
+
+    parser.add_argument(
+        "--rules",
+        choices=sorted(RULESETS),
+        help="LLMを使わずに記法を機械的に変換するルールセット（例: zenn-to-note）"
+    )
+
+    parser.add_argument(
+        "--rules-mode",
+        choices=list(RULES_MODES),
+        default="only",
+        help="ルールセットの適用方法: only（ルールのみでLLMを使わない）、pre（LLMの前）、post（LLMの後）（デフォルト: only）"
+    )
+
+    parser.add_argument(
+        "--html",
+        action="store_true",
+        help="変換結果のマークダウンをHTMLにレンダリングして出力する（バッチ変換では出力ファイルの拡張子を .html にする）"
+    )
+    parser.add_argument(
+        "--html-extensions",
+        default=",".join(DEFAULT_EXTENSIONS),
+        metavar="EXTS",
+        help=f"--html で有効にする Python-Markdown の拡張機能（カンマ区切り、デフォルト: {','.join(DEFAULT_EXTENSIONS)}）"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="前回の変換をセクション単位で出力先の隣に保存し、変更されたセクションだけを再変換する（--output が必要）"
+    )
+
+    parser.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        help="LLMのリクエストと応答・トークン使用量・応答時間をカセットファイル（JSON Lines、.gz で圧縮）に記録する"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        help="LLMに接続せず、カセットファイルに記録した応答を返す（記録されていないリクエストはエラー）"
+    )
+    parser.add_argument(
+        "--replay-latency",
+        choices=["none", "recorded"],
+        default="none",
+        help="--replay で記録した応答時間を再現するかどうか（none: すぐに返す、recorded: 記録どおり待つ。デフォルト: none）"
+    )
+
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="ステージごとに cProfile と tracemalloc で計測し、.pstats と要約（summary.txt）をディレクトリに書き出す"
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=int,
+        default=1,
+        metavar="N",
+        help="--profile で各ステージの N 回に1回の呼び出しだけを計測する（2以上ではメモリ確保を計測せず、"
+             "最大常駐メモリだけを報告する。デフォルト: 1）"
+    )
+
+    args = parser.parse_args()
+    rules_only = args.rules and args.rules_mode == "only"
+    if not args.input and not args.jsonl:
+        parser.error("--input または --jsonl のいずれかを指定してください")
+    if args.input and args.jsonl:
+        parser.error("--input と --jsonl は同時に指定できません")
+    if args.ordered and not args.jsonl:
+        parser.error("--ordered には --jsonl の指定が必要です")
+    if not args.template and not args.target and not rules_only and not args.jsonl:
+        parser.error("--template または --target のいずれかを指定してください")
+    if args.mask:
+        unknown = set(_split_kinds(args.mask)) - set(MASK_KINDS)
+        if unknown:
+            parser.error(f"--mask に不明な種類が指定されました: {', '.join(sorted(unknown))}")
+    for pattern in args.minify_strip or []:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            parser.error(f"--minify-strip の正規表現が不正です: {pattern}: {e}")
+    if args.incremental and not args.output:
+        parser.error("--incremental には --output の指定が必要です")
+    if args.record and args.replay:
+        parser.error("--record と --replay は同時に指定できません")
+    if args.profile_sample < 1:
+        parser.error("--profile-sample には1以上を指定してください")
+    if args.key_requests_per_minute is not None and args.key_requests_per_minute < 1:
+        parser.error("--key-requests-per-minute には1以上を指定してください")
+    for value in args.fallback or []:
+        if value.partition(":")[0] not in LLM_PROVIDERS:
+            parser.error(f"--fallback に不明なプロバイダーが指定されました: {value}")
+    return args
+
+
+def _split_kinds(value: str) -> List[str]:
+    """カンマ区切りの種類の指定をリストに分割する"""
+    return [kind.strip() for kind in value.split(",") if kind.strip()]
+
+
+def parse_targets(target_args: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    --target 引数を (テンプレートパス, 出力パス) の組に変換する
+
+    Args:
+        target_args: 'TEMPLATE' または 'TEMPLATE=OUTPUT' 形式の文字列リスト
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: テンプレートパスと出力パス（省略時はNone）の組
+    """
+    targets: List[Tuple[str, Optional[str]]] = []
+    for value in target_args:
+        template_path, sep, output_path = value.partition("=")
+        targets.append((template_path, output_path if sep and output_path else None))
+    return targets
 
-    return parser.parse_args()
 
+def _split_keys(value: str) -> List[str]:
+    """カンマ・改行区切りの文字列をAPIキーのリストに分割する"""
+    return [k.strip() for k in value.replace("\n", ",").split(",") if k.strip()]
 
-def get_api_key(provider: str, api_key_arg: Optional[str] = None) -> str:
+
+def _read_key_file(provider: str, path: str) -> List[str]:
+    """
+    APIキーファイルを読み込む
+
+    1行に1つのキーを記載する。空行と '#' で始まる行は無視し、
+    'provider:key' 形式の行は指定プロバイダーに一致するものだけを使う。
+    """
+    keys: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if ":" in line:
+                key_provider, key = line.split(":", 1)
+                if key_provider.lower() != provider.lower():
+                    continue
+                line = key.strip()
+            keys.append(line)
+    return keys
+
+
+def _as_key_result(keys: List[str]) -> Union[str, List[str]]:
+    """キーが1つなら文字列、複数ならリストとして返す"""
+    return keys[0] if len(keys) == 1 else keys
+
+
+# APIキーが必須ではないプロバイダー
+KEYLESS_PROVIDERS = ("openai-compatible",)
+
+
+def get_api_key(
+    provider: str,
+    api_key_arg: Optional[str] = None,
+    api_key_file: Optional[str] = None,
+) -> Union[str, List[str]]:
     """
-    環境変数または引数からAPIキーを取得する
+    環境変数、引数またはキーファイルからAPIキーを取得する
+
+    優先順位は コマンドライン引数 > キーファイル > 環境変数。
+    引数と環境変数はカンマ区切りで複数のキーを指定できる。
+    環境変数 ``<ENV>_FILE``（例: GOOGLE_API_KEY_FILE）でキーファイルを指定することもできる。
 
     Args:
         provider: プロバイダー名
         api_key_arg: コマンドライン引数で指定されたAPIキー
+        api_key_file: APIキーを1行に1つ記載したファイルのパス
 
     Returns:
-        str: APIキー
+        Union[str, List[str]]: APIキー（複数見つかった場合はリスト）
 
     Raises:
         ValueError: APIキーが見つからない場合
     """
     # コマンドライン引数が優先
     if api_key_arg:
-        if ":" in api_key_arg:
+        value = str(api_key_arg)
+        key_provider = None
+        if ":" in value:
             # 形式が 'provider:key' の場合
-            key_provider, key = api_key_arg.split(":", 1)
-            if key_provider.lower() == provider.lower():
-                return key
-        else:
-            # 形式が 'key' の場合
-            return api_key_arg
+            key_provider, value = value.split(":", 1)
+        if key_provider is None or key_provider.lower() == provider.lower():
+            keys = _split_keys(value)
+            if keys:
+                return _as_key_result(keys)
 
-    # 環境変数名の特例対応（gemini→GOOGLE_API_KEY）
+    # 環境変数名の特例対応（gemini→GOOGLE_API_KEY、openai-compatible→OPENAI_COMPATIBLE_API_KEY）
     if provider.lower() == "gemini":
         env_var = "GOOGLE_API_KEY"
     else:
-        env_var = f"{provider.upper()}_API_KEY"
-    api_key = os.getenv(env_var)
-    if not api_key:
+        env_var = f"{provider.upper().replace('-', '_')}_API_KEY"
+
+    key_file = api_key_file or os.getenv(f"{env_var}_FILE")
+    if key_file:
+        keys = _read_key_file(provider, key_file)
+        if keys:
+            return _as_key_result(keys)
+
+    keys = _split_keys(os.getenv(env_var) or "")
+    if not keys:
         raise ValueError(
             f"{provider} APIキーが設定されていません。"
             f"環境変数 {env_var} を設定するか、--api-key 引数で指定してください。"
         )
-    return api_key
+    return _as_key_result(keys)
+
+
+def _provider_options(args: argparse.Namespace, provider: Optional[str] = None) -> Dict[str, Any]:
+    """
+    コマンドライン引数からプロバイダー固有のオプションを組み立てる
+
+    Args:
+        args: パースされた引数
+        provider: プロバイダー名（省略時は --llm-provider。フォールバック先のプロバイダーには
+            --base-url などの --llm-provider 向けのオプションを渡さない）
+
+    Returns:
+        Dict[str, Any]: プロバイダーのコンストラクタに渡す追加オプション
+    """
+    options: Dict[str, Any] = {}
+    request_timeout = getattr(args, "request_timeout", None)
+    if isinstance(request_timeout, (int, float)):
+        options["timeout"] = request_timeout
+    if provider is not None and provider != args.llm_provider:
+        return options
+    base_url = getattr(args, "base_url", None)
+    if args.llm_provider == "openai-compatible":
+        if isinstance(base_url, str):
+            options["base_url"] = base_url
+        if getattr(args, "stream", False) is True:
+            options["stream"] = True
+        parallel = getattr(args, "parallel", None)
+        if isinstance(parallel, int):
+            options["parallel"] = parallel
+    elif args.llm_provider == "openrouter" and isinstance(base_url, str):
+        options["api_base"] = base_url
+    return options
+
+
+def _pool_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """コマンドライン引数から複数キーのプールのオプションを組み立てる"""
+    options: Dict[str, Any] = {}
+    requests_per_minute = getattr(args, "key_requests_per_minute", None)
+    if isinstance(requests_per_minute, int):
+        options["requests_per_minute"] = requests_per_minute
+    cooldown = getattr(args, "key_cooldown", None)
+    if isinstance(cooldown, (int, float)):
+        options["cooldown_seconds"] = cooldown
+    return options
+
+
+def _fallback_chain(args: argparse.Namespace, fallbacks: List[str]) -> List[Dict[str, Any]]:
+    """
+    --fallback の指定からフォールバック先のプロバイダーの作成引数を組み立てる
+
+    APIキーは --api-key-file と環境変数から探す（--api-key は --llm-provider 用）。
+
+    Args:
+        args: パースされた引数
+        fallbacks: 'PROVIDER[:MODEL]' 形式の文字列のリスト
+
+    Returns:
+        List[Dict[str, Any]]: LLMProviderFactory.create に渡す引数の辞書のリスト
+
+    Raises:
+        ValueError: APIキーが必要なプロバイダーのキーが見つからない場合
+    """
+    chain: List[Dict[str, Any]] = []
+    for value in fallbacks:
+        provider, _, model = value.partition(":")
+        api_key_file = getattr(args, "api_key_file", None)
+        try:
+            api_key: Any = get_api_key(
+                provider, None, api_key_file if isinstance(api_key_file, str) else None
+            )
+        except ValueError:
+            if provider not in KEYLESS_PROVIDERS:
+                raise
+            api_key = None
+        spec: Dict[str, Any] = {"provider_type": provider, "api_key": api_key, "model": model or None}
+        options = _provider_options(args, provider)
+        if options:
+            spec["provider_options"] = options
+        pool_options = _pool_options(args)
+        if pool_options:
+            spec["pool_options"] = pool_options
+        chain.append(spec)
+    return chain
+
+
+def _breaker_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """コマンドライン引数からサーキットブレーカーのオプションを組み立てる"""
+    options: Dict[str, Any] = {}
+    for key, name in (
+        ("breaker_error_rate", "error_rate"),
+        ("breaker_slow_call", "slow_call_seconds"),
+        ("breaker_open_seconds", "open_seconds"),
+    ):
+        value = getattr(args, key, None)
+        if isinstance(value, (int, float)):
+            options[name] = value
+    return options
+
+
+def _priority_of(input_dir: str, patterns: List[str]) -> Callable[[str], str]:
+    """
+    入力ディレクトリからの相対パスがパターンに一致するファイルを interactive とする関数を返す
+
+    Args:
+        input_dir: 入力ディレクトリ
+        patterns: globパターンのリスト
+
+    Returns:
+        Callable[[str], str]: 入力パスから優先度クラス名を返す関数
+    """
+    root = Path(input_dir)
+
+    def priority(path: str) -> str:
+        relative = Path(path).relative_to(root)
+        return INTERACTIVE if any(relative.match(p) for p in patterns) else BULK
+
+    return priority
+
+
+def _scheduled(llm_provider: LLMProvider, args: argparse.Namespace) -> LLMProvider:
+    """
+    --tokens-per-minute・--interactive-pattern が指定された場合、優先度スケジューラーを通すプロバイダーで包む
+
+    Args:
+        llm_provider: LLMプロバイダー
+        args: パースされた引数
+
+    Returns:
+        LLMProvider: スケジューラーを通すプロバイダー（指定がない場合は llm_provider のまま）
+    """
+    tokens_per_minute = getattr(args, "tokens_per_minute", None)
+    interactive_patterns = getattr(args, "interactive_pattern", None)
+    has_tpm = isinstance(tokens_per_minute, int)
+    if not has_tpm and not (isinstance(interactive_patterns, list) and interactive_patterns):
+        return llm_provider
+    share = getattr(args, "interactive_share", None)
+    scheduler = PriorityScheduler(
+        max_concurrency=args.jobs if isinstance(getattr(args, "jobs", None), int) else 4,
+        tokens_per_minute=tokens_per_minute if has_tpm else None,
+        classes=priority_classes(share if isinstance(share, float) else 0.25),
+    )
+    return ScheduledProvider(llm_provider, scheduler)
+
+
+def _profiler(args: argparse.Namespace) -> Optional[Profiler]:
+    """--profile が指定されている場合にプロファイラーを作成する"""
+    output_dir = getattr(args, "profile", None)
+    if not isinstance(output_dir, str):
+        return None
+    sample_every = getattr(args, "profile_sample", 1)
+    return Profiler(output_dir, sample_every=sample_every if isinstance(sample_every, int) else 1)
+
+
+def _write_profile(profiler: Profiler) -> None:
+    """プロファイルを書き出し、要約ファイルのパスを標準エラーに出力する"""
+    print(f"プロファイル: {profiler.write()}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def _profiled(args: argparse.Namespace, stage: str) -> Iterator[None]:
+    """
+    --profile が指定されている場合に with ブロックの処理を1つのステージとして計測する
+
+    Args:
+        args: パースされた引数
+        stage: ステージ名
+    """
+    profiler = _profiler(args)
+    if profiler is None:
+        yield
+        return
+    try:
+        with profiler, profiler.stage(stage):
+            yield
+    finally:
+        _write_profile(profiler)
+
+
+def _render_settings(args: argparse.Namespace) -> Optional[RenderSettings]:
+    """--html が指定されている場合にHTMLレンダリングの設定を返す"""
+    if getattr(args, "html", False) is not True:
+        return None
+    extensions = getattr(args, "html_extensions", None)
+    if not isinstance(extensions, str):
+        return RenderSettings()
+    return RenderSettings.create(_split_kinds(extensions))
+
+
+def _render(args: argparse.Namespace, text: str) -> str:
+    """--html が指定されている場合に変換結果をHTMLにレンダリングする"""
+    settings = _render_settings(args)
+    if settings is None:
+        return text
+    return html_renderer(settings).render(text)
+
+
+def _save_result(converter: Any, text: str, output_path: str) -> None:
+    """
+    変換結果を保存し、書き込み結果を表示する
+
+    Args:
+        converter: コンテンツコンバーター
+        text: 変換結果
+        output_path: 出力ファイルパス
+    """
+    if converter.save_converted_file(text, output_path) == UNCHANGED:
+        print(f"変更はありません: {output_path}")
+    else:
+        print(f"変換が完了しました: {output_path}")
+
+
+def _report_usage(converter: Any, html: Optional[RenderSettings] = None) -> None:
+    """
+    累計トークン使用量（キャッシュ済みトークン数を含む）と類似キャッシュの統計を標準エラーに出力する
+
+    出力予算を使っている場合は、学習した出力/入力比もここで保存する。
+
+    Args:
+        converter: コンテンツコンバーター
+        html: HTMLにレンダリングした場合の設定（このプロセスでレンダリングした分の統計を出力する）
+    """
+    if html is not None and html_renderer(html).stats.documents:
+        print(f"HTML: {html_renderer(html).stats.summary()}", file=sys.stderr)
+    llm_provider = getattr(converter, "llm_provider", None)
+    cache = getattr(converter, "similarity_cache", None)
+    if isinstance(cache, SimilarityCache):
+        print(f"類似キャッシュ: {cache.summary()}", file=sys.stderr)
+    minify_stats = getattr(converter, "minify_stats", None)
+    if isinstance(minify_stats, MinifyStats) and minify_stats.documents:
+        print(f"縮小: {minify_stats.summary()}", file=sys.stderr)
+    budget = getattr(converter, "output_budget", None)
+    if isinstance(budget, OutputBudget) and budget.requests:
+        budget.save()
+        print(f"出力予算: {budget.summary()}", file=sys.stderr)
+    masking = getattr(converter, "masking_stats", None)
+    if isinstance(masking, MaskingStats) and masking.documents:
+        print(f"マスク: {masking.summary()}", file=sys.stderr)
+    if isinstance(llm_provider, ScheduledProvider):
+        for line in llm_provider.scheduler.summary().splitlines():
+            print(f"スケジューラー: {line}", file=sys.stderr)
+        llm_provider = llm_provider.provider
+    if isinstance(llm_provider, (RecordingProvider, ReplayProvider)):
+        print(f"カセット: {llm_provider.summary()}", file=sys.stderr)
+    if isinstance(llm_provider, RecordingProvider):
+        llm_provider = llm_provider.provider
+    if isinstance(llm_provider, FallbackProvider):
+        for line in llm_provider.summary().splitlines():
+            print(f"フォールバック: {line}", file=sys.stderr)
+    continuations = getattr(llm_provider, "continuations", 0)
+    truncated = getattr(llm_provider, "truncated_outputs", 0)
+    if isinstance(continuations, int) and isinstance(truncated, int) and (continuations or truncated):
+        print(
+            f"続きの生成: {continuations}回（上限回数に達して途切れたままの出力 {truncated}件）",
+            file=sys.stderr,
+        )
+    totals = getattr(llm_provider, "usage_totals", None)
+    if not isinstance(totals, dict) or not totals.get("prompt_tokens"):
+        return
+    print(
+        f"トークン使用量: 入力 {totals['prompt_tokens']}"
+        f"（うちキャッシュ {totals.get('cached_tokens', 0)}）"
+        f" / 出力 {totals.get('completion_tokens', 0)}",
+        file=sys.stderr,
+    )
+
+
+def _run_targets(converter: Any, args: argparse.Namespace, prompt_path: Optional[str]) -> int:
+    """
+    複数ターゲットへの変換を実行し、結果を出力する
+
+    Args:
+        converter: コンテンツコンバーター
+        args: パースされた引数
+        prompt_path: プロンプトファイルのパス
+
+    Returns:
+        int: 終了コード
+    """
+    targets = parse_targets(args.target)
+    if args.template:
+        targets.insert(0, (args.template, args.output))
+
+    results = converter.convert_file_targets(
+        input_path=args.input,
+        template_paths={template_path: template_path for template_path, _ in targets},
+        prompt_path=prompt_path,
+        single_request=bool(getattr(args, "single_request", False)),
+    )
+
+    for template_path, output_path in targets:
+        result = _render(args, results[template_path])
+        if output_path:
+            _save_result(converter, result, output_path)
+        else:
+            print(f"===== {template_path} =====")
+            print(result)
+    _report_usage(converter, _render_settings(args))
+    return 0
+
+
+def _run_batch(converter: Any, args: argparse.Namespace, prompt_path: Optional[str]) -> int:
+    """
+    ディレクトリ単位のバッチ変換を実行する
+
+    Args:
+        converter: コンテンツコンバーター
+        args: パースされた引数
+        prompt_path: プロンプトファイルのパス
+
+    Returns:
+        int: 終了コード（中断時は130、バッチ全体の制限時間に達した場合は124）
+    """
+    # ルールエンジンだけで変換する場合はテンプレートを省略できる
+    rules_only = getattr(args, "rules", None) and getattr(args, "rules_mode", None) == "only"
+    if not args.output or not (args.template or rules_only):
+        print("エラー: バッチ変換には --template と出力ディレクトリ（--output）が必要です", file=sys.stderr)
+        return 1
+
+    runner_options: Dict[str, Any] = {}
+    for key in ("job_timeout", "batch_timeout"):
+        if isinstance(getattr(args, key, None), (int, float)):
+            runner_options[key] = getattr(args, key)
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs: Iterator[Tuple[str, str]] = iter_jobs(args.input, args.output, args.pattern)
+    interactive_patterns = getattr(args, "interactive_pattern", None)
+    if isinstance(interactive_patterns, list) and interactive_patterns:
+        priority = _priority_of(args.input, interactive_patterns)
+        # 優先するファイルを先に処理する（ディレクトリを2回走査し、一覧はメモリに保持しない）
+        jobs = itertools.chain(
+            (job for job in jobs if priority(job[0]) == INTERACTIVE),
+            (
+                job for job in iter_jobs(args.input, args.output, args.pattern)
+                if priority(job[0]) == BULK
+            ),
+        )
+        runner_options["priority"] = priority
+    html = _render_settings(args)
+    if html is not None:
+        jobs = ((input_path, str(Path(output_path).with_suffix(".html"))) for input_path, output_path in jobs)
+        runner_options["html"] = html
+    profiler = _profiler(args)
+    if profiler is not None:
+        runner_options["profiler"] = profiler
+    journal_path = args.journal or os.path.join(args.output, DEFAULT_JOURNAL_NAME)
+    with JobJournal(journal_path) as journal:
+        runner = BatchRunner(
+            converter,
+            template_path=args.template,
+            prompt_path=prompt_path,
+            max_workers=args.jobs,
+            journal=journal,
+            incremental=getattr(args, "incremental", False) is True,
+            cpu_workers=args.cpu_workers,
+            io_workers=args.io_workers,
+            queue_size=args.queue_size,
+            **runner_options
+        )
+        with runner.handle_signals(), profiler or contextlib.nullcontext():
+            result = runner.run(jobs, resume=args.resume)
+
+    for job_id, error in result.errors.items():
+        print(f"エラー: {job_id}: {error}", file=sys.stderr)
+    print(f"バッチ変換: {result.summary()}")
+    for stats in result.stages:
+        print(f"ステージ {stats.summary()}", file=sys.stderr)
+    _report_usage(converter, html)
+    if profiler is not None:
+        _write_profile(profiler)
+    if result.timed_out:
+        return 124
+    if result.interrupted:
+        return 130
+    return 0 if result.ok else 1
+
+
+def _run_jsonl(converter: Any, args: argparse.Namespace, prompt_path: Optional[str]) -> int:
+    """
+    JSON Lines のジョブレコードを並行に変換し、結果レコードを標準出力に書き出す
+
+    Args:
+        converter: コンテンツコンバーター
+        args: パースされた引数
+        prompt_path: レコードにプロンプトがない場合のプロンプトファイルのパス
+
+    Returns:
+        int: 終了コード（失敗したジョブがある場合は1、中断時は130）
+    """
+    template = None
+    if isinstance(args.template, str):
+        with open(args.template, "r", encoding="utf-8") as f:
+            template = f.read()
+    prompt = None
+    if isinstance(prompt_path, str):
+        with open(prompt_path, "r", encoding="utf-8") as f:
+            prompt = f.read()
+    job_timeout = getattr(args, "job_timeout", None)
+    profiler = _profiler(args)
+    runner = JsonlRunner(
+        converter,
+        template=template,
+        prompt=prompt,
+        max_workers=args.jobs,
+        io_workers=args.io_workers,
+        queue_size=args.queue_size,
+        ordered=getattr(args, "ordered", False) is True,
+        job_timeout=job_timeout if isinstance(job_timeout, (int, float)) else None,
+        profiler=profiler,
+        html=_render_settings(args),
+    )
+
+    def write(line: str) -> None:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    try:
+        with profiler or contextlib.nullcontext():
+            if args.jsonl == "-":
+                result = runner.run(sys.stdin, write)
+            else:
+                with open(args.jsonl, "r", encoding="utf-8") as f:
+                    result = runner.run(f, write)
+    except KeyboardInterrupt:
+        print("JSONL変換: 中断しました", file=sys.stderr)
+        return 130
+    print(f"JSONL変換: {result.summary()}", file=sys.stderr)
+    _report_usage(converter, runner.html)
+    if profiler is not None:
+        _write_profile(profiler)
+    return 0 if result.ok else 1
 
 
 def main() -> int:
-    """メインエントリーポイント"""
+    """メインエントリーポイント（content-converter bench で負荷生成ツールを実行する）"""
+    if sys.argv[1:2] == ["bench"]:
+        from .bench import main as bench_main
+
+        return bench_main(sys.argv[2:])
     try:
         args = parse_args()
 
         # APIキーを取得
         api_key = None
-        if args.llm_provider:
+        rules_only = getattr(args, "rules", None) and getattr(args, "rules_mode", None) == "only"
+        replay = getattr(args, "replay", None)
+        if args.llm_provider and not rules_only and not isinstance(replay, str):
             try:
-                api_key = get_api_key(args.llm_provider, args.api_key)
+                api_key = get_api_key(
+                    args.llm_provider, args.api_key, getattr(args, "api_key_file", None)
+                )
             except ValueError as e:
+                # ローカルサーバー向けのプロバイダーはAPIキーなしでも使える
+                if args.llm_provider not in KEYLESS_PROVIDERS:
+                    print(f"エラー: {e}", file=sys.stderr)
+                    return 1
+            except OSError as e:
                 print(f"エラー: {e}", file=sys.stderr)
                 return 1
 
         # LLMプロバイダーを初期化
-        llm_provider = None
+        llm_provider: Optional[LLMProvider] = None
         # E2Eテスト用: MOCK_LLM_PROVIDERがセットされていればダミーを使う
         if os.environ.get("MOCK_LLM_PROVIDER") == "1":
             import re
@@ -147,40 +1023,120 @@ def main() -> int:
                     return self._extract_template_result(prompt)
                 def optimize_content(self, prompt, **kwargs):
                     return self._extract_template_result(prompt)
-            llm_provider = DummyLLMProvider()
-        elif api_key:
+            # LLMProvider のメソッドのうち変換で使うものだけを持つダックタイピングのダミー
+            llm_provider = cast(LLMProvider, DummyLLMProvider())
+        elif isinstance(replay, str):
+            if not os.path.exists(replay):
+                print(f"エラー: カセットファイルが見つかりません: {replay}", file=sys.stderr)
+                return 1
+            latency = getattr(args, "replay_latency", "none")
+            replay_provider = ReplayProvider(
+                Cassette(replay), latency=latency if isinstance(latency, str) else "none"
+            )
+            llm_provider = _scheduled(replay_provider, args)
+        elif api_key or args.llm_provider in KEYLESS_PROVIDERS:
             try:
-                llm_provider = LLMProviderFactory.create(
-                    provider_type=args.llm_provider,
-                    api_key=api_key,
-                    model=args.model
-                )
+                provider_options = _provider_options(args)
+                create_kwargs: Dict[str, Any] = {}
+                if provider_options:
+                    create_kwargs["provider_options"] = provider_options
+                pool_options = _pool_options(args)
+                if pool_options:
+                    create_kwargs["pool_options"] = pool_options
+                fallbacks = getattr(args, "fallback", None)
+                if isinstance(fallbacks, list) and fallbacks:
+                    primary = dict(
+                        provider_type=args.llm_provider, api_key=api_key, model=args.model,
+                        **create_kwargs
+                    )
+                    llm_provider = LLMProviderFactory.create_fallback(
+                        [primary] + _fallback_chain(args, fallbacks), _breaker_options(args)
+                    )
+                else:
+                    llm_provider = LLMProviderFactory.create(
+                        provider_type=args.llm_provider,
+                        api_key=api_key,
+                        model=args.model,
+                        **create_kwargs
+                    )
             except ValueError as e:
                 print(f"エラー: {e}", file=sys.stderr)
                 return 1
+            record = getattr(args, "record", None)
+            if isinstance(record, str):
+                llm_provider = RecordingProvider(llm_provider, Cassette(record))
+            llm_provider = _scheduled(llm_provider, args)
 
         # コンバーターを初期化
+        config: Dict[str, Any] = {}
+        if getattr(args, "prompt_cache", False):
+            config["prompt_cache"] = True
+            style_guide_path = getattr(args, "style_guide", None)
+            if isinstance(style_guide_path, str):
+                with open(style_guide_path, "r", encoding="utf-8") as f:
+                    config["style_guide"] = f.read()
+        if getattr(args, "minify", False) is True:
+            config["minify"] = True
+            minify_strip = getattr(args, "minify_strip", None)
+            if isinstance(minify_strip, list):
+                config["minify_patterns"] = minify_strip
+        if isinstance(getattr(args, "mask", None), str):
+            config["mask"] = _split_kinds(args.mask)
+        if isinstance(getattr(args, "rules", None), str):
+            config["rules"] = args.rules
+            config["rules_mode"] = args.rules_mode
+        output_budget = getattr(args, "output_budget", None)
+        if output_budget is True or isinstance(output_budget, str):
+            config["output_budget"] = output_budget
+            for key in ("context_limit", "max_output_tokens"):
+                if isinstance(getattr(args, key, None), int):
+                    config[key] = getattr(args, key)
+        if isinstance(getattr(args, "max_continuations", None), int):
+            config["max_continuations"] = args.max_continuations
+        similarity_cache = getattr(args, "similarity_cache", None)
+        if isinstance(similarity_cache, str):
+            config["similarity_cache"] = similarity_cache
+            config["similarity_threshold"] = args.similarity_threshold
         converter = ConverterFactory.create_converter(
-            llm_provider=llm_provider, model=args.model
+            llm_provider=llm_provider, config=config, model=args.model
         )
 
         # 変換を実行
         try:
             # --prompt-file > --prompt > None の優先順位でプロンプトファイルを選択
             prompt_path = args.prompt_file if getattr(args, "prompt_file", None) else args.prompt
-            result = converter.convert_file(
-                input_path=args.input,
-                template_path=args.template,
-                prompt_path=prompt_path
-            )
 
-            # 結果を出力
-            if args.output:
-                converter.save_converted_file(result, args.output)
-                print(f"変換が完了しました: {args.output}")
-            else:
-                print(result)
+            if isinstance(getattr(args, "jsonl", None), str):
+                return _run_jsonl(converter, args, prompt_path)
+            if isinstance(args.input, str) and os.path.isdir(args.input):
+                return _run_batch(converter, args, prompt_path)
+
+            # 1件の変換の制限時間（再試行・セクション・続きの生成を含む）
+            job_timeout = getattr(args, "job_timeout", None)
+            deadline = Deadline(job_timeout) if isinstance(job_timeout, (int, float)) else None
+            with _profiled(args, "convert"), deadline_scope(deadline):
+                target_args = getattr(args, "target", None)
+                if isinstance(target_args, list) and target_args:
+                    return _run_targets(converter, args, prompt_path)
+
+                convert_kwargs: Dict[str, Any] = {}
+                if getattr(args, "incremental", False) is True and args.output:
+                    convert_kwargs["state_path"] = default_state_path(args.output)
+                result = converter.convert_file(
+                    input_path=args.input,
+                    template_path=args.template,
+                    prompt_path=prompt_path,
+                    **convert_kwargs
+                )
+
+                # 結果を出力
+                result = _render(args, result)
+                if args.output:
+                    _save_result(converter, result, args.output)
+                else:
+                    print(result)
 
+            _report_usage(converter, _render_settings(args))
             return 0
 
         except FileNotFoundError as e:
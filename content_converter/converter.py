@@ -6,23 +6,91 @@ Converter module
 コンテンツ変換の中核機能を提供するモジュール
 """
 
-from typing import Any, Dict, Optional
+import re
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
-from .llm.base import LLMProvider
+from .budget import ModelLimits, OutputBudget, model_limits
+from .core.masking import MASK_KINDS, MaskingStats, RestoreReport
+from .core.minify import MinifyStats
+from .core.sections import Section, join_sections, split_sections
+from .core.tokens import estimate_tokens
+from .deadline import bind_deadline
+from .incremental import IncrementalResult, IncrementalState, SectionRecord
+from .llm.base import LLMProvider, Message, model_name_of
+from .rules import RuleEngine
+from .similarity import SimilarityCache, context_key
+from .stages import PreparedRequest, StageSettings, apply_rules, finish_request, prepare_request
+from .writer import OutputWriter
+
+# インデントはトークンの無駄になるため取り除いて保持する
+DEFAULT_PROMPT = textwrap.dedent("""
+        以下の入力テキストを指定されたテンプレートの形式に変換してください。
+
+        # 入力テキスト
+        {{input}}
+
+        # 使用するテンプレート
+        {{template}}
+
+        # 出力要件
+        - テンプレート内のプレースホルダーを適切に置き換えてください
+        - フォーマットを維持してください
+        - 構造を保持してください
+        """).strip("\n")
+
+# プロンプトキャッシュ使用時に、プロンプト内のプレースホルダーを置き換える参照文
+INPUT_REFERENCE = "（最後のメッセージ「入力テキスト」を参照）"
+TEMPLATE_REFERENCE = "（メッセージ「使用するテンプレート」を参照）"
+
+# 入力をマスクした場合にプロンプトの末尾へ追加する指示
+MASK_INSTRUCTIONS = """
+# プレースホルダー
+- [[M1]] のような二重角括弧のプレースホルダーは、コードブロック・表・画像・URLなどを置き換えたものです
+- プレースホルダーは変更・翻訳・削除・複製せず、対応する位置にそのまま出力してください
+"""
+
+# ルールエンジンの適用段階
+RULES_MODES = ("only", "pre", "post")
+
+# セクション単位で変換する際にプロンプトの末尾へ追加する指示
+SECTION_INSTRUCTIONS = """
+# セクション単位の変換
+- 入力テキストは記事の一部（1つのセクション）です
+- このセクションに対応する変換結果のみを出力し、テンプレートの他の部分は出力しないでください
+"""
+
+# 複数ターゲットを1リクエストで変換する際の出力区切り
+TARGET_MARKER = "=====TARGET: {name}====="
+_TARGET_MARKER_RE = re.compile(r"^=====TARGET: (.+?)=====[ \t]*$", re.MULTILINE)
+
+MULTI_TARGET_INSTRUCTIONS = """
+# 複数ターゲットの出力形式
+- 上記の各テンプレートについて、それぞれ変換結果を出力してください
+- 各変換結果の直前に、区切り行 `=====TARGET: ターゲット名=====` を単独の行で出力してください
+- 区切り行以外の前置きや説明は出力しないでください
+"""
 
 
 class ContentConverter:
     """コンテンツ変換を行うメインクラス"""
 
-    def save_converted_file(self, text: str, output_path: str) -> None:
+    def save_converted_file(self, text: str, output_path: str) -> str:
         """
         変換結果を指定ファイルに保存する
+
+        一時ファイルに書き込んでからリネームするため、途中で中断されても
+        出力ファイルが壊れない。内容が既存ファイルと同じ場合は書き込まない。
+
         Args:
             text: 保存するテキスト
             output_path: 出力ファイルパス
+
+        Returns:
+            str: WRITTEN（書き込んだ）または UNCHANGED（変更なし）
         """
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        return self.writer.write(output_path, text)
 
     def __init__(
         self,
@@ -40,6 +108,61 @@ class ContentConverter:
         self.llm_provider = llm_provider
         self.config = config or {}
         self.model = model
+        self.writer = OutputWriter(fsync=self.config.get("fsync", "always"))
+
+        # 類似キャッシュ（config の "similarity_cache" にパスまたはTrueを指定すると有効）
+        self.similarity_cache: Optional[SimilarityCache] = None
+        similarity_cache = self.config.get("similarity_cache")
+        if similarity_cache:
+            self.similarity_cache = SimilarityCache(
+                path=similarity_cache if isinstance(similarity_cache, str) else None,
+                similarity=self.config.get("similarity_threshold", 0.95),
+            )
+
+        # マスク（config の "mask" にTrueまたはマスクする要素の種類のリストを指定すると有効）
+        mask = self.config.get("mask")
+        self.mask_kinds: Tuple[str, ...] = (
+            MASK_KINDS if mask is True else tuple(mask) if mask else ()
+        )
+        self.masking_stats = MaskingStats()
+
+        # 縮小（config の "minify" をTrueにすると有効、"minify_patterns" で取り除く正規表現を追加）
+        self.minify_stats = MinifyStats()
+
+        # ルールエンジン（config の "rules" にルールセット名または RuleEngine を指定すると有効）
+        # "rules_mode" は 'only'（LLMを使わない）、'pre'（LLMの前）、'post'（LLMの後）のいずれか
+        rules = self.config.get("rules")
+        self.rule_engine: Optional[RuleEngine] = (
+            RuleEngine.from_name(rules) if isinstance(rules, str) else rules
+        )
+        self.rules_mode = self.config.get("rules_mode", "only")
+        if self.rules_mode not in RULES_MODES:
+            raise ValueError(f"Unsupported rules mode: {self.rules_mode}")
+
+        # 出力トークン数の予算（config の "output_budget" にTrueまたは学習値を保存するパスを指定すると有効）
+        # "context_limit"・"max_output_tokens" でモデルの上限を上書きできる（ローカルモデル向け）
+        self.output_budget: Optional[OutputBudget] = None
+        output_budget = self.config.get("output_budget")
+        if output_budget:
+            limits = None
+            if self.config.get("context_limit") or self.config.get("max_output_tokens"):
+                known = model_limits(self._model_name())
+                limits = ModelLimits(
+                    self.config.get("context_limit") or known.context,
+                    self.config.get("max_output_tokens") or known.max_output,
+                )
+            self.output_budget = OutputBudget(
+                path=output_budget if isinstance(output_budget, str) else None, limits=limits
+            )
+
+        # LLM呼び出しの前後のCPU処理の設定（CPUプールのワーカーにも渡す）
+        self.stage_settings = StageSettings(
+            rules=self.rule_engine,
+            rules_mode=self.rules_mode,
+            minify=bool(self.config.get("minify", False)),
+            minify_patterns=tuple(self.config.get("minify_patterns", ())),
+            mask_kinds=self.mask_kinds,
+        )
 
     def convert(
         self,
@@ -58,6 +181,27 @@ class ContentConverter:
         Returns:
             str: 変換されたテキスト
         """
+        if self.rule_engine is not None and self.rules_mode == "only":
+            return self.rule_engine.apply(input_text)
+        input_text = apply_rules(input_text, self.stage_settings, "pre")
+        return apply_rules(self._convert(input_text, template, prompt), self.stage_settings, "post")
+
+    @property
+    def supports_cpu_pool(self) -> bool:
+        """
+        LLM前後のCPU処理を文書単位でCPUプールに任せられるかどうか
+
+        LLMを使わない変換と、セクション単位で変換する類似キャッシュはコンバーター内で処理する。
+        """
+        return self.config.get("use_llm", True) and self.similarity_cache is None
+
+    def _convert(
+        self,
+        input_text: str,
+        template: str,
+        prompt: Optional[str] = None,
+    ) -> str:
+        """ルールエンジンの前後処理を除いた変換を行う（引数は convert と同じ）"""
         use_llm = self.config.get("use_llm", True)
         if not use_llm:
             # テンプレートの{{content}}または{{input}}にinput_textを埋め込むだけ
@@ -69,35 +213,391 @@ class ContentConverter:
             else:
                 return input_text
         # LLM使用時
-        default_prompt = """
-        以下の入力テキストを指定されたテンプレートの形式に変換してください。
+        if self.similarity_cache is not None:
+            return self._convert_with_similarity(input_text, template, prompt)
+        return self._convert_llm(input_text, template, prompt)
 
-        # 入力テキスト
-        {{input}}
+    def _convert_llm(
+        self,
+        input_text: str,
+        template: str,
+        prompt: Optional[str] = None,
+        instructions: str = "",
+    ) -> str:
+        """
+        LLMを使って変換する
 
-        # 使用するテンプレート
-        {{template}}
+        Args:
+            input_text: 入力テキスト
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略可）
+            instructions: プロンプトの末尾に追加する指示
 
-        # 出力要件
-        - テンプレート内のプレースホルダーを適切に置き換えてください
-        - フォーマットを維持してください
-        - 構造を保持してください
+        Returns:
+            str: 変換されたテキスト
+        """
+        # テンプレートは出力の書式そのものを表すため縮小・マスクの対象外
+        prepared = prepare_request(input_text, prompt, self.stage_settings)
+        return self.finish_prepared(prepared, self.send_prepared(prepared, template, instructions))
+
+    def send_prepared(
+        self, prepared: PreparedRequest, template: str, instructions: str = ""
+    ) -> str:
+        """
+        縮小・マスク済みの入力をLLMに送信し、復元前の出力を返す
+
+        CPUプールで準備した入力はこのメソッドでスレッドから送信する。
+
+        Args:
+            prepared: 送信する入力（stages.prepare_request の戻り値）
+            template: テンプレートテキスト
+            instructions: プロンプトの末尾に追加する指示
+
+        Returns:
+            str: LLMの出力
+        """
+        # 出力/入力比はテンプレートと追加の指示ごとに学習する
+        budget_key = context_key(template, instructions)
+        if prepared.masked is not None:
+            instructions = MASK_INSTRUCTIONS + instructions
+
+        options = self._llm_options()
+        prompt_cache = self.config.get("prompt_cache", False)
+        if prompt_cache:
+            messages = self._build_messages(prepared.text, template, prepared.prompt)
+            messages[0]["content"] += instructions
+            prompt_text = "".join(m["content"] for m in messages)
+        else:
+            prompt_text = self._render_prompt(prepared.text, template, prepared.prompt) + instructions
+
+        if self.output_budget is not None:
+            input_tokens = estimate_tokens(prepared.text)
+            options["max_tokens"] = self.output_budget.max_tokens(
+                budget_key, input_tokens, estimate_tokens(prompt_text), self._model_name()
+            )
+
+        if prompt_cache:
+            result = self.llm_provider.chat(messages, options=options)
+        else:
+            result = self.llm_provider.optimize_content(prompt_text, options=options)
+
+        if self.output_budget is not None:
+            self.output_budget.record(budget_key, input_tokens, estimate_tokens(result))
+        return result
+
+    def _model_name(self) -> Optional[str]:
+        """使用するモデル名（指定がない場合はプロバイダーのデフォルト。ラップしたプロバイダーは内側のもの）"""
+        if isinstance(self.model, str):
+            return self.model
+        return model_name_of(self.llm_provider)
+
+    def finish_prepared(self, prepared: PreparedRequest, output: str) -> str:
+        """LLMの出力のプレースホルダーを元に戻し、縮小・マスクの統計を記録する"""
+        restored, report = finish_request(prepared, output)
+        self.record_prepared(prepared, report)
+        return restored
+
+    def record_prepared(
+        self, prepared: PreparedRequest, report: Optional[RestoreReport]
+    ) -> None:
+        """
+        1件の変換の縮小・マスクの統計を記録する
+
+        Args:
+            prepared: 送信した入力
+            report: プレースホルダーの復元結果（マスクしていない場合はNone）
+        """
+        if prepared.minify_tokens is not None:
+            self.minify_stats.record_tokens(*prepared.minify_tokens)
+        if prepared.masked is not None and report is not None:
+            self.masking_stats.record(prepared.masked, report)
+
+    def _convert_sections(
+        self, sections: List[Section], template: str, prompt: Optional[str] = None
+    ) -> List[str]:
+        """
+        セクションを個別に並行して変換する（空白だけのセクションはそのまま返す）
+
+        Args:
+            sections: 変換するセクション
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略可）
+
+        Returns:
+            List[str]: セクションごとの変換結果（sectionsと同じ順序）
+        """
+        if not sections:
+            return []
+
+        def convert_one(section: Section) -> str:
+            if not section.text.strip():
+                return section.text
+            return self._convert_llm(section.text, template, prompt, SECTION_INSTRUCTIONS)
+
+        max_workers = self.config.get("max_workers") or min(8, len(sections))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 呼び出し元のジョブの期限をセクションごとのスレッドにも引き継ぐ
+            return list(executor.map(bind_deadline(convert_one), sections))
+
+    def _fill_sections(
+        self,
+        sections: List[Section],
+        outputs: List[Optional[str]],
+        template: str,
+        prompt: Optional[str] = None,
+    ) -> List[str]:
+        """
+        出力が未確定（None）のセクションを類似キャッシュまたはLLMで変換して埋める
+
+        Args:
+            sections: 入力のセクション
+            outputs: セクションごとの既知の出力（未確定のものはNone）
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略可）
+
+        Returns:
+            List[str]: セクションごとの出力
+        """
+        cache = self.similarity_cache
+        context = context_key(template, prompt, self.model)
+        if cache is not None:
+            outputs = [
+                output if output is not None else cache.lookup(context, section.text)
+                for section, output in zip(sections, outputs)
+            ]
+
+        misses = [i for i, output in enumerate(outputs) if output is None]
+        converted = self._convert_sections([sections[i] for i in misses], template, prompt)
+        filled = list(outputs)
+        for i, output in zip(misses, converted):
+            filled[i] = output
+            if cache is not None and sections[i].text.strip():
+                cache.add(context, sections[i].text, output)
+        return [output or "" for output in filled]
+
+    def _convert_with_similarity(
+        self, input_text: str, template: str, prompt: Optional[str] = None
+    ) -> str:
+        """
+        セクションごとに類似キャッシュを引き、ヒットしなかったセクションだけをLLMで変換する
+
+        Args:
+            input_text: 入力テキスト
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略可）
+
+        Returns:
+            str: 変換されたテキスト
+        """
+        sections = split_sections(input_text)
+        outputs = self._fill_sections(sections, [None] * len(sections), template, prompt)
+        return join_sections(outputs)
+
+    def convert_incremental(
+        self,
+        input_text: str,
+        template: str,
+        prompt: Optional[str] = None,
+        state_path: Optional[str] = None,
+    ) -> IncrementalResult:
+        """
+        前回の変換から変更されたセクションだけを再変換する
+
+        state_path に保存された前回のセクションごとの入力ハッシュと出力を新しい入力と突き合わせ、
+        一致しないセクションだけをLLMで変換して前回の出力に差し込む。
+        テンプレート・プロンプト・モデルが前回と異なる場合は全セクションを変換する。
+
+        Args:
+            input_text: 入力テキスト
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略可）
+            state_path: セクション状態ファイルのパス（Noneの場合は保存せず全セクションを変換）
+
+        Returns:
+            IncrementalResult: 変換結果と、再利用・変換したセクション数
+        """
+        use_rules_only = self.rule_engine is not None and self.rules_mode == "only"
+        if use_rules_only or not self.config.get("use_llm", True):
+            return IncrementalResult(self.convert(input_text, template, prompt), 0, 0)
+
+        input_text = apply_rules(input_text, self.stage_settings, "pre")
+        context = context_key(template, prompt, self.model)
+        sections = split_sections(input_text)
+
+        state = IncrementalState.load(state_path) if state_path else None
+        if state is not None and state.context == context:
+            outputs = state.match(sections)
+        else:
+            outputs = [None] * len(sections)
+
+        # 空白だけのセクションは変換しないため、再利用の件数に含めない
+        reused = sum(1 for s, o in zip(sections, outputs) if o is not None and s.text.strip())
+        converted = sum(1 for s, o in zip(sections, outputs) if o is None and s.text.strip())
+        filled = self._fill_sections(sections, outputs, template, prompt)
+
+        if state_path:
+            records = [
+                SectionRecord(section.key, section.content_hash, output)
+                for section, output in zip(sections, filled)
+            ]
+            IncrementalState(context, records).save(state_path)
+        text = apply_rules(join_sections(filled), self.stage_settings, "post")
+        return IncrementalResult(text, reused, converted)
+
+    def _build_messages(
+        self, input_text: str, template: str, prompt: Optional[str] = None
+    ) -> List[Message]:
+        """
+        プロンプトキャッシュが効くメッセージ列を組み立てる
+
+        リクエスト間で不変な指示・テンプレート・スタイルガイドを先頭に置き、
+        可変な入力テキストを最後の独立したメッセージとして渡す。
+
+        Args:
+            input_text: 入力テキスト
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略時はデフォルトプロンプト）
+
+        Returns:
+            List[Message]: チャットメッセージのリスト
+        """
+        instructions = (prompt or DEFAULT_PROMPT).replace(
+            "{{input}}", INPUT_REFERENCE
+        ).replace(
+            "{{template}}", TEMPLATE_REFERENCE
+        )
+        prefix = f"# 使用するテンプレート\n{template}"
+        style_guide = self.config.get("style_guide")
+        if style_guide:
+            prefix += f"\n\n# スタイルガイド\n{style_guide}"
+        return [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prefix, "cache": True},
+            {"role": "user", "content": f"# 入力テキスト\n{input_text}"},
+        ]
+
+    def _render_prompt(
+        self, input_text: str, template: str, prompt: Optional[str] = None
+    ) -> str:
+        """
+        プロンプトに入力テキストとテンプレートを埋め込む
+
+        Args:
+            input_text: 入力テキスト
+            template: テンプレートテキスト
+            prompt: カスタムプロンプト（省略時はデフォルトプロンプト）
+
+        Returns:
+            str: LLMに送信するプロンプト
         """
-        final_prompt = (prompt or default_prompt).replace(
+        return (prompt or DEFAULT_PROMPT).replace(
             "{{input}}", input_text
         ).replace(
             "{{template}}", template
         )
-        options = {}
+
+    def _llm_options(self) -> Dict[str, Any]:
+        """LLMプロバイダーに渡すオプションを組み立てる"""
+        options: Dict[str, Any] = {}
         if self.model:
             options["model"] = self.model
-        return self.llm_provider.optimize_content(final_prompt, options=options)
+        # 出力が上限で途切れた場合に続きを生成する最大回数（省略時はプロバイダーのデフォルト）
+        if "max_continuations" in self.config:
+            options["max_continuations"] = self.config["max_continuations"]
+        return options
+
+    def convert_targets(
+        self,
+        input_text: str,
+        templates: Mapping[str, str],
+        prompt: Optional[str] = None,
+        single_request: Optional[bool] = None,
+    ) -> Dict[str, str]:
+        """
+        1つの入力テキストを複数のターゲット（テンプレート）へ変換する
+
+        ターゲットごとの変換はスレッドプールで並行実行する。single_requestが有効な場合は
+        全ターゲットを1回のLLMリクエストで生成し、レスポンスを区切り行で分割する。
+        分割できなかったターゲットは個別リクエストにフォールバックする。
+
+        Args:
+            input_text: 入力テキスト
+            templates: ターゲット名からテンプレートテキストへのマッピング
+            prompt: カスタムプロンプト（省略可）
+            single_request: 1リクエストで全ターゲットを生成するか
+                （省略時は config の "single_request"）
+
+        Returns:
+            Dict[str, str]: ターゲット名から変換結果へのマッピング（templatesと同じ順序）
+        """
+        if single_request is None:
+            single_request = self.config.get("single_request", False)
+
+        results: Dict[str, str] = {}
+        # ルールエンジンだけで変換する場合はLLMを使わないため、ターゲットごとに convert で変換する
+        use_llm = self.config.get("use_llm", True) and not (
+            self.rule_engine is not None and self.rules_mode == "only"
+        )
+        if single_request and use_llm and len(templates) > 1:
+            results = self._convert_targets_single_request(input_text, templates, prompt)
+
+        pending = [name for name in templates if name not in results]
+        if pending:
+            max_workers = self.config.get("max_workers") or len(pending)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    name: executor.submit(
+                        bind_deadline(self.convert), input_text, templates[name], prompt
+                    )
+                    for name in pending
+                }
+                for name, future in futures.items():
+                    results[name] = future.result()
+
+        return {name: results[name] for name in templates}
+
+    def _convert_targets_single_request(
+        self,
+        input_text: str,
+        templates: Mapping[str, str],
+        prompt: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        全ターゲットを1回のLLMリクエストで変換し、レスポンスをターゲットごとに分割する
+
+        Args:
+            input_text: 入力テキスト
+            templates: ターゲット名からテンプレートテキストへのマッピング
+            prompt: カスタムプロンプト（省略可）
+
+        Returns:
+            Dict[str, str]: 分割できたターゲットの変換結果
+        """
+        combined_template = "\n\n".join(
+            f"## ターゲット: {name}\n{template}" for name, template in templates.items()
+        )
+        prepared = prepare_request(
+            apply_rules(input_text, self.stage_settings, "pre"), prompt, self.stage_settings
+        )
+        response = self.send_prepared(prepared, combined_template, MULTI_TARGET_INSTRUCTIONS)
+        results = split_target_response(response, templates.keys())
+
+        converted = {}
+        for name, text in results.items():
+            restored, report = finish_request(prepared, text)
+            converted[name] = apply_rules(restored, self.stage_settings, "post")
+            if prepared.masked is not None and report is not None:
+                self.masking_stats.record(prepared.masked, report)
+        if prepared.minify_tokens is not None:
+            self.minify_stats.record_tokens(*prepared.minify_tokens)
+        return converted
 
     def convert_file(
         self,
         input_path: str,
-        template_path: str,
+        template_path: Optional[str],
         prompt_path: Optional[str] = None,
+        state_path: Optional[str] = None,
     ) -> str:
         """
         ファイルからコンテンツを読み込んで変換する
@@ -106,6 +606,8 @@ class ContentConverter:
             input_path: 入力ファイルのパス
             template_path: テンプレートファイルのパス
             prompt_path: プロンプトファイルのパス（省略可）
+            state_path: セクション状態ファイルのパス。指定すると前回から変更された
+                セクションだけを再変換する（convert_incremental を参照）
 
         Returns:
             str: 変換されたテキスト
@@ -114,8 +616,11 @@ class ContentConverter:
         with open(input_path, "r", encoding="utf-8") as f:
             input_text = f.read()
 
-        with open(template_path, "r", encoding="utf-8") as f:
-            template = f.read()
+        # ルールエンジンだけで変換する場合はテンプレートを省略できる
+        template = ""
+        if template_path:
+            with open(template_path, "r", encoding="utf-8") as f:
+                template = f.read()
 
         prompt = None
         if prompt_path:
@@ -123,4 +628,65 @@ class ContentConverter:
                 prompt = f.read()
 
         # 変換を実行
+        if state_path:
+            return self.convert_incremental(input_text, template, prompt, state_path).text
         return self.convert(input_text, template, prompt)
+
+    def convert_file_targets(
+        self,
+        input_path: str,
+        template_paths: Mapping[str, str],
+        prompt_path: Optional[str] = None,
+        single_request: Optional[bool] = None,
+    ) -> Dict[str, str]:
+        """
+        入力ファイルを1回だけ読み込み、複数のテンプレートファイルへ変換する
+
+        Args:
+            input_path: 入力ファイルのパス
+            template_paths: ターゲット名からテンプレートファイルのパスへのマッピング
+            prompt_path: プロンプトファイルのパス（省略可）
+            single_request: 1リクエストで全ターゲットを生成するか
+
+        Returns:
+            Dict[str, str]: ターゲット名から変換結果へのマッピング
+        """
+        with open(input_path, "r", encoding="utf-8") as f:
+            input_text = f.read()
+
+        templates = {}
+        for name, template_path in template_paths.items():
+            with open(template_path, "r", encoding="utf-8") as f:
+                templates[name] = f.read()
+
+        prompt = None
+        if prompt_path:
+            with open(prompt_path, "r", encoding="utf-8") as f:
+                prompt = f.read()
+
+        return self.convert_targets(input_text, templates, prompt, single_request=single_request)
+
+
+def split_target_response(response: str, names: Iterable[str]) -> Dict[str, str]:
+    """
+    区切り行 ``=====TARGET: name=====`` で区切られたレスポンスをターゲットごとに分割する
+
+    Args:
+        response: LLMのレスポンス
+        names: 期待するターゲット名の一覧
+
+    Returns:
+        Dict[str, str]: 期待するターゲット名のうち、レスポンスに含まれていたものの結果
+    """
+    expected = set(names)
+    results: Dict[str, str] = {}
+    matches = list(_TARGET_MARKER_RE.finditer(response))
+    for i, match in enumerate(matches):
+        name = match.group(1).strip()
+        if name not in expected or name in results:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        body = response[match.end():end].strip("\n")
+        if body.strip():
+            results[name] = body + "\n"
+    return results
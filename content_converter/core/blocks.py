@@ -0,0 +1,213 @@
+"""
+Blocks module
+------------
+
+マークダウンをブロック単位の構文木に分解し、元のテキストに戻すモジュール
+"""
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import yaml
+
+# ブロックの種類
+BLANK = "blank"
+HEADING = "heading"
+CODE = "code"
+CONTAINER = "container"
+EMBED = "embed"
+PARAGRAPH = "paragraph"
+
+_HEADING_RE = re.compile(r"^#{1,6}[ \t]")
+_FENCE_RE = re.compile(r"^[ \t]{0,3}(`{3,}|~{3,})(.*)$")
+_CONTAINER_OPEN_RE = re.compile(r"^(:{3,})[ \t]*(\S.*?)[ \t]*$")
+_EMBED_RE = re.compile(r"^@\[([\w-]+)\]\((.+)\)[ \t]*$")
+
+
+class Block(NamedTuple):
+    """
+    マークダウンのブロック
+
+    text は末尾の改行を含む元のテキストで、全ブロックの text を連結すると元の文書に戻る。
+    info はブロックの種類ごとの付加情報（コードブロックの情報文字列、コンテナの種類と引数、
+    埋め込みのサービス名）。
+    """
+
+    kind: str
+    text: str
+    info: str = ""
+
+    @property
+    def body(self) -> str:
+        """コードブロック・コンテナの区切り行を除いた中身（それ以外のブロックは text と同じ）"""
+        if self.kind not in (CODE, CONTAINER):
+            return self.text
+        lines = self.text.splitlines(keepends=True)
+        last = lines[-1].strip() if len(lines) > 1 else ""
+        closed = bool(last) and last.strip("`~:") == ""
+        return "".join(lines[1:-1] if closed else lines[1:])
+
+    @property
+    def embed_target(self) -> str:
+        """埋め込みブロックのURLまたはID"""
+        match = _EMBED_RE.match(self.text.rstrip("\r\n"))
+        return match.group(2).strip() if match else ""
+
+
+class Document:
+    """フロントマターのメタデータとブロックの列からなるマークダウン文書"""
+
+    def __init__(self, metadata: Optional[Dict[str, Any]], blocks: List[Block]):
+        """
+        初期化メソッド
+
+        Args:
+            metadata: フロントマターのメタデータ（フロントマターがない場合はNone）
+            blocks: フロントマター以外のブロック
+        """
+        self.metadata = metadata
+        self.blocks = blocks
+        self._original_metadata = dict(metadata) if metadata is not None else None
+        self._frontmatter_text = ""
+
+    def render(self) -> str:
+        """
+        文書をマークダウンテキストに戻す
+
+        メタデータが変更されていなければフロントマターは元のテキストのまま出力する。
+        """
+        if self.metadata is None:
+            frontmatter = ""
+        elif self.metadata == self._original_metadata and self._frontmatter_text:
+            frontmatter = self._frontmatter_text
+        else:
+            frontmatter = "---\n" + dump_metadata(self.metadata) + "---\n"
+        return frontmatter + "".join(block.text for block in self.blocks)
+
+
+class _IndentedDumper(yaml.SafeDumper):
+    """リストをキーより1段深くインデントするDumper（Zenn・noteのフロントマターの一般的な書式）"""
+
+    def increase_indent(self, flow: bool = False, indentless: bool = False) -> None:
+        super().increase_indent(flow, False)
+
+
+def dump_metadata(metadata: Dict[str, Any]) -> str:
+    """メタデータをフロントマター用のYAMLに変換する（キーの順序を保つ）"""
+    if not metadata:
+        return ""
+    dumped: str = yaml.dump(
+        metadata,
+        Dumper=_IndentedDumper,
+        allow_unicode=True,
+        sort_keys=False,
+        default_flow_style=False,
+    )
+    return dumped
+
+
+def parse_document(text: str) -> Document:
+    """
+    マークダウンテキストを Document に分解する
+
+    フロントマターがYAMLとして解釈できない場合は、本文の段落として扱う。
+
+    Args:
+        text: マークダウンテキスト
+
+    Returns:
+        Document: 分解した文書
+    """
+    metadata = None
+    frontmatter_text = ""
+    if text.startswith("---"):
+        lines = text.splitlines(keepends=True)
+        for i in range(1, len(lines)):
+            if lines[i].rstrip("\r\n") in ("---", "..."):
+                candidate = "".join(lines[: i + 1])
+                try:
+                    loaded = yaml.safe_load("".join(lines[1:i]))
+                except yaml.YAMLError:
+                    break
+                if loaded is None:
+                    loaded = {}
+                if isinstance(loaded, dict):
+                    metadata = loaded
+                    frontmatter_text = candidate
+                    text = text[len(candidate):]
+                break
+
+    document = Document(metadata, parse_blocks(text))
+    document._frontmatter_text = frontmatter_text
+    return document
+
+
+def parse_blocks(text: str) -> List[Block]:
+    """
+    マークダウンテキストをブロックの列に分解する
+
+    コードブロック（``` / ~~~）、コンテナ（:::message など、入れ子可）、
+    1行の埋め込み（@[service](target)）、見出し、空行、それ以外の段落を区別する。
+    リストや表などは段落として扱う。
+
+    Args:
+        text: マークダウンテキスト（フロントマターを除く）
+
+    Returns:
+        List[Block]: ブロックのリスト
+    """
+    lines = text.splitlines(keepends=True)
+    blocks: List[Block] = []
+    paragraph: List[str] = []
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            blocks.append(Block(PARAGRAPH, "".join(paragraph)))
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.rstrip("\r\n")
+
+        fence = _FENCE_RE.match(stripped)
+        if fence:
+            flush_paragraph()
+            marker = fence.group(1)
+            end = i + 1
+            while end < len(lines):
+                close = _FENCE_RE.match(lines[end].rstrip("\r\n"))
+                if close and close.group(1)[0] == marker[0] and len(close.group(1)) >= len(marker):
+                    if not close.group(2).strip():
+                        break
+                end += 1
+            blocks.append(Block(CODE, "".join(lines[i:end + 1]), fence.group(2).strip()))
+            i = end + 1
+            continue
+
+        container = _CONTAINER_OPEN_RE.match(stripped)
+        if container:
+            flush_paragraph()
+            colons = container.group(1)
+            end = i + 1
+            while end < len(lines) and lines[end].strip() != colons:
+                end += 1
+            blocks.append(Block(CONTAINER, "".join(lines[i:end + 1]), container.group(2)))
+            i = end + 1
+            continue
+
+        embed = None if paragraph else _EMBED_RE.match(stripped)
+        if not stripped.strip():
+            flush_paragraph()
+            blocks.append(Block(BLANK, line))
+        elif _HEADING_RE.match(stripped):
+            flush_paragraph()
+            blocks.append(Block(HEADING, line))
+        elif embed:
+            blocks.append(Block(EMBED, line, embed.group(1)))
+        else:
+            paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    return blocks
@@ -0,0 +1,171 @@
+"""
+Fingerprint module
+-----------------
+
+SimHashによるテキストの類似度フィンガープリントと、その近傍検索インデックスを提供するモジュール
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+FINGERPRINT_BITS = 64
+# SimHashのビットごとの重みを1つの多倍長整数にまとめて加算するためのフィールド幅
+_FIELD_BITS = 24
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# 8ビットの値を、各ビットが _FIELD_BITS 幅のフィールドに1つずつ入るよう展開する表
+_SPREAD_TABLE = [
+    sum(1 << (_FIELD_BITS * bit) for bit in range(8) if value >> bit & 1)
+    for value in range(256)
+]
+
+V = TypeVar("V")
+
+
+def _features(text: str, ngram: int) -> Counter:
+    """正規化したテキストの文字n-gramを数える（日本語にも分かち書きなしで使える）"""
+    normalized = _WHITESPACE_RE.sub(" ", text).strip().lower()
+    if len(normalized) <= ngram:
+        return Counter([normalized]) if normalized else Counter()
+    return Counter(normalized[i:i + ngram] for i in range(len(normalized) - ngram + 1))
+
+
+def simhash(text: str, ngram: int = 3) -> int:
+    """
+    テキストの64ビットSimHashを計算する
+
+    各n-gramの64ビットハッシュのビットごとに重みを足し合わせる処理を、
+    ビットを多倍長整数のフィールドに展開して一括で加算することで高速化している。
+
+    Args:
+        text: 対象テキスト
+        ngram: 特徴量に使う文字n-gramの長さ
+
+    Returns:
+        int: 64ビットのフィンガープリント
+    """
+    features = _features(text, ngram)
+    if not features:
+        return 0
+    total = 0
+    weight_sum = 0
+    table = _SPREAD_TABLE
+    byte_shift = _FIELD_BITS * 8
+    for feature, weight in features.items():
+        h = int.from_bytes(
+            hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        spread = 0
+        for byte_index in range(8):
+            spread |= table[(h >> (8 * byte_index)) & 0xFF] << (byte_shift * byte_index)
+        total += spread * weight
+        weight_sum += weight
+
+    fingerprint = 0
+    half = weight_sum / 2
+    for bit in range(FINGERPRINT_BITS):
+        if (total >> (_FIELD_BITS * bit)) & _FIELD_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """2つのフィンガープリントのハミング距離を返す"""
+    return bin(a ^ b).count("1")
+
+
+def max_distance_for(similarity: float) -> int:
+    """
+    類似度のしきい値（0〜1）を許容ハミング距離に換算する
+
+    Args:
+        similarity: 類似度のしきい値（1.0で完全一致のみ）
+
+    Returns:
+        int: 許容するハミング距離
+    """
+    if not 0.0 <= similarity <= 1.0:
+        raise ValueError(f"similarity must be between 0 and 1: {similarity}")
+    return int((1.0 - similarity) * FINGERPRINT_BITS)
+
+
+class SimHashIndex(Generic[V]):
+    """
+    ハミング距離がしきい値以内のフィンガープリントを高速に検索するインデックス
+
+    64ビットを (max_distance + 1) 個のバンドに分割し、各バンドの値で転置索引を作る。
+    鳩の巣原理により、距離が max_distance 以内のフィンガープリントは少なくとも
+    1つのバンドで完全一致するため、候補の絞り込みに全件走査が不要になる。
+    """
+
+    def __init__(self, max_distance: int = 3):
+        """
+        初期化メソッド
+
+        Args:
+            max_distance: 近傍とみなす最大ハミング距離
+        """
+        if not 0 <= max_distance < FINGERPRINT_BITS:
+            raise ValueError(f"max_distance must be between 0 and {FINGERPRINT_BITS - 1}")
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        base, extra = divmod(FINGERPRINT_BITS, band_count)
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(band_count):
+            width = base + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[Tuple[Hashable, int], List[int]]] = [{} for _ in self._bands]
+        self._entries: List[Tuple[int, V]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, fingerprint: int, value: V, namespace: Hashable = None) -> None:
+        """
+        フィンガープリントと値を登録する
+
+        Args:
+            fingerprint: フィンガープリント
+            value: 関連付ける値
+            namespace: 検索対象を分ける名前空間（異なる名前空間同士はヒットしない）
+        """
+        entry_id = len(self._entries)
+        self._entries.append((fingerprint, value))
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table.setdefault((namespace, (fingerprint >> shift) & mask), []).append(entry_id)
+
+    def nearest(
+        self, fingerprint: int, namespace: Hashable = None
+    ) -> Optional[Tuple[int, V]]:
+        """
+        しきい値以内で最も近いフィンガープリントの値を返す
+
+        Args:
+            fingerprint: 検索するフィンガープリント
+            namespace: 名前空間
+
+        Returns:
+            Optional[Tuple[int, V]]: (ハミング距離, 値)。見つからない場合はNone
+        """
+        best: Optional[Tuple[int, int]] = None
+        seen = set()
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            for entry_id in table.get((namespace, (fingerprint >> shift) & mask), ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                distance = hamming_distance(fingerprint, self._entries[entry_id][0])
+                if distance > self.max_distance:
+                    continue
+                # 同じ距離なら新しく登録されたものを優先する
+                candidate = (distance, -entry_id)
+                if best is None or candidate < best:
+                    best = candidate
+        if best is None:
+            return None
+        return best[0], self._entries[-best[1]][1]
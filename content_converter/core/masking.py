@@ -0,0 +1,232 @@
+"""
+Masking module
+-------------
+
+LLMが変更してはいけない部分（コードブロック・表・画像・埋め込み・URL）を
+短いプレースホルダーに置き換え、変換後に元に戻すモジュール
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .blocks import CODE, CONTAINER, EMBED, HEADING, PARAGRAPH, Block, parse_blocks, parse_document
+from .tokens import estimate_tokens
+
+# マスクできる要素の種類
+MASK_KINDS = ("code", "table", "image", "embed", "url")
+
+PLACEHOLDER_FORMAT = "[[M{}]]"
+_PLACEHOLDER_RE = re.compile(r"\[\[M(\d+)\]\]")
+
+_IMAGE_RE = re.compile(r"!\[[^\]\n]*\]\([^)\n]*\)")
+_URL_RE = re.compile(r"https?://[^\s)<>\]\"'`]+")
+_TABLE_DELIMITER_RE = re.compile(r"^\s*\|?\s*:?-{1,}:?\s*(\|\s*:?-{1,}:?\s*)*\|?\s*$")
+_BARE_URL_LINE_RE = re.compile(r"^https?://\S+\s*$")
+
+
+def _is_table(text: str) -> bool:
+    """段落が表（2行目が区切り行）かどうか"""
+    lines = text.splitlines()
+    return len(lines) >= 2 and "|" in lines[0] and bool(_TABLE_DELIMITER_RE.match(lines[1]))
+
+
+class RestoreReport(NamedTuple):
+    """プレースホルダーの復元結果"""
+
+    missing: int
+    duplicates: int
+    unknown: int
+
+    @property
+    def repaired(self) -> bool:
+        """修復が必要だったかどうか"""
+        return bool(self.missing or self.duplicates or self.unknown)
+
+
+class MaskedText:
+    """マスク済みのテキストと、プレースホルダーから元のテキストへの対応"""
+
+    def __init__(self, original: str, kinds: Iterable[str] = MASK_KINDS):
+        """
+        テキストをマスクする
+
+        フロントマターと見出しはLLMが変換する対象のためマスクしない。
+        同じ内容には同じプレースホルダーを割り当てる。
+
+        Args:
+            original: 元のテキスト
+            kinds: マスクする要素の種類（MASK_KINDS の部分集合）
+        """
+        unknown = set(kinds) - set(MASK_KINDS)
+        if unknown:
+            raise ValueError(f"Unsupported mask kinds: {sorted(unknown)}")
+        self.original = original
+        self.kinds = frozenset(kinds)
+        self.placeholders: Dict[str, str] = {}
+        self._by_content: Dict[str, str] = {}
+        # プレースホルダーごとの元の出現回数と、ブロック単位かどうか
+        self._expected: Dict[str, int] = {}
+        self._block: Dict[str, bool] = {}
+
+        document = parse_document(original)
+        body_length = sum(len(block.text) for block in document.blocks)
+        frontmatter = original[: len(original) - body_length]
+        self.text = frontmatter + self._mask_blocks(document.blocks)
+
+    def _placeholder(self, content: str, block: bool) -> str:
+        placeholder = self._by_content.get(content)
+        if placeholder is None:
+            placeholder = PLACEHOLDER_FORMAT.format(len(self.placeholders) + 1)
+            self._by_content[content] = placeholder
+            self.placeholders[placeholder] = content
+            self._block[placeholder] = block
+        self._expected[placeholder] = self._expected.get(placeholder, 0) + 1
+        return placeholder
+
+    def _mask_block(self, block: Block) -> Optional[str]:
+        """ブロック全体を置き換える場合はプレースホルダーの行を返す"""
+        content = block.text.rstrip("\r\n")
+        newline = block.text[len(content):]
+        if block.kind == CODE and "code" in self.kinds:
+            return self._placeholder(content, True) + newline
+        if block.kind == EMBED and "embed" in self.kinds:
+            return self._placeholder(content, True) + newline
+        if block.kind == PARAGRAPH:
+            if "table" in self.kinds and _is_table(content):
+                return self._placeholder(content, True) + newline
+            if "embed" in self.kinds and _BARE_URL_LINE_RE.match(content):
+                return self._placeholder(content, True) + newline
+        return None
+
+    def _mask_inline(self, text: str) -> str:
+        if "image" in self.kinds:
+            text = _IMAGE_RE.sub(lambda m: self._placeholder(m.group(0), False), text)
+        if "url" in self.kinds:
+            text = _URL_RE.sub(lambda m: self._placeholder(m.group(0), False), text)
+        return text
+
+    def _mask_blocks(self, blocks: List[Block]) -> str:
+        parts = []
+        for block in blocks:
+            masked = self._mask_block(block)
+            if masked is not None:
+                parts.append(masked)
+            elif block.kind == CONTAINER:
+                # コンテナの中身は再帰的にマスクし、区切り行はそのまま残す
+                lines = block.text.splitlines(keepends=True)
+                body = block.body
+                closing = block.text[len(lines[0]) + len(body):]
+                parts.append(lines[0] + self._mask_blocks(parse_blocks(body)) + closing)
+            elif block.kind in (PARAGRAPH, HEADING):
+                parts.append(self._mask_inline(block.text))
+            else:
+                parts.append(block.text)
+        return "".join(parts)
+
+    @property
+    def tokens_saved(self) -> int:
+        """マスクによって減った入力トークン数の概算"""
+        return max(0, estimate_tokens(self.original) - estimate_tokens(self.text))
+
+    def restore(self, output: str) -> Tuple[str, RestoreReport]:
+        """
+        LLMの出力のプレースホルダーを元のテキストに戻す
+
+        元の出現回数を超えて複製されたプレースホルダーと、存在しないプレースホルダーは取り除く。
+        出力から消えたプレースホルダーは、元の順序で直前にあるプレースホルダーの後
+        （見つからない場合は直後のプレースホルダーの前、それもなければ末尾）に補う。
+
+        Args:
+            output: LLMの出力
+
+        Returns:
+            Tuple[str, RestoreReport]: 復元したテキストと修復内容
+        """
+        seen: Dict[str, int] = {}
+        duplicates = 0
+        unknown = 0
+
+        def dedupe(match: "re.Match[str]") -> str:
+            nonlocal duplicates, unknown
+            placeholder = match.group(0)
+            if placeholder not in self.placeholders:
+                unknown += 1
+                return ""
+            seen[placeholder] = seen.get(placeholder, 0) + 1
+            if seen[placeholder] > self._expected[placeholder]:
+                duplicates += 1
+                return ""
+            return placeholder
+
+        output = _PLACEHOLDER_RE.sub(dedupe, output)
+
+        order = list(self.placeholders)
+        missing = [p for p in order if p not in seen]
+        for placeholder in missing:
+            output = self._insert_missing(output, placeholder, order)
+
+        restored = _PLACEHOLDER_RE.sub(lambda m: self.placeholders[m.group(0)], output)
+        return restored, RestoreReport(len(missing), duplicates, unknown)
+
+    def _insert_missing(self, output: str, placeholder: str, order: List[str]) -> str:
+        """消えたプレースホルダーを前後のプレースホルダーの位置を手がかりに補う"""
+        index = order.index(placeholder)
+        block = self._block[placeholder]
+        separator = "\n\n" if block else " "
+
+        for previous in reversed(order[:index]):
+            position = output.find(previous)
+            if position >= 0:
+                end = position + len(previous)
+                if block:
+                    # ブロックは直前のプレースホルダーを含む行の後に独立した段落として補う
+                    line_end = output.find("\n", end)
+                    end = len(output) if line_end < 0 else line_end
+                return output[:end] + separator + placeholder + output[end:]
+        for following in order[index + 1:]:
+            position = output.find(following)
+            if position >= 0:
+                if block:
+                    line_start = output.rfind("\n", 0, position) + 1
+                    position = line_start
+                return output[:position] + placeholder + separator + output[position:]
+        return output.rstrip("\n") + separator + placeholder + "\n"
+
+
+class MaskingStats:
+    """複数の文書のマスクによる削減トークン数と修復件数を集計するクラス"""
+
+    def __init__(self) -> None:
+        """初期化メソッド"""
+        self.documents = 0
+        self.placeholders = 0
+        self.tokens_saved = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.unknown = 0
+        self._lock = threading.Lock()
+
+    def record(self, masked: MaskedText, report: RestoreReport) -> None:
+        """
+        1件の文書の結果を集計に加える
+
+        Args:
+            masked: マスク済みのテキスト
+            report: 復元結果
+        """
+        with self._lock:
+            self.documents += 1
+            self.placeholders += len(masked.placeholders)
+            self.tokens_saved += masked.tokens_saved
+            self.missing += report.missing
+            self.duplicates += report.duplicates
+            self.unknown += report.unknown
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        return (
+            f"{self.documents}件 / プレースホルダー {self.placeholders} / "
+            f"削減した入力トークン 約{self.tokens_saved}"
+            f"（修復: 欠落 {self.missing} / 重複 {self.duplicates} / 不明 {self.unknown}）"
+        )
@@ -0,0 +1,154 @@
+"""
+Minify module
+------------
+
+プロンプトと入力テキストから意味のない空白やコメントを取り除き、トークン数を減らすモジュール
+"""
+
+import re
+import threading
+from typing import Callable, Iterable, List, Match, Pattern, Sequence, Union
+
+from .tokens import estimate_tokens
+
+_FENCE_RE = re.compile(r"^[ \t]{0,3}(`{3,}|~{3,})")
+# インラインコードは変更しないよう、置換対象と一緒にマッチさせてそのまま残す
+_INLINE_CODE = r"(`+)[^`]*?\1"
+_COMMENT_RE = re.compile(_INLINE_CODE + r"|<!--.*?-->", re.DOTALL)
+_INNER_SPACES_RE = re.compile(_INLINE_CODE + r"|(?<=\S)[ \t]{2,}(?=\S)")
+
+
+def _keep_inline_code(replacement: str) -> Callable[[Match[str]], str]:
+    """インラインコードにマッチした場合はそのまま残し、それ以外は replacement に置き換える関数を返す"""
+    return lambda m: m.group(0) if m.group(1) else replacement
+
+
+def _strip_line_end(line: str) -> str:
+    """行末の空白を取り除く（Markdownの改行となる2つ以上の半角スペースはちょうど2つにして残す）"""
+    body = line.rstrip()
+    if body and line[len(body):].rstrip("\r").endswith("  "):
+        return body + "  "
+    return body
+
+
+def _split_code_blocks(text: str) -> List[List[str]]:
+    """テキストをコードブロック外と内の行のまとまりに交互に分割する（偶数番目がコードブロック外）"""
+    segments: List[List[str]] = [[]]
+    fence = ""
+    for line in text.splitlines(keepends=True):
+        match = _FENCE_RE.match(line)
+        if fence:
+            segments[-1].append(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                if not line[match.end():].strip():
+                    fence = ""
+                    segments.append([])
+        elif match:
+            fence = match.group(1)
+            segments.append([line])
+        else:
+            segments[-1].append(line)
+    return segments
+
+
+def minify(
+    text: str,
+    strip_comments: bool = True,
+    remove_patterns: Sequence[Union[str, Pattern[str]]] = (),
+) -> str:
+    """
+    コードブロックの外側だけを対象に、意味を変えない範囲でテキストを縮める
+
+    - コードブロック外の行に共通するインデントを取り除く（dedent）
+    - 行末の空白を取り除き、行中の連続する空白を1つにする（行頭のインデントとインラインコードは残す）
+    - ただし行末の2つ以上の半角スペース（Markdownの改行）はちょうど2つにして残す
+    - 連続する空行を1つにまとめ、先頭と末尾の空行を取り除く
+    - HTMLコメントと remove_patterns に一致する部分を取り除く
+
+    Args:
+        text: 対象テキスト
+        strip_comments: HTMLコメントを取り除くかどうか
+        remove_patterns: 取り除く正規表現（コードブロック外にだけ適用する）
+
+    Returns:
+        str: 縮めたテキスト
+    """
+    segments = _split_code_blocks(text)
+    prose_lines = [
+        line for i, segment in enumerate(segments) if i % 2 == 0 for line in segment if line.strip()
+    ]
+    indent = min((len(line) - len(line.lstrip(" \t")) for line in prose_lines), default=0)
+    patterns = [re.compile(p) if isinstance(p, str) else p for p in remove_patterns]
+
+    output: List[str] = []
+    for i, segment in enumerate(segments):
+        if i % 2 == 1:
+            output.append("".join(segment))
+            continue
+        chunk = "".join(line[indent:] if line.strip() else line for line in segment)
+        if strip_comments:
+            chunk = _COMMENT_RE.sub(_keep_inline_code(""), chunk)
+        for pattern in patterns:
+            chunk = pattern.sub("", chunk)
+        lines = [
+            _INNER_SPACES_RE.sub(_keep_inline_code(" "), _strip_line_end(line))
+            for line in chunk.split("\n")
+        ]
+        chunk = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+        if i == 0:
+            chunk = chunk.lstrip("\n")
+        else:
+            # 直前のコードブロックは改行で終わるため、先頭の空行は1つまでにする
+            chunk = re.sub(r"^\n{2,}", "\n", chunk)
+        if i == len(segments) - 1:
+            chunk = chunk.rstrip("\n")
+            if chunk and text.endswith("\n"):
+                chunk += "\n"
+        output.append(chunk)
+    return "".join(output)
+
+
+class MinifyStats:
+    """縮める前後の推定トークン数を集計するクラス"""
+
+    def __init__(self) -> None:
+        """初期化メソッド"""
+        self.documents = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def record(self, before: Iterable[str], after: Iterable[str]) -> None:
+        """
+        1件の変換で縮める前後のテキストを集計に加える
+
+        Args:
+            before: 縮める前のテキスト
+            after: 縮めた後のテキスト
+        """
+        self.record_tokens(
+            sum(estimate_tokens(text) for text in before),
+            sum(estimate_tokens(text) for text in after),
+        )
+
+    def record_tokens(self, tokens_before: int, tokens_after: int) -> None:
+        """
+        1件の変換で縮める前後の推定トークン数を集計に加える
+
+        Args:
+            tokens_before: 縮める前の推定トークン数
+            tokens_after: 縮めた後の推定トークン数
+        """
+        with self._lock:
+            self.documents += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        saved = self.tokens_before - self.tokens_after
+        ratio = saved / self.tokens_before * 100 if self.tokens_before else 0.0
+        return (
+            f"{self.documents}件 / 推定トークン {self.tokens_before} → {self.tokens_after}"
+            f"（{saved} 削減、{ratio:.1f}%）"
+        )
@@ -0,0 +1,97 @@
+"""
+Sections module
+--------------
+
+マークダウンを見出し単位のセクションに分割するモジュール
+"""
+
+import hashlib
+import re
+from typing import List, NamedTuple, Tuple
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+_FENCE_RE = re.compile(r"^[ \t]{0,3}(`{3,}|~{3,})")
+
+
+class Section(NamedTuple):
+    """見出しで区切られたマークダウンのセクション"""
+
+    heading_path: Tuple[str, ...]
+    text: str
+
+    @property
+    def content_hash(self) -> str:
+        """セクション本文のSHA-256ハッシュ"""
+        return hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+
+    @property
+    def key(self) -> str:
+        """見出しパスを ' > ' で連結したキー（見出しより前の部分は空文字列）"""
+        return " > ".join(self.heading_path)
+
+
+def split_sections(text: str) -> List[Section]:
+    """
+    マークダウンをATX見出し（# 〜 ######）ごとのセクションに分割する
+
+    コードブロック・フロントマター内の '#' は見出しとして扱わない。最初の見出しより前の部分
+    （フロントマターなど）は見出しパスが空のセクションになる。
+    全セクションの text を連結すると元のテキストに一致する。
+
+    Args:
+        text: マークダウンテキスト
+
+    Returns:
+        List[Section]: セクションのリスト
+    """
+    sections: List[Section] = []
+    stack: List[Tuple[int, str]] = []
+    path: Tuple[str, ...] = ()
+    current: List[str] = []
+    fence = ""
+    # フロントマター内の '#'（YAMLコメント）も見出しとして扱わない
+    in_frontmatter = text.startswith("---")
+
+    for i, line in enumerate(text.splitlines(keepends=True)):
+        stripped = line.rstrip("\r\n")
+        fence_match = _FENCE_RE.match(stripped)
+        if in_frontmatter:
+            if i > 0 and stripped in ("---", "..."):
+                in_frontmatter = False
+        elif fence:
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence):
+                fence = ""
+        elif fence_match:
+            fence = fence_match.group(1)
+        else:
+            heading = _HEADING_RE.match(stripped)
+            if heading:
+                if current:
+                    sections.append(Section(path, "".join(current)))
+                current = []
+                level = len(heading.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, heading.group(2)))
+                path = tuple(title for _, title in stack)
+        current.append(line)
+
+    if current:
+        sections.append(Section(path, "".join(current)))
+    return sections
+
+
+def join_sections(texts: List[str]) -> str:
+    """
+    変換済みのセクションを1つの文書に連結する
+
+    各セクションの前後の空行を取り除き、空行1つで区切る。
+
+    Args:
+        texts: セクションごとのテキスト
+
+    Returns:
+        str: 連結したテキスト
+    """
+    parts = [t.strip("\n") for t in texts if t.strip()]
+    return "\n\n".join(parts) + "\n" if parts else ""
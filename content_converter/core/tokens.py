@@ -0,0 +1,31 @@
+"""
+Tokens module
+------------
+
+トークン数の概算を行うモジュール
+"""
+
+import math
+import re
+
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する
+
+    英数字などのASCII文字は約4文字で1トークン、日本語などの非ASCII文字は
+    1文字で約1トークンとして数える。プロバイダーのトークナイザーとは一致しないが、
+    キャッシュ可否の判定や削減量の比較には十分な精度を持つ。
+
+    Args:
+        text: 対象テキスト
+
+    Returns:
+        int: 概算トークン数
+    """
+    if not text:
+        return 0
+    non_ascii = len(_NON_ASCII_RE.findall(text))
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
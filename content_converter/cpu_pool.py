@@ -0,0 +1,294 @@
+"""
+CPU pool module
+--------------
+
+LLM呼び出しの前後のCPU処理（ルール・縮小・マスク・復元）を複数のプロセスで並列に実行するモジュール
+
+GILに縛られるCPU処理だけをプロセスに任せ、待ち時間が大半を占めるLLM呼び出しはスレッドに残す。
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .core.masking import MASK_KINDS, RestoreReport
+from .stages import PreparedRequest, StageSettings, finish_document, prepare_document
+
+# ワーカーの初期化時に処理して、モジュールの読み込みと正規表現のコンパイルを済ませる文書
+_WARM_UP_TEXT = """---
+title: warm up
+---
+
+# Warm up
+
+Text with `code`, ![image](https://example.com/a.png) and https://example.com/.
+
+```python
+print("hello")
+```
+"""
+
+# ワーカープロセス内の設定（初期化時に一度だけ受け取る）
+_settings: Optional[StageSettings] = None
+
+
+def _init_worker(settings: StageSettings) -> None:
+    """ワーカープロセスの初期化（設定の保持とルールエンジンの作成・読み込みをプロセスごとに1回だけ行う）"""
+    global _settings
+    _settings = settings
+    prepared = prepare_document(_WARM_UP_TEXT, None, settings)
+    finish_document(prepared, prepared.text, settings)
+
+
+def _prepare(item: Tuple[str, Optional[str]]) -> PreparedRequest:
+    assert _settings is not None, "ワーカープロセスが初期化されていません"
+    return prepare_document(item[0], item[1], _settings)
+
+
+def _finish(item: Tuple[PreparedRequest, str]) -> Tuple[str, Optional[RestoreReport]]:
+    assert _settings is not None, "ワーカープロセスが初期化されていません"
+    return finish_document(item[0], item[1], _settings)
+
+
+def _ping(_: int) -> int:
+    return os.getpid()
+
+
+class CPUStagePool:
+    """
+    LLM前後のCPU処理を実行するプロセスプール
+
+    設定はワーカーの初期化時に一度だけ渡し、タスクごとには入力テキストだけを送る。
+    複数の文書をまとめて処理する *_many はタスクをチャンク単位で送信し、プロセス間通信の回数を減らす。
+    max_workers が1以下の場合はプロセスを作らず呼び出し元のスレッドで処理する。
+    """
+
+    def __init__(
+        self,
+        settings: StageSettings,
+        max_workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            settings: CPU処理の設定
+            max_workers: ワーカープロセス数（省略時はCPUコア数）
+            chunksize: *_many で1回に送信するタスク数（省略時は件数とプロセス数から決める）
+        """
+        self.settings = settings
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.max_workers > 1:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(settings,),
+            )
+
+    def __enter__(self) -> "CPUStagePool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """ワーカープロセスを終了する"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def warm_up(self) -> None:
+        """全ワーカープロセスを起動して初期化を済ませる"""
+        if self._executor is not None:
+            list(self._executor.map(_ping, range(self.max_workers * 2)))
+
+    def _chunksize(self, count: int) -> int:
+        if self.chunksize:
+            return self.chunksize
+        # multiprocessing.Pool.map と同様に、1プロセスあたり4チャンク程度になるようにする
+        return max(1, math.ceil(count / (self.max_workers * 4)))
+
+    def prepare(self, text: str, prompt: Optional[str] = None) -> PreparedRequest:
+        """
+        1件の文書にLLM前の処理を適用する
+
+        Args:
+            text: 入力テキスト
+            prompt: カスタムプロンプト（省略可）
+
+        Returns:
+            PreparedRequest: 送信する入力
+        """
+        if self._executor is None:
+            return prepare_document(text, prompt, self.settings)
+        return self._executor.submit(_prepare, (text, prompt)).result()
+
+    def finish(
+        self, prepared: PreparedRequest, output: str
+    ) -> Tuple[str, Optional[RestoreReport]]:
+        """
+        1件の文書のLLMの出力にLLM後の処理を適用する
+
+        Args:
+            prepared: 送信した入力
+            output: LLMの出力
+
+        Returns:
+            Tuple[str, Optional[RestoreReport]]: 変換結果と修復内容
+        """
+        if self._executor is None:
+            return finish_document(prepared, output, self.settings)
+        return self._executor.submit(_finish, (prepared, output)).result()
+
+    def prepare_many(
+        self, items: Sequence[Tuple[str, Optional[str]]]
+    ) -> Iterator[PreparedRequest]:
+        """
+        複数の文書にLLM前の処理を適用する（結果は入力の順に返す）
+
+        Args:
+            items: (入力テキスト, カスタムプロンプト) のシーケンス
+
+        Returns:
+            Iterator[PreparedRequest]: 送信する入力
+        """
+        if self._executor is None:
+            return (prepare_document(text, prompt, self.settings) for text, prompt in items)
+        return self._executor.map(_prepare, items, chunksize=self._chunksize(len(items)))
+
+    def finish_many(
+        self, items: Sequence[Tuple[PreparedRequest, str]]
+    ) -> Iterator[Tuple[str, Optional[RestoreReport]]]:
+        """
+        複数の文書のLLMの出力にLLM後の処理を適用する（結果は入力の順に返す）
+
+        Args:
+            items: (送信した入力, LLMの出力) のシーケンス
+
+        Returns:
+            Iterator[Tuple[str, Optional[RestoreReport]]]: 変換結果と修復内容
+        """
+        if self._executor is None:
+            return (finish_document(prepared, output, self.settings) for prepared, output in items)
+        return self._executor.map(_finish, items, chunksize=self._chunksize(len(items)))
+
+
+class ScalingResult(NamedTuple):
+    """CPUプールのスケーリング計測の1行"""
+
+    workers: int
+    documents: int
+    seconds: float
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+def benchmark_scaling(
+    texts: Sequence[str],
+    settings: StageSettings,
+    worker_counts: Iterable[int],
+    chunksize: Optional[int] = None,
+    chunked: bool = False,
+) -> List[ScalingResult]:
+    """
+    ワーカー数ごとにLLM前後のCPU処理の処理時間を計測する
+
+    既定ではバッチ処理と同じく、ワーカー数と同じ数のスレッドから1件ずつ prepare / finish を呼び出す
+    （1件ごとにプロセス間通信が発生する）。chunked を指定すると prepare_many / finish_many で
+    チャンク単位に送信する場合を計測する。
+    LLMの出力には準備した入力をそのまま使う。プロセスの起動と初期化は計測に含めない。
+
+    Args:
+        texts: 入力テキストのリスト
+        settings: CPU処理の設定
+        worker_counts: 計測するワーカー数
+        chunksize: chunked の場合に1回に送信するタスク数（省略時は自動）
+        chunked: prepare_many / finish_many でチャンク単位に送信するかどうか
+
+    Returns:
+        List[ScalingResult]: ワーカー数ごとの計測結果
+    """
+    results = []
+    for workers in worker_counts:
+        with CPUStagePool(settings, max_workers=workers, chunksize=chunksize) as pool:
+            pool.warm_up()
+            start = time.perf_counter()
+            if chunked:
+                prepared = list(pool.prepare_many([(text, None) for text in texts]))
+                list(pool.finish_many([(p, p.text) for p in prepared]))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as threads:
+                    list(threads.map(lambda text: _prepare_and_finish(pool, text), texts))
+            results.append(ScalingResult(workers, len(texts), time.perf_counter() - start))
+    return results
+
+
+def _prepare_and_finish(pool: CPUStagePool, text: str) -> None:
+    """バッチ処理のステージと同じく1件ずつLLM前後の処理を行う（LLMの出力は準備した入力をそのまま使う）"""
+    prepared = pool.prepare(text)
+    pool.finish(prepared, prepared.text)
+
+
+def format_scaling(results: Sequence[ScalingResult]) -> str:
+    """計測結果を表形式の文字列にする（速度向上率はワーカー数が最小の行を基準にする）"""
+    if not results:
+        return ""
+    base = results[0].seconds
+    lines = ["workers  seconds  docs/s  speedup"]
+    for r in results:
+        speedup = base / r.seconds if r.seconds else 0.0
+        lines.append(
+            f"{r.workers:>7}  {r.seconds:>7.3f}  {r.documents_per_second:>6.1f}  {speedup:>6.2f}x"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """スケーリング計測のコマンドラインエントリーポイント"""
+    parser = argparse.ArgumentParser(
+        description="LLM前後のCPU処理（ルール・縮小・マスク）のワーカー数ごとの処理時間を計測する",
+    )
+    parser.add_argument("files", nargs="+", help="入力ファイル")
+    parser.add_argument(
+        "--max-workers", type=int, default=os.cpu_count() or 1,
+        help="計測する最大ワーカー数（1から順に計測する）",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="入力ファイルを繰り返す回数")
+    parser.add_argument(
+        "--chunked", action="store_true",
+        help="バッチ処理と同じ1件ずつの送信ではなく、チャンク単位の送信（prepare_many / finish_many）を計測する",
+    )
+    parser.add_argument("--chunksize", type=int, help="--chunked の場合に1回に送信するタスク数")
+    parser.add_argument("--rules", help="適用するルールセット名（pre で適用する）")
+    parser.add_argument("--minify", action="store_true", help="縮小を含める")
+    parser.add_argument("--mask", action="store_true", help="マスクと復元を含める")
+    args = parser.parse_args(argv)
+
+    texts = []
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append(f.read())
+    settings = StageSettings(
+        rules=args.rules,
+        rules_mode="pre",
+        minify=args.minify,
+        mask_kinds=MASK_KINDS if args.mask else (),
+    )
+    results = benchmark_scaling(
+        texts * args.repeat, settings, range(1, args.max_workers + 1), args.chunksize, args.chunked
+    )
+    print(format_scaling(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
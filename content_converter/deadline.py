@@ -0,0 +1,244 @@
+"""
+Deadline module
+--------------
+
+リクエストのタイムアウト・ジョブやバッチ全体の期限と、協調的なキャンセルを提供するモジュール
+
+期限は親子関係を持ち（バッチ → ジョブ）、親の期限切れやキャンセルは子にも及ぶ。
+現在の期限はコンテキスト変数で受け渡すため、プロバイダー・再試行・セクション分割・
+続きの生成の各層は引数を増やさずに同じ期限を参照できる。
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional, TypeVar, cast
+
+T = TypeVar("T")
+
+# プロバイダーの1回のリクエストのデフォルトのタイムアウト（秒）
+DEFAULT_REQUEST_TIMEOUT = 300.0
+
+# 実行中の呼び出しがキャンセル・期限切れを確認する間隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class Cancelled(Exception):
+    """協調的なキャンセルにより処理を中断した"""
+
+    def __init__(self, message: str = "キャンセルされました"):
+        super().__init__(message)
+
+
+class DeadlineExceeded(TimeoutError):
+    """期限を過ぎたため処理を中断した"""
+
+    def __init__(self, deadline: "Deadline"):
+        super().__init__(f"制限時間（{deadline.timeout:g}秒）を超えました")
+        # 期限を過ぎた Deadline（親の期限切れかどうかの判定に使う）
+        self.deadline = deadline
+
+
+class Deadline:
+    """
+    期限とキャンセル要求を表すクラス
+
+    timeout を省略すると期限を持たず、キャンセルの受け渡しだけに使える。
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["Deadline"] = None):
+        """
+        初期化メソッド
+
+        Args:
+            timeout: 現在からの制限時間（秒、Noneで無制限）
+            parent: 親の期限（親の期限切れ・キャンセルはこの期限にも及ぶ）
+        """
+        self.timeout = timeout
+        self.parent = parent
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+
+    def _chain(self) -> Iterator["Deadline"]:
+        deadline: Optional[Deadline] = self
+        while deadline is not None:
+            yield deadline
+            deadline = deadline.parent
+
+    def cancel(self) -> None:
+        """キャンセルを要求する（この期限を親に持つ全ての処理が中断する）"""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """この期限または親がキャンセルされたかどうか"""
+        return any(d._cancelled.is_set() for d in self._chain())
+
+    def expired(self) -> Optional["Deadline"]:
+        """期限を過ぎた Deadline（この期限または親）を返す（過ぎていない場合はNone）"""
+        now = time.monotonic()
+        for deadline in self._chain():
+            if deadline.expires_at is not None and deadline.expires_at <= now:
+                return deadline
+        return None
+
+    def remaining(self) -> Optional[float]:
+        """最も近い期限までの残り秒数（期限がない場合はNone）"""
+        limits = [d.expires_at for d in self._chain() if d.expires_at is not None]
+        if not limits:
+            return None
+        return max(0.0, min(limits) - time.monotonic())
+
+    def check(self) -> None:
+        """
+        キャンセル・期限切れを確認する
+
+        Raises:
+            Cancelled: キャンセルされた場合
+            DeadlineExceeded: 期限を過ぎた場合
+        """
+        if self.cancelled:
+            raise Cancelled()
+        expired = self.expired()
+        if expired is not None:
+            raise DeadlineExceeded(expired)
+
+
+_current: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar(
+    "content_converter_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """現在のスレッド（コンテキスト）の期限を返す"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """
+    with ブロックの中の処理に期限を設定する
+
+    Args:
+        deadline: 期限（Noneの場合は期限を解除する）
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check_deadline() -> None:
+    """現在の期限のキャンセル・期限切れを確認する（期限がない場合は何もしない）"""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def request_timeout(default: Optional[float]) -> Optional[float]:
+    """
+    1回のリクエストのタイムアウトを、デフォルト値と現在の期限の残り時間の短い方に決める
+
+    Args:
+        default: プロバイダーのタイムアウト（秒、Noneで無制限）
+
+    Returns:
+        Optional[float]: タイムアウト（秒）
+
+    Raises:
+        Cancelled: キャンセルされている場合
+        DeadlineExceeded: すでに期限を過ぎている場合
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    if remaining is None:
+        return default
+    return remaining if default is None else min(default, remaining)
+
+
+def bind_deadline(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    関数を呼び出し元の期限の中で実行するようにする（スレッドプールに渡す関数に使う）
+
+    期限と同じくコンテキスト変数で受け渡す値（優先度クラスなど）もまとめて引き継ぐ。
+
+    Args:
+        func: 別のスレッドで実行する関数
+
+    Returns:
+        Callable[..., T]: 呼び出し元のコンテキストをコピーして func を呼び出す関数
+    """
+    context = contextvars.copy_context()
+
+    def bound(*args: Any, **kwargs: Any) -> T:
+        # 同じコンテキストには複数のスレッドから同時に入れないため、呼び出しごとにコピーする
+        return cast(T, context.copy().run(_checked, func, *args, **kwargs))
+
+    return bound
+
+
+def _checked(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    check_deadline()
+    return func(*args, **kwargs)
+
+
+def run_cancellable(
+    func: Callable[[], T],
+    on_cancel: Optional[Callable[[], None]] = None,
+    poll_interval: float = POLL_INTERVAL,
+) -> T:
+    """
+    ブロックする呼び出しを、現在の期限のキャンセル・期限切れで中断できるように実行する
+
+    期限がある場合は func を別スレッドで実行し、呼び出し元は poll_interval ごとに
+    キャンセル・期限切れを確認する。中断した場合は on_cancel（接続を閉じるなど）を呼んで
+    すぐに戻るため、呼び出し元が確保していた並列数の枠もすぐに解放される。
+    取り残された呼び出しは、リクエストのタイムアウトで終了する。
+
+    Args:
+        func: ブロックする呼び出し
+        on_cancel: 中断時に呼び出す関数（省略可）
+        poll_interval: キャンセル・期限切れを確認する間隔（秒）
+
+    Returns:
+        T: func の戻り値
+
+    Raises:
+        Cancelled: キャンセルされた場合
+        DeadlineExceeded: 期限を過ぎた場合
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return func()
+    deadline.check()
+
+    done = threading.Event()
+    outcome: List[Any] = []
+    context = contextvars.copy_context()
+
+    def target() -> None:
+        try:
+            outcome.append((True, context.run(func)))
+        except BaseException as e:
+            outcome.append((False, e))
+        finally:
+            done.set()
+
+    threading.Thread(target=target, daemon=True).start()
+    while not done.wait(poll_interval):
+        try:
+            deadline.check()
+        except (Cancelled, DeadlineExceeded):
+            if on_cancel is not None:
+                with contextlib.suppress(Exception):
+                    on_cancel()
+            raise
+    ok, value = outcome[0]
+    if ok:
+        return cast(T, value)
+    raise value
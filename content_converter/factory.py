@@ -5,11 +5,14 @@ Factory module
 各種コンポーネントのファクトリークラスを提供するモジュール
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence, Union
 
 from .converter import ContentConverter
 from .llm.base import LLMProvider
+from .llm.fallback import FallbackProvider
 from .llm.gemini import GeminiProvider
+from .llm.key_pool import KeyPoolProvider
+from .llm.openai_compatible import OpenAICompatibleProvider
 from .llm.openrouter import OpenRouterProvider
 
 
@@ -17,14 +20,24 @@ class LLMProviderFactory:
     """LLMプロバイダーのファクトリークラス"""
 
     @staticmethod
-    def create(provider_type: str, api_key: Optional[str] = None, model: Optional[str] = None) -> LLMProvider:
+    def create(
+        provider_type: str,
+        api_key: Optional[Union[str, Sequence[str]]] = None,
+        model: Optional[str] = None,
+        pool_options: Optional[Dict[str, Any]] = None,
+        provider_options: Optional[Dict[str, Any]] = None,
+    ) -> LLMProvider:
         """
         LLMプロバイダーを作成する
 
         Args:
-            provider_type: プロバイダータイプ ('gemini', 'openrouter')
-            api_key: APIキー
+            provider_type: プロバイダータイプ ('gemini', 'openrouter', 'openai-compatible')
+            api_key: APIキー。複数のキーを渡した場合はキープールを使うプロバイダーを返す
             model: モデル名
+            pool_options: KeyPoolProviderに渡す追加オプション
+                （requests_per_minute, cooldown_seconds など）
+            provider_options: プロバイダーのコンストラクタに渡す追加オプション
+                （OpenRouterの api_base、OpenAI互換の base_url, stream, parallel など）
 
         Returns:
             LLMProvider: LLMプロバイダーのインスタンス
@@ -32,13 +45,56 @@ class LLMProviderFactory:
         Raises:
             ValueError: サポートされていないプロバイダータイプの場合
         """
+        if api_key is not None and not isinstance(api_key, str):
+            keys = list(api_key)
+            if len(keys) > 1:
+                return KeyPoolProvider(
+                    lambda key: LLMProviderFactory.create(
+                        provider_type, key, model, provider_options=provider_options
+                    ),
+                    keys,
+                    **(pool_options or {}),
+                )
+            api_key = keys[0] if keys else None
+
+        options = provider_options or {}
         if provider_type == "gemini":
-            return GeminiProvider(api_key=api_key, model=model)
+            return GeminiProvider(api_key=api_key, model=model, **options)
         elif provider_type == "openrouter":
-            return OpenRouterProvider(api_key=api_key, model=model)
+            return OpenRouterProvider(api_key=api_key, model=model, **options)
+        elif provider_type == "openai-compatible":
+            return OpenAICompatibleProvider(api_key=api_key, model=model, **options)
         else:
             raise ValueError(f"Unsupported LLM provider type: {provider_type}")
 
+    @staticmethod
+    def create_fallback(
+        chain: Sequence[Dict[str, Any]],
+        breaker_options: Optional[Dict[str, Any]] = None,
+    ) -> LLMProvider:
+        """
+        順序付きのフォールバックチェーンのLLMプロバイダーを作成する
+
+        Args:
+            chain: create に渡す引数の辞書のリスト（先頭から優先）
+            breaker_options: プロバイダーごとのサーキットブレーカーに渡す追加オプション
+                （error_rate, slow_call_seconds, open_seconds など）
+
+        Returns:
+            LLMProvider: チェーンが1つだけの場合はそのプロバイダー、それ以外は FallbackProvider
+        """
+        providers = []
+        for spec in chain:
+            provider = LLMProviderFactory.create(**spec)
+            model = getattr(provider, "model_name", None) or getattr(provider, "model", None)
+            if not isinstance(model, str):
+                model = spec.get("model")
+            name = f"{spec['provider_type']}:{model}" if model else spec["provider_type"]
+            providers.append((name, provider))
+        if len(providers) == 1:
+            return providers[0][1]
+        return FallbackProvider(providers, **(breaker_options or {}))
+
 
 class ConverterFactory:
     """コンテンツコンバーターのファクトリークラス"""
@@ -0,0 +1,128 @@
+"""
+Incremental module
+-----------------
+
+前回の入力と出力をセクション単位で保存し、変更されたセクションだけを再変換するためのモジュール
+"""
+
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .core.sections import Section
+from .writer import OutputWriter
+
+STATE_VERSION = 1
+
+
+def default_state_path(output_path: str) -> str:
+    """
+    出力ファイルに対応するセクション状態ファイルのパスを返す
+
+    Args:
+        output_path: 出力ファイルのパス
+
+    Returns:
+        str: 出力ファイルと同じディレクトリの隠しファイル（例: .article.md.sections.json）
+    """
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.sections.json")
+
+
+class SectionRecord(NamedTuple):
+    """前回変換したセクションの入力と出力の対応"""
+
+    key: str
+    content_hash: str
+    output: str
+
+
+class IncrementalResult(NamedTuple):
+    """差分変換の結果"""
+
+    text: str
+    reused: int
+    converted: int
+
+
+class IncrementalState:
+    """前回の変換をセクション単位で保持する状態"""
+
+    def __init__(self, context: str, records: Optional[List[SectionRecord]] = None):
+        """
+        初期化メソッド
+
+        Args:
+            context: 変換の文脈キー（テンプレート・プロンプト・モデルが変わると一致しない）
+            records: セクションごとの記録（入力の順序）
+        """
+        self.context = context
+        self.records = records or []
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IncrementalState"]:
+        """
+        状態ファイルを読み込む
+
+        Args:
+            path: 状態ファイルのパス
+
+        Returns:
+            Optional[IncrementalState]: 状態（ファイルがない・壊れている・形式が古い場合はNone）
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            return None
+        records = [
+            SectionRecord(r["key"], r["hash"], r["output"]) for r in data.get("sections", [])
+        ]
+        return cls(data.get("context", ""), records)
+
+    def save(self, path: str) -> None:
+        """
+        状態ファイルをアトミックに書き込む
+
+        Args:
+            path: 状態ファイルのパス
+        """
+        data = {
+            "version": STATE_VERSION,
+            "context": self.context,
+            "sections": [
+                {"key": r.key, "hash": r.content_hash, "output": r.output} for r in self.records
+            ],
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        OutputWriter(fsync="never").write(path, json.dumps(data, ensure_ascii=False, indent=1))
+
+    def match(self, sections: List[Section]) -> List[Optional[str]]:
+        """
+        新しい入力のセクションに対応する前回の出力を返す
+
+        見出しパスと内容ハッシュが一致するセクションを優先し、見出しの移動などで
+        パスが変わった場合は内容ハッシュだけで一致させる。
+
+        Args:
+            sections: 新しい入力のセクション
+
+        Returns:
+            List[Optional[str]]: セクションごとの前回の出力（再変換が必要な場合はNone）
+        """
+        by_key: Dict[Tuple[str, str], str] = {}
+        by_hash: Dict[str, str] = {}
+        for record in self.records:
+            by_key.setdefault((record.key, record.content_hash), record.output)
+            by_hash.setdefault(record.content_hash, record.output)
+
+        outputs: List[Optional[str]] = []
+        for section in sections:
+            content_hash = section.content_hash
+            output = by_key.get((section.key, content_hash))
+            if output is None:
+                output = by_hash.get(content_hash)
+            outputs.append(output)
+        return outputs
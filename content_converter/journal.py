@@ -0,0 +1,230 @@
+"""
+Journal module
+-------------
+
+バッチ変換のジョブ状態を永続化するジャーナルを提供するモジュール
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .writer import file_sha256
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    input_hash TEXT,
+    state TEXT NOT NULL,
+    output_hash TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JournalJob(NamedTuple):
+    """ジャーナルに記録された1件のジョブ"""
+
+    job_id: str
+    input_path: str
+    output_path: str
+    input_hash: Optional[str]
+    state: str
+    output_hash: Optional[str]
+    error: Optional[str]
+    attempts: int
+
+
+class JobJournal:
+    """SQLite（WALモード）によるクラッシュセーフなジョブジャーナル"""
+
+    def __init__(self, path: str):
+        """
+        初期化メソッド
+
+        Args:
+            path: ジャーナルファイル（SQLiteデータベース）のパス
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WALモードではNORMALでもコミット済みの状態はプロセスのクラッシュで失われない
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+
+    def close(self) -> None:
+        """ジャーナルを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def add_jobs(
+        self, jobs: Iterable[JournalJob], resume: bool = False
+    ) -> None:
+        """
+        ジョブを登録する
+
+        resumeがFalseの場合、既存のジョブも含めて全てpendingに戻す。
+        resumeがTrueの場合、完了済みのジョブは入力ハッシュが変わっておらず、出力ファイルが
+        記録した出力ハッシュのまま残っていればそのまま残す（出力が削除・編集されていればやり直す）。
+        前回の実行中に中断されたrunningのジョブはpendingに戻す。
+
+        Args:
+            jobs: 登録するジョブ（stateなどは無視され、pendingとして登録される）
+            resume: 前回の実行を再開するかどうか
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for job in jobs:
+                    self._add(job, resume, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_job(self, job: JournalJob, resume: bool = False) -> bool:
+        """
+        1件のジョブを登録する（add_jobs と同じ規則で、ストリーミング処理から1件ずつ登録する場合に使う）
+
+        Args:
+            job: 登録するジョブ
+            resume: 前回の実行を再開するかどうか
+
+        Returns:
+            bool: 実行が必要な場合はTrue（再開時に完了済みのまま残した場合はFalse）
+        """
+        with self._lock:
+            return self._add(job, resume, time.time())
+
+    def _add(self, job: JournalJob, resume: bool, now: float) -> bool:
+        """ジョブを登録し、pendingにした場合はTrueを返す（ロックを取得した状態で呼ぶ）"""
+        row = self._conn.execute(
+            "SELECT state, input_hash, output_hash FROM jobs WHERE job_id = ?", (job.job_id,)
+        ).fetchone()
+        keep_done = resume and row is not None and row[0] == DONE and row[1] == job.input_hash
+        # 出力ファイルが削除・編集されている場合はやり直す
+        if keep_done and row[2] is not None and file_sha256(job.output_path) == row[2]:
+            return False
+        self._conn.execute(
+            "INSERT INTO jobs (job_id, input_path, output_path, input_hash, state, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(job_id) DO UPDATE SET input_path = excluded.input_path,"
+            " output_path = excluded.output_path, input_hash = excluded.input_hash,"
+            " state = excluded.state, error = NULL, updated_at = excluded.updated_at",
+            (job.job_id, job.input_path, job.output_path, job.input_hash, PENDING, now),
+        )
+        return True
+
+    def _set_state(self, job_id: str, state: str, **fields: Optional[str]) -> None:
+        """ジョブの状態を更新する（1更新につき1コミット）"""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        sql = f"UPDATE jobs SET state = ?, updated_at = ?{', ' + assignments if fields else ''}"
+        if state == RUNNING:
+            sql += ", attempts = attempts + 1"
+        with self._lock:
+            self._conn.execute(
+                sql + " WHERE job_id = ?",
+                (state, time.time(), *fields.values(), job_id),
+            )
+
+    def mark_running(self, job_id: str) -> None:
+        """ジョブを実行中にする"""
+        self._set_state(job_id, RUNNING)
+
+    def mark_done(self, job_id: str, output_hash: str) -> None:
+        """ジョブを完了にし、出力のハッシュを記録する"""
+        self._set_state(job_id, DONE, output_hash=output_hash, error=None)
+
+    def mark_done_many(self, jobs: Iterable[Tuple[str, str]]) -> None:
+        """
+        複数のジョブをまとめて完了にする（1回のコミット）
+
+        Args:
+            jobs: (ジョブID, 出力のハッシュ) の列
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE jobs SET state = ?, updated_at = ?, output_hash = ?, error = NULL WHERE job_id = ?",
+                    [(DONE, now, output_hash, job_id) for job_id, output_hash in jobs],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """ジョブを失敗にし、エラーメッセージを記録する"""
+        self._set_state(job_id, FAILED, error=error)
+
+    def mark_pending(self, job_id: str) -> None:
+        """ジョブを未処理に戻す"""
+        self._set_state(job_id, PENDING)
+
+    def unfinished(self) -> List[JournalJob]:
+        """
+        未完了（pending, running, failed）のジョブを返す
+
+        Returns:
+            List[JournalJob]: 未完了のジョブ（登録順）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, input_path, output_path, input_hash, state, output_hash, error, attempts"
+                " FROM jobs WHERE state != ? ORDER BY rowid",
+                (DONE,),
+            ).fetchall()
+        return [JournalJob(*row) for row in rows]
+
+    def get(self, job_id: str) -> Optional[JournalJob]:
+        """
+        ジョブを取得する
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            Optional[JournalJob]: ジョブ（存在しない場合はNone）
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, input_path, output_path, input_hash, state, output_hash, error, attempts"
+                " FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return JournalJob(*row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """
+        状態ごとのジョブ数を返す
+
+        Returns:
+            Dict[str, int]: 状態名からジョブ数へのマッピング
+        """
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        with self._lock:
+            for state, count in self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ):
+                counts[state] = count
+        return counts
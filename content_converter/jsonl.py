@@ -0,0 +1,256 @@
+"""
+JSONL module
+-----------
+
+JSON Lines のジョブレコードを読み込んで並行に変換し、完了した順（または入力順）に
+結果レコードを1行ずつ出力するストリーミング変換を提供するモジュール
+"""
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from .converter import ContentConverter
+from .deadline import POLL_INTERVAL, Deadline, deadline_scope
+from .pipeline import DEFAULT_QUEUE_SIZE, Pipeline, PipelineResult, Stage
+from .profiling import Profiler
+from .render import RenderSettings, html_renderer
+from .scheduler import priority_scope
+
+# ジョブレコードの options で指定できるキー
+JOB_OPTIONS = ("timeout", "priority")
+
+
+class JsonlJob(NamedTuple):
+    """1件のジョブレコード"""
+
+    # 入力の何件目か（空行を除いて0から数える。入力順に並べ直す場合に使う）
+    seq: int
+    # 入力の行番号（1から数える）
+    line: int
+    # レコードの id（省略時はNone）
+    id: Any
+    text: str
+    template: str
+    prompt: Optional[str]
+    options: Dict[str, Any]
+
+
+class JsonlResult:
+    """JSONLモードの実行結果"""
+
+    def __init__(self) -> None:
+        self.done = 0
+        self.failed = 0
+
+    @property
+    def ok(self) -> bool:
+        """全てのジョブが成功したかどうか"""
+        return self.failed == 0
+
+    def summary(self) -> str:
+        """結果の要約文字列を返す"""
+        return f"成功 {self.done} / 失敗 {self.failed}"
+
+
+def _read_file(path: Any, field: str) -> str:
+    if not isinstance(path, str):
+        raise ValueError(f"{field} には文字列を指定してください")
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _text_field(record: Dict[str, Any], inline: str, path: str) -> Optional[str]:
+    """インラインのテキスト（inline）またはファイルのパス（path）のフィールドを読む"""
+    if inline in record:
+        value = record[inline]
+        if not isinstance(value, str):
+            raise ValueError(f"{inline} には文字列を指定してください")
+        return value
+    if path in record:
+        return _read_file(record[path], path)
+    return None
+
+
+class JsonlRunner:
+    """
+    JSON Lines のジョブレコードをパイプラインで並行に変換するクラス
+
+    1行が1件のジョブで、次のキーを持つJSONオブジェクトとする。
+
+    - ``id``: 結果レコードにそのまま含める識別子（省略可）
+    - ``text`` または ``input``: 入力テキスト、または入力ファイルのパス
+    - ``template`` または ``template_path``: テンプレート、またはテンプレートファイルのパス（省略時はデフォルト）
+    - ``prompt`` または ``prompt_path``: カスタムプロンプト、またはプロンプトファイルのパス（省略時はデフォルト）
+    - ``options``: ``timeout``（このジョブの制限時間、秒）と ``priority``（"interactive" / "bulk"）
+
+    結果は ``{"id", "line", "ok", "output" または "error", "seconds"}`` のJSONオブジェクトで、
+    完了した順に出力する。ordered の場合は入力順に並べ直して出力する。並べ直しを待つ結果は
+    reorder_window 件までに制限し（それ以上先のジョブは投入を待つ）、パイプラインのキューも有界のため、
+    入力がいくら長くてもメモリ使用量は一定に保たれる。
+    """
+
+    def __init__(
+        self,
+        converter: ContentConverter,
+        template: Optional[str] = None,
+        prompt: Optional[str] = None,
+        max_workers: int = 4,
+        io_workers: int = 2,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        ordered: bool = False,
+        reorder_window: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+        profiler: Optional[Profiler] = None,
+        html: Optional[RenderSettings] = None,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            converter: コンテンツコンバーター
+            template: レコードにテンプレートがない場合のテンプレート
+            prompt: レコードにプロンプトがない場合のカスタムプロンプト
+            max_workers: 同時にLLMで変換するジョブ数
+            io_workers: レコードの解析とファイルの読み込みの並列数
+            queue_size: ステージ間のキューの大きさ
+            ordered: 結果を入力順に出力するかどうか
+            reorder_window: 入力順に並べ直すために保持する結果の最大件数（省略時は queue_size）
+            job_timeout: レコードに timeout がない場合の1件の制限時間（秒）
+            profiler: ステージごとに計測するプロファイラー（省略時は計測しない）
+            html: 変換結果をHTMLにレンダリングする場合の設定（省略時はマークダウンのまま出力する）
+        """
+        self.converter = converter
+        self.template = template
+        self.prompt = prompt
+        self.max_workers = max(1, max_workers)
+        self.io_workers = max(1, io_workers)
+        self.queue_size = queue_size
+        self.ordered = ordered
+        self.reorder_window = max(1, reorder_window or queue_size)
+        self.job_timeout = job_timeout
+        self.profiler = profiler
+        self.html = html
+        # 実行中の全ジョブの期限の親（中断時にキャンセルする）
+        self._deadline: Optional[Deadline] = None
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def _parse(self, item: Tuple[int, int, str]) -> JsonlJob:
+        """1行を解析し、ファイルのパスで指定された入力・テンプレート・プロンプトを読み込む"""
+        seq, line, raw = item
+        try:
+            record = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSONとして解析できません: {e}") from None
+        if not isinstance(record, dict):
+            raise ValueError("ジョブレコードはJSONオブジェクトにしてください")
+        text = _text_field(record, "text", "input")
+        if text is None:
+            raise ValueError("text または input を指定してください")
+        template = _text_field(record, "template", "template_path")
+        if template is None:
+            template = self.template
+        if template is None and self.converter.rules_mode != "only":
+            raise ValueError("template または template_path を指定してください")
+        prompt = _text_field(record, "prompt", "prompt_path")
+        options = record.get("options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("options はJSONオブジェクトにしてください")
+        unknown = set(options) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"不明なオプションです: {', '.join(sorted(unknown))}")
+        return JsonlJob(
+            seq, line, record.get("id"), text, template or "",
+            prompt if prompt is not None else self.prompt, options,
+        )
+
+    def _convert(self, job: JsonlJob) -> Tuple[JsonlJob, str, float]:
+        """ジョブの制限時間と優先度クラスの中で変換する"""
+        timeout = job.options.get("timeout", self.job_timeout)
+        start = time.monotonic()
+        with deadline_scope(Deadline(timeout, parent=self._deadline)), priority_scope(job.options.get("priority")):
+            output = self.converter.convert(job.text, job.template, job.prompt)
+        if self.html is not None:
+            output = html_renderer(self.html).render(output)
+        return job, output, time.monotonic() - start
+
+    def _source(self, lines: Iterable[str], pipeline: Pipeline) -> Iterator[Tuple[int, int, str]]:
+        """空行を除いた行を番号つきで投入する（入力順に並べ直す場合は並べ直しの枠が空くまで待つ）"""
+        seq = 0
+        for line, raw in enumerate(lines, start=1):
+            if not raw.strip():
+                continue
+            if self.ordered:
+                with self._cond:
+                    while seq >= self._next + self.reorder_window and not pipeline.stopped:
+                        self._cond.wait(POLL_INTERVAL)
+            yield seq, line, raw
+            seq += 1
+
+    def _record(self, outcome: PipelineResult) -> Tuple[int, Dict[str, Any]]:
+        """パイプラインの結果を (入力の番号, 結果レコード) にする"""
+        if outcome.ok:
+            job, output, seconds = outcome.value
+            return job.seq, {
+                "id": job.id, "line": job.line, "ok": True, "output": output, "seconds": round(seconds, 3),
+            }
+        value = outcome.value
+        if isinstance(value, JsonlJob):
+            seq, line, job_id = value.seq, value.line, value.id
+        else:
+            seq, line, job_id = value[0], value[1], None
+        error = str(outcome.error) if outcome.error is not None else "キャンセルされました"
+        return seq, {"id": job_id, "line": line, "ok": False, "error": error}
+
+    def run(self, lines: Iterable[str], write: Callable[[str], None]) -> JsonlResult:
+        """
+        ジョブレコードを変換し、結果レコードを1行ずつ書き出す
+
+        Args:
+            lines: ジョブレコードの行（ファイルや標準入力のように1行ずつ読み出してよい）
+            write: 結果レコードの1行（改行を含む）を書き出す関数
+
+        Returns:
+            JsonlResult: 実行結果
+        """
+        result = JsonlResult()
+        self._deadline = Deadline()
+        self._next = 0
+        pending: Dict[int, Dict[str, Any]] = {}
+        stages = [
+            Stage("parse", self._parse, self.io_workers),
+            Stage("llm", self._convert, self.max_workers),
+        ]
+        if self.profiler is not None:
+            stages = [stage._replace(func=self.profiler.wrap(stage.name, stage.func)) for stage in stages]
+        pipeline = Pipeline(stages, queue_size=self.queue_size)
+
+        def emit(record: Dict[str, Any]) -> None:
+            if record["ok"]:
+                result.done += 1
+            else:
+                result.failed += 1
+            write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        outcomes = pipeline.run(self._source(lines, pipeline))
+        try:
+            for outcome in outcomes:
+                seq, record = self._record(outcome)
+                if not self.ordered:
+                    emit(record)
+                    continue
+                pending[seq] = record
+                with self._cond:
+                    while self._next in pending:
+                        emit(pending.pop(self._next))
+                        self._next += 1
+                    self._cond.notify_all()
+        except BaseException:
+            # 中断された場合は実行中の変換を待たずにキャンセルする
+            self._deadline.cancel()
+            raise
+        finally:
+            outcomes.close()
+        return result
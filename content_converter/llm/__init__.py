@@ -6,7 +6,12 @@ LLMプロバイダーとプロンプトテンプレートを提供するモジ
 """
 
 from .base import LLMProvider
+from .batching import MicroBatchingProvider
+from .cassette import RecordingProvider, ReplayProvider
+from .fallback import CircuitBreaker, FallbackProvider
 from .gemini import GeminiProvider
+from .key_pool import KeyPoolProvider
+from .openai_compatible import OpenAICompatibleProvider
 from .openrouter import OpenRouterProvider
 from .prompts import (
     PromptTemplate,
@@ -18,7 +23,14 @@ from .prompts import (
 
 __all__ = [
     "LLMProvider",
+    "MicroBatchingProvider",
+    "RecordingProvider",
+    "ReplayProvider",
+    "CircuitBreaker",
+    "FallbackProvider",
     "GeminiProvider",
+    "KeyPoolProvider",
+    "OpenAICompatibleProvider",
     "OpenRouterProvider",
     "PromptTemplate",
     "OptimizeContentTemplate",
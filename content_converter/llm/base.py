@@ -5,13 +5,183 @@ LLM Base module
 LLM連携の基底クラスを提供するモジュール
 """
 
+import contextlib
+import contextvars
+import math
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .continuation import DEFAULT_MAX_CONTINUATIONS, Generate, generate_with_continuations
+
+# チャットメッセージ（{"role": ..., "content": ..., "cache": bool}）
+Message = Dict[str, Any]
+
+_usage_lock = threading.Lock()
+
+# usage_scope の中で記録したトークン使用量の集計先
+_usage: "contextvars.ContextVar[Optional[Dict[str, int]]]" = contextvars.ContextVar(
+    "content_converter_usage", default=None
+)
+
+
+@contextlib.contextmanager
+def usage_scope() -> Iterator[Dict[str, int]]:
+    """
+    with ブロックの中で記録されたトークン使用量を集計する
+
+    record_usage はどのプロバイダーのインスタンスで呼ばれても、呼び出し元のコンテキストのスコープに加算する。
+    そのため、キープールやフォールバックのように内側のプロバイダーに委ねるプロバイダーでも、
+    並行して呼び出している場合でも、その呼び出しのトークン使用量だけを得られる（続きの生成も合算する）。
+    スコープを入れ子にした場合は、内側で集計した使用量を終了時に外側にも加算する。
+
+    Yields:
+        Dict[str, int]: 集計したトークン使用量（prompt_tokens / completion_tokens / cached_tokens）
+    """
+    parent = _usage.get()
+    usage: Dict[str, int] = {}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+        if parent is not None:
+            with _usage_lock:
+                for k, v in usage.items():
+                    parent[k] = parent.get(k, 0) + v
+
+
+def split_messages(messages: List[Message]) -> Tuple[str, List[str], List[str]]:
+    """
+    メッセージ列をシステム指示・キャッシュ可能なプレフィックス・可変部分に分割する
+
+    Args:
+        messages: チャットメッセージのリスト。``cache`` がTrueのメッセージは
+            リクエスト間で不変なプレフィックスとして扱う
+
+    Returns:
+        Tuple[str, List[str], List[str]]: システム指示、プレフィックス、可変部分
+    """
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    prefix = [m["content"] for m in messages if m["role"] != "system" and m.get("cache")]
+    variable = [m["content"] for m in messages if m["role"] != "system" and not m.get("cache")]
+    return system, prefix, variable
+
+
+def summary_max_tokens(max_length: int) -> int:
+    """
+    要約の最大文字数から max_tokens を決める
+
+    日本語は1文字で約1トークンになるため、最大文字数に2割の余裕を持たせる。
+
+    Args:
+        max_length: 要約の最大文字数
+
+    Returns:
+        int: max_tokens
+    """
+    return max(32, math.ceil(max_length * 1.2))
+
+
+def model_name_of(provider: Any) -> Optional[str]:
+    """
+    プロバイダーが使うモデル名を返す
+
+    プロバイダーによって属性名が異なるため model_name・model の順に探す。内側のプロバイダーに委ねる
+    プロバイダー（キープール・フォールバックなど）は model_name で内側のモデル名を返す。
+
+    Args:
+        provider: LLMプロバイダー
+
+    Returns:
+        Optional[str]: モデル名（わからない場合はNone）
+    """
+    for name in (getattr(provider, "model_name", None), getattr(provider, "model", None)):
+        if isinstance(name, str):
+            return name
+    return None
 
 
 class LLMProvider(ABC):
     """LLMプロバイダーの基底クラス"""
 
+    # 直近リクエストと累計のトークン使用量（record_usage で更新される）
+    last_usage: Dict[str, int] = {}
+    usage_totals: Dict[str, int] = {}
+
+    # 出力が上限で途切れた場合に続きを生成する最大回数（options の "max_continuations" で上書きできる）
+    max_continuations: int = DEFAULT_MAX_CONTINUATIONS
+    # 続きを生成した累計回数と、上限回数に達しても途切れたままだった出力の件数
+    continuations: int = 0
+    truncated_outputs: int = 0
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        不変な指示・テンプレートを先頭に、可変な入力を末尾に置いたメッセージ列を受け取る。
+        プロンプトキャッシュに対応するプロバイダーはこのメソッドをオーバーライドする。
+        デフォルト実装は全メッセージを連結して optimize_content に渡す。
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        return self.optimize_content(
+            "\n\n".join(m["content"] for m in messages), options=options
+        )
+
+    def record_usage(
+        self, prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0
+    ) -> None:
+        """
+        直近リクエストのトークン使用量を記録し、累計に加算する
+
+        Args:
+            prompt_tokens: 入力トークン数
+            completion_tokens: 出力トークン数
+            cached_tokens: 入力トークンのうちキャッシュから読み込まれたトークン数
+        """
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+        }
+        scope = _usage.get()
+        with _usage_lock:
+            self.last_usage = usage
+            self.usage_totals = {
+                k: self.usage_totals.get(k, 0) + v for k, v in usage.items()
+            }
+            if scope is not None:
+                for k, v in usage.items():
+                    scope[k] = scope.get(k, 0) + v
+
+    def complete_with_continuations(
+        self, generate: Generate, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        1回のリクエストを行う関数を使い、出力が上限で途切れている間は続きを生成してつなぎ合わせる
+
+        Args:
+            generate: 追加の会話ターン（途切れた出力と続きの指示）を受け取ってリクエストを行い、
+                (生成されたテキスト, 上限で途切れたかどうか) を返す関数
+            options: 生成オプション（max_continuations）
+
+        Returns:
+            str: 連結したテキスト（上限回数に達した場合も生成済みのテキストは全て含む）
+        """
+        limit = (options or {}).get("max_continuations", self.max_continuations)
+        text, count, truncated = generate_with_continuations(generate, limit)
+        if count or truncated:
+            with _usage_lock:
+                self.continuations += count
+                self.truncated_outputs += int(truncated)
+        return text
+
     @abstractmethod
     def optimize_content(
         self, content: str, options: Optional[Dict[str, Any]] = None
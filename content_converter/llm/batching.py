@@ -0,0 +1,296 @@
+"""
+Micro-batching Provider module
+----------------------------
+
+短いコンテンツの要約リクエストを少しの間ためて、1回のリクエストにまとめて送るLLMプロバイダーを提供するモジュール
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..core.tokens import estimate_tokens
+from ..deadline import POLL_INTERVAL, Cancelled, DeadlineExceeded, check_deadline
+from .base import LLMProvider, Message, model_name_of, summary_max_tokens
+from .prompts import GENERATE_SUMMARIES_TEMPLATE
+
+# 1回のリクエストにまとめる入力の推定トークン数の上限
+DEFAULT_MAX_BATCH_TOKENS = 8000
+# 1回のリクエストにまとめる件数の上限
+DEFAULT_MAX_BATCH_SIZE = 16
+# 最初のリクエストが後続のリクエストを待つ秒数
+DEFAULT_LINGER_SECONDS = 0.05
+
+CONTENT_MARKER = "=====CONTENT: {index}====="
+_SUMMARY_MARKER_RE = re.compile(r"^=====SUMMARY: (\d+)=====[ \t]*$", re.MULTILINE)
+# 区切り行の分として1件ごとに見込む出力トークン数
+_MARKER_TOKENS = 16
+
+
+def split_summaries(response: str, count: int) -> Dict[int, str]:
+    """
+    区切り行 ``=====SUMMARY: 番号=====`` で区切られたレスポンスを要約ごとに分割する
+
+    Args:
+        response: LLMのレスポンス
+        count: まとめたコンテンツの件数（番号は1から count まで）
+
+    Returns:
+        Dict[int, str]: 番号（0始まり）から要約へのマッピング（空の要約・範囲外や重複した番号は含まない）
+    """
+    results: Dict[int, str] = {}
+    matches = list(_SUMMARY_MARKER_RE.finditer(response))
+    for i, match in enumerate(matches):
+        index = int(match.group(1)) - 1
+        if not 0 <= index < count or index in results:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(response)
+        body = response[match.end():end].strip()
+        if body:
+            results[index] = body
+    return results
+
+
+class MicroBatchStats:
+    """まとめたリクエストの件数と、個別に送った件数を集計するクラス"""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.batched = 0
+        self.individual = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record_batch(self, documents: int, fallbacks: int) -> None:
+        """
+        まとめて送ったリクエストを記録する
+
+        Args:
+            documents: まとめたコンテンツの件数
+            fallbacks: 要約を分割できず個別に送り直した件数
+        """
+        with self._lock:
+            self.requests += 1
+            self.batched += documents - fallbacks
+            self.fallbacks += fallbacks
+
+    def record_individual(self) -> None:
+        """まとめずに送ったリクエストを記録する"""
+        with self._lock:
+            self.individual += 1
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        average = self.batched / self.requests if self.requests else 0.0
+        return (
+            f"まとめたリクエスト {self.requests}回（{self.batched}件、平均 {average:.1f}件/回）"
+            f" / 個別 {self.individual}件 / 分割できず個別に送り直し {self.fallbacks}件"
+        )
+
+
+class _Pending:
+    """まとめて送るのを待っている要約リクエスト"""
+
+    __slots__ = ("content", "tokens", "done", "result")
+
+    def __init__(self, content: str, tokens: int):
+        self.content = content
+        self.tokens = tokens
+        self.done = threading.Event()
+        # 要約（Noneの場合は個別に送り直す）
+        self.result: Optional[str] = None
+
+
+class _Batch:
+    """1回のリクエストにまとめる要約リクエストの集まり"""
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+        self.items: List[_Pending] = []
+        self.tokens = 0
+        # 件数・トークン数の上限に達した（これ以上待たずに送る）
+        self.full = threading.Event()
+
+
+class MicroBatchingProvider(LLMProvider):
+    """
+    短いコンテンツの要約リクエストを1回のリクエストにまとめるLLMプロバイダー
+
+    generate_summary は最初の呼び出しが linger_seconds だけ後続の呼び出しを待ち、
+    件数・推定トークン数の上限までを区切り行つきの1つのリクエストにまとめて送る。
+    レスポンスは区切り行で要約ごとに分割し、分割できなかった要約やリクエストが失敗した場合は
+    それぞれ個別のリクエストで送り直す。指示の繰り返しと往復の待ち時間が減り、
+    リクエスト数/分の上限にも当たりにくくなる。
+
+    最初の呼び出しがまとめたリクエストを送るため、後続の呼び出しはそれを待つ。
+    複数のスレッドから同時に呼び出す場合（バッチ変換など）に効果がある。
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        linger_seconds: float = DEFAULT_LINGER_SECONDS,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            provider: 実際にリクエストを送るプロバイダー
+            max_batch_tokens: 1回のリクエストにまとめる入力の推定トークン数の上限
+                （この半分を超えるコンテンツはまとめずに送る）
+            max_batch_size: 1回のリクエストにまとめる件数の上限
+            linger_seconds: 最初のリクエストが後続のリクエストを待つ秒数
+        """
+        self.provider = provider
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max(1, max_batch_size)
+        self.linger_seconds = linger_seconds
+        self.stats = MicroBatchStats()
+        # 要約の最大文字数ごとの、まだ送っていない集まり
+        self._open: Dict[int, _Batch] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:  # type: ignore[override]
+        """内側のプロバイダーの累計トークン使用量"""
+        return getattr(self.provider, "usage_totals", None) or {}
+
+    @property
+    def continuations(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで続きを生成した累計回数"""
+        return getattr(self.provider, "continuations", 0)
+
+    @property
+    def truncated_outputs(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで途切れたままだった出力の件数"""
+        return getattr(self.provider, "truncated_outputs", 0)
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """内側のプロバイダーのモデル名"""
+        return model_name_of(self.provider)
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する（まとめずに内側のプロバイダーに送る）
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        return self.provider.chat(messages, options=options)
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        コンテンツを最適化する（まとめずに内側のプロバイダーに送る）
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        return self.provider.optimize_content(content, options=options)
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        他の呼び出しとまとめて要約を生成する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        tokens = estimate_tokens(content)
+        if self.max_batch_size < 2 or tokens > self.max_batch_tokens // 2:
+            return self._individual(content, max_length)
+
+        item = _Pending(content, tokens)
+        batch = self._join(item, max_length)
+        if batch is not None:
+            self._send(batch)
+        else:
+            # まとめたリクエストを送る呼び出しの完了を待つ（待っている間も自分の期限を確認する）
+            while not item.done.wait(POLL_INTERVAL):
+                check_deadline()
+        if item.result is None:
+            return self.provider.generate_summary(content, max_length=max_length)
+        return item.result
+
+    def _join(self, item: _Pending, max_length: int) -> Optional[_Batch]:
+        """
+        まだ送っていない集まりに加わる
+
+        Returns:
+            Optional[_Batch]: 新しい集まりを作った場合はその集まり（呼び出し元が送る）
+        """
+        with self._lock:
+            batch = self._open.get(max_length)
+            created = None
+            if batch is None or batch.tokens + item.tokens > self.max_batch_tokens:
+                if batch is not None:
+                    batch.full.set()
+                batch = created = self._open[max_length] = _Batch(max_length)
+            batch.items.append(item)
+            batch.tokens += item.tokens
+            if len(batch.items) >= self.max_batch_size:
+                batch.full.set()
+                del self._open[max_length]
+            return created
+
+    def _send(self, batch: _Batch) -> None:
+        """後続の呼び出しを少し待ってから、集まりを1回のリクエストで送り、各呼び出しに結果を渡す"""
+        batch.full.wait(self.linger_seconds)
+        with self._lock:
+            if self._open.get(batch.max_length) is batch:
+                del self._open[batch.max_length]
+        items = batch.items
+
+        try:
+            if len(items) == 1:
+                self.stats.record_individual()
+            else:
+                results = self._request(items, batch.max_length)
+                for index, item in enumerate(items):
+                    item.result = results.get(index)
+                self.stats.record_batch(len(items), sum(1 for item in items if item.result is None))
+        except (Cancelled, DeadlineExceeded):
+            # 送った呼び出しの中断は、他の呼び出しには及ばない（それぞれ個別に送り直す）
+            raise
+        except Exception:
+            self.stats.record_batch(len(items), len(items))
+        finally:
+            for item in items:
+                item.done.set()
+
+    def _request(self, items: List[_Pending], max_length: int) -> Dict[int, str]:
+        """まとめたリクエストを送り、要約ごとに分割する"""
+        contents = "\n\n".join(
+            f"{CONTENT_MARKER.format(index=index)}\n{item.content}"
+            for index, item in enumerate(items, start=1)
+        )
+        messages: List[Message] = [
+            {
+                "role": "system",
+                "content": GENERATE_SUMMARIES_TEMPLATE.format(count=len(items), max_length=max_length),
+                "cache": True,
+            },
+            {"role": "user", "content": contents},
+        ]
+        max_tokens = len(items) * (summary_max_tokens(max_length) + _MARKER_TOKENS)
+        response = self.provider.chat(messages, options={"max_tokens": max_tokens})
+        return split_summaries(response, len(items))
+
+    def _individual(self, content: str, max_length: int) -> str:
+        self.stats.record_individual()
+        return self.provider.generate_summary(content, max_length=max_length)
@@ -0,0 +1,376 @@
+"""
+Cassette module
+--------------
+
+LLMのリクエストと応答・トークン使用量・応答時間をカセットファイルに記録し、
+ネットワークなしで再生するプロバイダーを提供するモジュール
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import IO, Any, Callable, Dict, List, NamedTuple, Optional
+
+from ..deadline import POLL_INTERVAL, check_deadline
+from .base import LLMProvider, Message, model_name_of, usage_scope
+
+CASSETTE_VERSION = 1
+
+# フィンガープリントに含めないオプション（出力予算の学習などで実行ごとに変わるため）
+VOLATILE_OPTIONS = ("max_tokens",)
+
+
+def request_fingerprint(method: str, payload: Dict[str, Any]) -> str:
+    """
+    リクエストを識別するフィンガープリントを返す
+
+    Args:
+        method: プロバイダーのメソッド名（chat / optimize_content / generate_summary）
+        payload: リクエストの内容（メッセージ・コンテンツ・オプションなど）
+
+    Returns:
+        str: SHA-256ハッシュの先頭32文字
+    """
+    data = json.dumps(
+        {"method": method, **payload}, sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class Recording(NamedTuple):
+    """カセットに記録した1回のリクエスト"""
+
+    fingerprint: str
+    method: str
+    response: str
+    usage: Dict[str, int]
+    latency: float
+
+
+class CassetteMissError(LookupError):
+    """カセットに記録されていないリクエストを再生しようとした"""
+
+    def __init__(self, method: str, fingerprint: str, text: str):
+        preview = " ".join(text.split())[:40]
+        super().__init__(
+            f"カセットに記録されていないリクエストです: {method} {fingerprint}（{len(text)}文字: {preview}…）"
+        )
+        self.method = method
+        self.fingerprint = fingerprint
+
+
+class Cassette:
+    """
+    リクエストのフィンガープリントごとに応答を保持するカセット
+
+    JSON Lines形式で1リクエストずつ追記する（パスが .gz で終わる場合はgzip圧縮する）。
+    同じリクエストを複数回記録した場合は、再生時に記録した順に返し、最後の応答を繰り返す。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初期化メソッド
+
+        Args:
+            path: カセットファイルのパス（Noneの場合はメモリ上のみ）。既存のファイルは読み込み、追記する
+        """
+        self.path = path
+        self.recordings: Dict[str, List[Recording]] = {}
+        self._played: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _open(self, path: str, mode: str) -> IO[str]:
+        if path.endswith(".gz"):
+            return gzip.open(path, mode + "t", encoding="utf-8")  # type: ignore[return-value]
+        return open(path, mode, encoding="utf-8")
+
+    def _load(self, path: str) -> None:
+        """カセットファイルを読み込む"""
+        with self._open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で中断された末尾の行は無視する
+                    continue
+                if record.get("version") != CASSETTE_VERSION:
+                    continue
+                recording = Recording(
+                    record["fingerprint"], record["method"], record["response"],
+                    record.get("usage") or {}, record.get("latency", 0.0),
+                )
+                self.recordings.setdefault(recording.fingerprint, []).append(recording)
+
+    def __len__(self) -> int:
+        return sum(len(recordings) for recordings in self.recordings.values())
+
+    def add(self, recording: Recording) -> None:
+        """
+        リクエストを記録する
+
+        Args:
+            recording: 記録するリクエスト
+        """
+        with self._lock:
+            self.recordings.setdefault(recording.fingerprint, []).append(recording)
+            if self.path:
+                record = {"version": CASSETTE_VERSION, **recording._asdict()}
+                with self._open(self.path, "a") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def play(self, fingerprint: str) -> Optional[Recording]:
+        """
+        記録した応答を返す
+
+        Args:
+            fingerprint: リクエストのフィンガープリント
+
+        Returns:
+            Optional[Recording]: 記録した順の次の応答（記録がない場合はNone）
+        """
+        with self._lock:
+            recordings = self.recordings.get(fingerprint)
+            if not recordings:
+                return None
+            played = self._played.get(fingerprint, 0)
+            self._played[fingerprint] = played + 1
+            return recordings[min(played, len(recordings) - 1)]
+
+
+def _stable_options(options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in (options or {}).items() if k not in VOLATILE_OPTIONS}
+
+
+def _chat_payload(messages: List[Message], options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"messages": messages, "options": _stable_options(options)}
+
+
+def _content_payload(content: str, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"content": content, "options": _stable_options(options)}
+
+
+def _summary_payload(content: str, max_length: int) -> Dict[str, Any]:
+    return {"content": content, "max_length": max_length}
+
+
+class RecordingProvider(LLMProvider):
+    """内側のプロバイダーへのリクエストと応答・トークン使用量・応答時間をカセットに記録するプロバイダー"""
+
+    def __init__(self, provider: LLMProvider, cassette: Cassette):
+        """
+        初期化メソッド
+
+        Args:
+            provider: 実際にリクエストを送るプロバイダー
+            cassette: 記録先のカセット
+        """
+        self.provider = provider
+        self.cassette = cassette
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:  # type: ignore[override]
+        """内側のプロバイダーの累計トークン使用量"""
+        return getattr(self.provider, "usage_totals", None) or {}
+
+    @property
+    def continuations(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで続きを生成した累計回数"""
+        return getattr(self.provider, "continuations", 0)
+
+    @property
+    def truncated_outputs(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで途切れたままだった出力の件数"""
+        return getattr(self.provider, "truncated_outputs", 0)
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """内側のプロバイダーのモデル名"""
+        return model_name_of(self.provider)
+
+    def _record(self, method: str, payload: Dict[str, Any], func: Callable[[LLMProvider], str]) -> str:
+        """リクエストを送り、成功した応答を記録する"""
+        start = time.monotonic()
+        # 並行して呼び出している場合や内側のプロバイダーに委ねるプロバイダーでも、この呼び出しの分だけを集計する
+        with usage_scope() as usage:
+            response = func(self.provider)
+        latency = time.monotonic() - start
+        self.cassette.add(
+            Recording(request_fingerprint(method, payload), method, response, usage, round(latency, 3))
+        )
+        with self._lock:
+            self.recorded += 1
+        return response
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成し、記録する
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        return self._record(
+            "chat", _chat_payload(messages, options), lambda p: p.chat(messages, options=options)
+        )
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        コンテンツを最適化し、記録する
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        return self._record(
+            "optimize_content",
+            _content_payload(content, options),
+            lambda p: p.optimize_content(content, options=options),
+        )
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        要約を生成し、記録する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        return self._record(
+            "generate_summary",
+            _summary_payload(content, max_length),
+            lambda p: p.generate_summary(content, max_length=max_length),
+        )
+
+    def summary(self) -> str:
+        """記録件数の要約文字列を返す"""
+        return f"記録 {self.recorded}件（{self.cassette.path or 'メモリ上'}）"
+
+
+class ReplayProvider(LLMProvider):
+    """
+    カセットに記録した応答を返すプロバイダー（ネットワークに接続しない）
+
+    latency が "recorded" の場合は記録した応答時間（speed 倍速）だけ待ってから返すため、
+    本番のバッチ変換の処理時間をローカルで再現できる。"none" の場合はすぐに返す。
+    記録されていないリクエストは CassetteMissError になる。
+    """
+
+    def __init__(self, cassette: Cassette, latency: str = "none", speed: float = 1.0):
+        """
+        初期化メソッド
+
+        Args:
+            cassette: 再生するカセット
+            latency: 応答時間の再現方法（"none" / "recorded"）
+            speed: 記録した応答時間を何倍速で再現するか
+        """
+        if latency not in ("none", "recorded"):
+            raise ValueError(f"不明な応答時間の再現方法です: {latency}")
+        self.cassette = cassette
+        self.latency = latency
+        self.speed = speed
+        self.hits = 0
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+
+    def _play(self, method: str, payload: Dict[str, Any], preview: str) -> str:
+        """記録した応答を返す（記録した応答時間を再現する場合は待つ）"""
+        fingerprint = request_fingerprint(method, payload)
+        recording = self.cassette.play(fingerprint)
+        if recording is None:
+            with self._lock:
+                self.misses.append(fingerprint)
+            raise CassetteMissError(method, fingerprint, preview)
+        with self._lock:
+            self.hits += 1
+        if self.latency == "recorded" and self.speed > 0:
+            # 待っている間もキャンセル・期限切れを確認する
+            until = time.monotonic() + recording.latency / self.speed
+            while True:
+                check_deadline()
+                remaining = until - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, POLL_INTERVAL))
+        if recording.usage:
+            self.record_usage(
+                recording.usage.get("prompt_tokens", 0),
+                recording.usage.get("completion_tokens", 0),
+                recording.usage.get("cached_tokens", 0),
+            )
+        return recording.response
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        記録したチャットの応答を返す
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 記録したテキスト
+
+        Raises:
+            CassetteMissError: 記録されていないリクエストの場合
+        """
+        preview = messages[-1]["content"] if messages else ""
+        return self._play("chat", _chat_payload(messages, options), preview)
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        記録した最適化の結果を返す
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 記録したコンテンツ
+
+        Raises:
+            CassetteMissError: 記録されていないリクエストの場合
+        """
+        return self._play("optimize_content", _content_payload(content, options), content)
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        記録した要約を返す
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 記録した要約
+
+        Raises:
+            CassetteMissError: 記録されていないリクエストの場合
+        """
+        return self._play("generate_summary", _summary_payload(content, max_length), content)
+
+    def summary(self) -> str:
+        """再生件数の要約文字列を返す"""
+        return f"再生 {self.hits}件 / 記録なし {len(self.misses)}件（{self.cassette.path or 'メモリ上'}）"
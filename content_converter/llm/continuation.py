@@ -0,0 +1,87 @@
+"""
+Continuation module
+------------------
+
+出力トークン数の上限で途切れたLLMの出力を、続きのリクエストでつなぎ合わせるモジュール
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from .prompts import CONTINUE_OUTPUT_TEMPLATE
+
+# 途切れた出力に対して続きを生成する最大回数のデフォルト
+DEFAULT_MAX_CONTINUATIONS = 3
+
+# 重複とみなす最短・最長の文字数（短い一致は偶然の可能性が高いため取り除かない）
+MIN_OVERLAP = 8
+MAX_OVERLAP = 500
+
+# 続きの生成を行う関数: 追加の会話ターンを受け取り、(生成されたテキスト, 上限で途切れたかどうか) を返す
+Generate = Callable[[List[Dict[str, Any]]], Tuple[str, bool]]
+
+
+def stitch(
+    previous: str,
+    continuation: str,
+    min_overlap: int = MIN_OVERLAP,
+    max_overlap: int = MAX_OVERLAP,
+) -> str:
+    """
+    途切れた出力と続きを連結する
+
+    続きの先頭が途切れた出力の末尾を繰り返している場合は、重複部分を取り除く。
+
+    Args:
+        previous: 途切れた出力
+        continuation: 続きの出力
+        min_overlap: 重複とみなす最短の文字数
+        max_overlap: 重複を探す最長の文字数
+
+    Returns:
+        str: 連結したテキスト
+    """
+    limit = min(len(previous), len(continuation), max_overlap)
+    for size in range(limit, min_overlap - 1, -1):
+        if previous.endswith(continuation[:size]):
+            return previous + continuation[size:]
+    return previous + continuation
+
+
+def continuation_turns(partial: str) -> List[Dict[str, Any]]:
+    """
+    途切れた出力の続きを求める会話ターンを返す
+
+    Args:
+        partial: これまでに生成された出力
+
+    Returns:
+        List[Dict[str, Any]]: 元のリクエストの後ろに追加するメッセージ（assistant の出力と続きの指示）
+    """
+    return [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_OUTPUT_TEMPLATE.format()},
+    ]
+
+
+def generate_with_continuations(
+    generate: Generate, max_continuations: int
+) -> Tuple[str, int, bool]:
+    """
+    出力が上限で途切れている間、続きを生成してつなぎ合わせる
+
+    生成されたテキストは上限回数に達した場合も含めて全て返す。
+
+    Args:
+        generate: 追加の会話ターンを受け取って1回のリクエストを行う関数
+        max_continuations: 続きを生成する最大回数
+
+    Returns:
+        Tuple[str, int, bool]: 連結したテキスト、続きを生成した回数、最後まで途切れたままかどうか
+    """
+    text, truncated = generate([])
+    count = 0
+    while truncated and count < max_continuations:
+        piece, truncated = generate(continuation_turns(text))
+        text = stitch(text, piece)
+        count += 1
+    return text, count, truncated
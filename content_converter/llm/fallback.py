@@ -0,0 +1,288 @@
+"""
+Fallback module
+--------------
+
+プロバイダー・モデルごとのサーキットブレーカーと、順序付きのフォールバックチェーンを提供するモジュール
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from ..deadline import Cancelled, DeadlineExceeded
+from .base import LLMProvider, Message, model_name_of
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# サーキットブレーカーの状態
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class ProvidersUnavailableError(RuntimeError):
+    """フォールバックチェーンの全てのプロバイダーが失敗した、または回路が開いていた"""
+
+
+class CircuitBreaker:
+    """
+    1つのプロバイダー・モデルへのリクエストを、エラー率と応答時間に応じて遮断するサーキットブレーカー
+
+    closed の間は直近 window 件の結果を記録し、min_calls 件以上でエラー率（slow_call_seconds を
+    超えた遅い応答も失敗として数える）が error_rate 以上になると open になる。
+    open の間はリクエストを通さず、open_seconds が経つと half-open にして試行リクエストを通す。
+    試行が成功すれば closed に戻り、失敗すれば再び open になる。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        min_calls: int = 5,
+        window: int = 20,
+        slow_call_seconds: Optional[float] = None,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            name: プロバイダー・モデルの名前（ログ・統計用）
+            error_rate: 回路を開くエラー率（0〜1）
+            min_calls: エラー率を判定する最小の件数
+            window: エラー率を計算する直近の件数
+            slow_call_seconds: 失敗として数える応答時間（秒、Noneで応答時間は見ない）
+            open_seconds: 回路を開いてから試行リクエストを通すまでの秒数
+            half_open_calls: half-open の間に同時に通す試行リクエスト数
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+        """
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = max(1, min_calls)
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self._clock = clock
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=max(self.min_calls, window))
+        self._opened_at = 0.0
+        self._trials = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        # 状態遷移の回数（遷移先の状態 → 回数）
+        self.transitions: Dict[str, int] = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str) -> None:
+        """状態を遷移させ、ログと回数に記録する（ロックを保持して呼び出す）"""
+        previous, self.state = self.state, state
+        self.transitions[state] += 1
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state != HALF_OPEN:
+            self._trials = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+        level = logging.WARNING if state == OPEN else logging.INFO
+        logger.log(level, "サーキットブレーカー %s: %s → %s（%s）", self.name, previous, state, reason)
+
+    def allow(self) -> bool:
+        """
+        リクエストを通してよいかどうかを返す（通す場合は呼び出し元が record か release を呼ぶ）
+
+        Returns:
+            bool: 通してよい場合はTrue
+        """
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, f"{self.open_seconds:g}秒経過")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, seconds: float, failed: bool) -> None:
+        """
+        通したリクエストの結果を記録する
+
+        Args:
+            seconds: 応答時間（秒）
+            failed: 失敗したかどうか
+        """
+        slow = self.slow_call_seconds is not None and seconds >= self.slow_call_seconds
+        bad = failed or slow
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            self.slow_calls += int(slow and not failed)
+            if self.state == HALF_OPEN:
+                if bad:
+                    self._transition(OPEN, "試行リクエストが失敗" if failed else "試行リクエストが遅延")
+                else:
+                    self._transition(CLOSED, "試行リクエストが成功")
+                return
+            if self.state != CLOSED:
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls:
+                rate = sum(self._outcomes) / len(self._outcomes)
+                if rate >= self.error_rate:
+                    self._transition(OPEN, f"直近{len(self._outcomes)}件のエラー率 {rate:.0%}")
+
+    def release(self) -> None:
+        """結果を記録せずに終わったリクエスト（キャンセルなど）の試行枠を返す"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        return (
+            f"{self.name}: {self.state} / リクエスト {self.calls}（失敗 {self.failures} / 遅延 {self.slow_calls}）"
+            f" / 遮断 {self.rejected} / open {self.transitions[OPEN]}回"
+        )
+
+
+class FallbackProvider(LLMProvider):
+    """
+    順序付きのプロバイダーのチェーンで、先頭から順に利用可能なプロバイダーにリクエストを送るLLMプロバイダー
+
+    プロバイダーごとのサーキットブレーカーが開いている間は、そのプロバイダーを待たずに次へ進む。
+    """
+
+    def __init__(self, providers: Sequence[Tuple[str, LLMProvider]], **breaker_options: Any):
+        """
+        初期化メソッド
+
+        Args:
+            providers: (名前, プロバイダー) のリスト（先頭から優先）
+            **breaker_options: CircuitBreaker に渡す追加オプション
+                （error_rate, slow_call_seconds, open_seconds など）
+        """
+        if not providers:
+            raise ValueError("フォールバックチェーンにプロバイダーが1つも指定されていません。")
+        self.providers = [provider for _, provider in providers]
+        self.breakers = [CircuitBreaker(name, **breaker_options) for name, _ in providers]
+        # 先頭以外のプロバイダーで応答した回数
+        self.failovers = 0
+        self._lock = threading.Lock()
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:  # type: ignore[override]
+        """チェーン内の全プロバイダーの累計トークン使用量"""
+        totals: Dict[str, int] = {}
+        for provider in self.providers:
+            for key, value in (getattr(provider, "usage_totals", None) or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @property
+    def continuations(self) -> int:  # type: ignore[override]
+        """チェーン内の全プロバイダーで続きを生成した累計回数"""
+        return sum(getattr(provider, "continuations", 0) for provider in self.providers)
+
+    @property
+    def truncated_outputs(self) -> int:  # type: ignore[override]
+        """チェーン内の全プロバイダーで途切れたままだった出力の件数"""
+        return sum(getattr(provider, "truncated_outputs", 0) for provider in self.providers)
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """チェーンの先頭のプロバイダーのモデル名"""
+        return model_name_of(self.providers[0])
+
+    def _call(self, func: Callable[[LLMProvider], T]) -> T:
+        """回路が閉じているプロバイダーに先頭から順にリクエストを送り、失敗したら次へ進む"""
+        errors: List[str] = []
+        last_error: Optional[BaseException] = None
+        for index, (provider, breaker) in enumerate(zip(self.providers, self.breakers)):
+            if not breaker.allow():
+                errors.append(f"{breaker.name}: 回路が開いています")
+                continue
+            start = time.perf_counter()
+            try:
+                result = func(provider)
+            except (Cancelled, DeadlineExceeded):
+                # ジョブの中断はプロバイダーの失敗として数えない
+                breaker.release()
+                raise
+            except Exception as e:
+                breaker.record(time.perf_counter() - start, failed=True)
+                errors.append(f"{breaker.name}: {e}")
+                last_error = e
+                continue
+            breaker.record(time.perf_counter() - start, failed=False)
+            if index:
+                with self._lock:
+                    self.failovers += 1
+            return result
+        raise ProvidersUnavailableError(
+            "全てのプロバイダーが利用できません: " + " / ".join(errors)
+        ) from last_error
+
+    @staticmethod
+    def _options(options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """各プロバイダーは自身のモデルを使うため、オプションのモデル指定を取り除く"""
+        if not options or "model" not in options:
+            return options
+        return {k: v for k, v in options.items() if k != "model"}
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        options = self._options(options)
+        return self._call(lambda p: p.chat(messages, options=options))
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        チェーン内のプロバイダーを使ってコンテンツを最適化する
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        options = self._options(options)
+        return self._call(lambda p: p.optimize_content(content, options=options))
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        チェーン内のプロバイダーを使って要約を生成する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        return self._call(lambda p: p.generate_summary(content, max_length=max_length))
+
+    def summary(self) -> str:
+        """プロバイダーごとのサーキットブレーカーの状態を1行ずつ並べた文字列を返す"""
+        lines = [breaker.summary() for breaker in self.breakers]
+        lines.append(f"フォールバックで応答した回数: {self.failovers}")
+        return "\n".join(lines)
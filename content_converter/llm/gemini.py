@@ -5,39 +5,251 @@ Gemini Provider module
 Google Gemini APIを使用したLLMプロバイダーの実装
 """
 
+import datetime
+import hashlib
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
-from .base import LLMProvider
+from ..core.tokens import estimate_tokens
+from ..deadline import DEFAULT_REQUEST_TIMEOUT, request_timeout, run_cancellable
+from .base import LLMProvider, Message, split_messages, summary_max_tokens
+from .prompts import GENERATE_SUMMARY_TEMPLATE, OPTIMIZE_CONTENT_TEMPLATE
+
+
+def _usage_count(usage: Any, name: str) -> int:
+    """usage_metadata から整数のトークン数を取り出す（取得できない場合は0）"""
+    value = getattr(usage, name, 0)
+    return value if isinstance(value, int) else 0
+
+
+def _is_truncated(response: Any) -> bool:
+    """レスポンスが出力トークン数の上限（MAX_TOKENS）で途切れたかどうか"""
+    try:
+        candidate = response.candidates[0]
+    except (AttributeError, IndexError, TypeError):
+        return False
+    reason = getattr(candidate, "finish_reason", None)
+    return getattr(reason, "name", reason) == "MAX_TOKENS"
 
 
 class GeminiProvider(LLMProvider):
     """Google Gemini APIを使用したLLMプロバイダー"""
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        cache_ttl: int = 600,
+        cache_min_tokens: int = 1024,
+        timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+    ):
         """
         GeminiProviderの初期化
 
         Args:
             api_key: Gemini APIキー。指定がない場合は環境変数GOOGLE_API_KEYから取得
             model: 使用するモデル名（デフォルト: gemini-2.5-flash）
+            cache_ttl: chat() で作成するコンテキストキャッシュの有効期間（秒）
+            cache_min_tokens: コンテキストキャッシュを作成する最小プレフィックス長（概算トークン数）
+            timeout: 1回のリクエストのタイムアウト秒数（ジョブの期限が近い場合はその残り時間）
         """
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             raise ValueError("Gemini APIキーが設定されていません。環境変数 GOOGLE_API_KEY を設定するか、--api-key 引数で指定してください。詳細は [Gemini API ドキュメント](https://ai.google.dev/docs/api_key) を参照してください。")
 
-        genai.configure(api_key=self.api_key)
+        # genai.configure() はプロセス全体の設定を書き換えるため使用せず、
+        # このインスタンスのAPIキーに紐づいたクライアントを個別に保持する
+        self.client = glm.GenerativeServiceClient(client_options={"api_key": self.api_key})
         self.model_name = model or 'gemini-2.5-flash'
-        self.model = genai.GenerativeModel(self.model_name)
+        self.model = self._create_model(self.model_name)
         self.safety_settings = {
             HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
             HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
             HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
         }
+        self.cache_ttl = cache_ttl
+        self.cache_min_tokens = cache_min_tokens
+        self.timeout = timeout
+        self._cache_client: Optional[glm.CacheServiceClient] = None
+        # プレフィックスのハッシュ → (キャッシュ名 または None, 有効期限)
+        self._context_caches: Dict[str, Tuple[Optional[str], float]] = {}
+        self._cache_lock = threading.Lock()
+
+    def _create_model(self, model_name: str, **kwargs: Any) -> Any:
+        """
+        このインスタンス専用のクライアントを使うモデルを生成する
+
+        Args:
+            model_name: モデル名
+            **kwargs: genai.GenerativeModel に渡す追加引数
+
+        Returns:
+            genai.GenerativeModel: 生成されたモデル
+
+        Raises:
+            RuntimeError: モデルにインスタンス専用のクライアントを設定できない場合
+        """
+        model = genai.GenerativeModel(model_name, **kwargs)
+        # SDKにはクライアントを渡す公開の引数がないため非公開属性を差し替える。
+        # 差し替えられない版で genai.configure() に頼るとキー間の分離が崩れるのでエラーにする
+        if not hasattr(model, "_client"):
+            raise RuntimeError(
+                "google-generativeai の GenerativeModel にクライアントを設定できません。"
+                "インスタンスごとのAPIキーを使うため、対応するバージョンの google-generativeai を使用してください。"
+            )
+        setattr(model, "_client", self.client)
+        return model
+
+    def _record_response_usage(self, response: Any) -> None:
+        """レスポンスの usage_metadata からトークン使用量を記録する"""
+        usage = getattr(response, "usage_metadata", None)
+        self.record_usage(
+            prompt_tokens=_usage_count(usage, "prompt_token_count"),
+            completion_tokens=_usage_count(usage, "candidates_token_count"),
+            cached_tokens=_usage_count(usage, "cached_content_token_count"),
+        )
+
+    def _generate(
+        self,
+        model: Any,
+        contents: Any,
+        generation_config: Any,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        generate_content を呼び出し、出力が上限で途切れた場合は続きを生成して連結する
+
+        Args:
+            model: 使用するモデル
+            contents: 送信する内容（プロンプト文字列または会話のリスト）
+            generation_config: 生成設定
+            options: 生成オプション（max_continuations）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+
+        def generate(turns: List[Message]) -> Tuple[str, bool]:
+            request = contents
+            if turns:
+                history = [{"role": "user", "parts": [contents]}] if isinstance(contents, str) else list(contents)
+                request = history + [
+                    {"role": "model" if t["role"] == "assistant" else "user", "parts": [t["content"]]}
+                    for t in turns
+                ]
+            timeout = request_timeout(self.timeout)
+            response = run_cancellable(
+                lambda: model.generate_content(
+                    request,
+                    generation_config=generation_config,
+                    safety_settings=self.safety_settings,
+                    request_options={"timeout": timeout} if timeout is not None else None,
+                )
+            )
+            self._record_response_usage(response)
+            if _is_truncated(response):
+                try:
+                    return response.text, True
+                except ValueError:
+                    # 1文字も生成されずに上限に達した場合はテキストを持たない
+                    return "", True
+            return response.text, False
+
+        return self.complete_with_continuations(generate, options)
+
+    def _get_context_cache(self, model_name: str, system: str, prefix: str) -> Optional[str]:
+        """
+        不変なプレフィックスに対応するコンテキストキャッシュを取得または作成する
+
+        プレフィックスが短すぎる場合や作成に失敗した場合はNoneを返し、
+        呼び出し側は暗黙的キャッシュ（プレフィックス一致）に頼る。
+
+        Args:
+            model_name: モデル名
+            system: システム指示
+            prefix: キャッシュ対象のプレフィックス
+
+        Returns:
+            Optional[str]: キャッシュ名（cachedContents/...）
+        """
+        if estimate_tokens(system + prefix) < self.cache_min_tokens:
+            return None
+        key = hashlib.sha256(f"{model_name}\0{system}\0{prefix}".encode("utf-8")).hexdigest()
+        with self._cache_lock:
+            now = time.time()
+            entry = self._context_caches.get(key)
+            # 期限切れ直前のキャッシュは使わず作り直す
+            if entry and entry[1] > now + 30:
+                return entry[0]
+            cached_content: Dict[str, Any] = {
+                "model": model_name if model_name.startswith("models/") else f"models/{model_name}",
+                "contents": [glm.Content(role="user", parts=[glm.Part(text=prefix)])],
+                "ttl": datetime.timedelta(seconds=self.cache_ttl),
+            }
+            if system:
+                cached_content["system_instruction"] = glm.Content(parts=[glm.Part(text=system)])
+            try:
+                if self._cache_client is None:
+                    self._cache_client = glm.CacheServiceClient(
+                        client_options={"api_key": self.api_key}
+                    )
+                created = self._cache_client.create_cached_content(
+                    glm.CreateCachedContentRequest(cached_content=glm.CachedContent(**cached_content))
+                )
+                name: Optional[str] = created.name
+            except Exception:
+                # モデルが明示的キャッシュに非対応などの場合は、有効期間中は再作成を試みない
+                name = None
+            self._context_caches[key] = (name, now + self.cache_ttl)
+            return name
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        システム指示とキャッシュ可能なメッセージをコンテキストキャッシュに載せ、
+        可変な入力だけをリクエストごとに送信する。キャッシュを作成できない場合も
+        プレフィックスを先頭に置くことで暗黙的キャッシュが効くようにする。
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション（model, temperature, max_tokens）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        options = options or {}
+        model_name = options.get("model") or self.model_name
+        system, prefix_parts, variable_parts = split_messages(messages)
+        prefix = "\n\n".join(prefix_parts)
+
+        cache_name = self._get_context_cache(model_name, system, prefix)
+        model = self._create_model(model_name) if cache_name else None
+        # キャッシュを指定する非公開属性がない版では、プレフィックスごと送信する
+        if model is not None and hasattr(model, "_cached_content"):
+            model._cached_content = cache_name
+            parts = variable_parts
+        else:
+            kwargs = {"system_instruction": system} if system else {}
+            model = self._create_model(model_name, **kwargs)
+            parts = prefix_parts + variable_parts
+
+        return self._generate(
+            model,
+            [{"role": "user", "parts": parts}],
+            genai.types.GenerationConfig(
+                temperature=options.get("temperature", 0.7),
+                max_output_tokens=options.get("max_tokens", 2048),
+            ),
+            options,
+        )
 
     def optimize_content(
         self, content: str, options: Optional[Dict[str, Any]] = None
@@ -63,27 +275,20 @@ class GeminiProvider(LLMProvider):
         # モデルが変更された場合は新しいモデルをロード
         if model_name != self.model_name:
             self.model_name = model_name
-            self.model = genai.GenerativeModel(self.model_name)
+            self.model = self._create_model(self.model_name)
 
-        prompt = f"""
-        以下のコンテンツを最適化してください。文章の流れを改善し、読みやすさを向上させてください。
-        ただし、元の内容や意図は保持してください。
+        prompt = OPTIMIZE_CONTENT_TEMPLATE.format(content=content)
 
-        コンテンツ:
-        {content}
-        """
-
-        response = self.model.generate_content(
+        return self._generate(
+            self.model,
             prompt,
-            generation_config=genai.types.GenerationConfig(
+            genai.types.GenerationConfig(
                 temperature=temperature,
                 max_output_tokens=max_tokens,
             ),
-            safety_settings=self.safety_settings,
+            options,
         )
 
-        return response.text
-
     def generate_summary(self, content: str, max_length: int = 100) -> str:
         """
         コンテンツの要約をGeminiを使用して生成する
@@ -95,21 +300,13 @@ class GeminiProvider(LLMProvider):
         Returns:
             str: 生成された要約
         """
-        prompt = f"""
-        以下のコンテンツを{max_length}文字以内で要約してください。
-        重要なポイントを簡潔にまとめてください。
-
-        コンテンツ:
-        {content}
-        """
+        prompt = GENERATE_SUMMARY_TEMPLATE.format(content=content, max_length=max_length)
 
-        response = self.model.generate_content(
+        return self._generate(
+            self.model,
             prompt,
-            generation_config=genai.types.GenerationConfig(
+            genai.types.GenerationConfig(
                 temperature=0.3,
-                max_output_tokens=100,
+                max_output_tokens=summary_max_tokens(max_length),
             ),
-            safety_settings=self.safety_settings,
-        )
-
-        return response.text 
\ No newline at end of file
+        ) 
\ No newline at end of file
@@ -0,0 +1,338 @@
+"""
+Key Pool module
+--------------
+
+複数のAPIキーをプールし、リクエストを分散するLLMプロバイダーを提供するモジュール
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+from ..deadline import POLL_INTERVAL, current_deadline
+from .base import LLMProvider, Message, model_name_of
+
+T = TypeVar("T")
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - google-api-core がない環境
+    google_exceptions = None  # type: ignore[assignment]
+
+# 例外の型やステータスコードで判定できない場合に使う、レート制限・クォータ超過を示すメッセージ
+_RATE_LIMIT_RE = re.compile(
+    r"\b429\b|rate[ _-]?limit|resource[ _]?exhausted|quota (?:exceeded|exhausted)|exceeded .*quota",
+    re.IGNORECASE,
+)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    例外がレート制限（429）またはクォータ超過を示すかどうかを判定する
+
+    Args:
+        error: 判定する例外
+
+    Returns:
+        bool: レート制限・クォータ超過の場合はTrue
+    """
+    # google.api_core.exceptions.ResourceExhausted / TooManyRequests（Gemini）
+    if google_exceptions is not None and isinstance(
+        error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+    ):
+        return True
+    # requests.HTTPError（OpenRouter）: ステータスコードがあればそれだけで判定する
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code == 429
+    # 型やステータスコードで判定できない例外（SDKがメッセージだけを返す場合など）
+    return bool(_RATE_LIMIT_RE.search(str(error)))
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    例外に付随するRetry-Afterヘッダーから待機秒数を取得する
+
+    Args:
+        error: 対象の例外
+
+    Returns:
+        Optional[float]: 待機秒数（取得できない場合はNone）
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    try:
+        value = headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class KeyState:
+    """プール内の1つのAPIキーの状態"""
+
+    def __init__(self, key: str, provider: LLMProvider):
+        """
+        初期化メソッド
+
+        Args:
+            key: APIキー
+            provider: このキー専用のLLMプロバイダー
+        """
+        self.key = key
+        self.provider = provider
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.request_times: Deque[float] = deque()
+        self.total_requests = 0
+        self.rate_limited = 0
+
+    @property
+    def label(self) -> str:
+        """ログ・統計用にマスクしたキー表記"""
+        return f"...{self.key[-4:]}" if len(self.key) > 4 else "****"
+
+
+class APIKeyPool:
+    """キーごとのレート制限とクールダウンを管理するAPIキープール"""
+
+    def __init__(
+        self,
+        states: Sequence[KeyState],
+        requests_per_minute: Optional[int] = None,
+        cooldown_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            states: キーの状態リスト
+            requests_per_minute: キーごとの1分あたり最大リクエスト数（Noneで無制限）
+            cooldown_seconds: 429/クォータエラー時にキーを休止させる秒数
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+        """
+        if not states:
+            raise ValueError("APIキーが1つも指定されていません。")
+        self.states = list(states)
+        self.requests_per_minute = requests_per_minute
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._cond = threading.Condition()
+
+    def _available_at(self, state: KeyState, now: float) -> float:
+        """キーが次に利用可能になる時刻を返す"""
+        available = state.cooldown_until
+        if self.requests_per_minute:
+            while state.request_times and state.request_times[0] <= now - 60.0:
+                state.request_times.popleft()
+            if len(state.request_times) >= self.requests_per_minute:
+                available = max(available, state.request_times[0] + 60.0)
+        return available
+
+    def acquire(self, timeout: Optional[float] = None) -> KeyState:
+        """
+        利用可能なキーを1つ確保する（全キーが使用不可の場合は待機する）
+
+        Args:
+            timeout: 最大待機秒数（Noneで無制限）
+
+        Returns:
+            KeyState: 確保したキー
+
+        Raises:
+            TimeoutError: 待機がタイムアウトした場合
+        """
+        with self._cond:
+            start = self._clock()
+            while True:
+                now = self._clock()
+                ready = [s for s in self.states if self._available_at(s, now) <= now]
+                if ready:
+                    # 処理中リクエストが少なく、最も長く使われていないキーを選ぶ
+                    state = min(ready, key=lambda s: (s.in_flight, s.last_used))
+                    state.in_flight += 1
+                    state.last_used = now
+                    state.total_requests += 1
+                    state.request_times.append(now)
+                    return state
+                wait = min(self._available_at(s, now) for s in self.states) - now
+                if timeout is not None:
+                    remaining = timeout - (now - start)
+                    if remaining <= 0:
+                        raise TimeoutError("利用可能なAPIキーがありません（全キーがレート制限中です）。")
+                    wait = min(wait, remaining)
+                self._cond.wait(max(wait, 0.01))
+
+    def release(self, state: KeyState, error: Optional[BaseException] = None) -> None:
+        """
+        確保したキーを返却する
+
+        Args:
+            state: 返却するキー
+            error: リクエストで発生した例外（レート制限の場合はクールダウンする）
+        """
+        with self._cond:
+            state.in_flight -= 1
+            if error is not None and is_rate_limit_error(error):
+                state.rate_limited += 1
+                cooldown = retry_after_seconds(error) or self.cooldown_seconds
+                state.cooldown_until = max(state.cooldown_until, self._clock() + cooldown)
+            self._cond.notify_all()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        キーごとの統計情報を返す
+
+        Returns:
+            List[Dict[str, Any]]: キーごとのリクエスト数・レート制限回数など
+        """
+        with self._cond:
+            now = self._clock()
+            return [
+                {
+                    "key": s.label,
+                    "requests": s.total_requests,
+                    "rate_limited": s.rate_limited,
+                    "in_flight": s.in_flight,
+                    "cooling_down": s.cooldown_until > now,
+                }
+                for s in self.states
+            ]
+
+
+class KeyPoolProvider(LLMProvider):
+    """複数のAPIキーにリクエストを分散するLLMプロバイダー"""
+
+    def __init__(
+        self,
+        provider_factory: Callable[[str], LLMProvider],
+        api_keys: Sequence[str],
+        requests_per_minute: Optional[int] = None,
+        cooldown_seconds: float = 60.0,
+        max_attempts: Optional[int] = None,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            provider_factory: APIキーを受け取り、そのキー専用のプロバイダーを生成する関数
+            api_keys: APIキーのリスト
+            requests_per_minute: キーごとの1分あたり最大リクエスト数
+            cooldown_seconds: 429/クォータエラー時のクールダウン秒数
+            max_attempts: レート制限時の最大試行回数（デフォルト: キー数+1）
+        """
+        keys = list(dict.fromkeys(k for k in api_keys if k))
+        # キーごとに独立したクライアントを持つプロバイダーを生成する
+        self.pool = APIKeyPool(
+            [KeyState(key, provider_factory(key)) for key in keys],
+            requests_per_minute=requests_per_minute,
+            cooldown_seconds=cooldown_seconds,
+        )
+        self.max_attempts = max_attempts or len(keys) + 1
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:  # type: ignore[override]
+        """プール内の全キーのプロバイダーの累計トークン使用量"""
+        totals: Dict[str, int] = {}
+        for state in self.pool.states:
+            for key, value in (getattr(state.provider, "usage_totals", None) or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    @property
+    def continuations(self) -> int:  # type: ignore[override]
+        """プール内の全キーのプロバイダーで続きを生成した累計回数"""
+        return sum(getattr(state.provider, "continuations", 0) for state in self.pool.states)
+
+    @property
+    def truncated_outputs(self) -> int:  # type: ignore[override]
+        """プール内の全キーのプロバイダーで途切れたままだった出力の件数"""
+        return sum(getattr(state.provider, "truncated_outputs", 0) for state in self.pool.states)
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """プール内のキーのプロバイダーのモデル名（全てのキーで同じモデルを使う）"""
+        return model_name_of(self.pool.states[0].provider)
+
+    def _call(self, func: Callable[[LLMProvider], T]) -> T:
+        """キーを確保してリクエストを実行し、レート制限時は別のキーで再試行する"""
+        last_error: Optional[BaseException] = None
+        for _ in range(self.max_attempts):
+            state = self._acquire()
+            try:
+                result = func(state.provider)
+            except Exception as e:
+                self.pool.release(state, e)
+                if not is_rate_limit_error(e):
+                    raise
+                last_error = e
+                continue
+            self.pool.release(state)
+            return result
+        assert last_error is not None
+        raise last_error
+
+    def _acquire(self) -> KeyState:
+        """キーを確保する（現在の期限がある場合は待機中もキャンセル・期限切れを確認する）"""
+        deadline = current_deadline()
+        if deadline is None:
+            return self.pool.acquire()
+        while True:
+            deadline.check()
+            try:
+                return self.pool.acquire(timeout=POLL_INTERVAL)
+            except TimeoutError:
+                continue
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        プール内のキーを使ってチャットメッセージ列から応答を生成する
+
+        キーごとのプロバイダーの chat に渡すため、プロンプトキャッシュ（Geminiのコンテキストキャッシュ、
+        OpenRouter の cache_control）もそのまま使われる。
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        return self._call(lambda p: p.chat(messages, options=options))
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        プール内のキーを使ってコンテンツを最適化する
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        return self._call(lambda p: p.optimize_content(content, options=options))
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        プール内のキーを使って要約を生成する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        return self._call(lambda p: p.generate_summary(content, max_length=max_length))
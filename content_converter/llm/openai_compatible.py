@@ -0,0 +1,296 @@
+"""
+OpenAI Compatible Provider module
+-------------------------------
+
+OpenAI互換のChat Completions API（llama.cpp server・Ollama・vLLMなど）を使用したLLMプロバイダーの実装
+"""
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..deadline import POLL_INTERVAL, current_deadline, request_timeout, run_cancellable
+from .base import LLMProvider, Message, summary_max_tokens
+from .openrouter import to_openai_messages
+from .prompts import GENERATE_SUMMARY_TEMPLATE, OPTIMIZE_CONTENT_TEMPLATE
+
+# llama.cpp server のデフォルトのエンドポイント
+# （Ollama は http://localhost:11434/v1、vLLM は http://localhost:8000/v1）
+DEFAULT_BASE_URL = "http://localhost:8080/v1"
+DEFAULT_MODEL = "local-model"
+
+
+def iter_sse_data(lines: Iterable[bytes]) -> Iterable[Dict[str, Any]]:
+    """
+    Server-Sent Events のストリームから data 行のJSONを順に返す
+
+    Args:
+        lines: レスポンスの行（requests.Response.iter_lines の戻り値）
+
+    Returns:
+        Iterable[Dict[str, Any]]: data 行のJSON（"[DONE]" で終了する）
+    """
+    for raw in lines:
+        if not raw:
+            continue
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    OpenAI互換APIを使用したLLMプロバイダー
+
+    同じマシンやLAN内のローカルサーバーを想定し、APIキーは省略できる。
+    requests.Session で接続を再利用し、parallel を指定するとサーバーの並列スロット数を超える
+    同時リクエストをクライアント側で待たせる（サーバー側の連続バッチ処理に収まる数だけ送る）。
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        stream: bool = False,
+        parallel: Optional[int] = None,
+        timeout: float = 600.0,
+        extra_body: Optional[Dict[str, Any]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        OpenAICompatibleProviderの初期化
+
+        Args:
+            api_key: APIキー（省略可）。指定がない場合は環境変数OPENAI_COMPATIBLE_API_KEYから取得
+            model: 使用するモデル名。指定がない場合は環境変数OPENAI_COMPATIBLE_MODELから取得
+            base_url: APIのベースURL。指定がない場合は環境変数OPENAI_COMPATIBLE_BASE_URL、
+                それもなければ llama.cpp server のデフォルト（http://localhost:8080/v1）
+            stream: ストリーミングで応答を受け取るかどうか
+            parallel: サーバーの並列スロット数（llama.cpp の --parallel など）。
+                指定すると同時リクエスト数をこの数に制限し、接続プールの大きさにも使う
+            timeout: リクエストのタイムアウト秒数（CPU推論は遅いため長めにしている。
+                ジョブの期限が近い場合はその残り時間）
+            extra_body: リクエストに追加するパラメータ（例: llama.cpp の {"cache_prompt": True}）
+            on_token: ストリーミング時に受信したテキスト片ごとに呼ばれるコールバック
+        """
+        self.api_key = api_key or os.getenv("OPENAI_COMPATIBLE_API_KEY")
+        self.model = model or os.getenv("OPENAI_COMPATIBLE_MODEL") or DEFAULT_MODEL
+        self.api_base = (
+            base_url or os.getenv("OPENAI_COMPATIBLE_BASE_URL") or DEFAULT_BASE_URL
+        ).rstrip("/")
+        self.stream = stream
+        self.timeout = timeout
+        self.extra_body = dict(extra_body or {})
+        self.on_token = on_token
+
+        self.headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            self.headers["Authorization"] = f"Bearer {self.api_key}"
+
+        # 接続を使い回してリクエストごとのTCP・TLSハンドシェイクを省く
+        pool_size = max(parallel or 0, 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(parallel) if parallel else None
+
+    def close(self) -> None:
+        """接続プールを閉じる"""
+        self.session.close()
+
+    def _record_response_usage(self, data: Dict[str, Any]) -> None:
+        """レスポンスのusageからトークン使用量を記録する"""
+        usage = data.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        self.record_usage(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=details.get("cached_tokens", 0),
+        )
+
+    def _complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Chat Completions APIを呼び出して生成されたテキストを返す
+
+        出力が max_tokens で途切れた場合は続きを生成して連結する。
+
+        Args:
+            messages: APIに送信するメッセージ
+            model: モデル名
+            temperature: 生成の多様性
+            max_tokens: 生成する最大トークン数
+            options: 生成オプション（max_continuations）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        return self.complete_with_continuations(
+            lambda turns: self._request(messages + turns, model, temperature, max_tokens),
+            options,
+        )
+
+    def _request(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Tuple[str, bool]:
+        """1回のリクエストを行い、生成されたテキストと上限で途切れたかどうかを返す"""
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **self.extra_body,
+        }
+        if self.stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+
+        self._acquire_slot()
+        try:
+            timeout = request_timeout(self.timeout)
+            responses: List[requests.Response] = []
+
+            def post() -> Tuple[str, bool]:
+                response = self.session.post(
+                    f"{self.api_base}/chat/completions",
+                    headers=self.headers,
+                    json=payload,
+                    timeout=timeout,
+                    stream=self.stream,
+                )
+                responses.append(response)
+                try:
+                    response.raise_for_status()
+                    if self.stream:
+                        return self._read_stream(response)
+                    data = response.json()
+                finally:
+                    response.close()
+                self._record_response_usage(data)
+                choice = data["choices"][0]
+                return choice["message"]["content"], choice.get("finish_reason") == "length"
+
+            def abort() -> None:
+                # 受信中のレスポンスを閉じてサーバーへの接続を切る
+                for response in responses:
+                    response.close()
+
+            return run_cancellable(post, on_cancel=abort)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def _acquire_slot(self) -> None:
+        """並列スロットを確保する（待機中もキャンセル・期限切れを確認する）"""
+        if self._slots is None:
+            return
+        deadline = current_deadline()
+        if deadline is None:
+            self._slots.acquire()
+            return
+        while not self._slots.acquire(timeout=POLL_INTERVAL):
+            deadline.check()
+
+    def _read_stream(self, response: requests.Response) -> Tuple[str, bool]:
+        """ストリーミングレスポンスのテキスト片を連結し、最後のチャンクのusageを記録する"""
+        parts: List[str] = []
+        usage: Optional[Dict[str, Any]] = None
+        finish_reason = None
+        for chunk in iter_sse_data(response.iter_lines()):
+            if chunk.get("usage"):
+                usage = chunk
+            for choice in chunk.get("choices") or []:
+                finish_reason = choice.get("finish_reason") or finish_reason
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    parts.append(text)
+                    if self.on_token is not None:
+                        self.on_token(text)
+        if usage is not None:
+            self._record_response_usage(usage)
+        return "".join(parts), finish_reason == "length"
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        不変なプレフィックスを先頭のメッセージとして送信するため、llama.cpp・vLLMなどの
+        プレフィックスキャッシュ（KVキャッシュの再利用）が効く。
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション（model, temperature, max_tokens）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        options = options or {}
+        return self._complete(
+            to_openai_messages(messages, cache_control=False),
+            options.get("model") or self.model,
+            options.get("temperature", 0.7),
+            options.get("max_tokens", 2048),
+            options,
+        )
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        コンテンツをOpenAI互換APIを使用して最適化する
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+                - model: 使用するモデル名
+                - temperature: 生成の多様性（0.0-1.0）
+                - max_tokens: 生成する最大トークン数
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        options = options or {}
+        prompt = OPTIMIZE_CONTENT_TEMPLATE.format(content=content)
+        return self._complete(
+            [{"role": "user", "content": prompt}],
+            options.get("model") or self.model,
+            options.get("temperature", 0.7),
+            options.get("max_tokens", 2048),
+            options,
+        )
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        コンテンツの要約をOpenAI互換APIを使用して生成する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        prompt = GENERATE_SUMMARY_TEMPLATE.format(content=content, max_length=max_length)
+        return self._complete(
+            [{"role": "user", "content": prompt}], self.model, 0.3, summary_max_tokens(max_length)
+        )
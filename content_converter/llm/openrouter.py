@@ -6,36 +6,159 @@ OpenRouter APIを使用したLLMプロバイダーの実装
 """
 
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
-from .base import LLMProvider
+from ..deadline import DEFAULT_REQUEST_TIMEOUT, request_timeout, run_cancellable
+from .base import LLMProvider, Message, summary_max_tokens
+from .prompts import GENERATE_SUMMARY_TEMPLATE, OPTIMIZE_CONTENT_TEMPLATE
+
+# cache_control によるプロンプトキャッシュの指定が必要なモデルの接頭辞
+# （OpenAI・DeepSeek等は自動的にプレフィックスキャッシュされる）
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/")
+
+
+def to_openai_messages(messages: List[Message], cache_control: bool) -> List[Dict[str, Any]]:
+    """
+    内部のメッセージ形式をOpenAI互換APIのmessages形式に変換する
+
+    cache_controlが有効な場合は、最後のキャッシュ可能なメッセージ（およびシステム指示）に
+    ``cache_control: {"type": "ephemeral"}`` を付与してキャッシュの区切りを示す。
+
+    Args:
+        messages: チャットメッセージのリスト
+        cache_control: cache_control を付与するかどうか
+
+    Returns:
+        List[Dict[str, Any]]: APIに送信するメッセージ
+    """
+    breakpoints = set()
+    if cache_control:
+        cacheable = [i for i, m in enumerate(messages) if m.get("cache") or m["role"] == "system"]
+        if cacheable:
+            breakpoints.add(cacheable[-1])
+
+    converted: List[Dict[str, Any]] = []
+    for i, message in enumerate(messages):
+        if i in breakpoints:
+            content: Any = [
+                {"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}
+            ]
+        else:
+            content = message["content"]
+        converted.append({"role": message["role"], "content": content})
+    return converted
 
 
 class OpenRouterProvider(LLMProvider):
     """OpenRouter APIを使用したLLMプロバイダー"""
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        api_base: Optional[str] = None,
+        timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+    ):
         """
         OpenRouterProviderの初期化
 
         Args:
             api_key: OpenRouter APIキー。指定がない場合は環境変数OPENROUTER_API_KEYから取得
             model: 使用するモデル名（デフォルト: anthropic/claude-3-opus-20240229）
+            api_base: APIのベースURL。指定がない場合は環境変数OPENROUTER_API_BASE、
+                それもなければ https://openrouter.ai/api/v1
+            timeout: 1回のリクエストのタイムアウト秒数（ジョブの期限が近い場合はその残り時間）
         """
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError("OpenRouter APIキーが設定されていません。環境変数OPENROUTER_API_KEYを設定するか、api_key引数を指定してください。")
 
         self.model = model or "anthropic/claude-3-opus-20240229"
-        self.api_base = "https://openrouter.ai/api/v1"
+        self.api_base = (
+            api_base or os.getenv("OPENROUTER_API_BASE") or "https://openrouter.ai/api/v1"
+        ).rstrip("/")
+        self.timeout = timeout
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "https://github.com/centervil/Content-Converter",
             "X-Title": "Content Converter",
         }
 
+    def _record_response_usage(self, data: Dict[str, Any]) -> None:
+        """レスポンスのusageからトークン使用量を記録する"""
+        usage = data.get("usage") or {}
+        details = usage.get("prompt_tokens_details") or {}
+        self.record_usage(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=details.get("cached_tokens", 0),
+        )
+
+    def _complete(self, payload: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Chat Completions APIを呼び出し、出力が max_tokens で途切れた場合は続きを生成して連結する
+
+        Args:
+            payload: リクエストのJSON
+            options: 生成オプション（max_continuations）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+
+        def generate(turns: List[Message]) -> Tuple[str, bool]:
+            body = payload
+            if turns:
+                body = dict(payload, messages=payload["messages"] + turns)
+            timeout = request_timeout(self.timeout)
+            response = run_cancellable(
+                lambda: requests.post(
+                    f"{self.api_base}/chat/completions",
+                    headers=self.headers,
+                    json=body,
+                    timeout=timeout,
+                )
+            )
+            response.raise_for_status()
+
+            data = response.json()
+            self._record_response_usage(data)
+            choice = data["choices"][0]
+            return choice["message"]["content"], choice.get("finish_reason") == "length"
+
+        return self.complete_with_continuations(generate, options)
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        不変なプレフィックスを先頭のメッセージとして送信し、Anthropic・Geminiモデルでは
+        cache_control でキャッシュ区切りを指定する。
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション（model, temperature, max_tokens）
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        options = options or {}
+        model = options.get("model") or self.model
+        cache_control = model.startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+        return self._complete(
+            {
+                "model": model,
+                "messages": to_openai_messages(messages, cache_control),
+                "temperature": options.get("temperature", 0.7),
+                "max_tokens": options.get("max_tokens", 2048),
+                "usage": {"include": True},
+            },
+            options,
+        )
+
     def optimize_content(
         self, content: str, options: Optional[Dict[str, Any]] = None
     ) -> str:
@@ -57,27 +180,17 @@ class OpenRouterProvider(LLMProvider):
         temperature = options.get("temperature", 0.7)
         max_tokens = options.get("max_tokens", 2048)
 
-        prompt = f"""
-        以下のコンテンツを最適化してください。文章の流れを改善し、読みやすさを向上させてください。
-        ただし、元の内容や意図は保持してください。
-
-        コンテンツ:
-        {content}
-        """
+        prompt = OPTIMIZE_CONTENT_TEMPLATE.format(content=content)
 
-        response = requests.post(
-            f"{self.api_base}/chat/completions",
-            headers=self.headers,
-            json={
+        return self._complete(
+            {
                 "model": model,
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": temperature,
                 "max_tokens": max_tokens,
             },
+            options,
         )
-        response.raise_for_status()
-
-        return response.json()["choices"][0]["message"]["content"]
 
     def generate_summary(self, content: str, max_length: int = 100) -> str:
         """
@@ -90,24 +203,13 @@ class OpenRouterProvider(LLMProvider):
         Returns:
             str: 生成された要約
         """
-        prompt = f"""
-        以下のコンテンツを{max_length}文字以内で要約してください。
-        重要なポイントを簡潔にまとめてください。
+        prompt = GENERATE_SUMMARY_TEMPLATE.format(content=content, max_length=max_length)
 
-        コンテンツ:
-        {content}
-        """
-
-        response = requests.post(
-            f"{self.api_base}/chat/completions",
-            headers=self.headers,
-            json={
+        return self._complete(
+            {
                 "model": self.model,
                 "messages": [{"role": "user", "content": prompt}],
                 "temperature": 0.3,
-                "max_tokens": 100,
-            },
-        )
-        response.raise_for_status()
-
-        return response.json()["choices"][0]["message"]["content"] 
\ No newline at end of file
+                "max_tokens": summary_max_tokens(max_length),
+            }
+        ) 
\ No newline at end of file
@@ -5,6 +5,7 @@ Prompt Templates module
 LLMプロバイダーで使用するプロンプトテンプレートを管理するモジュール
 """
 
+import textwrap
 from typing import Dict, Any
 
 
@@ -15,10 +16,13 @@ class PromptTemplate:
         """
         プロンプトテンプレートの初期化
 
+        インデントされた三重引用符の文字列をそのまま渡せるよう、共通のインデントと
+        前後の空行を取り除いて保持する（余分な空白をトークンとして送信しないため）。
+
         Args:
             template: プロンプトテンプレート文字列
         """
-        self.template = template
+        self.template = textwrap.dedent(template).strip("\n")
 
     def format(self, **kwargs: Any) -> str:
         """
@@ -59,6 +63,32 @@ class GenerateSummaryTemplate(PromptTemplate):
         """)
 
 
+class GenerateSummariesTemplate(PromptTemplate):
+    """複数のコンテンツの要約を1回のリクエストで生成するためのプロンプトテンプレート"""
+
+    def __init__(self):
+        super().__init__("""
+        以下の{count}件のコンテンツを、それぞれ{max_length}文字以内で要約してください。
+        重要なポイントを簡潔にまとめてください。
+        - 各要約の直前に、区切り行 `=====SUMMARY: 番号=====` を単独の行で出力してください
+        - 番号はコンテンツの `=====CONTENT: 番号=====` の番号と同じにしてください
+        - 区切り行以外の前置きや説明は出力しないでください
+        """)
+
+
+class ContinueOutputTemplate(PromptTemplate):
+    """出力トークン数の上限で途切れた出力の続きを求めるプロンプトテンプレート"""
+
+    def __init__(self):
+        super().__init__("""
+        出力が上限に達して途中で途切れました。直前の出力の最後の文字の直後から、続きだけを出力してください。
+        - すでに出力した部分を繰り返さないでください
+        - 前置き・説明・コードブロックの囲みを追加しないでください
+        """)
+
+
 # プロンプトテンプレートのインスタンス
 OPTIMIZE_CONTENT_TEMPLATE = OptimizeContentTemplate()
-GENERATE_SUMMARY_TEMPLATE = GenerateSummaryTemplate() 
\ No newline at end of file
+GENERATE_SUMMARY_TEMPLATE = GenerateSummaryTemplate()
+GENERATE_SUMMARIES_TEMPLATE = GenerateSummariesTemplate()
+CONTINUE_OUTPUT_TEMPLATE = ContinueOutputTemplate() 
\ No newline at end of file
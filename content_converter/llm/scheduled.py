@@ -0,0 +1,117 @@
+"""
+Scheduled Provider module
+-----------------------
+
+優先度スケジューラーを通してリクエストを送るLLMプロバイダーを提供するモジュール
+"""
+
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from ..core.tokens import estimate_tokens
+from ..scheduler import BULK, PriorityScheduler, current_priority
+from .base import LLMProvider, Message, model_name_of, summary_max_tokens
+
+T = TypeVar("T")
+
+# max_tokens が指定されていないリクエストの出力トークン数の見込み
+DEFAULT_OUTPUT_TOKENS = 2048
+
+
+class ScheduledProvider(LLMProvider):
+    """
+    リクエストごとに優先度スケジューラーの実行許可を得てから、内側のプロバイダーに送るLLMプロバイダー
+
+    優先度クラスは priority_scope で設定したもの（設定がなければ default_priority）を使う。
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        scheduler: PriorityScheduler,
+        default_priority: str = BULK,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            provider: 実際にリクエストを送るプロバイダー
+            scheduler: 優先度スケジューラー（複数のプロバイダーで共有してもよい）
+            default_priority: 優先度クラスが設定されていないリクエストのクラス
+        """
+        self.provider = provider
+        self.scheduler = scheduler
+        self.default_priority = default_priority
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:  # type: ignore[override]
+        """内側のプロバイダーの累計トークン使用量"""
+        return getattr(self.provider, "usage_totals", None) or {}
+
+    @property
+    def continuations(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで続きを生成した累計回数"""
+        return getattr(self.provider, "continuations", 0)
+
+    @property
+    def truncated_outputs(self) -> int:  # type: ignore[override]
+        """内側のプロバイダーで途切れたままだった出力の件数"""
+        return getattr(self.provider, "truncated_outputs", 0)
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """内側のプロバイダーのモデル名"""
+        return model_name_of(self.provider)
+
+    def _call(self, text: str, max_tokens: int, func: Callable[[LLMProvider], T]) -> T:
+        """実行許可を得てからリクエストを送る"""
+        priority = current_priority() or self.default_priority
+        with self.scheduler.slot(priority, estimate_tokens(text) + max_tokens):
+            return func(self.provider)
+
+    def chat(self, messages: List[Message], options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        チャットメッセージ列から応答を生成する
+
+        Args:
+            messages: チャットメッセージのリスト
+            options: 生成オプション
+
+        Returns:
+            str: 生成されたテキスト
+        """
+        text = "\n\n".join(m["content"] for m in messages)
+        max_tokens = (options or {}).get("max_tokens", DEFAULT_OUTPUT_TOKENS)
+        return self._call(text, max_tokens, lambda p: p.chat(messages, options=options))
+
+    def optimize_content(
+        self, content: str, options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        スケジューラーを通してコンテンツを最適化する
+
+        Args:
+            content: 最適化するコンテンツテキスト
+            options: 最適化オプション
+
+        Returns:
+            str: 最適化されたコンテンツ
+        """
+        max_tokens = (options or {}).get("max_tokens", DEFAULT_OUTPUT_TOKENS)
+        return self._call(content, max_tokens, lambda p: p.optimize_content(content, options=options))
+
+    def generate_summary(self, content: str, max_length: int = 100) -> str:
+        """
+        スケジューラーを通して要約を生成する
+
+        Args:
+            content: 要約するコンテンツテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        return self._call(
+            content,
+            summary_max_tokens(max_length),
+            lambda p: p.generate_summary(content, max_length=max_length),
+        )
@@ -0,0 +1,274 @@
+"""
+Pipeline module
+--------------
+
+有界キューでつないだステージをスレッドで並行に実行するストリーミングパイプラインを提供するモジュール
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Generator, Iterable, List, NamedTuple, Optional, Sequence
+
+# 各ステージの入力キューのデフォルトの大きさ
+DEFAULT_QUEUE_SIZE = 64
+
+# キューの終端を表す値
+_END = object()
+# 停止要求を確認する間隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+class Stage(NamedTuple):
+    """パイプラインの1つのステージ"""
+
+    # ステージ名（統計の表示に使う）
+    name: str
+    # 1件を処理して次のステージに渡す値を返す関数
+    func: Callable[[Any], Any]
+    # 同時に処理するスレッド数
+    workers: int = 1
+    # 入力キューの大きさ（省略時はパイプラインのデフォルト）
+    queue_size: Optional[int] = None
+    # 停止要求後にまだ処理していない項目を取り消すかどうか
+    # （LLMの結果を捨てないよう、書き込みなどの後段では False にする）
+    cancellable: bool = True
+
+
+class PipelineResult(NamedTuple):
+    """パイプラインを通過した1件の結果"""
+
+    # 最後に処理したステージの戻り値（失敗・取り消しの場合はその直前の値）
+    value: Any
+    # 失敗した場合の例外
+    error: Optional[BaseException] = None
+    # 失敗または取り消されたステージ名
+    stage: Optional[str] = None
+    # 停止要求により取り消されたかどうか
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """全ステージを通過したかどうか"""
+        return self.error is None and not self.cancelled
+
+
+class StageStats:
+    """ステージごとの処理件数・稼働時間・入力キューの深さを集計するクラス"""
+
+    def __init__(self, name: str, workers: int, capacity: int):
+        """
+        初期化メソッド
+
+        Args:
+            name: ステージ名
+            workers: 同時に処理するスレッド数
+            capacity: 入力キューの大きさ
+        """
+        self.name = name
+        self.workers = workers
+        self.capacity = capacity
+        self.processed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._queue: Optional["queue.Queue[Any]"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        """現在の入力キューの深さ"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _record_depth(self) -> None:
+        depth = self.depth
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+
+    def _record(self, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.processed += 1
+            self.failed += int(failed)
+            self.busy_seconds += seconds
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        return (
+            f"{self.name}: 処理 {self.processed}（失敗 {self.failed} / 取り消し {self.cancelled}）"
+            f" / 待ち行列 最大 {self.max_depth}/{self.capacity}"
+            f" / 稼働 {self.busy_seconds:.1f}秒（{self.workers}並列）"
+        )
+
+
+class _Failed(NamedTuple):
+    """後続のステージを素通りさせる、失敗または取り消された項目"""
+
+    result: PipelineResult
+
+
+class Pipeline:
+    """
+    ステージを有界キューでつなぎ、入力を1件ずつ流すパイプライン
+
+    各ステージは自分の入力キューから取り出した項目を処理して次のステージのキューに入れる。
+    キューがいっぱいになると前段が待つため（バックプレッシャー）、入力がいくら多くても
+    同時にメモリ上にある項目はキューの大きさとスレッド数の合計までに収まる。
+    あるステージで例外が発生した項目は、後続のステージを飛ばして失敗として出力される。
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        初期化メソッド
+
+        Args:
+            stages: ステージのリスト（先頭から順に処理する）
+            queue_size: 各ステージの入力キューのデフォルトの大きさ
+        """
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage")
+        self.stages = [stage._replace(workers=max(1, stage.workers)) for stage in stages]
+        self.stats = [
+            StageStats(stage.name, stage.workers, max(1, stage.queue_size or queue_size))
+            for stage in self.stages
+        ]
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """入力の投入を止め、取り消し可能なステージのまだ処理していない項目を取り消す"""
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        """停止要求を受けたかどうか"""
+        return self._stop.is_set()
+
+    def depths(self) -> Dict[str, int]:
+        """ステージ名から現在の入力キューの深さへのマッピングを返す（実行中の調整用）"""
+        return {stats.name: stats.depth for stats in self.stats}
+
+    def summary(self) -> str:
+        """全ステージの集計結果を1行ずつ並べた文字列を返す"""
+        return "\n".join(stats.summary() for stats in self.stats)
+
+    def run(self, source: Iterable[Any]) -> Generator[PipelineResult, None, None]:
+        """
+        パイプラインを実行し、最終ステージを通過した順に結果を返す
+
+        呼び出し元が結果を受け取らない間は出力キューが埋まり、パイプライン全体が待つ。
+
+        Args:
+            source: 入力（必要な分だけ順に読み出す）
+
+        Returns:
+            Generator[PipelineResult, None, None]: 結果（途中で close() すると残りの処理を止める）
+        """
+        queues: List["queue.Queue[Any]"] = [
+            queue.Queue(maxsize=stats.capacity) for stats in self.stats
+        ]
+        output: "queue.Queue[Any]" = queue.Queue(maxsize=self.stats[-1].capacity)
+        for stats, q in zip(self.stats, queues):
+            stats._queue = q
+
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], output), daemon=True)]
+        remaining = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+        for index, stage in enumerate(self.stages):
+            next_queue = queues[index + 1] if index + 1 < len(queues) else output
+            next_workers = self.stages[index + 1].workers if index + 1 < len(queues) else 1
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(index, queues[index], next_queue, next_workers, remaining, lock),
+                        daemon=True,
+                    )
+                )
+        for thread in threads:
+            thread.start()
+
+        finished = False
+        try:
+            while True:
+                item = output.get()
+                if item is _END:
+                    finished = True
+                    return
+                yield item.result if isinstance(item, _Failed) else PipelineResult(item)
+        finally:
+            if not finished:
+                # 途中で打ち切られた場合は停止させ、スレッドが終了できるよう出力を読み捨てる
+                self.stop()
+                while output.get() is not _END:
+                    pass
+            for thread in threads:
+                thread.join()
+
+    def _feed(self, source: Iterable[Any], first: "queue.Queue[Any]", output: "queue.Queue[Any]") -> None:
+        """入力を先頭のキューに投入するスレッド"""
+        try:
+            for item in source:
+                while True:
+                    if self._stop.is_set():
+                        # 取り出してしまった項目は取り消しとして出力する
+                        with self.stats[0]._lock:
+                            self.stats[0].cancelled += 1
+                        output.put(_Failed(PipelineResult(item, stage=self.stats[0].name, cancelled=True)))
+                        return
+                    try:
+                        first.put(item, timeout=_POLL_INTERVAL)
+                    except queue.Full:
+                        continue
+                    self.stats[0]._record_depth()
+                    break
+                if self._stop.is_set():
+                    return
+        except Exception as e:
+            # 入力の列挙自体の失敗は1件の失敗として出力し、以降の投入を止める
+            output.put(_Failed(PipelineResult(None, error=e, stage="source")))
+        finally:
+            for _ in range(self.stages[0].workers):
+                first.put(_END)
+
+    def _work(
+        self,
+        index: int,
+        inbox: "queue.Queue[Any]",
+        outbox: "queue.Queue[Any]",
+        next_workers: int,
+        remaining: List[int],
+        lock: threading.Lock,
+    ) -> None:
+        """1つのステージの項目を処理するスレッド"""
+        stage = self.stages[index]
+        stats = self.stats[index]
+        next_stats = self.stats[index + 1] if index + 1 < len(self.stats) else None
+        while True:
+            item = inbox.get()
+            if item is _END:
+                break
+            if not isinstance(item, _Failed):
+                if stage.cancellable and self._stop.is_set():
+                    with stats._lock:
+                        stats.cancelled += 1
+                    item = _Failed(PipelineResult(item, stage=stage.name, cancelled=True))
+                else:
+                    start = time.perf_counter()
+                    try:
+                        item = stage.func(item)
+                    except Exception as e:
+                        stats._record(time.perf_counter() - start, True)
+                        item = _Failed(PipelineResult(item, error=e, stage=stage.name))
+                    else:
+                        stats._record(time.perf_counter() - start, False)
+            outbox.put(item)
+            if next_stats is not None:
+                next_stats._record_depth()
+
+        # 最後に終了したスレッドが次のステージに終端を伝える
+        with lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_END)
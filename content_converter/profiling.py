@@ -0,0 +1,324 @@
+"""
+Profiling module
+---------------
+
+変換のステージごとに cProfile と tracemalloc で計測し、.pstats と読みやすい要約を書き出すモジュール
+"""
+
+import contextlib
+import cProfile
+import dis
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+T = TypeVar("T")
+
+# 要約に表示する関数・メモリ確保箇所の数
+DEFAULT_TOP = 15
+# tracemalloc で記録するスタックの深さ（ステージの関数まで遡れるよう深めにする）
+DEFAULT_MEMORY_FRAMES = 64
+
+SUMMARY_NAME = "summary.txt"
+
+# Python 3.12 以降の cProfile は sys.monitoring を使うため、プロセス内で同時に有効にできるのは1つだけ
+# （2つ目の enable() は ValueError になる）。その場合は計測中の別の呼び出しと重なった呼び出しを計測しない。
+EXCLUSIVE_PROFILING = sys.version_info >= (3, 12)
+_profiling_lock = threading.Lock()
+
+
+def max_rss_bytes() -> Optional[int]:
+    """プロセスの最大常駐メモリ（取得できない場合はNone）"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KiB、macOS はバイト単位
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def format_bytes(size: float) -> str:
+    """バイト数を読みやすい単位の文字列にする"""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _short_path(path: str) -> str:
+    """ファイルパスを末尾の2階層に縮める"""
+    parts = path.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+class StageProfile:
+    """1つのステージの計測結果"""
+
+    def __init__(self, name: str):
+        """
+        初期化メソッド
+
+        Args:
+            name: ステージ名
+        """
+        self.name = name
+        self.calls = 0
+        self.profiled = 0
+        # 計測する番だったが、別のステージの計測と重なったため計測しなかった呼び出しの数
+        self.overlapped = 0
+        self.seconds = 0.0
+        self.profiles: List[cProfile.Profile] = []
+        # メモリ確保箇所 (ファイル, 行) → [呼び出し終了時に残っていたバイト数, 個数]
+        self.allocations: Dict[Tuple[str, int], List[int]] = {}
+
+    def stats(self) -> Optional[pstats.Stats]:
+        """スレッドごとのプロファイルをまとめた統計（計測していない場合はNone）"""
+        profiles = [p for p in self.profiles if p.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+class Profiler:
+    """
+    ステージごとに cProfile と tracemalloc で計測するプロファイラー
+
+    cProfile はスレッドごとに計測するため、ステージの関数の呼び出し中の処理だけが
+    そのステージに計上される。tracemalloc はプロセス全体で記録し、呼び出しの前後の
+    スナップショットの差分のうち、スタックにそのステージの関数を含む確保だけを計上する。
+
+    sample_every を2以上にすると、各ステージの sample_every 回に1回の呼び出しだけを計測する。
+    この場合はメモリの計測（tracemalloc）を行わず、最大常駐メモリだけを報告するため、
+    本番のバッチ変換で常に有効にしておける程度の負荷で済む。
+
+    Python 3.12 以降は cProfile をプロセス内で同時に1つしか有効にできないため、
+    計測中の別の呼び出しと重なった呼び出しは計測せずに件数だけを数える（EXCLUSIVE_PROFILING を参照）。
+    この場合、計測中の処理時間には同時に動いている他のスレッドの処理も含まれる。
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        sample_every: int = 1,
+        memory: Optional[bool] = None,
+        memory_frames: int = DEFAULT_MEMORY_FRAMES,
+        top: int = DEFAULT_TOP,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            output_dir: .pstats と要約を書き出すディレクトリ
+            sample_every: 何回に1回の呼び出しを計測するか（1で全ての呼び出し）
+            memory: tracemalloc でメモリ確保を計測するかどうか（省略時はサンプリングしない場合のみ）
+            memory_frames: tracemalloc で記録するスタックの深さ
+            top: 要約に表示する関数・メモリ確保箇所の数
+        """
+        self.output_dir = output_dir
+        self.sample_every = max(1, sample_every)
+        self.memory = self.sample_every == 1 if memory is None else memory
+        self.memory_frames = memory_frames
+        self.top = top
+        self.stages: Dict[str, StageProfile] = {}
+        self.traced_peak = 0
+        self._started_tracing = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """計測を開始する（メモリを計測する場合は tracemalloc を開始する）"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        """計測を終了する"""
+        if tracemalloc.is_tracing():
+            self.traced_peak = max(self.traced_peak, tracemalloc.get_traced_memory()[1])
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _stage(self, name: str) -> StageProfile:
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = StageProfile(name)
+            return stage
+
+    def _thread_profile(self, stage: StageProfile) -> cProfile.Profile:
+        """このスレッドでステージを計測する cProfile.Profile（スレッドごとに1つ）"""
+        profiles: Dict[str, cProfile.Profile] = self._local.__dict__.setdefault("profiles", {})
+        profile = profiles.get(stage.name)
+        if profile is None:
+            profile = profiles[stage.name] = cProfile.Profile()
+            with self._lock:
+                stage.profiles.append(profile)
+        return profile
+
+    @contextlib.contextmanager
+    def stage(self, name: str, code: Any = None) -> Iterator[None]:
+        """
+        with ブロックの処理をステージとして計測する
+
+        Args:
+            name: ステージ名
+            code: メモリ確保をステージに計上する目印の関数（省略時はブロック中の全ての確保を計上する）
+        """
+        stage = self._stage(name)
+        with self._lock:
+            stage.calls += 1
+            sampled = (stage.calls - 1) % self.sample_every == 0
+        exclusive = sampled and EXCLUSIVE_PROFILING
+        if exclusive and not _profiling_lock.acquire(blocking=False):
+            with self._lock:
+                stage.overlapped += 1
+            sampled = exclusive = False
+        if not sampled:
+            yield
+            return
+
+        try:
+            with self._lock:
+                stage.profiled += 1
+            tracing = self.memory and tracemalloc.is_tracing()
+            before = tracemalloc.take_snapshot() if tracing else None
+            profile = self._thread_profile(stage)
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    stage.seconds += elapsed
+                if before is not None:
+                    self._record_allocations(stage, before, code)
+        finally:
+            if exclusive:
+                _profiling_lock.release()
+
+    def _record_allocations(self, stage: StageProfile, before: tracemalloc.Snapshot, code: Any) -> None:
+        """呼び出しの前後のスナップショットの差分のうち、ステージの関数から確保されたものを計上する"""
+        after = tracemalloc.take_snapshot()
+        self.traced_peak = max(self.traced_peak, tracemalloc.get_traced_memory()[1])
+        marker = _code_range(code)
+        # Snapshot.filter_traces は遅いため、スナップショット自体の確保はここで読み飛ばす
+        ignore = (tracemalloc.__file__, __file__)
+        with self._lock:
+            for diff in after.compare_to(before, "traceback"):
+                site = diff.traceback[-1]
+                if diff.size_diff <= 0 or site.filename in ignore:
+                    continue
+                if marker is not None and not any(_in_range(frame, marker) for frame in diff.traceback):
+                    continue
+                entry = stage.allocations.setdefault((site.filename, site.lineno), [0, 0])
+                entry[0] += diff.size_diff
+                entry[1] += max(0, diff.count_diff)
+
+    def wrap(self, name: str, func: Callable[..., T]) -> Callable[..., T]:
+        """
+        関数の呼び出しをステージとして計測するようにする（パイプラインのステージの関数に使う）
+
+        Args:
+            name: ステージ名
+            func: 計測する関数
+
+        Returns:
+            Callable[..., T]: 計測しながら func を呼び出す関数
+        """
+
+        def profiled(*args: Any, **kwargs: Any) -> T:
+            with self.stage(name, func):
+                return func(*args, **kwargs)
+
+        return profiled
+
+    def write(self) -> str:
+        """
+        ステージごとの .pstats と要約（summary.txt）を書き出す
+
+        Returns:
+            str: 要約ファイルのパス
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        for stage in self.stages.values():
+            stats = stage.stats()
+            if stats is not None:
+                stats.dump_stats(os.path.join(self.output_dir, f"{stage.name}.pstats"))
+        path = os.path.join(self.output_dir, SUMMARY_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        return path
+
+    def summary(self) -> str:
+        """読みやすい要約の文字列を返す"""
+        out = io.StringIO()
+        mode = "全ての呼び出し" if self.sample_every == 1 else f"{self.sample_every}回に1回の呼び出し"
+        out.write(f"プロファイル（計測対象: {mode}）\n")
+        for stage in self.stages.values():
+            overlapped = f"（重なって計測しなかった呼び出し {stage.overlapped}）" if stage.overlapped else ""
+            out.write(
+                f"\n== {stage.name}: 呼び出し {stage.calls} / 計測 {stage.profiled}{overlapped}"
+                f" / 計測した時間 {stage.seconds:.3f}秒 ==\n"
+            )
+            stats = stage.stats()
+            if stats is not None:
+                out.write("累積時間の上位（累積 / 関数内 / 呼び出し回数 / 関数）:\n")
+                rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # type: ignore[attr-defined]
+                for (filename, lineno, function), (_, calls, tottime, cumtime, _) in rows[: self.top]:
+                    out.write(
+                        f"  {cumtime:9.3f}s {tottime:9.3f}s {calls:>8} "
+                        f"{_short_path(filename)}:{lineno}({function})\n"
+                    )
+            if stage.allocations:
+                out.write("メモリ確保の上位（呼び出しの終了時に残っていたもの）:\n")
+                top = sorted(stage.allocations.items(), key=lambda item: item[1][0], reverse=True)
+                for (filename, lineno), (size, count) in top[: self.top]:
+                    out.write(f"  {format_bytes(size):>12} ({count}) {_short_path(filename)}:{lineno}\n")
+
+        memory = []
+        if self.traced_peak:
+            memory.append(f"tracemalloc のピーク {format_bytes(self.traced_peak)}")
+        rss = max_rss_bytes()
+        if rss is not None:
+            memory.append(f"最大常駐メモリ {format_bytes(rss)}")
+        if memory:
+            out.write(f"\nメモリ: {' / '.join(memory)}\n")
+        return out.getvalue()
+
+
+def _code_range(func: Any) -> Optional[Tuple[str, int, int]]:
+    """関数のファイル名と行の範囲（関数でない場合はNone）"""
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return None
+    # co_lines は Python 3.10 以降にしかないため dis.findlinestarts を使う
+    lines = [line for _, line in dis.findlinestarts(code) if line is not None]
+    return code.co_filename, min(lines, default=code.co_firstlineno), max(lines, default=code.co_firstlineno)
+
+
+def _in_range(frame: tracemalloc.Frame, marker: Tuple[str, int, int]) -> bool:
+    filename, first, last = marker
+    return frame.filename == filename and first <= frame.lineno <= last
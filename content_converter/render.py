@@ -0,0 +1,337 @@
+"""
+Render module
+------------
+
+変換後のマークダウンをHTMLにレンダリングするモジュール
+
+markdown.Markdown のインスタンスはスレッドごとに1つだけ作成し、文書ごとに reset() して再利用する。
+拡張機能の名前と設定の解決はレンダラーの作成時に一度だけ行う。
+"""
+
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import markdown
+
+# デフォルトで有効にする拡張機能（表・脚注・コードブロックなどと見出しのid）
+DEFAULT_EXTENSIONS = ("extra", "sane_lists", "toc")
+
+
+class RenderSettings(NamedTuple):
+    """HTMLレンダリングの設定（ワーカープロセスに一度だけ渡す。ハッシュ可能にするため設定はタプルで持つ）"""
+
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS
+    # (拡張機能名, ((設定名, 値), ...)) のタプル
+    extension_configs: Tuple[Tuple[str, Tuple[Tuple[str, Any], ...]], ...] = ()
+    output_format: str = "html"
+
+    @classmethod
+    def create(
+        cls,
+        extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+        extension_configs: Optional[Dict[str, Dict[str, Any]]] = None,
+        output_format: str = "html",
+    ) -> "RenderSettings":
+        """
+        辞書形式の拡張機能の設定から作成する
+
+        Args:
+            extensions: 拡張機能名のシーケンス（例: "extra"、"markdown.extensions.toc"）
+            extension_configs: 拡張機能名ごとの設定
+            output_format: 出力形式（"html" / "xhtml"）
+
+        Returns:
+            RenderSettings: レンダリングの設定
+        """
+        configs = tuple(
+            (name, tuple(sorted(config.items())))
+            for name, config in sorted((extension_configs or {}).items())
+        )
+        return cls(tuple(extensions), configs, output_format)
+
+
+class RenderStats:
+    """レンダリングした文書数と処理時間を集計するクラス"""
+
+    def __init__(self) -> None:
+        self.documents = 0
+        self.characters = 0
+        self.seconds = 0.0
+        # 作成した markdown.Markdown のインスタンス数（スレッド数と一致する）
+        self.renderers = 0
+        self._lock = threading.Lock()
+
+    def record(self, characters: int, seconds: float) -> None:
+        """1件の文書のレンダリングを記録する"""
+        with self._lock:
+            self.documents += 1
+            self.characters += characters
+            self.seconds += seconds
+
+    def record_renderer(self) -> None:
+        """markdown.Markdown のインスタンスの作成を記録する"""
+        with self._lock:
+            self.renderers += 1
+
+    @property
+    def documents_per_second(self) -> float:
+        """1スレッドあたりの1秒間にレンダリングした文書数"""
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        return (
+            f"文書 {self.documents}件 / {self.characters}文字 / {self.seconds:.3f}秒"
+            f"（{self.documents_per_second:.1f}件/秒、レンダラー {self.renderers}個）"
+        )
+
+
+def compile_extensions(settings: RenderSettings) -> List[Tuple[Callable[..., markdown.Extension], Dict[str, Any]]]:
+    """
+    拡張機能の名前と設定を解決し、拡張機能のクラスと設定の組のリストにする
+
+    名前からのモジュールの読み込みと設定の検証はここで一度だけ行い、
+    スレッドごとのインスタンスはクラスから直接作成する。
+
+    Args:
+        settings: レンダリングの設定
+
+    Returns:
+        List[Tuple[Callable[..., markdown.Extension], Dict[str, Any]]]: (拡張機能のクラス, 設定) のリスト
+
+    Raises:
+        ValueError: 有効にしていない拡張機能の設定がある場合
+        ImportError: 拡張機能が見つからない場合
+        KeyError: 拡張機能が受け付けない設定の場合
+    """
+    configs = {name: dict(config) for name, config in settings.extension_configs}
+    unknown = set(configs) - set(settings.extensions)
+    if unknown:
+        raise ValueError(f"有効にしていない拡張機能の設定です: {', '.join(sorted(unknown))}")
+    resolver = markdown.Markdown()
+    compiled: List[Tuple[Callable[..., markdown.Extension], Dict[str, Any]]] = []
+    for name in settings.extensions:
+        extension = resolver.build_extension(name, configs.get(name, {}))
+        compiled.append((type(extension), extension.getConfigs()))
+    return compiled
+
+
+class HtmlRenderer:
+    """
+    マークダウンをHTMLにレンダリングするクラス（スレッドセーフ）
+
+    markdown.Markdown のインスタンスはスレッドごとに1つだけ作成し、文書ごとに reset() して再利用する。
+    インスタンスの作成では拡張機能のプロセッサーの登録と正規表現のコンパイルが行われるため、
+    文書ごとに作成するよりも大幅に速い。
+    """
+
+    def __init__(self, settings: Optional[RenderSettings] = None):
+        """
+        初期化メソッド
+
+        Args:
+            settings: レンダリングの設定（省略時はデフォルトの拡張機能）
+        """
+        self.settings = settings or RenderSettings()
+        self._extensions = compile_extensions(self.settings)
+        self._local = threading.local()
+        self.stats = RenderStats()
+
+    def _markdown(self) -> markdown.Markdown:
+        """このスレッドの markdown.Markdown のインスタンスを返す（なければ作成する）"""
+        md = getattr(self._local, "md", None)
+        if md is None:
+            md = self._local.md = markdown.Markdown(
+                extensions=[cls(**config) for cls, config in self._extensions],
+                output_format=self.settings.output_format,
+            )
+            self.stats.record_renderer()
+        return md
+
+    def render(self, text: str) -> str:
+        """
+        マークダウンをHTMLにレンダリングする
+
+        Args:
+            text: マークダウンのテキスト
+
+        Returns:
+            str: HTML
+        """
+        md = self._markdown()
+        start = time.perf_counter()
+        try:
+            html: str = md.convert(text)
+            return html
+        finally:
+            # 目次・脚注・参照リンクなどの文書ごとの状態を次の文書に持ち越さない
+            md.reset()
+            self.stats.record(len(text), time.perf_counter() - start)
+
+
+_renderers: Dict[RenderSettings, HtmlRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def html_renderer(settings: RenderSettings) -> HtmlRenderer:
+    """設定のレンダラーを返す（プロセスごとに1回だけ作成する）"""
+    renderer = _renderers.get(settings)
+    if renderer is None:
+        with _renderers_lock:
+            renderer = _renderers.get(settings)
+            if renderer is None:
+                renderer = _renderers[settings] = HtmlRenderer(settings)
+    return renderer
+
+
+def _render(text: str, settings: RenderSettings) -> str:
+    return html_renderer(settings).render(text)
+
+
+# ワーカープロセス内の設定（初期化時に一度だけ受け取る）
+_worker_settings: Optional[RenderSettings] = None
+
+
+def _init_worker(settings: RenderSettings) -> None:
+    """ワーカープロセスの初期化（レンダラーの作成をプロセスごとに1回だけ行う）"""
+    global _worker_settings
+    _worker_settings = settings
+    _render("# warm up\n\ntext", settings)
+
+
+def _render_in_worker(text: str) -> str:
+    assert _worker_settings is not None, "ワーカープロセスが初期化されていません"
+    return _render(text, _worker_settings)
+
+
+def render_many(
+    texts: Sequence[str],
+    settings: Optional[RenderSettings] = None,
+    max_workers: int = 1,
+    chunksize: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    複数の文書をHTMLにレンダリングする（結果は入力の順に返す）
+
+    レンダリングはGILに縛られるCPU処理のため、max_workers が2以上の場合はプロセスで並列に処理する。
+    各プロセスは起動時に一度だけ設定を受け取り、レンダラーを作成する。
+
+    Args:
+        texts: マークダウンのテキストのシーケンス
+        settings: レンダリングの設定（省略時はデフォルトの拡張機能）
+        max_workers: ワーカープロセス数（1以下の場合は呼び出し元のスレッドで処理する）
+        chunksize: 1回に送信する文書数（省略時は件数とプロセス数から決める）
+
+    Returns:
+        Iterator[str]: HTML
+    """
+    settings = settings or RenderSettings()
+    if max_workers <= 1:
+        yield from (_render(text, settings) for text in texts)
+        return
+    chunksize = chunksize or max(1, math.ceil(len(texts) / (max_workers * 4)))
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(settings,)) as executor:
+        yield from executor.map(_render_in_worker, texts, chunksize=chunksize)
+
+
+def benchmark_rendering(
+    texts: Sequence[str],
+    settings: Optional[RenderSettings] = None,
+    worker_counts: Iterable[int] = (1,),
+    chunksize: Optional[int] = None,
+) -> List[Any]:
+    """
+    ワーカー数ごとにレンダリングの処理時間を計測する（プロセスの起動と初期化を含む）
+
+    Args:
+        texts: マークダウンのテキストのリスト
+        settings: レンダリングの設定
+        worker_counts: 計測するワーカー数
+        chunksize: 1回に送信する文書数（省略時は自動）
+
+    Returns:
+        List[ScalingResult]: ワーカー数ごとの計測結果
+    """
+    from .cpu_pool import ScalingResult
+
+    settings = settings or RenderSettings()
+    # 同じプロセスでの計測にレンダラーの作成を含めない
+    html_renderer(settings)
+    results = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        for _ in render_many(texts, settings, max_workers=workers, chunksize=chunksize):
+            pass
+        results.append(ScalingResult(workers, len(texts), time.perf_counter() - start))
+    return results
+
+
+def benchmark_fresh(texts: Sequence[str], settings: Optional[RenderSettings] = None) -> float:
+    """
+    比較のために文書ごとに markdown.Markdown を作成してレンダリングした場合の処理時間を計測する
+
+    Args:
+        texts: マークダウンのテキストのリスト
+        settings: レンダリングの設定
+
+    Returns:
+        float: 処理時間（秒）
+    """
+    settings = settings or RenderSettings()
+    configs = {name: dict(config) for name, config in settings.extension_configs}
+    start = time.perf_counter()
+    for text in texts:
+        markdown.markdown(
+            text,
+            extensions=list(settings.extensions),
+            extension_configs=configs,
+            output_format=settings.output_format,
+        )
+    return time.perf_counter() - start
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """レンダリングの処理量の計測のコマンドラインエントリーポイント"""
+    from .bench import load_corpus
+    from .cpu_pool import format_scaling
+
+    parser = argparse.ArgumentParser(
+        description="ベンチマーク用のコーパスのHTMLレンダリングの処理量をワーカー数ごとに計測する",
+    )
+    parser.add_argument("corpus", nargs="+", help="入力ファイルまたはディレクトリ")
+    parser.add_argument("--pattern", default="*.md", help="ディレクトリから読み込むファイルのglobパターン")
+    parser.add_argument(
+        "--max-workers", type=int, default=os.cpu_count() or 1,
+        help="計測する最大ワーカー数（1から順に計測する）",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="入力ファイルを繰り返す回数")
+    parser.add_argument("--chunksize", type=int, help="1回に送信する文書数")
+    parser.add_argument(
+        "--extensions", default=",".join(DEFAULT_EXTENSIONS),
+        help=f"有効にする拡張機能（カンマ区切り、デフォルト: {','.join(DEFAULT_EXTENSIONS)}）",
+    )
+    args = parser.parse_args(argv)
+
+    texts = load_corpus(args.corpus, args.pattern)
+    if not texts:
+        print("エラー: 入力ファイルがありません", file=sys.stderr)
+        return 1
+    settings = RenderSettings.create([e.strip() for e in args.extensions.split(",") if e.strip()])
+    texts = texts * args.repeat
+    fresh = benchmark_fresh(texts, settings)
+    results = benchmark_rendering(texts, settings, range(1, args.max_workers + 1), args.chunksize)
+    print(format_scaling(results))
+    print(
+        f"文書ごとに作成した場合: {fresh:.3f}秒（{len(texts) / fresh if fresh else 0.0:.1f} docs/s）"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
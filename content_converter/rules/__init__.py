@@ -0,0 +1,27 @@
+"""
+Rules module
+-----------
+
+LLMを使わずにプラットフォーム固有の記法を機械的に変換するルールエンジンを提供するモジュール
+"""
+
+from .base import RULESETS, Rule, RuleEngine, register_ruleset
+from .zenn_note import (
+    ZennCodeFenceRule,
+    ZennContainerRule,
+    ZennEmbedRule,
+    ZennFrontmatterToNoteRule,
+    ZennImageSizeRule,
+)
+
+__all__ = [
+    "RULESETS",
+    "Rule",
+    "RuleEngine",
+    "register_ruleset",
+    "ZennCodeFenceRule",
+    "ZennContainerRule",
+    "ZennEmbedRule",
+    "ZennFrontmatterToNoteRule",
+    "ZennImageSizeRule",
+]
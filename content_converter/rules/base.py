@@ -0,0 +1,89 @@
+"""
+Base rule module
+--------------
+
+ルールの基底クラスとルールエンジンを定義するモジュール
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence
+
+from ..core.blocks import Document, parse_document
+
+
+class Rule(ABC):
+    """文書に機械的な変換を適用するルールの基底クラス"""
+
+    # ルールの名前（ログや --rules の説明で使う）
+    name = "rule"
+
+    @abstractmethod
+    def apply(self, document: Document) -> None:
+        """
+        文書を変換する（document.metadata と document.blocks をその場で書き換える）
+
+        Args:
+            document: 変換する文書
+        """
+        pass
+
+
+# ルールセット名と、そのルールのリストを作る関数の対応
+RULESETS: Dict[str, Callable[[], List[Rule]]] = {}
+
+
+def register_ruleset(name: str, factory: Callable[[], List[Rule]]) -> None:
+    """
+    ルールセットを登録する
+
+    Args:
+        name: ルールセット名（例: 'zenn-to-note'）
+        factory: ルールのリストを返す関数
+    """
+    RULESETS[name] = factory
+
+
+class RuleEngine:
+    """ルールを順番に適用して文書を変換するクラス"""
+
+    def __init__(self, rules: Sequence[Rule]):
+        """
+        初期化メソッド
+
+        Args:
+            rules: 適用するルール（先頭から順に適用する）
+        """
+        self.rules = list(rules)
+
+    @classmethod
+    def from_name(cls, name: str) -> "RuleEngine":
+        """
+        登録済みのルールセットからルールエンジンを作成する
+
+        Args:
+            name: ルールセット名
+
+        Returns:
+            RuleEngine: ルールエンジン
+
+        Raises:
+            ValueError: ルールセットが登録されていない場合
+        """
+        if name not in RULESETS:
+            raise ValueError(f"Unsupported ruleset: {name}")
+        return cls(RULESETS[name]())
+
+    def apply(self, text: str) -> str:
+        """
+        マークダウンテキストにルールを適用する
+
+        Args:
+            text: マークダウンテキスト
+
+        Returns:
+            str: 変換されたテキスト
+        """
+        document = parse_document(text)
+        for rule in self.rules:
+            rule.apply(document)
+        return document.render()
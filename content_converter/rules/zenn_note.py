@@ -0,0 +1,227 @@
+"""
+Zenn to note rule module
+-----------------------
+
+Zenn形式の記事をnote形式に機械的に変換するルールを提供するモジュール
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from ..core.blocks import (
+    BLANK,
+    CODE,
+    CONTAINER,
+    EMBED,
+    PARAGRAPH,
+    Block,
+    Document,
+    parse_blocks,
+)
+from .base import Rule, register_ruleset
+
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\(\s*(<[^>]+>|[^\s)]+)")
+# Zennの画像幅指定: ![alt](url =250x)
+_IMAGE_SIZE_RE = re.compile(r"(!\[[^\]]*\]\(\s*[^\s)]+)\s+=\d*x\d*\s*\)")
+_FENCE_MARKER_RE = re.compile(r"^[ \t]{0,3}(?:`{3,}|~{3,})")
+
+# note では使わないZenn固有のフロントマターのキー
+ZENN_ONLY_KEYS = ("emoji", "type", "topics", "published", "published_at", "publication_name")
+
+# IDで指定するZennの埋め込みをURLに変換する書式
+EMBED_URL_FORMATS = {
+    "youtube": "https://www.youtube.com/watch?v={target}",
+}
+
+
+def find_first_image(blocks: List[Block]) -> Optional[str]:
+    """
+    本文中の最初の画像のURLを返す（コードブロック内は対象外）
+
+    Args:
+        blocks: ブロックのリスト
+
+    Returns:
+        Optional[str]: 画像のURL（見つからない場合はNone）
+    """
+    for block in blocks:
+        if block.kind == PARAGRAPH:
+            match = _IMAGE_RE.search(block.text)
+            if match:
+                return match.group(1).strip("<>")
+        elif block.kind == CONTAINER:
+            url = find_first_image(parse_blocks(block.body))
+            if url:
+                return url
+    return None
+
+
+class ZennFrontmatterToNoteRule(Rule):
+    """
+    Zennのフロントマターをnote用に変換するルール
+
+    - topics → hashtags
+    - published → status（publish=False の場合は常に draft）
+    - 本文の最初の画像 → eyecatch
+    - emoji・type などのZenn固有のキーを削除
+    """
+
+    name = "zenn-frontmatter"
+
+    def __init__(self, publish: bool = False):
+        """
+        初期化メソッド
+
+        Args:
+            publish: published: true の記事を status: public にするかどうか
+                （デフォルトでは誤って公開しないよう常に下書きにする）
+        """
+        self.publish = publish
+
+    def apply(self, document: Document) -> None:
+        metadata = document.metadata
+        if metadata is None:
+            return
+
+        converted: Dict[str, Any] = {}
+        if "title" in metadata:
+            converted["title"] = metadata["title"]
+        topics = metadata.get("topics")
+        if topics:
+            converted["hashtags"] = list(topics) if isinstance(topics, (list, tuple)) else [topics]
+        eyecatch = metadata.get("eyecatch") or find_first_image(document.blocks)
+        if eyecatch:
+            converted["eyecatch"] = eyecatch
+        published = metadata.get("published") is True
+        converted["status"] = "public" if self.publish and published else "draft"
+
+        for key, value in metadata.items():
+            if key not in converted and key not in ZENN_ONLY_KEYS:
+                converted[key] = value
+        document.metadata = converted
+
+
+class ZennImageSizeRule(Rule):
+    """Zennの画像幅指定（![alt](url =250x)）を取り除くルール"""
+
+    name = "zenn-image-size"
+
+    def apply(self, document: Document) -> None:
+        document.blocks = [
+            block._replace(text=_IMAGE_SIZE_RE.sub(r"\1)", block.text))
+            if block.kind == PARAGRAPH
+            else block
+            for block in document.blocks
+        ]
+
+
+class ZennContainerRule(Rule):
+    """
+    Zennの :::message / :::details ブロックをnoteで表示できる記法に変換するルール
+
+    - :::message → 引用
+    - :::message alert → 「**注意**」から始まる引用
+    - :::details タイトル → 太字のタイトルと本文
+    """
+
+    name = "zenn-container"
+
+    def apply(self, document: Document) -> None:
+        document.blocks = self._convert_blocks(document.blocks)
+
+    def _convert_blocks(self, blocks: List[Block]) -> List[Block]:
+        converted = []
+        for block in blocks:
+            if block.kind == CONTAINER:
+                converted.append(Block(PARAGRAPH, self._convert_container(block)))
+            else:
+                converted.append(block)
+        return converted
+
+    def _convert_container(self, block: Block) -> str:
+        kind, _, argument = block.info.partition(" ")
+        body = "".join(b.text for b in self._convert_blocks(parse_blocks(block.body)))
+        body = body.strip("\n")
+        if not body.endswith("\n"):
+            body += "\n"
+
+        if kind == "message":
+            if argument.strip() == "alert":
+                body = "**注意**\n\n" + body
+            return "".join(
+                "> " + line if line.strip() else ">\n"
+                for line in body.splitlines(keepends=True)
+            )
+        if kind == "details":
+            title = argument.strip()
+            return (f"**{title}**\n\n" if title else "") + body
+        return body
+
+
+class ZennEmbedRule(Rule):
+    """
+    Zennの埋め込み記法（@[service](target)）を、noteで埋め込み表示される単独行のURLに変換するルール
+
+    URLに変換できない埋め込み（IDだけで指定するサービスなど）はそのまま残す。
+    """
+
+    name = "zenn-embed"
+
+    def apply(self, document: Document) -> None:
+        converted = []
+        for block in document.blocks:
+            if block.kind == EMBED:
+                url = self._to_url(block.info, block.embed_target)
+                if url:
+                    block = Block(PARAGRAPH, url + "\n")
+            converted.append(block)
+        document.blocks = converted
+
+    @staticmethod
+    def _to_url(service: str, target: str) -> Optional[str]:
+        if target.startswith(("http://", "https://")):
+            return target
+        url_format = EMBED_URL_FORMATS.get(service)
+        return url_format.format(target=target) if url_format else None
+
+
+class ZennCodeFenceRule(Rule):
+    """
+    Zennのコードブロックの情報文字列（python:hello.py、diff python など）を言語名だけにするルール
+
+    ファイル名の指定は、コードブロックの直前にインラインコードとして残す。
+    """
+
+    name = "zenn-code-fence"
+
+    def apply(self, document: Document) -> None:
+        converted: List[Block] = []
+        for block in document.blocks:
+            if block.kind == CODE and block.info:
+                language, _, filename = block.info.partition(":")
+                language = language.split()[0] if language.strip() else ""
+                if filename.strip():
+                    converted.append(Block(PARAGRAPH, f"`{filename.strip()}`\n"))
+                    converted.append(Block(BLANK, "\n"))
+                if language != block.info:
+                    first, newline, rest = block.text.partition("\n")
+                    match = _FENCE_MARKER_RE.match(first)
+                    if match:
+                        first = match.group(0) + language
+                    block = block._replace(text=first + newline + rest, info=language)
+            converted.append(block)
+        document.blocks = converted
+
+
+def zenn_to_note_rules() -> List[Rule]:
+    """Zennからnoteへの変換に使うルールのリストを返す"""
+    return [
+        ZennFrontmatterToNoteRule(),
+        ZennImageSizeRule(),
+        ZennContainerRule(),
+        ZennEmbedRule(),
+        ZennCodeFenceRule(),
+    ]
+
+
+register_ruleset("zenn-to-note", zenn_to_note_rules)
@@ -0,0 +1,307 @@
+"""
+Scheduler module
+---------------
+
+優先度クラスごとに同時実行数とトークン数/分を配分する、LLMリクエストのスケジューラーを提供するモジュール
+
+対話的な変換（interactive）には同時実行数とトークン数/分の一部を予約し、
+一括の再変換（bulk）は予約されていない残りの容量を使う。複数のクラスが待っている場合は
+重み付き公平キューイング（クラスごとの消費トークン数を重みで割った仮想時間が最も小さいクラスを先に通す）で選ぶ。
+"""
+
+import contextlib
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from .deadline import POLL_INTERVAL, current_deadline
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class PriorityClass(NamedTuple):
+    """優先度クラスの設定"""
+
+    # クラス名
+    name: str
+    # 重み付き公平キューイングの重み（大きいほど多く配分される）
+    weight: float = 1.0
+    # 予約する同時実行数の割合（0〜1。他のクラスはこの分を使えない）
+    reserved_share: float = 0.0
+
+
+# デフォルトの優先度クラス（先頭ほど優先度が高く、パイプラインのキューでも先に処理される）
+DEFAULT_CLASSES: Tuple[PriorityClass, ...] = (
+    PriorityClass(INTERACTIVE, weight=4.0, reserved_share=0.25),
+    PriorityClass(BULK, weight=1.0),
+)
+
+
+def priority_classes(interactive_share: float) -> Tuple[PriorityClass, ...]:
+    """
+    interactive に予約する割合を指定したデフォルトの優先度クラスを返す
+
+    Args:
+        interactive_share: interactive に予約する同時実行数・トークン数/分の割合（0〜1）
+
+    Returns:
+        Tuple[PriorityClass, ...]: 優先度クラス
+    """
+    return (DEFAULT_CLASSES[0]._replace(reserved_share=interactive_share),) + DEFAULT_CLASSES[1:]
+
+
+class ClassStats:
+    """優先度クラスごとのリクエスト数・待ち時間・使用トークン数を集計するクラス"""
+
+    def __init__(self, name: str):
+        """
+        初期化メソッド
+
+        Args:
+            name: クラス名
+        """
+        self.name = name
+        self.requests = 0
+        self.tokens = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        average = self.wait_seconds / self.requests if self.requests else 0.0
+        return (
+            f"{self.name}: {self.requests}件 / トークン {self.tokens}"
+            f" / 待ち時間 平均 {average:.2f}秒・最大 {self.max_wait_seconds:.2f}秒"
+        )
+
+
+class Ticket(NamedTuple):
+    """スケジューラーが発行した実行許可"""
+
+    priority: str
+    tokens: int
+
+
+class _Waiter:
+    """スケジューラーの待ち行列に並んでいるリクエスト"""
+
+    __slots__ = ("priority", "tokens", "enqueued_at")
+
+    def __init__(self, priority: str, tokens: int, enqueued_at: float):
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = enqueued_at
+
+
+class PriorityScheduler:
+    """
+    優先度クラスごとに同時実行数とトークン数/分を配分するスケジューラー
+
+    各クラスは他のクラスの予約のうち使われていない分を使えない。予約を使い切ったクラスや
+    予約のないクラスは、どのクラスにも予約されていない残りの容量を分け合う。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        tokens_per_minute: Optional[int] = None,
+        classes: Sequence[PriorityClass] = DEFAULT_CLASSES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            max_concurrency: 全クラス合計の同時実行数
+            tokens_per_minute: 全クラス合計の1分あたりのトークン数（Noneで無制限）
+            classes: 優先度クラス（先頭ほど優先度が高い）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+        """
+        if not classes:
+            raise ValueError("優先度クラスが1つも指定されていません。")
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.classes = {c.name: c for c in classes}
+        self.order = [c.name for c in classes]
+        self.stats = {c.name: ClassStats(c.name) for c in classes}
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[_Waiter]] = {c.name: deque() for c in classes}
+        # クラスごとの仮想時間（消費トークン数 / 重み）
+        self._virtual: Dict[str, float] = {c.name: 0.0 for c in classes}
+        # 直近1分間に開始したリクエストの (時刻, クラス, トークン数)
+        self._window: Deque[Tuple[float, str, int]] = deque()
+
+    def rank(self, priority: Optional[str]) -> int:
+        """クラスの優先順位（小さいほど優先。不明なクラスは最後）"""
+        return self.order.index(priority) if priority in self.classes else len(self.order)
+
+    def _reserved_slots(self, name: str) -> int:
+        return math.floor(self.max_concurrency * self.classes[name].reserved_share)
+
+    def _reserved_tokens(self, name: str) -> int:
+        if not self.tokens_per_minute:
+            return 0
+        return math.floor(self.tokens_per_minute * self.classes[name].reserved_share)
+
+    def _window_tokens(self, now: float) -> Dict[str, int]:
+        """直近1分間のクラスごとの使用トークン数（古い記録は取り除く）"""
+        while self._window and self._window[0][0] <= now - 60.0:
+            self._window.popleft()
+        used = {name: 0 for name in self.classes}
+        for _, name, tokens in self._window:
+            used[name] += tokens
+        return used
+
+    def _admissible(self, waiter: _Waiter, used: Dict[str, int]) -> bool:
+        """他のクラスの未使用の予約を残したまま開始できるかどうか"""
+        name = waiter.priority
+        in_flight = sum(s.in_flight for s in self.stats.values())
+        held_slots = sum(
+            max(0, self._reserved_slots(other) - self.stats[other].in_flight)
+            for other in self.classes if other != name
+        )
+        if in_flight + 1 > self.max_concurrency - held_slots:
+            return False
+        if not self.tokens_per_minute:
+            return True
+        total = sum(used.values())
+        if total == 0:
+            # 1件で上限を超える大きなリクエストも、他に使用がなければ通す
+            return True
+        held_tokens = sum(
+            max(0, self._reserved_tokens(other) - used[other])
+            for other in self.classes if other != name
+        )
+        return total + waiter.tokens <= self.tokens_per_minute - held_tokens
+
+    def _next(self, now: float) -> Optional[_Waiter]:
+        """次に開始するリクエスト（開始できるクラスのうち仮想時間が最も小さいクラスの先頭）"""
+        used = self._window_tokens(now)
+        candidates = [
+            queue[0] for name, queue in self._queues.items()
+            if queue and self._admissible(queue[0], used)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (self._virtual[w.priority], self.rank(w.priority)))
+
+    def acquire(self, priority: str, tokens: int = 0) -> Ticket:
+        """
+        リクエストの開始を待つ（現在の期限がある場合は待機中もキャンセル・期限切れを確認する）
+
+        Args:
+            priority: 優先度クラス名
+            tokens: リクエストの推定トークン数（入力と出力の上限の合計）
+
+        Returns:
+            Ticket: 実行許可（終了後に release に渡す）
+
+        Raises:
+            ValueError: 不明な優先度クラスの場合
+        """
+        if priority not in self.classes:
+            raise ValueError(f"不明な優先度クラスです: {priority}")
+        deadline = current_deadline()
+        with self._cond:
+            now = self._clock()
+            queue = self._queues[priority]
+            stats = self.stats[priority]
+            if not queue and not stats.in_flight:
+                # しばらく使われていなかったクラスが、休んでいた間の分をまとめて使わないようにする
+                active = [
+                    self._virtual[name] for name in self.classes
+                    if name != priority and (self._queues[name] or self.stats[name].in_flight)
+                ]
+                if active:
+                    self._virtual[priority] = max(self._virtual[priority], min(active))
+            waiter = _Waiter(priority, max(0, tokens), now)
+            queue.append(waiter)
+            stats.waiting += 1
+            try:
+                while self._next(self._clock()) is not waiter:
+                    if deadline is not None:
+                        deadline.check()
+                    self._cond.wait(self._wait_seconds())
+            except BaseException:
+                queue.remove(waiter)
+                stats.waiting -= 1
+                self._cond.notify_all()
+                raise
+            queue.popleft()
+            now = self._clock()
+            waited = now - waiter.enqueued_at
+            stats.waiting -= 1
+            stats.in_flight += 1
+            stats.requests += 1
+            stats.tokens += waiter.tokens
+            stats.wait_seconds += waited
+            stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+            self._virtual[priority] += max(1, waiter.tokens) / self.classes[priority].weight
+            if self.tokens_per_minute:
+                self._window.append((now, priority, waiter.tokens))
+            # 同じクラスの後続や他のクラスも開始できるかもしれない
+            self._cond.notify_all()
+            return Ticket(priority, waiter.tokens)
+
+    def _wait_seconds(self) -> float:
+        """次に状態を確認するまでの秒数（トークンの記録が期限切れになる時刻まで）"""
+        wait = POLL_INTERVAL
+        if self._window:
+            wait = min(wait, max(self._window[0][0] + 60.0 - self._clock(), 0.01))
+        return wait
+
+    def release(self, ticket: Ticket) -> None:
+        """
+        リクエストの終了を記録する
+
+        Args:
+            ticket: acquire が返した実行許可
+        """
+        with self._cond:
+            self.stats[ticket.priority].in_flight -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, priority: str, tokens: int = 0) -> Iterator[Ticket]:
+        """with ブロックの間だけ実行許可を保持する"""
+        ticket = self.acquire(priority, tokens)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def summary(self) -> str:
+        """クラスごとの集計結果を1行ずつ並べた文字列を返す"""
+        return "\n".join(self.stats[name].summary() for name in self.order)
+
+
+_current: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar(
+    "content_converter_priority", default=None
+)
+
+
+def current_priority() -> Optional[str]:
+    """現在のスレッド（コンテキスト）の優先度クラス名を返す"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def priority_scope(priority: Optional[str]) -> Iterator[Optional[str]]:
+    """
+    with ブロックの中のLLMリクエストに優先度クラスを設定する
+
+    Args:
+        priority: 優先度クラス名（Noneの場合はスケジューラー側のデフォルト）
+    """
+    token = _current.set(priority)
+    try:
+        yield priority
+    finally:
+        _current.reset(token)
@@ -0,0 +1,127 @@
+"""
+Similarity module
+----------------
+
+入力が類似したセクションの過去の変換結果を再利用する類似キャッシュを提供するモジュール
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .core.fingerprint import SimHashIndex, max_distance_for, simhash
+
+
+def context_key(*parts: Optional[str]) -> str:
+    """
+    変換の文脈（テンプレート・プロンプト・モデルなど）を表すキーを返す
+
+    文脈が異なる変換結果は類似キャッシュでヒットしない。
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class SimilarityCache:
+    """SimHashでセクション入力の近似一致を検索し、過去の変換結果を返すキャッシュ"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        similarity: float = 0.95,
+        min_chars: int = 200,
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            path: 変換履歴を保存するJSON Linesファイルのパス（Noneの場合はメモリ上のみ）
+            similarity: 近似一致とみなす類似度のしきい値（0〜1、1.0で完全一致のみ）
+            min_chars: 近似一致を許可する最小文字数。これより短いセクションは、
+                日付だけの変更なども大きな差として扱えないため完全一致のみで再利用する
+        """
+        self.path = path
+        self.min_chars = min_chars
+        self.index: SimHashIndex[str] = SimHashIndex(max_distance_for(similarity))
+        self._exact: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _load(self, path: str) -> None:
+        """変換履歴ファイルを読み込んでインデックスを構築する"""
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で中断された末尾の行は無視する
+                    continue
+                self._add_to_index(
+                    record["context"], record["hash"], record.get("fingerprint"), record["output"]
+                )
+
+    def _add_to_index(
+        self, context: str, text_hash: str, fingerprint: Optional[int], output: str
+    ) -> None:
+        self._exact[(context, text_hash)] = output
+        if fingerprint is not None:
+            self.index.add(fingerprint, output, namespace=context)
+
+    def lookup(self, context: str, text: str) -> Optional[str]:
+        """
+        入力セクションに一致または近似一致する過去の変換結果を返す
+
+        Args:
+            context: 変換の文脈キー
+            text: 入力セクションのテキスト
+
+        Returns:
+            Optional[str]: 過去の変換結果（見つからない場合はNone）
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        fingerprint = simhash(text) if len(text) >= self.min_chars else None
+        with self._lock:
+            output = self._exact.get((context, text_hash))
+            if output is not None:
+                self.exact_hits += 1
+                return output
+            if fingerprint is not None:
+                hit = self.index.nearest(fingerprint, namespace=context)
+                if hit is not None:
+                    self.similar_hits += 1
+                    return hit[1]
+            self.misses += 1
+            return None
+
+    def add(self, context: str, text: str, output: str) -> None:
+        """
+        変換結果を登録する
+
+        Args:
+            context: 変換の文脈キー
+            text: 入力セクションのテキスト
+            output: 変換結果
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        fingerprint = simhash(text) if len(text) >= self.min_chars else None
+        with self._lock:
+            self._add_to_index(context, text_hash, fingerprint, output)
+            if self.path:
+                record = {"context": context, "hash": text_hash, "fingerprint": fingerprint, "output": output}
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def summary(self) -> str:
+        """ヒット件数の要約文字列を返す"""
+        return f"完全一致 {self.exact_hits} / 近似一致 {self.similar_hits} / ミス {self.misses}"
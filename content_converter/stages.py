@@ -0,0 +1,183 @@
+"""
+Stages module
+------------
+
+LLM呼び出しの前後に行うCPU処理（ルール適用・縮小・マスク・復元・HTMLレンダリング）を、
+プロセス間で受け渡しできる純粋な関数として提供するモジュール
+"""
+
+from typing import NamedTuple, Optional, Tuple, Union
+
+from .core.masking import MaskedText, RestoreReport
+from .core.minify import minify
+from .core.tokens import estimate_tokens
+from .render import RenderSettings, html_renderer
+from .rules import RuleEngine
+
+
+class StageSettings(NamedTuple):
+    """CPU処理の設定（ワーカープロセスに一度だけ渡す）"""
+
+    rules: Union[str, RuleEngine, None] = None
+    rules_mode: str = "only"
+    minify: bool = False
+    minify_patterns: Tuple[str, ...] = ()
+    mask_kinds: Tuple[str, ...] = ()
+    # 変換結果をHTMLにレンダリングする場合の設定（Noneの場合はマークダウンのまま）
+    html: Optional[RenderSettings] = None
+
+
+class PreparedRequest(NamedTuple):
+    """LLMに送信する準備ができた入力"""
+
+    # ルール・縮小・マスクを適用した入力テキスト
+    text: str
+    # 縮小したカスタムプロンプト
+    prompt: Optional[str]
+    # マスクした場合のマスク情報
+    masked: Optional[MaskedText] = None
+    # 縮小した場合の前後の推定トークン数
+    minify_tokens: Optional[Tuple[int, int]] = None
+    # ルールだけで変換が完了した場合の結果（LLMを呼ばない）
+    final: Optional[str] = None
+
+
+_engines: dict = {}
+
+
+def rule_engine(settings: StageSettings) -> Optional[RuleEngine]:
+    """設定のルールエンジンを返す（ルールセット名の場合はプロセスごとに1回だけ作成する）"""
+    rules = settings.rules
+    if rules is None or isinstance(rules, RuleEngine):
+        return rules
+    engine = _engines.get(rules)
+    if engine is None:
+        engine = _engines[rules] = RuleEngine.from_name(rules)
+    return engine
+
+
+def apply_rules(text: str, settings: StageSettings, stage: str) -> str:
+    """
+    ルールの適用段階が stage（'only'・'pre'・'post'）の場合にルールを適用する
+
+    Args:
+        text: 対象テキスト
+        settings: CPU処理の設定
+        stage: 適用段階
+
+    Returns:
+        str: ルールを適用したテキスト（適用段階が異なる場合はそのまま）
+    """
+    engine = rule_engine(settings)
+    if engine is None or settings.rules_mode != stage:
+        return text
+    return engine.apply(text)
+
+
+def render_output(text: str, settings: StageSettings) -> str:
+    """
+    HTMLにレンダリングする設定の場合に変換結果をレンダリングする
+
+    Args:
+        text: 変換結果のマークダウン
+        settings: CPU処理の設定
+
+    Returns:
+        str: HTML（レンダリングしない設定の場合はそのまま）
+    """
+    if settings.html is None:
+        return text
+    return html_renderer(settings.html).render(text)
+
+
+def prepare_request(
+    text: str, prompt: Optional[str], settings: StageSettings
+) -> PreparedRequest:
+    """
+    LLMに送信する1件の入力を縮小・マスクする
+
+    Args:
+        text: 入力テキスト（文書全体またはセクション）
+        prompt: カスタムプロンプト（省略可）
+        settings: CPU処理の設定
+
+    Returns:
+        PreparedRequest: 送信する入力
+    """
+    minify_tokens = None
+    if settings.minify:
+        minified = minify(text, remove_patterns=settings.minify_patterns)
+        minified_prompt = minify(prompt, remove_patterns=settings.minify_patterns) if prompt else prompt
+        minify_tokens = (
+            estimate_tokens(text) + estimate_tokens(prompt or ""),
+            estimate_tokens(minified) + estimate_tokens(minified_prompt or ""),
+        )
+        text, prompt = minified, minified_prompt
+
+    masked = None
+    if settings.mask_kinds:
+        masked = MaskedText(text, settings.mask_kinds)
+        if masked.placeholders:
+            text = masked.text
+        else:
+            masked = None
+    return PreparedRequest(text, prompt, masked, minify_tokens)
+
+
+def finish_request(
+    prepared: PreparedRequest, output: str
+) -> Tuple[str, Optional[RestoreReport]]:
+    """
+    LLMの出力のプレースホルダーを元に戻す
+
+    Args:
+        prepared: 送信した入力
+        output: LLMの出力
+
+    Returns:
+        Tuple[str, Optional[RestoreReport]]: 復元したテキストと修復内容（マスクしていない場合はNone）
+    """
+    if prepared.masked is None:
+        return output, None
+    return prepared.masked.restore(output)
+
+
+def prepare_document(
+    text: str, prompt: Optional[str], settings: StageSettings
+) -> PreparedRequest:
+    """
+    文書全体にLLM前のCPU処理（ルール・縮小・マスク）を適用する
+
+    ルールだけで変換する設定の場合は、結果を final に入れて返す。
+
+    Args:
+        text: 入力テキスト
+        prompt: カスタムプロンプト（省略可）
+        settings: CPU処理の設定
+
+    Returns:
+        PreparedRequest: 送信する入力
+    """
+    if rule_engine(settings) is not None and settings.rules_mode == "only":
+        return PreparedRequest(text, prompt, final=apply_rules(text, settings, "only"))
+    return prepare_request(apply_rules(text, settings, "pre"), prompt, settings)
+
+
+def finish_document(
+    prepared: PreparedRequest, output: str, settings: StageSettings
+) -> Tuple[str, Optional[RestoreReport]]:
+    """
+    文書全体の変換結果にLLM後のCPU処理（復元・ルール・HTMLレンダリング）を適用する
+
+    Args:
+        prepared: 送信した入力
+        output: LLMの出力
+        settings: CPU処理の設定
+
+    Returns:
+        Tuple[str, Optional[RestoreReport]]: 変換結果と修復内容
+    """
+    if prepared.final is not None:
+        return render_output(prepared.final, settings), None
+    restored, report = finish_request(prepared, output)
+    return render_output(apply_rules(restored, settings, "post"), settings), report
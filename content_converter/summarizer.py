@@ -0,0 +1,223 @@
+"""
+Summarizer module
+----------------
+
+長い文書をチャンクに分けて要約し、部分要約を階層的にまとめる（map-reduce）要約を提供するモジュール
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .core.sections import split_sections
+from .core.tokens import estimate_tokens
+from .deadline import bind_deadline
+from .llm.base import LLMProvider
+from .similarity import SimilarityCache, context_key
+
+# 1つのチャンクの推定トークン数の上限
+DEFAULT_CHUNK_TOKENS = 3000
+# チャンク・中間の要約の最大文字数
+DEFAULT_PARTIAL_LENGTH = 400
+# 1回の要約にまとめる部分要約の数
+DEFAULT_FAN_IN = 8
+# 最終的な要約が最大文字数を超えた場合に要約し直す回数
+MAX_SHORTEN_ATTEMPTS = 2
+
+# 空行の後の段落の先頭（空行はその前の段落に含める）
+_PARAGRAPH_RE = re.compile(r"(?<=\n\n)(?=[^\n])")
+
+
+def _split_oversized(text: str, chunk_tokens: int) -> List[str]:
+    """
+    上限を超えるセクションを段落ごと（1段落でも超える場合は文字数）に分割する
+
+    Args:
+        text: セクションのテキスト
+        chunk_tokens: 1つのチャンクの推定トークン数の上限
+
+    Returns:
+        List[str]: 分割したテキスト（連結すると元のテキストに一致する）
+    """
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        tokens = estimate_tokens(paragraph)
+        if tokens <= chunk_tokens:
+            pieces.append(paragraph)
+            continue
+        # 1トークンあたりの平均文字数から、上限に収まる文字数で切る
+        size = max(1, len(paragraph) * chunk_tokens // tokens)
+        pieces.extend(paragraph[i:i + size] for i in range(0, len(paragraph), size))
+    return pieces
+
+
+def chunk_document(text: str, chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[str]:
+    """
+    文書を見出し単位のセクションの境界で、推定トークン数の上限までのチャンクに分ける
+
+    続くセクションを上限まで詰めるため、一部のセクションを編集しても、
+    その前のチャンクの境界は変わらない（部分要約をキャッシュから再利用できる）。
+
+    Args:
+        text: 文書のテキスト
+        chunk_tokens: 1つのチャンクの推定トークン数の上限
+
+    Returns:
+        List[str]: チャンクのリスト
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for section in split_sections(text):
+        tokens = estimate_tokens(section.text)
+        pieces = [section.text] if tokens <= chunk_tokens else _split_oversized(section.text, chunk_tokens)
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > chunk_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class SummaryStats:
+    """要約のリクエスト数とキャッシュから再利用した件数を集計するクラス"""
+
+    def __init__(self) -> None:
+        self.chunks = 0
+        self.requests = 0
+        self.cached = 0
+        # 最も深い要約の階層数（チャンクの要約を1とする）
+        self.levels = 0
+        self._lock = threading.Lock()
+
+    def record(self, cached: bool) -> None:
+        """1件の要約（チャンクまたは中間）を記録する"""
+        with self._lock:
+            if cached:
+                self.cached += 1
+            else:
+                self.requests += 1
+
+    def record_document(self, chunks: int, levels: int) -> None:
+        """
+        1件の文書の要約を記録する
+
+        Args:
+            chunks: 文書を分けたチャンクの数
+            levels: 要約の階層数
+        """
+        with self._lock:
+            self.chunks += chunks
+            self.levels = max(self.levels, levels)
+
+    def summary(self) -> str:
+        """集計結果の要約文字列を返す"""
+        return (
+            f"チャンク {self.chunks}件 / 階層 {self.levels} / "
+            f"要約リクエスト {self.requests}回 / キャッシュから再利用 {self.cached}件"
+        )
+
+
+class MapReduceSummarizer:
+    """
+    長い文書をチャンクごとに並行して要約し、部分要約を階層的にまとめるクラス
+
+    部分要約は fan_in 件ずつまとめて要約し、1件になるまで繰り返す。キャッシュを指定すると
+    チャンク・中間の要約を入力ごとに保存するため、一部を編集した文書の要約では、
+    変更されたチャンクとその上の階層の要約だけをやり直す。
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        partial_length: int = DEFAULT_PARTIAL_LENGTH,
+        fan_in: int = DEFAULT_FAN_IN,
+        max_workers: int = 4,
+        cache: Optional[SimilarityCache] = None,
+        context: str = "",
+    ):
+        """
+        初期化メソッド
+
+        Args:
+            provider: 要約に使うLLMプロバイダー
+            chunk_tokens: 1つのチャンクの推定トークン数の上限
+            partial_length: チャンク・中間の要約の最大文字数
+            fan_in: 1回の要約にまとめる部分要約の数（2以上）
+            max_workers: 同時に要約するチャンクの数
+            cache: チャンク・中間の要約を保存するキャッシュ（省略時は保存しない）
+            context: キャッシュの文脈キーに含める文字列（モデル名など。変わると再利用しない）
+        """
+        self.provider = provider
+        self.chunk_tokens = chunk_tokens
+        self.partial_length = partial_length
+        self.fan_in = max(2, fan_in)
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self.context = context
+        self.stats = SummaryStats()
+
+    def _summarize(self, text: str, max_length: int) -> str:
+        """1件の要約を生成する（キャッシュにあれば再利用する）"""
+        key = context_key("summary", self.context, str(max_length))
+        if self.cache is not None:
+            cached = self.cache.lookup(key, text)
+            if cached is not None:
+                self.stats.record(cached=True)
+                return cached
+        summary = self.provider.generate_summary(text, max_length=max_length).strip()
+        self.stats.record(cached=False)
+        if self.cache is not None:
+            self.cache.add(key, text, summary)
+        return summary
+
+    def _map(self, texts: List[str], max_length: int) -> List[str]:
+        """テキストを並行して要約する"""
+        def summarize(text: str) -> str:
+            return self._summarize(text, max_length)
+
+        if len(texts) == 1:
+            return [summarize(texts[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(texts))) as executor:
+            return list(executor.map(bind_deadline(summarize), texts))
+
+    def summarize(self, text: str, max_length: int = 100) -> str:
+        """
+        文書を要約する
+
+        Args:
+            text: 文書のテキスト
+            max_length: 要約の最大文字数
+
+        Returns:
+            str: 生成された要約
+        """
+        chunks = chunk_document(text, self.chunk_tokens)
+        levels = 1
+        if len(chunks) <= 1:
+            summary = self._summarize(text, max_length)
+        else:
+            partials = self._map(chunks, self.partial_length)
+            while len(partials) > self.fan_in:
+                groups = [
+                    "\n\n".join(partials[i:i + self.fan_in])
+                    for i in range(0, len(partials), self.fan_in)
+                ]
+                partials = self._map(groups, self.partial_length)
+                levels += 1
+            summary = self._summarize("\n\n".join(partials), max_length)
+            levels += 1
+        self.stats.record_document(len(chunks), levels)
+
+        # 指定した文字数に収まらなかった場合は、要約をさらに要約する
+        for _ in range(MAX_SHORTEN_ATTEMPTS):
+            if len(summary) <= max_length:
+                break
+            summary = self._summarize(summary, max_length)
+        return summary
@@ -0,0 +1,189 @@
+"""
+Writer module
+------------
+
+出力ファイルをアトミックに書き込むモジュール
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+import uuid
+from typing import List, Optional, Set
+
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+
+FSYNC_MODES = ("always", "batch", "never")
+
+# 一時ファイル名が既存のファイルと衝突した場合に名前を変えて作り直す回数
+_TEMP_ATTEMPTS = 100
+
+
+def file_sha256(path: str) -> Optional[str]:
+    """
+    ファイル内容のSHA-256ハッシュを返す
+
+    Args:
+        path: ファイルパス
+
+    Returns:
+        Optional[str]: ハッシュ（ファイルが存在しない場合はNone）
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    return digest.hexdigest()
+
+
+def _create_temp(path: str) -> "tuple[int, str]":
+    """
+    出力ファイルと同じディレクトリに一時ファイルを作成する
+
+    mkstemp と異なり 0666 で作成するため、新規ファイルにはその時点のumaskが適用される
+    （通常の open で作成した場合と同じ権限になる）。
+
+    Args:
+        path: 出力ファイルパス
+
+    Returns:
+        tuple[int, str]: (ファイルディスクリプター, 一時ファイルのパス)
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    for _ in range(_TEMP_ATTEMPTS):
+        tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"一時ファイルを作成できません: {path}")
+
+
+def _fsync_path(path: str) -> None:
+    """ファイルまたはディレクトリをfsyncする（ディレクトリのfsyncはPOSIXのみ）"""
+    flags = os.O_RDONLY
+    if os.path.isdir(path):
+        if os.name != "posix":
+            return
+        flags |= getattr(os, "O_DIRECTORY", 0)
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OutputWriter:
+    """一時ファイルへの書き込みとリネームでアトミックに出力し、内容が同じ場合は書き込まないクラス"""
+
+    def __init__(self, fsync: str = "always", batch_size: int = 64):
+        """
+        初期化メソッド
+
+        Args:
+            fsync: fsyncの方式
+                - "always": ファイルごとにリネーム前のfsyncとディレクトリのfsyncを行う
+                - "batch": batch_size件ごと（および flush() 時）にまとめてfsyncする
+                - "never": fsyncしない（リネームによるアトミック性のみ）
+            batch_size: "batch" モードでまとめてfsyncする件数
+        """
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Unsupported fsync mode: {fsync}")
+        self.fsync = fsync
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.unchanged = 0
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        # 他のスレッドで実行中の flush() の完了も待つため、flush() 全体を直列にする
+        self._flush_lock = threading.Lock()
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.flush()
+
+    def write(self, path: str, text: str) -> str:
+        """
+        テキストをファイルにアトミックに書き込む
+
+        既存ファイルと内容が同じ場合は書き込まず、mtimeも変更しない。
+
+        Args:
+            path: 出力ファイルパス
+            text: 書き込むテキスト
+
+        Returns:
+            str: WRITTEN または UNCHANGED
+
+        Raises:
+            OSError: 書き込みに失敗した場合（既存ファイルは変更されない）
+        """
+        data: Optional[bytes] = None
+        mode: Optional[int] = None
+        if os.path.isfile(path):
+            data = text.encode("utf-8")
+            if file_sha256(path) == hashlib.sha256(data).hexdigest():
+                with self._lock:
+                    self.unchanged += 1
+                return UNCHANGED
+            # 既存ファイルは元の権限を引き継ぐ
+            mode = os.stat(path).st_mode & 0o7777
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = _create_temp(path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data if data is not None else text.encode("utf-8"))
+                if self.fsync == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+            if mode is not None:
+                os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+        if self.fsync == "always":
+            _fsync_path(directory)
+
+        flush_now = False
+        with self._lock:
+            self.written += 1
+            if self.fsync == "batch":
+                self._pending.append(path)
+                flush_now = len(self._pending) >= self.batch_size
+        if flush_now:
+            self.flush()
+        return WRITTEN
+
+    def flush(self) -> None:
+        """
+        batch モードで未fsyncのファイルと、そのディレクトリをまとめてfsyncする
+
+        戻った時点で、それまでに write() が完了した全てのファイルのfsyncが完了している。
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            directories: Set[str] = set()
+            for path in pending:
+                with contextlib.suppress(OSError):
+                    _fsync_path(path)
+                directories.add(os.path.dirname(os.path.abspath(path)))
+            for directory in directories:
+                with contextlib.suppress(OSError):
+                    _fsync_path(directory)
+
+    def summary(self) -> str:
+        """書き込み件数と変更なし件数の要約文字列を返す"""
+        return f"書き込み {self.written} / 変更なし {self.unchanged}"
@@ -0,0 +1,74 @@
+"""
+ブロック単位の構文木のテスト
+"""
+
+from content_converter.core.blocks import (
+    BLANK,
+    CODE,
+    CONTAINER,
+    EMBED,
+    HEADING,
+    PARAGRAPH,
+    parse_blocks,
+    parse_document,
+)
+
+TEXT = """---
+title: タイトル
+topics:
+  - a
+---
+# 見出し
+
+本文
+続き
+
+```python:app.py
+# コメント
+:::message
+```
+
+::::details 詳細
+:::message
+入れ子
+:::
+::::
+@[youtube](abc)
+"""
+
+
+def test_parse_document_roundtrip():
+    """分解した文書を元のテキストに戻せることを確認"""
+    document = parse_document(TEXT)
+    assert document.metadata == {"title": "タイトル", "topics": ["a"]}
+    assert document.render() == TEXT
+
+
+def test_parse_blocks_kinds():
+    """コードブロック内の記法を解釈せず、ブロックの種類を判別することを確認"""
+    blocks = parse_document(TEXT).blocks
+    assert [b.kind for b in blocks] == [
+        HEADING, BLANK, PARAGRAPH, BLANK, CODE, BLANK, CONTAINER, EMBED,
+    ]
+    assert blocks[4].info == "python:app.py"
+    assert blocks[4].body == "# コメント\n:::message\n"
+    assert blocks[6].info == "details 詳細"
+    assert [b.kind for b in parse_blocks(blocks[6].body)] == [CONTAINER]
+    assert blocks[7].embed_target == "abc"
+
+
+def test_metadata_change_is_rendered():
+    """メタデータを変更するとフロントマターを書き直すことを確認"""
+    document = parse_document(TEXT)
+    document.metadata = {"title": "新しいタイトル", "hashtags": ["a", "b"]}
+    assert document.render().startswith(
+        "---\ntitle: 新しいタイトル\nhashtags:\n  - a\n  - b\n---\n# 見出し"
+    )
+
+
+def test_invalid_frontmatter_is_kept_as_text():
+    """YAMLとして解釈できないフロントマターは本文として残すことを確認"""
+    text = "---\n: [\n---\n本文\n"
+    document = parse_document(text)
+    assert document.metadata is None
+    assert document.render() == text
@@ -0,0 +1,66 @@
+"""
+SimHashフィンガープリントのテスト
+"""
+
+import random
+import time
+
+import pytest
+
+from content_converter.core.fingerprint import (
+    SimHashIndex,
+    hamming_distance,
+    max_distance_for,
+    simhash,
+)
+
+BASE = "これはSimHashのテスト用の文章です。技術記事のセクションを想定しています。" * 5
+
+
+def test_simhash_similar_texts_are_close():
+    """わずかな差分の文章は距離が小さく、無関係な文章は距離が大きいことを確認"""
+    edited = BASE.replace("想定", "前提", 1)
+    other = "まったく関係のない内容の段落で、料理のレシピについて説明しています。" * 5
+    assert hamming_distance(simhash(BASE), simhash(edited)) <= 3
+    assert hamming_distance(simhash(BASE), simhash(other)) > 10
+
+
+def test_simhash_ignores_whitespace_and_case():
+    """空白の違いと大文字小文字を無視することを確認"""
+    assert simhash("Hello   World\n") == simhash("hello world")
+
+
+def test_max_distance_for():
+    """類似度をハミング距離に換算することを確認"""
+    assert max_distance_for(1.0) == 0
+    assert max_distance_for(0.95) == 3
+    with pytest.raises(ValueError):
+        max_distance_for(1.5)
+
+
+def test_index_nearest_respects_threshold_and_namespace():
+    """しきい値と名前空間を考慮して最も近い値を返すことを確認"""
+    index: SimHashIndex[str] = SimHashIndex(max_distance=3)
+    index.add(0b1111, "near", namespace="a")
+    index.add(0, "exact", namespace="b")
+    assert index.nearest(0b0111, namespace="a") == (1, "near")
+    assert index.nearest(0, namespace="a") is None
+    assert index.nearest(0, namespace="b") == (0, "exact")
+
+
+def test_index_lookup_is_fast_with_many_entries():
+    """10万件登録してもルックアップが全件走査より十分速いことを確認"""
+    rng = random.Random(0)
+    index: SimHashIndex[int] = SimHashIndex(max_distance=3)
+    fingerprints = [rng.getrandbits(64) for _ in range(100_000)]
+    for i, fp in enumerate(fingerprints):
+        index.add(fp, i)
+
+    queries = [fp ^ (1 << rng.randrange(64)) for fp in fingerprints[:1000]]
+    start = time.perf_counter()
+    results = [index.nearest(q) for q in queries]
+    elapsed = time.perf_counter() - start
+
+    assert [r[1] for r in results] == list(range(1000))
+    # 1件あたり1ms未満（実測は数十μs程度）
+    assert elapsed < 1.0
@@ -0,0 +1,79 @@
+"""
+マスク処理のテスト
+"""
+
+import pytest
+
+from content_converter.core.masking import MaskedText, MaskingStats
+
+ARTICLE = """---
+title: t
+---
+# 手順
+
+詳しくは[公式サイト](https://example.com/docs)を参照してください。
+
+```python
+print("https://example.com/in-code")
+```
+
+| 列1 | 列2 |
+| --- | --- |
+| a | b |
+
+![図](img.png)
+
+@[youtube](abc)
+
+```python
+print("https://example.com/in-code")
+```
+"""
+
+
+def test_mask_replaces_protected_spans():
+    """コード・表・画像・埋め込み・URLが置き換えられ、同じ内容は同じプレースホルダーになることを確認"""
+    masked = MaskedText(ARTICLE)
+    assert masked.text.startswith("---\ntitle: t\n---\n# 手順\n")
+    assert "[公式サイト]([[M1]])" in masked.text
+    assert "print" not in masked.text
+    assert "| a | b |" not in masked.text
+    assert masked.text.count("[[M2]]") == 2
+    assert len(masked.placeholders) == 5
+    assert masked.tokens_saved > 0
+
+
+def test_restore_roundtrip():
+    """変更されなかった出力は元のテキストに戻ることを確認"""
+    masked = MaskedText(ARTICLE)
+    restored, report = masked.restore(masked.text)
+    assert restored == ARTICLE
+    assert not report.repaired
+
+
+def test_restore_repairs_dropped_duplicated_and_unknown():
+    """消えた・複製された・存在しないプレースホルダーを修復することを確認"""
+    masked = MaskedText("前\n\n```\ncode1\n```\n\n中\n\n```\ncode2\n```\n\n後\n")
+    output = "BEFORE\n\n[[M1]]\n\nMIDDLE [[M1]] [[M9]]\n\nAFTER\n"
+    restored, report = masked.restore(output)
+    assert (report.missing, report.duplicates, report.unknown) == (1, 1, 1)
+    assert restored == "BEFORE\n\n```\ncode1\n```\n\n```\ncode2\n```\n\nMIDDLE  \n\nAFTER\n"
+
+
+def test_mask_kinds():
+    """指定した種類だけをマスクすることを確認"""
+    masked = MaskedText(ARTICLE, kinds=["code"])
+    assert "https://example.com/docs" in masked.text
+    assert len(masked.placeholders) == 1
+    with pytest.raises(ValueError):
+        MaskedText(ARTICLE, kinds=["unknown"])
+
+
+def test_masking_stats():
+    """統計に削減トークン数と修復件数が集計されることを確認"""
+    stats = MaskingStats()
+    masked = MaskedText(ARTICLE)
+    stats.record(masked, masked.restore("")[1])
+    assert stats.documents == 1
+    assert stats.missing == 5
+    assert "削減した入力トークン" in stats.summary()
@@ -0,0 +1,48 @@
+"""
+プロンプト縮小のテスト
+"""
+
+from content_converter.core.minify import MinifyStats, minify
+
+
+def test_minify_collapses_whitespace_and_comments():
+    """空白・空行・HTMLコメントを取り除き、インラインコードは残すことを確認"""
+    text = "<!-- メモ -->\n# 見出し   です \t\n\n\n\n本文  です `a  <!-- b -->`\n- a\n  - b\n"
+    assert minify(text) == "# 見出し です\n\n本文 です `a  <!-- b -->`\n- a\n  - b\n"
+
+
+def test_minify_keeps_markdown_hard_breaks():
+    """行末の2つ以上の半角スペース（Markdownの改行）は2つにして残し、それ以外の行末空白は取り除くことを確認"""
+    text = "1行目  \n2行目    \n3行目 \n4行目\t\n5行目 \t  \n  \n"
+    assert minify(text) == "1行目  \n2行目  \n3行目\n4行目\n5行目  \n"
+
+
+def test_minify_never_touches_code_blocks():
+    """コードブロック内の空白・空行・コメントを変更しないことを確認"""
+    code = "```python\nx  =  1   \n\n\n# <!-- keep -->\n```\n"
+    text = "前\n\n\n" + code + "\n\n\n後\n"
+    assert minify(text) == "前\n\n" + code + "\n後\n"
+
+
+def test_minify_dedents_prompt():
+    """インデントされたプロンプトのインデントを取り除くことを確認"""
+    prompt = """
+        指示です。
+
+        # 入力
+        {{input}}
+        """
+    assert minify(prompt) == "指示です。\n\n# 入力\n{{input}}"
+
+
+def test_minify_remove_patterns():
+    """指定した正規表現に一致する部分を取り除くことを確認"""
+    assert minify("本文{#id}\n", remove_patterns=[r"\{#[^}]*\}"]) == "本文\n"
+
+
+def test_minify_stats():
+    """前後の推定トークン数を集計することを確認"""
+    stats = MinifyStats()
+    stats.record(["a" * 40], ["a" * 20])
+    assert (stats.tokens_before, stats.tokens_after) == (10, 5)
+    assert "50.0%" in stats.summary()
@@ -0,0 +1,26 @@
+"""
+セクション分割のテスト
+"""
+
+from content_converter.core.sections import join_sections, split_sections
+
+
+def test_split_sections_roundtrip():
+    """分割したセクションを連結すると元のテキストに戻ることを確認"""
+    text = "---\ntitle: x\n# comment\n---\n\n前文\n\n# A\n\nbody\n\n## B\n\n```\n# not heading\n```\n\n# C\n"
+    sections = split_sections(text)
+    assert "".join(s.text for s in sections) == text
+    assert [s.heading_path for s in sections] == [(), ("A",), ("A", "B"), ("C",)]
+
+
+def test_section_key_and_hash():
+    """キーが見出しパスの連結で、ハッシュが本文に依存することを確認"""
+    first, second = split_sections("# A\n\n## B\nx\n")
+    assert second.key == "A > B"
+    assert first.content_hash != second.content_hash
+
+
+def test_join_sections():
+    """空のセクションを除き空行1つで連結することを確認"""
+    assert join_sections(["# A\n\n", "\n", "# B\nx\n"]) == "# A\n\n# B\nx\n"
+    assert join_sections([]) == ""
@@ -0,0 +1,20 @@
+"""
+トークン概算のテスト
+"""
+
+from content_converter.core.tokens import estimate_tokens
+
+
+def test_estimate_tokens_empty():
+    """空文字列は0トークン"""
+    assert estimate_tokens("") == 0
+
+
+def test_estimate_tokens_ascii():
+    """ASCII文字は約4文字で1トークン"""
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_estimate_tokens_japanese():
+    """日本語は1文字で約1トークン"""
+    assert estimate_tokens("日本語abcd") == 4
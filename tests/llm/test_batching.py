@@ -0,0 +1,79 @@
+"""Tests for MicroBatchingProvider."""
+import re
+import threading
+from unittest.mock import MagicMock
+
+from content_converter.llm.batching import MicroBatchingProvider, split_summaries
+
+
+def _summarize_all(messages, options=None):
+    """Answer a batched request with one delimited summary per content."""
+    indexes = re.findall(r"^=====CONTENT: (\d+)=====$", messages[-1]["content"], re.MULTILINE)
+    return "\n".join(f"=====SUMMARY: {i}=====\nsummary {i}" for i in indexes)
+
+
+def _run_concurrently(provider, contents):
+    results = [None] * len(contents)
+    barrier = threading.Barrier(len(contents))
+
+    def run(index):
+        barrier.wait()
+        results[index] = provider.generate_summary(contents[index], max_length=50)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(contents))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_split_summaries_ignores_unknown_and_duplicate_markers():
+    response = "preamble\n=====SUMMARY: 2=====\nb\n=====SUMMARY: 9=====\nx\n=====SUMMARY: 1=====\na\n=====SUMMARY: 2=====\nc"
+    assert split_summaries(response, 2) == {0: "a", 1: "b"}
+
+
+class TestMicroBatchingProvider:
+    """Test suite for MicroBatchingProvider."""
+
+    def test_concurrent_summaries_share_one_request(self):
+        inner = MagicMock()
+        inner.chat.side_effect = _summarize_all
+        provider = MicroBatchingProvider(inner, max_batch_size=8, linger_seconds=1.0)
+
+        results = _run_concurrently(provider, [f"doc {i}" for i in range(8)])
+
+        assert inner.chat.call_count == 1
+        inner.generate_summary.assert_not_called()
+        messages = inner.chat.call_args.args[0]
+        assert "8件" in messages[0]["content"] and "50文字以内" in messages[0]["content"]
+        # Each caller gets the summary of its own content back.
+        numbers = dict(
+            (content, number)
+            for number, content in re.findall(r"^=====CONTENT: (\d+)=====\n(.*)$", messages[-1]["content"], re.MULTILINE)
+        )
+        assert results == [f"summary {numbers[f'doc {i}']}" for i in range(8)]
+        assert provider.stats.requests == 1 and provider.stats.batched == 8
+
+    def test_unparsed_summaries_fall_back_to_individual_calls(self):
+        inner = MagicMock()
+        inner.chat.return_value = "=====SUMMARY: 1=====\nonly the first"
+        inner.generate_summary.side_effect = lambda content, max_length: f"single {content}"
+        provider = MicroBatchingProvider(inner, max_batch_size=3, linger_seconds=1.0)
+
+        results = _run_concurrently(provider, ["a", "b", "c"])
+
+        assert sorted(results).count("only the first") == 1
+        assert inner.generate_summary.call_count == 2
+        assert provider.stats.fallbacks == 2 and provider.stats.batched == 1
+
+    def test_failed_batch_and_large_content_are_sent_individually(self):
+        inner = MagicMock()
+        inner.chat.side_effect = RuntimeError("bad gateway")
+        inner.generate_summary.return_value = "single"
+        provider = MicroBatchingProvider(inner, max_batch_tokens=100, max_batch_size=2, linger_seconds=1.0)
+
+        assert _run_concurrently(provider, ["a", "b"]) == ["single", "single"]
+        assert provider.generate_summary("x" * 400) == "single"
+        assert inner.chat.call_count == 1
+        assert provider.stats.fallbacks == 2 and provider.stats.individual == 1
@@ -0,0 +1,105 @@
+"""Tests for the record/replay providers."""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from content_converter.converter import ContentConverter
+from content_converter.llm.base import LLMProvider
+from content_converter.llm.cassette import (
+    Cassette,
+    CassetteMissError,
+    RecordingProvider,
+    ReplayProvider,
+)
+from content_converter.llm.key_pool import KeyPoolProvider
+
+
+def _inner():
+    inner = MagicMock()
+    inner.usage_totals = {}
+
+    def respond(text):
+        LLMProvider.record_usage(inner, 12, 5, 0)
+        return text
+
+    def chat(messages, options=None):
+        time.sleep(0.05)
+        return respond(f"converted {len(messages)}")
+
+    inner.chat.side_effect = chat
+    inner.optimize_content.side_effect = lambda content, options=None: respond(f"optimized {len(content)}")
+    inner.generate_summary.side_effect = lambda content, max_length=100: respond("summary")
+    return inner
+
+
+class _SizedProvider(LLMProvider):
+    """Reports the content length as prompt tokens after a random delay."""
+
+    def optimize_content(self, content, options=None):
+        time.sleep(random.uniform(0, 0.02))
+        self.record_usage(len(content), 1)
+        return content.upper()
+
+    def generate_summary(self, content, max_length=100):
+        return self.optimize_content(content)[:max_length]
+
+
+class TestRecordReplay:
+    """Test suite for RecordingProvider and ReplayProvider."""
+
+    def test_replay_serves_recorded_pipeline_responses(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl.gz")
+        recorder = RecordingProvider(_inner(), Cassette(path))
+        recorded = ContentConverter(llm_provider=recorder).convert("# 本文", "TEMPLATE")
+        assert recorded.startswith("optimized")
+        assert recorder.generate_summary("本文", max_length=50) == "summary"
+        assert recorder.recorded == 2
+
+        replay = ReplayProvider(Cassette(path))
+        converter = ContentConverter(llm_provider=replay)
+        assert converter.convert("# 本文", "TEMPLATE") == recorded
+        assert replay.generate_summary("本文", max_length=50) == "summary"
+        assert replay.usage_totals["prompt_tokens"] == 24
+        assert replay.hits == 2 and replay.misses == []
+
+    def test_max_tokens_is_not_part_of_the_fingerprint(self):
+        cassette = Cassette()
+        RecordingProvider(_inner(), cassette).chat([{"role": "user", "content": "a"}], {"max_tokens": 100})
+        replay = ReplayProvider(cassette)
+        assert replay.chat([{"role": "user", "content": "a"}], {"max_tokens": 900}) == "converted 1"
+
+    def test_miss_is_reported_with_the_request(self):
+        replay = ReplayProvider(Cassette())
+        with pytest.raises(CassetteMissError, match="optimize_content .*新しい本文"):
+            replay.optimize_content("新しい本文")
+        assert len(replay.misses) == 1
+        assert "記録なし 1件" in replay.summary()
+
+    def test_recorded_latency_is_reproduced(self):
+        cassette = Cassette()
+        RecordingProvider(_inner(), cassette).chat([{"role": "user", "content": "a"}])
+        messages = [{"role": "user", "content": "a"}]
+
+        start = time.monotonic()
+        ReplayProvider(cassette).chat(messages)
+        instant = time.monotonic() - start
+        start = time.monotonic()
+        ReplayProvider(cassette, latency="recorded").chat(messages)
+        assert instant < 0.02 <= time.monotonic() - start
+
+    def test_usage_is_captured_per_call_through_wrapped_providers(self):
+        cassette = Cassette()
+        pool = KeyPoolProvider(lambda key: _SizedProvider(), ["key-a", "key-b"])
+        recorder = RecordingProvider(pool, cassette)
+        contents = ["x" * n for n in range(1, 25)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(recorder.optimize_content, contents))
+
+        recordings = [r for rs in cassette.recordings.values() for r in rs]
+        assert len(recordings) == len(contents)
+        for recording in recordings:
+            assert recording.usage["prompt_tokens"] == len(recording.response)
+        assert recorder.usage_totals["prompt_tokens"] == sum(map(len, contents))
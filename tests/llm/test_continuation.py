@@ -0,0 +1,47 @@
+"""
+途切れた出力の続きの生成のテスト
+"""
+
+from content_converter.llm.continuation import generate_with_continuations, stitch
+
+
+class TestStitch:
+    """stitchのテスト"""
+
+    def test_removes_repeated_overlap(self):
+        """続きの先頭が途切れた出力の末尾を繰り返している場合は重複を取り除くことを確認"""
+        assert stitch("## 見出し\n本文の途中まで書い", "本文の途中まで書いた続きです") == "## 見出し\n本文の途中まで書いた続きです"
+
+    def test_short_accidental_match_is_kept(self):
+        """短い一致は重複とみなさずそのまま連結することを確認"""
+        assert stitch("line one\n", "\nline two") == "line one\n\nline two"
+
+    def test_plain_concatenation(self):
+        """重複がない場合はそのまま連結することを確認"""
+        assert stitch("前半の文章", "後半の文章") == "前半の文章後半の文章"
+
+
+class TestGenerateWithContinuations:
+    """generate_with_continuationsのテスト"""
+
+    def test_continues_until_not_truncated(self):
+        """途切れている間は途切れた出力を会話に含めて続きを求めることを確認"""
+        responses = iter([("part one ", True), ("part two ", True), ("end", False)])
+        requests = []
+
+        def generate(turns):
+            requests.append(turns)
+            return next(responses)
+
+        text, count, truncated = generate_with_continuations(generate, max_continuations=5)
+
+        assert text == "part one part two end"
+        assert (count, truncated) == (2, False)
+        assert requests[0] == []
+        assert requests[2][0] == {"role": "assistant", "content": "part one part two "}
+        assert requests[2][1]["role"] == "user"
+
+    def test_keeps_generated_text_when_limit_reached(self):
+        """上限回数に達しても生成済みのテキストは捨てずに返すことを確認"""
+        text, count, truncated = generate_with_continuations(lambda turns: ("x", True), 2)
+        assert (text, count, truncated) == ("xxx", 2, True)
@@ -0,0 +1,128 @@
+"""Tests for the circuit breaker and FallbackProvider."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from content_converter.deadline import Cancelled
+from content_converter.factory import LLMProviderFactory
+from content_converter.llm.fallback import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    FallbackProvider,
+    ProvidersUnavailableError,
+)
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic breaker tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+
+    def test_opens_on_error_rate_and_recovers_after_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("gemini", error_rate=0.5, min_calls=4, open_seconds=30, clock=clock)
+
+        for failed in (False, True, False, True):
+            assert breaker.allow()
+            breaker.record(0.1, failed)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+        clock.now += 30
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        # Only one trial request is let through while half-open
+        assert not breaker.allow()
+        breaker.record(0.1, failed=False)
+
+        assert breaker.state == CLOSED
+        assert breaker.transitions == {CLOSED: 1, OPEN: 1, HALF_OPEN: 1}
+        assert breaker.rejected == 2
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker("slow", min_calls=2, slow_call_seconds=5.0)
+        breaker.record(6.0, failed=False)
+        breaker.record(7.0, failed=False)
+        assert breaker.state == OPEN
+        assert breaker.slow_calls == 2
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("x", min_calls=1, open_seconds=10, clock=clock)
+        breaker.record(0.1, failed=True)
+        clock.now += 10
+        assert breaker.allow()
+        breaker.record(0.1, failed=True)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+
+class TestFallbackProvider:
+    """Test suite for FallbackProvider."""
+
+    def test_fails_over_and_skips_open_breaker(self):
+        primary, secondary = MagicMock(), MagicMock()
+        primary.optimize_content.side_effect = RuntimeError("503 overloaded")
+        secondary.optimize_content.return_value = "from secondary"
+        provider = FallbackProvider(
+            [("gemini:flash", primary), ("openrouter:claude", secondary)], min_calls=2
+        )
+
+        assert provider.optimize_content("a", options={"model": "flash"}) == "from secondary"
+        assert provider.optimize_content("b") == "from secondary"
+        # The primary breaker is now open, so the next job fails over without calling it
+        assert provider.optimize_content("c") == "from secondary"
+
+        assert primary.optimize_content.call_count == 2
+        assert provider.breakers[0].state == OPEN
+        assert provider.failovers == 3
+        # Each provider keeps its own model
+        assert secondary.optimize_content.call_args_list[0].kwargs["options"] == {}
+        assert "gemini:flash: open" in provider.summary()
+
+    def test_raises_when_all_providers_fail(self):
+        primary, secondary = MagicMock(), MagicMock()
+        primary.generate_summary.side_effect = RuntimeError("down")
+        secondary.generate_summary.side_effect = RuntimeError("also down")
+        provider = FallbackProvider([("a", primary), ("b", secondary)])
+
+        with pytest.raises(ProvidersUnavailableError, match="a: down / b: also down"):
+            provider.generate_summary("text")
+
+    def test_cancellation_is_not_counted_as_failure(self):
+        primary, secondary = MagicMock(), MagicMock()
+        primary.chat.side_effect = Cancelled()
+        provider = FallbackProvider([("a", primary), ("b", secondary)], min_calls=1)
+
+        with pytest.raises(Cancelled):
+            provider.chat([{"role": "user", "content": "x"}])
+        assert provider.breakers[0].state == CLOSED
+        secondary.chat.assert_not_called()
+
+
+def test_factory_builds_named_chain(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "or-key")
+    provider = LLMProviderFactory.create_fallback(
+        [
+            {"provider_type": "openrouter", "model": "anthropic/claude-3.5-sonnet"},
+            {"provider_type": "openai-compatible", "model": "local-model"},
+        ],
+        {"open_seconds": 5},
+    )
+
+    assert isinstance(provider, FallbackProvider)
+    assert [b.name for b in provider.breakers] == [
+        "openrouter:anthropic/claude-3.5-sonnet",
+        "openai-compatible:local-model",
+    ]
+    assert provider.breakers[1].open_seconds == 5
@@ -24,7 +24,9 @@ class TestGeminiProvider:
 
         # Assert
         assert provider.api_key == "test_api_key"
-        mock_configure.assert_called_once_with(api_key="test_api_key")
+        # グローバル設定は変更せず、インスタンス専用のクライアントを使う
+        mock_configure.assert_not_called()
+        assert mock_model._client is provider.client
         mock_gen_model.assert_called_once_with('gemini-2.5-flash')
 
     @patch('google.generativeai.configure')
@@ -39,7 +41,8 @@ class TestGeminiProvider:
         provider = GeminiProvider(api_key="direct_key")
         # Assert
         assert provider.api_key == "direct_key"
-        mock_configure.assert_called_once_with(api_key="direct_key")
+        mock_configure.assert_not_called()
+        assert mock_model._client is provider.client
     
     def test_init_without_api_key(self):
         """Test initialization without API key raises ValueError."""
@@ -138,3 +141,91 @@ class TestGeminiProvider:
         # Act & Assert
         with pytest.raises(google_exceptions.GoogleAPIError, match="API error"):
             provider.optimize_content("Test content")
+
+
+class TestGeminiChat:
+    """Test suite for GeminiProvider.chat and context caching."""
+
+    MESSAGES = [
+        {"role": "system", "content": "Convert the input."},
+        {"role": "user", "content": "TEMPLATE " * 10, "cache": True},
+        {"role": "user", "content": "variable input"},
+    ]
+
+    @patch('google.generativeai.GenerativeModel')
+    def test_chat_small_prefix_uses_system_instruction(self, mock_gen_model):
+        """Short prefixes are sent first in the request instead of an explicit cache."""
+        mock_model = MagicMock()
+        mock_response = MagicMock()
+        mock_response.text = "converted"
+        mock_response.usage_metadata.prompt_token_count = 120
+        mock_response.usage_metadata.candidates_token_count = 30
+        mock_response.usage_metadata.cached_content_token_count = 100
+        mock_model.generate_content.return_value = mock_response
+        mock_gen_model.return_value = mock_model
+        provider = GeminiProvider(api_key="test_key")
+
+        result = provider.chat(self.MESSAGES)
+
+        assert result == "converted"
+        mock_gen_model.assert_called_with("gemini-2.5-flash", system_instruction="Convert the input.")
+        contents = mock_model.generate_content.call_args[0][0]
+        assert contents[0]["parts"] == ["TEMPLATE " * 10, "variable input"]
+        assert provider.last_usage == {"prompt_tokens": 120, "completion_tokens": 30, "cached_tokens": 100}
+
+    @patch('google.generativeai.GenerativeModel')
+    def test_chat_large_prefix_uses_context_cache(self, mock_gen_model):
+        """Long prefixes are stored once in a context cache and reused."""
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = "converted"
+        mock_gen_model.return_value = mock_model
+        provider = GeminiProvider(api_key="test_key", cache_min_tokens=1)
+        cache_client = MagicMock()
+        cache_client.create_cached_content.return_value.name = "cachedContents/abc"
+        provider._cache_client = cache_client
+
+        provider.chat(self.MESSAGES)
+        provider.chat(self.MESSAGES)
+
+        cache_client.create_cached_content.assert_called_once()
+        assert mock_model._cached_content == "cachedContents/abc"
+        contents = mock_model.generate_content.call_args[0][0]
+        assert contents[0]["parts"] == ["variable input"]
+
+    @patch('google.generativeai.GenerativeModel')
+    def test_chat_cache_creation_failure_falls_back(self, mock_gen_model):
+        """A failed cache creation falls back to sending the full prefix."""
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = "converted"
+        mock_gen_model.return_value = mock_model
+        provider = GeminiProvider(api_key="test_key", cache_min_tokens=1)
+        cache_client = MagicMock()
+        cache_client.create_cached_content.side_effect = google_exceptions.InvalidArgument("too small")
+        provider._cache_client = cache_client
+
+        assert provider.chat(self.MESSAGES) == "converted"
+        provider.chat(self.MESSAGES)
+
+        cache_client.create_cached_content.assert_called_once()
+        contents = mock_model.generate_content.call_args[0][0]
+        assert contents[0]["parts"][-1] == "variable input"
+        assert len(contents[0]["parts"]) == 2
+
+
+@patch('google.generativeai.GenerativeModel')
+def test_max_tokens_response_is_continued(mock_gen_model):
+    """Responses stopped by MAX_TOKENS are continued with the partial output as a model turn."""
+    truncated, finished = MagicMock(), MagicMock()
+    truncated.text = "first half, "
+    truncated.candidates[0].finish_reason.name = "MAX_TOKENS"
+    finished.text = "second half"
+    finished.candidates[0].finish_reason.name = "STOP"
+    mock_model = MagicMock()
+    mock_model.generate_content.side_effect = [truncated, finished]
+    mock_gen_model.return_value = mock_model
+    provider = GeminiProvider(api_key="test_key")
+
+    assert provider.optimize_content("Test content") == "first half, second half"
+    contents = mock_model.generate_content.call_args[0][0]
+    assert contents[1] == {"role": "model", "parts": ["first half, "]}
+    assert contents[2]["role"] == "user"
@@ -0,0 +1,189 @@
+"""Tests for the API key pool and KeyPoolProvider."""
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from content_converter.converter import ContentConverter
+from content_converter.factory import LLMProviderFactory
+from content_converter.llm.key_pool import (
+    APIKeyPool,
+    KeyPoolProvider,
+    KeyState,
+    is_rate_limit_error,
+)
+from content_converter.stages import prepare_request
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic pool tests."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _rate_limit_error(retry_after=None):
+    response = MagicMock()
+    response.status_code = 429
+    response.headers = {"Retry-After": retry_after} if retry_after else {}
+    return requests.HTTPError("429 Too Many Requests", response=response)
+
+
+class TestIsRateLimitError:
+    """Test suite for is_rate_limit_error."""
+
+    def test_http_429(self):
+        assert is_rate_limit_error(_rate_limit_error())
+
+    def test_google_resource_exhausted(self):
+        from google.api_core import exceptions as google_exceptions
+
+        assert is_rate_limit_error(google_exceptions.ResourceExhausted("Quota exceeded"))
+
+    def test_other_error(self):
+        assert not is_rate_limit_error(ValueError("bad request"))
+
+    def test_status_code_takes_precedence_over_message(self):
+        response = MagicMock()
+        response.status_code = 400
+        error = requests.HTTPError("invalid quota field: 429", response=response)
+
+        assert not is_rate_limit_error(error)
+        assert is_rate_limit_error(RuntimeError("Quota exceeded for requests per minute"))
+
+
+class TestAPIKeyPool:
+    """Test suite for APIKeyPool."""
+
+    def test_spreads_requests_across_keys(self):
+        clock = FakeClock()
+        pool = APIKeyPool([KeyState("key-a", MagicMock()), KeyState("key-b", MagicMock())], clock=clock)
+
+        first = pool.acquire()
+        clock.now += 1
+        second = pool.acquire()
+
+        assert first.key != second.key
+
+    def test_rate_limited_key_cools_down(self):
+        clock = FakeClock()
+        pool = APIKeyPool(
+            [KeyState("key-a", MagicMock()), KeyState("key-b", MagicMock())],
+            cooldown_seconds=30,
+            clock=clock,
+        )
+        state = pool.acquire()
+        pool.release(state, _rate_limit_error())
+
+        for _ in range(3):
+            clock.now += 1
+            other = pool.acquire()
+            assert other.key != state.key
+            pool.release(other)
+
+        clock.now += 30
+        assert any(pool.acquire().key == state.key for _ in range(2))
+
+    def test_retry_after_header_overrides_cooldown(self):
+        clock = FakeClock()
+        pool = APIKeyPool([KeyState("key-a", MagicMock())], cooldown_seconds=60, clock=clock)
+        state = pool.acquire()
+        pool.release(state, _rate_limit_error(retry_after="5"))
+        assert state.cooldown_until == clock.now + 5
+
+    def test_requests_per_minute_limit(self):
+        clock = FakeClock()
+        pool = APIKeyPool([KeyState("key-a", MagicMock())], requests_per_minute=2, clock=clock)
+        pool.release(pool.acquire())
+        pool.release(pool.acquire())
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0)
+
+        clock.now += 60
+        assert pool.acquire().key == "key-a"
+
+    def test_stats_masks_keys(self):
+        pool = APIKeyPool([KeyState("secret-key-1234", MagicMock())])
+        pool.release(pool.acquire())
+        stats = pool.stats()
+        assert stats[0]["key"] == "...1234"
+        assert stats[0]["requests"] == 1
+
+    def test_empty_pool(self):
+        with pytest.raises(ValueError):
+            APIKeyPool([])
+
+
+class TestKeyPoolProvider:
+    """Test suite for KeyPoolProvider."""
+
+    def _make_provider(self, behaviours):
+        providers = {}
+
+        def factory(key):
+            provider = MagicMock()
+            provider.optimize_content.side_effect = behaviours[key]
+            provider.generate_summary.return_value = f"summary from {key}"
+            providers[key] = provider
+            return provider
+
+        return KeyPoolProvider(factory, list(behaviours)), providers
+
+    def test_each_key_gets_its_own_provider(self):
+        pool_provider, providers = self._make_provider({"key-a": ["a"], "key-b": ["b"]})
+        assert set(providers) == {"key-a", "key-b"}
+        assert providers["key-a"] is not providers["key-b"]
+        assert pool_provider.generate_summary("text", max_length=10).startswith("summary from")
+
+    def test_fails_over_on_rate_limit(self):
+        pool_provider, providers = self._make_provider(
+            {"key-a": [_rate_limit_error()], "key-b": ["from b"]}
+        )
+        assert pool_provider.optimize_content("text") == "from b"
+        states = {s.key: s for s in pool_provider.pool.states}
+        assert states["key-a"].cooldown_until > 0
+
+    def test_non_rate_limit_error_is_raised(self):
+        pool_provider, _ = self._make_provider(
+            {"key-a": [ValueError("boom")], "key-b": [ValueError("boom")]}
+        )
+        with pytest.raises(ValueError, match="boom"):
+            pool_provider.optimize_content("text")
+
+    def test_usage_is_summed_across_keys(self):
+        pool_provider, providers = self._make_provider({"key-a": ["a"], "key-b": ["b"]})
+        providers["key-a"].usage_totals = {"prompt_tokens": 10, "completion_tokens": 2}
+        providers["key-b"].usage_totals = {"prompt_tokens": 5, "cached_tokens": 3}
+        providers["key-a"].continuations, providers["key-b"].continuations = 1, 2
+        providers["key-a"].truncated_outputs, providers["key-b"].truncated_outputs = 0, 1
+
+        assert pool_provider.usage_totals == {"prompt_tokens": 15, "completion_tokens": 2, "cached_tokens": 3}
+        assert (pool_provider.continuations, pool_provider.truncated_outputs) == (3, 1)
+
+    def test_chat_is_forwarded_with_prompt_cache(self):
+        pool_provider, providers = self._make_provider({"key-a": ["a"], "key-b": ["b"]})
+        for key, provider in providers.items():
+            provider.chat.return_value = f"chat from {key}"
+        converter = ContentConverter(llm_provider=pool_provider, config={"prompt_cache": True})
+
+        prepared = prepare_request("本文", None, converter.stage_settings)
+        assert converter.send_prepared(prepared, "TEMPLATE").startswith("chat from")
+
+        calls = [c for p in providers.values() for c in p.chat.call_args_list]
+        assert len(calls) == 1
+        messages = calls[0].args[0]
+        assert isinstance(messages, list) and any(m.get("cache") for m in messages)
+        assert all(not p.optimize_content.called for p in providers.values())
+
+    def test_factory_creates_pool_for_multiple_keys(self, monkeypatch):
+        created = []
+        monkeypatch.setattr(
+            "content_converter.factory.OpenRouterProvider",
+            lambda api_key, model: created.append(api_key) or MagicMock(),
+        )
+        provider = LLMProviderFactory.create("openrouter", api_key=["k1", "k2"])
+        assert isinstance(provider, KeyPoolProvider)
+        assert created == ["k1", "k2"]
@@ -0,0 +1,126 @@
+"""Tests for the OpenAICompatibleProvider class."""
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from content_converter.factory import LLMProviderFactory
+from content_converter.llm.openai_compatible import (
+    DEFAULT_BASE_URL,
+    OpenAICompatibleProvider,
+    iter_sse_data,
+)
+
+
+def _response(content="local response", usage=None):
+    response = MagicMock()
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "usage": usage or {"prompt_tokens": 10, "completion_tokens": 3},
+    }
+    return response
+
+
+class TestOpenAICompatibleProvider:
+    """Test suite for OpenAICompatibleProvider."""
+
+    def test_init_defaults_without_api_key(self, monkeypatch):
+        """API key is optional and the llama.cpp endpoint is the default."""
+        for name in ("OPENAI_COMPATIBLE_API_KEY", "OPENAI_COMPATIBLE_BASE_URL", "OPENAI_COMPATIBLE_MODEL"):
+            monkeypatch.delenv(name, raising=False)
+        provider = OpenAICompatibleProvider()
+        assert provider.api_base == DEFAULT_BASE_URL
+        assert "Authorization" not in provider.headers
+
+    def test_optimize_content_uses_pooled_session(self):
+        """Requests go through the shared session to the configured base URL."""
+        provider = OpenAICompatibleProvider(
+            api_key="k", model="qwen", base_url="http://127.0.0.1:11434/v1/",
+            extra_body={"cache_prompt": True},
+        )
+        with patch.object(provider.session, "post", return_value=_response()) as mock_post:
+            result = provider.optimize_content("Test content", {"max_tokens": 64})
+
+        assert result == "local response"
+        url = mock_post.call_args[0][0]
+        payload = mock_post.call_args[1]["json"]
+        assert url == "http://127.0.0.1:11434/v1/chat/completions"
+        assert payload["model"] == "qwen"
+        assert payload["max_tokens"] == 64
+        assert payload["cache_prompt"] is True
+        assert "Test content" in payload["messages"][0]["content"]
+        assert mock_post.call_args[1]["headers"]["Authorization"] == "Bearer k"
+        assert provider.last_usage["prompt_tokens"] == 10
+
+    def test_streaming(self):
+        """Streamed deltas are concatenated and the final usage chunk is recorded."""
+        chunks = [
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}},
+        ]
+        response = MagicMock()
+        response.iter_lines.return_value = [
+            b"", *[f"data: {json.dumps(c)}".encode() for c in chunks], b"data: [DONE]",
+        ]
+        tokens = []
+        provider = OpenAICompatibleProvider(stream=True, on_token=tokens.append)
+        with patch.object(provider.session, "post", return_value=response) as mock_post:
+            result = provider.chat([{"role": "user", "content": "hi"}])
+
+        assert result == "Hello"
+        assert tokens == ["Hel", "lo"]
+        assert mock_post.call_args[1]["json"]["stream"] is True
+        assert provider.last_usage["completion_tokens"] == 2
+
+    def test_parallel_limits_concurrent_requests(self):
+        """No more than `parallel` requests are in flight at once."""
+        provider = OpenAICompatibleProvider(parallel=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_post(*args, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return _response()
+
+        with patch.object(provider.session, "post", side_effect=slow_post):
+            threads = [threading.Thread(target=provider.generate_summary, args=("x",)) for _ in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert max(peak) == 2
+
+    def test_http_error(self):
+        """HTTP errors are raised to the caller."""
+        provider = OpenAICompatibleProvider()
+        response = _response()
+        response.raise_for_status.side_effect = RuntimeError("503")
+        with patch.object(provider.session, "post", return_value=response):
+            with pytest.raises(RuntimeError):
+                provider.optimize_content("x")
+
+
+def test_iter_sse_data_ignores_comments():
+    """Non-data lines such as keep-alive comments are skipped."""
+    lines = [b": keep-alive", b'data: {"a": 1}', b"data: [DONE]", b'data: {"a": 2}']
+    assert list(iter_sse_data(lines)) == [{"a": 1}]
+
+
+def test_factory_creates_provider_without_key():
+    """The factory accepts provider options and no API key."""
+    provider = LLMProviderFactory.create(
+        "openai-compatible", None, "llama", provider_options={"base_url": "http://box:8000/v1"}
+    )
+    assert isinstance(provider, OpenAICompatibleProvider)
+    assert provider.api_base == "http://box:8000/v1"
+    assert provider.model == "llama"
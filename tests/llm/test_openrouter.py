@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch, ANY
 import requests
 from requests.exceptions import HTTPError
 
+from content_converter.deadline import Deadline, DeadlineExceeded, deadline_scope
 from content_converter.llm.openrouter import OpenRouterProvider
 
 
@@ -154,3 +155,92 @@ class TestOpenRouterProvider:
         # Act & Assert
         with pytest.raises(KeyError):
             provider.optimize_content("Test content")
+
+    @patch('requests.post')
+    def test_chat_adds_cache_control_for_anthropic(self, mock_post):
+        """Test that the cacheable prefix is marked with cache_control."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [{"message": {"content": "converted"}}],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 20,
+                      "prompt_tokens_details": {"cached_tokens": 450}},
+        }
+        mock_post.return_value = mock_response
+        provider = OpenRouterProvider(api_key="test_key")
+
+        result = provider.chat([
+            {"role": "system", "content": "instructions"},
+            {"role": "user", "content": "template", "cache": True},
+            {"role": "user", "content": "input"},
+        ])
+
+        assert result == "converted"
+        messages = mock_post.call_args[1]["json"]["messages"]
+        assert messages[0]["content"] == "instructions"
+        assert messages[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert messages[2]["content"] == "input"
+        assert provider.last_usage["cached_tokens"] == 450
+
+    @patch('requests.post')
+    def test_chat_without_cache_control_for_other_models(self, mock_post):
+        """Test that plain messages are sent for automatically cached models."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"choices": [{"message": {"content": "converted"}}]}
+        mock_post.return_value = mock_response
+        provider = OpenRouterProvider(api_key="test_key", model="openai/gpt-4o-mini")
+
+        provider.chat([
+            {"role": "user", "content": "template", "cache": True},
+            {"role": "user", "content": "input"},
+        ])
+
+        messages = mock_post.call_args[1]["json"]["messages"]
+        assert messages == [
+            {"role": "user", "content": "template"},
+            {"role": "user", "content": "input"},
+        ]
+
+
+def test_api_base_is_configurable():
+    """Test that the API base URL can be overridden."""
+    provider = OpenRouterProvider(api_key="k", api_base="http://proxy.local/v1/")
+    assert provider.api_base == "http://proxy.local/v1"
+
+
+@patch('requests.post')
+def test_truncated_output_is_continued(mock_post):
+    """Test that a response cut off by max_tokens is continued and stitched together."""
+    first, second = MagicMock(), MagicMock()
+    first.json.return_value = {"choices": [{"message": {"content": "Hello wor"}, "finish_reason": "length"}]}
+    second.json.return_value = {"choices": [{"message": {"content": "world!"}, "finish_reason": "stop"}]}
+    mock_post.side_effect = [first, second]
+    provider = OpenRouterProvider(api_key="k")
+
+    result = provider.optimize_content("content", options={"max_continuations": 2})
+
+    assert result == "Hello worworld!"
+    messages = mock_post.call_args[1]["json"]["messages"]
+    assert messages[1] == {"role": "assistant", "content": "Hello wor"}
+    assert messages[2]["role"] == "user"
+    assert provider.continuations == 1
+
+
+@patch('requests.post')
+def test_request_timeout_follows_job_deadline(mock_post):
+    """Test that requests carry a timeout capped by the job deadline and stop once it has passed."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"choices": [{"message": {"content": "ok"}}]}
+    mock_post.return_value = mock_response
+    provider = OpenRouterProvider(api_key="k", timeout=120)
+
+    provider.optimize_content("content")
+    assert mock_post.call_args[1]["timeout"] == 120
+
+    with deadline_scope(Deadline(5)):
+        provider.optimize_content("content")
+    assert mock_post.call_args[1]["timeout"] <= 5
+
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(DeadlineExceeded):
+            provider.optimize_content("content")
+    assert mock_post.call_count == 2
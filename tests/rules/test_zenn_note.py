@@ -0,0 +1,70 @@
+"""
+Zennからnoteへの変換ルールのテスト
+"""
+
+from pathlib import Path
+
+import pytest
+
+from content_converter.core.blocks import Document, parse_document
+from content_converter.rules import RULESETS, Rule, RuleEngine, register_ruleset
+
+EXAMPLES = Path(__file__).resolve().parents[2] / "examples"
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine.from_name("zenn-to-note")
+
+
+def test_sample_article_matches_note_example(engine):
+    """サンプル記事がnote用のサンプルと同じ内容に変換されることを確認"""
+    zenn = (EXAMPLES / "sample_article_zenn.md").read_text(encoding="utf-8")
+    note = (EXAMPLES / "sample_article_note.md").read_text(encoding="utf-8")
+    assert engine.apply(zenn) == note
+
+
+def test_frontmatter(engine):
+    """フロントマターのキーの変換を確認"""
+    text = "---\ntitle: t\nemoji: 🐍\ntype: idea\ntopics: python\npublished: true\n---\n本文\n"
+    metadata = parse_document(engine.apply(text)).metadata
+    assert metadata == {"title": "t", "hashtags": ["python"], "status": "draft"}
+
+
+def test_containers(engine):
+    """:::message と :::details の変換を確認"""
+    text = ":::message alert\n危険\n:::\n\n:::details 補足\n中身\n:::\n"
+    assert engine.apply(text) == "> **注意**\n>\n> 危険\n\n**補足**\n\n中身\n"
+
+
+def test_embeds(engine):
+    """埋め込みが単独行のURLになり、変換できないものは残ることを確認"""
+    text = "@[youtube](abc)\n@[card](https://example.com)\n@[speakerdeck](123)\n"
+    assert engine.apply(text) == (
+        "https://www.youtube.com/watch?v=abc\nhttps://example.com\n@[speakerdeck](123)\n"
+    )
+
+
+def test_code_fence_and_image_size(engine):
+    """コードブロックのファイル名と画像幅指定の変換を確認（コード内は変更しない）"""
+    text = "```js:app.js\nconst a = '![x](y.png =250x)';\n```\n\n![図](a.png =250x)\n"
+    assert engine.apply(text) == (
+        "`app.js`\n\n```js\nconst a = '![x](y.png =250x)';\n```\n\n![図](a.png)\n"
+    )
+
+
+def test_register_custom_ruleset():
+    """独自のルールセットを登録して使えることを確認"""
+
+    class UpperTitle(Rule):
+        def apply(self, document: Document) -> None:
+            document.metadata = {"title": document.metadata["title"].upper()}
+
+    register_ruleset("upper-title", lambda: [UpperTitle()])
+    try:
+        engine = RuleEngine.from_name("upper-title")
+        assert engine.apply("---\ntitle: a\n---\n") == "---\ntitle: A\n---\n"
+    finally:
+        RULESETS.pop("upper-title")
+    with pytest.raises(ValueError):
+        RuleEngine.from_name("unknown")
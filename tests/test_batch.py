@@ -0,0 +1,274 @@
+"""
+バッチ変換のテスト
+"""
+
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from content_converter.batch import BatchRunner, discover_jobs, iter_jobs
+from content_converter.cli import main
+from content_converter.converter import ContentConverter
+from content_converter.deadline import run_cancellable
+from content_converter.journal import DONE, FAILED, PENDING, JobJournal
+from content_converter.render import RenderSettings
+from content_converter.scheduler import BULK, INTERACTIVE, current_priority
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """入力ディレクトリとテンプレートを作成する"""
+    input_dir = tmp_path / "in"
+    (input_dir / "sub").mkdir(parents=True)
+    for name in ["a.md", "b.md", "sub/c.md"]:
+        (input_dir / name).write_text(f"# {name}", encoding="utf-8")
+    (input_dir / "ignored.txt").write_text("x")
+    template = tmp_path / "template.md"
+    template.write_text("TEMPLATE {{content}}", encoding="utf-8")
+    return input_dir, tmp_path / "out", template
+
+
+def _converter():
+    return ContentConverter(llm_provider=MagicMock(), config={"use_llm": False})
+
+
+class TestBatchRunner:
+    """BatchRunnerのテスト"""
+
+    def test_discover_jobs_mirrors_directory(self, corpus):
+        """入力ディレクトリの相対パスを出力ディレクトリに写すことを確認"""
+        input_dir, output_dir, _ = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        assert [os.path.relpath(out, output_dir) for _, out in jobs] == [
+            "a.md", "b.md", os.path.join("sub", "c.md")
+        ]
+
+    def test_run_converts_all_and_records_hashes(self, corpus):
+        """全ジョブが変換され、ジャーナルに完了と出力ハッシュが記録されることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        with JobJournal(str(output_dir.parent / "journal.sqlite")) as journal:
+            runner = BatchRunner(_converter(), str(template), max_workers=2, journal=journal)
+            result = runner.run(jobs)
+
+            assert result.done == 3 and result.ok
+            assert (output_dir / "sub" / "c.md").read_text(encoding="utf-8") == "TEMPLATE # sub/c.md"
+            assert journal.counts()[DONE] == 3
+            assert all(journal.get(job_id).output_hash for job_id, _ in jobs)
+
+    def test_resume_skips_finished_jobs(self, corpus):
+        """中断後の再開で未完了のジョブだけが実行されることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        journal_path = str(output_dir.parent / "journal.sqlite")
+
+        converter = _converter()
+        with JobJournal(journal_path) as journal:
+            runner = BatchRunner(converter, str(template), max_workers=1, journal=journal)
+            original_convert = converter.convert
+
+            def convert_then_stop(*args, **kwargs):
+                runner.stop()
+                return original_convert(*args, **kwargs)
+
+            converter.convert = convert_then_stop
+            first = runner.run(jobs)
+            assert first.done == 1
+            assert first.pending == 2
+            assert first.interrupted
+
+        converter = _converter()
+        converter.convert = MagicMock(side_effect=converter.convert)
+        with JobJournal(journal_path) as journal:
+            runner = BatchRunner(converter, str(template), max_workers=2, journal=journal)
+            second = runner.run(jobs, resume=True)
+            assert second.skipped == 1
+            assert second.done == 2
+            assert converter.convert.call_count == 2
+            assert journal.counts()[DONE] == 3
+
+    def test_jobs_are_marked_done_only_after_outputs_are_fsynced(self, corpus):
+        """ジャーナルに完了と記録する時点で、その出力のfsyncが完了していることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        with JobJournal(str(output_dir.parent / "journal.sqlite")) as journal:
+            runner = BatchRunner(_converter(), str(template), journal=journal, fsync_batch_size=2)
+            marked = []
+            mark_done_many = journal.mark_done_many
+
+            def check_synced(done):
+                done_ids = [job_id for job_id, _ in done]
+                outputs = {output for input_path, output in jobs if input_path in done_ids}
+                assert not outputs & set(runner.writer._pending)
+                marked.extend(done_ids)
+                mark_done_many(done)
+
+            journal.mark_done_many = check_synced
+            assert runner.run(jobs).done == 3
+
+            assert sorted(marked) == sorted(job_id for job_id, _ in jobs)
+            assert journal.counts()[DONE] == 3
+
+    def test_failed_jobs_are_recorded(self, corpus):
+        """失敗したジョブがエラーと共に記録されることを確認"""
+        input_dir, output_dir, template = corpus
+        converter = _converter()
+        converter.convert = MagicMock(side_effect=RuntimeError("LLM error"))
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        with JobJournal(str(output_dir.parent / "journal.sqlite")) as journal:
+            result = BatchRunner(converter, str(template), journal=journal).run(jobs)
+            assert result.failed == 3
+            assert not result.ok
+            assert journal.counts()[FAILED] == 3
+            assert "LLM error" in result.errors[jobs[0][0]]
+
+    def test_rerun_counts_unchanged_outputs(self, corpus):
+        """再実行で出力が同じ場合は変更なしとして数えられることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        first = BatchRunner(_converter(), str(template)).run(jobs)
+        second = BatchRunner(_converter(), str(template)).run(jobs)
+        assert (first.written, first.unchanged) == (3, 0)
+        assert (second.written, second.unchanged) == (0, 3)
+
+    def test_incremental_batch_reuses_sections(self, corpus):
+        """差分変換モードで出力ごとのセクション状態を保存し、再実行時に再利用することを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        llm = MagicMock()
+        llm.optimize_content.return_value = "converted"
+        converter = ContentConverter(llm_provider=llm, config={})
+
+        BatchRunner(converter, str(template), incremental=True).run(jobs)
+        assert (output_dir / ".a.md.sections.json").exists()
+        result = BatchRunner(converter, str(template), incremental=True).run(jobs)
+
+        assert result.unchanged == 3
+        assert llm.optimize_content.call_count == 3
+
+    def test_cpu_workers_process_stages_in_pool(self, corpus):
+        """CPUプールを使ってもLLMはスレッドから呼ばれ、ルールとマスクの統計が記録されることを確認"""
+        input_dir, output_dir, template = corpus
+        (input_dir / "a.md").write_text("本文\n\n```\ncode()\n```\n", encoding="utf-8")
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        llm = MagicMock()
+        llm.optimize_content.side_effect = lambda prompt, options=None: "out\n\n[[M1]]\n" if "[[M1]]" in prompt else "out\n"
+        converter = ContentConverter(llm_provider=llm, config={"mask": ["code"]})
+
+        result = BatchRunner(converter, str(template), cpu_workers=2).run(jobs)
+
+        assert result.done == 3
+        assert llm.optimize_content.call_count == 3
+        assert (output_dir / "a.md").read_text(encoding="utf-8") == "out\n\n```\ncode()\n```\n"
+        assert converter.masking_stats.documents == 1
+
+    @pytest.mark.parametrize("cpu_workers", [0, 2])
+    def test_html_is_rendered_in_finish_stage(self, corpus, cpu_workers):
+        """HTMLにレンダリングする設定では、スレッドでもワーカープロセスでも変換結果がHTMLになることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        llm = MagicMock()
+        llm.optimize_content.side_effect = lambda prompt, options=None: "# 見出し\n\n本文\n"
+        converter = ContentConverter(llm_provider=llm)
+
+        result = BatchRunner(converter, str(template), cpu_workers=cpu_workers, html=RenderSettings()).run(jobs)
+
+        assert result.done == 3
+        assert (output_dir / "a.md").read_text(encoding="utf-8") == '<h1 id="_1">見出し</h1>\n<p>本文</p>'
+
+    def test_streaming_jobs_report_stage_stats(self, corpus):
+        """ジョブをジェネレーターで渡しても全件変換され、ステージごとの統計が得られることを確認"""
+        input_dir, output_dir, template = corpus
+        jobs = iter_jobs(str(input_dir), str(output_dir))
+        result = BatchRunner(_converter(), str(template), io_workers=2, queue_size=1).run(jobs)
+
+        assert result.done == 3
+        assert [s.name for s in result.stages] == ["read", "prepare", "llm", "finish", "write"]
+        assert all(s.processed == 3 and s.max_depth <= 1 for s in result.stages)
+
+    def test_job_timeout_fails_hung_job(self, corpus):
+        """制限時間を超えたジョブだけが失敗し、他のジョブは完了することを確認"""
+        input_dir, output_dir, template = corpus
+        converter = _converter()
+        hang = threading.Event()
+
+        def convert(text, *args):
+            if "b.md" in text:
+                run_cancellable(lambda: hang.wait(10))
+            return text
+
+        converter.convert = convert
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        result = BatchRunner(converter, str(template), job_timeout=0.2).run(jobs)
+        hang.set()
+
+        assert result.done == 2
+        assert result.failed == 1
+        assert "制限時間" in result.errors[str(input_dir / "b.md")]
+
+    def test_cancel_aborts_in_flight_jobs_as_pending(self, corpus):
+        """キャンセル付きの停止で実行中のLLM呼び出しがすぐに中断され、未処理として残ることを確認"""
+        input_dir, output_dir, template = corpus
+        converter = _converter()
+        hang = threading.Event()
+        converter.convert = lambda *args: run_cancellable(lambda: hang.wait(10))
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+
+        with JobJournal(str(output_dir.parent / "journal.sqlite")) as journal:
+            runner = BatchRunner(converter, str(template), max_workers=3, journal=journal)
+            threading.Timer(0.2, runner.stop, kwargs={"cancel": True}).start()
+            start = time.monotonic()
+            result = runner.run(jobs)
+            hang.set()
+
+            assert time.monotonic() - start < 1.5
+            assert result.pending == 3
+            assert result.failed == 0
+            assert result.interrupted
+            assert journal.counts()[PENDING] == 3
+
+    def test_batch_timeout_leaves_remaining_jobs_pending(self, corpus):
+        """バッチ全体の制限時間に達すると実行中の変換を中断し、打ち切りとして報告することを確認"""
+        input_dir, output_dir, template = corpus
+        converter = _converter()
+        hang = threading.Event()
+        converter.convert = lambda *args: run_cancellable(lambda: hang.wait(10))
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        result = BatchRunner(converter, str(template), max_workers=1, batch_timeout=0.2).run(jobs)
+        hang.set()
+
+        assert result.pending == 3
+        assert result.timed_out
+        assert "制限時間" in result.summary()
+
+    def test_priority_is_set_for_llm_requests(self, corpus):
+        """ジョブごとの優先度クラスがLLM変換の間だけ設定されることを確認"""
+        input_dir, output_dir, template = corpus
+        converter = _converter()
+        seen = {}
+
+        def convert(text, *args):
+            seen[text] = current_priority()
+            return text
+
+        converter.convert = convert
+        jobs = discover_jobs(str(input_dir), str(output_dir))
+        runner = BatchRunner(
+            converter, str(template),
+            priority=lambda path: INTERACTIVE if path.endswith("a.md") else BULK,
+        )
+        assert runner.run(jobs).done == 3
+        assert seen == {"# a.md": INTERACTIVE, "# b.md": BULK, "# sub/c.md": BULK}
+
+    def test_cli_rules_only_batch_without_template(self, corpus, capsys):
+        """ルールエンジンだけで変換する場合は --template なしでディレクトリを変換できることを確認"""
+        input_dir, output_dir, _ = corpus
+        argv = ["content_converter", "--input", str(input_dir), "--output", str(output_dir), "--rules", "zenn-to-note"]
+        with patch.object(sys, "argv", argv):
+            assert main() == 0
+
+        assert (output_dir / "sub" / "c.md").read_text(encoding="utf-8") == "# sub/c.md"
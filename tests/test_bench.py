@@ -0,0 +1,90 @@
+"""
+負荷生成ツールのテスト
+"""
+
+import json
+
+import pytest
+
+from content_converter.bench import StubProvider, format_reports, main, parse_mix, percentile, run_bench
+from content_converter.converter import ContentConverter
+
+
+def test_parse_mix_normalizes_weights():
+    """リクエストの構成の重みを合計1の割合にすることを確認"""
+    assert parse_mix("convert=3,summary=1") == {"convert": 0.75, "summary": 0.25}
+    assert parse_mix("summary") == {"summary": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("translate=1")
+
+
+def test_percentile_uses_nearest_rank():
+    """最近傍順位法でパーセンタイルを求めることを確認"""
+    values = [float(v) for v in range(1, 101)]
+    assert [percentile(values, p) for p in (50, 95, 99)] == [50.0, 95.0, 99.0]
+    assert percentile([], 50) == 0.0
+
+
+def test_run_bench_reports_operations_errors_and_tokens():
+    """操作ごとの件数・エラー率・レイテンシと、全体のトークン数/秒を計測することを確認"""
+    provider = StubProvider(latency=0.005, error_rate=0.2, seed=1)
+    converter = ContentConverter(llm_provider=provider)
+    report = run_bench(
+        converter, ["# 記事1\n本文", "# 記事2\n本文"], "TEMPLATE",
+        concurrency=4, duration=10, max_requests=60, mix=parse_mix("convert=1,summary=1"), seed=1,
+    )
+
+    convert, summary, total = report.operations
+    assert (convert.operation, summary.operation, total.operation) == ("convert", "summary", "total")
+    assert total.requests == 60 == convert.requests + summary.requests
+    assert 0 < total.errors < 60 and set(total.error_types) == {"RuntimeError"}
+    assert 0.005 <= total.latencies[0] <= total.latencies[1] <= total.latencies[2]
+    assert report.prompt_tokens > 0 and report.tokens_per_second > 0
+    assert "total" in format_reports([report])
+
+
+def test_main_writes_json(tmp_path):
+    """コマンドラインから並列数ごとに計測し、JSONを書き出すことを確認"""
+    (tmp_path / "a.md").write_text("# a\n本文", encoding="utf-8")
+    template = tmp_path / "template.md"
+    template.write_text("TEMPLATE", encoding="utf-8")
+    output = tmp_path / "bench.json"
+
+    assert main([
+        str(tmp_path), "--template", str(template), "--stub", "--stub-latency", "0",
+        "--concurrency", "1,2", "--requests", "5", "--json", str(output),
+    ]) == 0
+
+    data = json.loads(output.read_text(encoding="utf-8"))
+    assert [r["concurrency"] for r in data] == [1, 2]
+    assert data[0]["operations"]["convert"]["requests"] == 5
+    assert set(data[0]["operations"]["total"]) >= {"p50_ms", "p95_ms", "p99_ms", "error_rate"}
+
+
+def test_main_micro_batch_summaries(tmp_path, capsys):
+    """--micro-batch で同時に送られた要約をまとめて送り、スタブが要約ごとに応答することを確認"""
+    for i in range(4):
+        (tmp_path / f"{i}.md").write_text(f"# 記事{i}\n本文{i}", encoding="utf-8")
+
+    assert main([
+        str(tmp_path), "--mix", "summary", "--stub", "--stub-latency", "0.05", "--stub-jitter", "0",
+        "--concurrency", "4", "--requests", "8", "--micro-batch", "--micro-batch-linger", "0.2",
+    ]) == 0
+
+    err = capsys.readouterr().err
+    assert "まとめ送信: まとめたリクエスト" in err
+    assert "分割できず個別に送り直し 0件" in err and "まとめたリクエスト 0回" not in err
+
+
+def test_main_map_reduce_summaries(tmp_path, capsys):
+    """--map-reduce で長い文書をチャンクに分けて要約することを確認"""
+    sections = "".join(f"## 節{i}\n" + "本文です。" * 40 + "\n\n" for i in range(6))
+    (tmp_path / "book.md").write_text("# 本\n\n" + sections, encoding="utf-8")
+
+    assert main([
+        str(tmp_path), "--mix", "summary", "--stub", "--stub-latency", "0",
+        "--concurrency", "1", "--requests", "2", "--map-reduce", "--chunk-tokens", "200",
+    ]) == 0
+
+    err = capsys.readouterr().err
+    assert "map-reduce 要約: チャンク" in err and "チャンク 0件" not in err
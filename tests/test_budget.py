@@ -0,0 +1,82 @@
+"""
+出力トークン数の予算のテスト
+"""
+
+from unittest.mock import MagicMock
+
+from content_converter.budget import DEFAULT_LIMITS, ModelLimits, OutputBudget, model_limits
+from content_converter.converter import ContentConverter
+from content_converter.llm.cassette import Cassette, RecordingProvider
+from content_converter.llm.fallback import FallbackProvider
+from content_converter.llm.key_pool import KeyPoolProvider
+from content_converter.llm.scheduled import ScheduledProvider
+from content_converter.scheduler import PriorityScheduler
+
+
+class TestModelLimits:
+    """model_limitsのテスト"""
+
+    def test_known_models_with_provider_prefix(self):
+        """プロバイダーの接頭辞付きのモデル名でも上限が引けることを確認"""
+        assert model_limits("gemini-2.5-flash").max_output == 65_536
+        assert model_limits("anthropic/claude-3-opus-20240229") == ModelLimits(200_000, 4_096)
+        assert model_limits("openai/gpt-4o-mini").max_output == 16_384
+
+    def test_unknown_model_uses_conservative_default(self):
+        """不明なモデルでは控えめなデフォルトを使うことを確認"""
+        assert model_limits("local-model") == DEFAULT_LIMITS
+        assert model_limits(None) == DEFAULT_LIMITS
+
+
+class TestOutputBudget:
+    """OutputBudgetのテスト"""
+
+    def test_budget_scales_with_input_and_learned_ratio(self):
+        """max_tokens が入力の大きさと学習した比に応じて決まることを確認"""
+        budget = OutputBudget(default_ratio=1.0, margin=1.0, min_tokens=10)
+        assert budget.max_tokens("t", 100, 200, "gemini-2.5-flash") == 100
+
+        budget.record("t", 100, 300)
+        assert budget.ratio("t") == 3.0
+        assert budget.max_tokens("t", 100, 200, "gemini-2.5-flash") == 300
+        # 別のテンプレートはデフォルトの比のまま
+        assert budget.max_tokens("other", 100, 200, "gemini-2.5-flash") == 100
+
+    def test_budget_is_clamped_by_model_limits(self):
+        """最大出力・コンテキストの残り・下限の範囲に収まることを確認"""
+        budget = OutputBudget(margin=1.0, min_tokens=256, limits=ModelLimits(8_000, 4_096))
+        assert budget.max_tokens("t", 10, 100) == 256
+        assert budget.max_tokens("t", 100_000, 100) == 4_096
+        assert budget.max_tokens("t", 5_000, 7_000) == 1_000
+
+    def test_ratios_are_smoothed_and_persisted(self, tmp_path):
+        """比が指数移動平均で更新され、ファイルに保存されて次回に引き継がれることを確認"""
+        path = str(tmp_path / "budget.json")
+        budget = OutputBudget(path=path, smoothing=0.5)
+        budget.record("t", 100, 100)
+        budget.record("t", 100, 300)
+        assert budget.ratio("t") == 2.0
+        budget.save()
+
+        reloaded = OutputBudget(path=path)
+        assert reloaded.ratio("t") == 2.0
+        assert reloaded.ratios["t"][1] == 2
+
+    def test_model_limits_are_found_through_wrapped_providers(self):
+        """キープール・フォールバック・スケジューラー・記録で包んだプロバイダーでもモデルの上限を使うことを確認"""
+        gemini = MagicMock()
+        gemini.model_name = "gemini-2.5-flash"
+        gemini.optimize_content.return_value = "出力"
+        provider = RecordingProvider(
+            ScheduledProvider(
+                FallbackProvider([("gemini", KeyPoolProvider(lambda key: gemini, ["k1", "k2"]))]),
+                PriorityScheduler(max_concurrency=2),
+            ),
+            Cassette(),
+        )
+        converter = ContentConverter(llm_provider=provider, config={"output_budget": True})
+
+        assert converter._model_name() == "gemini-2.5-flash"
+        converter.convert("本文" * 10_000, "TEMPLATE")
+        max_tokens = gemini.optimize_content.call_args.kwargs["options"]["max_tokens"]
+        assert max_tokens > DEFAULT_LIMITS.max_output
@@ -9,7 +9,7 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock, call
 import pytest
 import importlib
-from content_converter.cli import main, parse_args, get_api_key
+from content_converter.cli import main, parse_args, get_api_key, parse_targets
 import content_converter.cli
 
 
@@ -80,6 +80,58 @@ class TestCLI:
         assert args.llm_provider == "openrouter"
         assert args.input == "input.md"
 
+    @patch("sys.argv", ["content_converter", "--input", "input.md",
+                        "--target", "zenn.md=out/zenn.md", "--target", "note.md", "--single-request"])
+    def test_parse_args_targets(self):
+        """複数ターゲット指定のテスト"""
+        args = parse_args()
+        assert args.template is None
+        assert args.single_request is True
+        assert parse_targets(args.target) == [("zenn.md", "out/zenn.md"), ("note.md", None)]
+
+    @patch("sys.argv", ["content_converter", "--input", "input.md", "--template", "template.txt",
+                        "--key-requests-per-minute", "15", "--key-cooldown", "30"])
+    def test_parse_args_key_pool_options(self):
+        """キーごとのレート制限とクールダウンの指定がキープールのオプションになることを確認"""
+        args = parse_args()
+        assert content_converter.cli._pool_options(args) == {"requests_per_minute": 15, "cooldown_seconds": 30.0}
+
+    @patch("sys.argv", ["content_converter", "--input", "input.md"])
+    def test_parse_args_requires_template_or_target(self):
+        """--template も --target も指定しない場合はエラーになることを確認"""
+        with pytest.raises(SystemExit):
+            parse_args()
+
+    @patch("content_converter.cli.parse_args")
+    @patch("content_converter.cli.ConverterFactory.create_converter")
+    def test_main_with_targets(self, mock_create_converter, mock_parse_args):
+        """複数ターゲット指定時に結果がターゲットごとに保存されることを確認"""
+        mock_args = MagicMock()
+        mock_args.input = self.test_file_path
+        mock_args.template = None
+        mock_args.target = ["zenn.md=zenn_out.md", "note.md=note_out.md"]
+        mock_args.single_request = False
+        mock_args.prompt = None
+        mock_args.prompt_file = None
+        mock_args.llm_provider = None
+        mock_args.model = None
+        mock_parse_args.return_value = mock_args
+
+        mock_converter = MagicMock()
+        mock_converter.convert_file_targets.return_value = {"zenn.md": "zenn", "note.md": "note"}
+        mock_create_converter.return_value = mock_converter
+
+        assert content_converter.cli.main() == 0
+        mock_converter.convert_file_targets.assert_called_once_with(
+            input_path=self.test_file_path,
+            template_paths={"zenn.md": "zenn.md", "note.md": "note.md"},
+            prompt_path=None,
+            single_request=False,
+        )
+        assert mock_converter.save_converted_file.call_args_list == [
+            call("zenn", "zenn_out.md"), call("note", "note_out.md")
+        ]
+
     @patch("content_converter.cli.parse_args")
     @patch("content_converter.cli.ConverterFactory.create_converter")
     def test_main_file_not_found(self, mock_create_converter, mock_parse_args):
@@ -361,6 +413,12 @@ class TestGetApiKey:
         api_key = get_api_key("openrouter")
         assert api_key == "env_openrouter_key"
 
+    @patch.dict(os.environ, {"OPENAI_COMPATIBLE_API_KEY": "env_local_key"}, clear=True)
+    def test_get_api_key_from_env_openai_compatible(self):
+        """環境変数 (OPENAI_COMPATIBLE_API_KEY) からAPIキーを取得するテスト"""
+        api_key = get_api_key("openai-compatible")
+        assert api_key == "env_local_key"
+
     @patch.dict(os.environ, {"GOOGLE_API_KEY": "env_gemini_key"}, clear=True)
     def test_get_api_key_arg_takes_precedence(self):
         """コマンドライン引数が環境変数より優先されることを確認するテスト"""
@@ -411,6 +469,29 @@ class TestGetApiKey:
                 get_api_key("gemini", "other_provider:arg_key_wont_be_used_either")
 
 
+    def test_get_api_key_multiple_from_arg(self):
+        """カンマ区切りで複数のAPIキーを指定するとリストで返ることを確認するテスト"""
+        assert get_api_key("gemini", "gemini:key1,key2") == ["key1", "key2"]
+
+    @patch.dict(os.environ, {"OPENROUTER_API_KEY": "env_key1, env_key2"}, clear=True)
+    def test_get_api_key_multiple_from_env(self):
+        """環境変数にカンマ区切りで複数のAPIキーを指定できることを確認するテスト"""
+        assert get_api_key("openrouter") == ["env_key1", "env_key2"]
+
+    @patch.dict(os.environ, {"GOOGLE_API_KEY": "env_key"}, clear=True)
+    def test_get_api_key_from_file(self, tmp_path):
+        """キーファイルから複数のAPIキーを取得するテスト"""
+        key_file = tmp_path / "keys.txt"
+        key_file.write_text("# comment\nfile_key1\n\ngemini:file_key2\nopenrouter:ignored\n")
+        assert get_api_key("gemini", api_key_file=str(key_file)) == ["file_key1", "file_key2"]
+
+    def test_get_api_key_file_from_env(self, tmp_path):
+        """環境変数 <ENV>_FILE でキーファイルを指定できることを確認するテスト"""
+        key_file = tmp_path / "keys.txt"
+        key_file.write_text("only_key\n")
+        with patch.dict(os.environ, {"GOOGLE_API_KEY_FILE": str(key_file)}, clear=True):
+            assert get_api_key("gemini") == "only_key"
+
 
 if __name__ == "__main__":
     pytest.main()
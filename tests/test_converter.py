@@ -160,3 +160,244 @@ class TestContentConverter:
         with pytest.raises(IOError):
             converter.save_converted_file(content, "/invalid/path/output.md")
     
+
+class TestConvertTargets:
+    """複数ターゲット変換のテスト"""
+
+    def test_convert_targets_runs_each_target(self):
+        """ターゲットごとにLLMが呼ばれ、テンプレート順で結果が返ることを確認"""
+        llm = MagicMock()
+        llm.optimize_content.side_effect = lambda prompt, options=None: (
+            "zenn result" if "ZENN" in prompt else "note result"
+        )
+        converter = ContentConverter(llm_provider=llm)
+
+        results = converter.convert_targets("本文", {"zenn": "ZENN {{content}}", "note": "NOTE {{content}}"})
+
+        assert list(results) == ["zenn", "note"]
+        assert results == {"zenn": "zenn result", "note": "note result"}
+        assert llm.optimize_content.call_count == 2
+
+    def test_convert_targets_single_request(self):
+        """1リクエストで生成し、区切り行で分割されることを確認"""
+        llm = MagicMock()
+        llm.optimize_content.return_value = (
+            "=====TARGET: zenn=====\nzenn body\n=====TARGET: note=====\nnote body\n"
+        )
+        converter = ContentConverter(llm_provider=llm)
+
+        results = converter.convert_targets(
+            "本文", {"zenn": "ZENN", "note": "NOTE"}, single_request=True
+        )
+
+        assert results == {"zenn": "zenn body\n", "note": "note body\n"}
+        llm.optimize_content.assert_called_once()
+        prompt = llm.optimize_content.call_args[0][0]
+        assert prompt.count("本文") == 1
+        assert "## ターゲット: zenn" in prompt and "## ターゲット: note" in prompt
+
+    def test_convert_targets_single_request_fallback(self):
+        """分割できなかったターゲットは個別リクエストにフォールバックすることを確認"""
+        llm = MagicMock()
+        llm.optimize_content.side_effect = [
+            "=====TARGET: zenn=====\nzenn body\n",
+            "note fallback",
+        ]
+        converter = ContentConverter(llm_provider=llm)
+
+        results = converter.convert_targets(
+            "本文", {"zenn": "ZENN", "note": "NOTE"}, single_request=True
+        )
+
+        assert results == {"zenn": "zenn body\n", "note": "note fallback"}
+        assert llm.optimize_content.call_count == 2
+
+    def test_convert_file_targets_reads_input_once(self, tmp_path):
+        """入力ファイルを1回だけ読み込んで全ターゲットを変換することを確認"""
+        input_file = tmp_path / "input.md"
+        input_file.write_text("本文")
+        zenn = tmp_path / "zenn.md"
+        zenn.write_text("ZENN {{content}}")
+        note = tmp_path / "note.md"
+        note.write_text("NOTE {{content}}")
+        converter = ContentConverter(llm_provider=MagicMock(), config={"use_llm": False})
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            results = converter.convert_file_targets(
+                str(input_file), {"zenn": str(zenn), "note": str(note)}
+            )
+
+        opened = [call.args[0] for call in mock_open.call_args_list]
+        assert opened.count(str(input_file)) == 1
+        assert results == {"zenn": "ZENN 本文", "note": "NOTE 本文"}
+
+
+class TestPromptCache:
+    """プロンプトキャッシュ用メッセージ構築のテスト"""
+
+    def test_convert_with_prompt_cache_sends_stable_prefix(self):
+        """不変なプレフィックスが先頭、入力テキストが最後のメッセージになることを確認"""
+        llm = MagicMock()
+        llm.chat.return_value = "converted"
+        converter = ContentConverter(
+            llm_provider=llm, config={"prompt_cache": True, "style_guide": "です・ます調"}
+        )
+
+        result = converter.convert("入力A", "テンプレート", "指示 {{template}} / {{input}}")
+
+        assert result == "converted"
+        llm.optimize_content.assert_not_called()
+        messages = llm.chat.call_args[0][0]
+        assert messages[0]["role"] == "system"
+        assert "入力A" not in messages[0]["content"]
+        assert messages[1]["cache"] is True
+        assert "テンプレート" in messages[1]["content"]
+        assert "です・ます調" in messages[1]["content"]
+        assert messages[-1]["content"].endswith("入力A")
+
+    def test_prefix_is_identical_across_inputs(self):
+        """入力が変わってもプレフィックスが同一であることを確認"""
+        converter = ContentConverter(llm_provider=MagicMock(), config={"prompt_cache": True})
+        first = converter._build_messages("入力A", "テンプレート")
+        second = converter._build_messages("入力B", "テンプレート")
+        assert first[:-1] == second[:-1]
+        assert first[-1] != second[-1]
+
+
+class TestSimilarityCache:
+    """類似キャッシュを使ったセクション単位の変換のテスト"""
+
+    ARTICLE = (
+        "# はじめに\n\n" + "この記事ではPythonのパッケージ管理について説明します。" * 8 + "\n\n"
+        "# 手順\n\n" + "まずは仮想環境を作成し、必要なライブラリをインストールします。" * 8 + "\n"
+    )
+
+    def test_only_changed_sections_are_converted(self):
+        """変更のないセクションと軽微な変更のセクションはLLMを呼ばないことを確認"""
+        llm = MagicMock()
+        llm.optimize_content.side_effect = lambda prompt, options=None: f"out{llm.optimize_content.call_count}"
+        converter = ContentConverter(llm_provider=llm, config={"similarity_cache": True})
+
+        converter.convert(self.ARTICLE, "テンプレート")
+        assert llm.optimize_content.call_count == 2
+
+        edited = self.ARTICLE.replace("説明します。", "解説します。", 1)
+        edited += "\n# まとめ\n\n新しく追加したセクションです。\n"
+        result = converter.convert(edited, "テンプレート")
+
+        assert llm.optimize_content.call_count == 3
+        assert "セクション単位の変換" in llm.optimize_content.call_args[0][0]
+        assert result == "out1\n\nout2\n\nout3\n"
+        cache = converter.similarity_cache
+        assert cache.similar_hits >= 1
+        assert cache.similar_hits + cache.exact_hits == 2
+
+    def test_different_template_does_not_reuse(self):
+        """テンプレートが異なる場合は再利用しないことを確認"""
+        llm = MagicMock()
+        llm.optimize_content.return_value = "out"
+        converter = ContentConverter(llm_provider=llm, config={"similarity_cache": True})
+        converter.convert(self.ARTICLE, "テンプレートA")
+        converter.convert(self.ARTICLE, "テンプレートB")
+        assert llm.optimize_content.call_count == 4
+
+
+class TestRuleEngine:
+    """ルールエンジンとLLMの組み合わせのテスト"""
+
+    ZENN = "---\ntitle: t\nemoji: 🐍\n---\n:::message\nメモ\n:::\n"
+
+    def test_rules_only_does_not_call_llm(self):
+        """rules_mode='only' ではLLMを呼ばないことを確認"""
+        llm = MagicMock()
+        converter = ContentConverter(llm_provider=llm, config={"rules": "zenn-to-note"})
+        assert converter.convert(self.ZENN, "") == "---\ntitle: t\nstatus: draft\n---\n> メモ\n"
+        llm.optimize_content.assert_not_called()
+
+    def test_rules_pre_and_post(self):
+        """pre ではLLMへの入力に、post ではLLMの出力にルールを適用することを確認"""
+        llm = MagicMock()
+        llm.optimize_content.return_value = self.ZENN
+        pre = ContentConverter(llm_provider=llm, config={"rules": "zenn-to-note", "rules_mode": "pre"})
+        assert pre.convert(self.ZENN, "テンプレート") == self.ZENN
+        assert "> メモ" in llm.optimize_content.call_args[0][0]
+
+        post = ContentConverter(llm_provider=llm, config={"rules": "zenn-to-note", "rules_mode": "post"})
+        assert post.convert("入力", "テンプレート").endswith("> メモ\n")
+
+    def test_rules_with_single_request_targets(self):
+        """複数ターゲットを1リクエストで変換する場合もルールの適用段階に従うことを確認"""
+        llm = MagicMock()
+        only = ContentConverter(llm_provider=llm, config={"rules": "zenn-to-note"})
+        results = only.convert_targets(self.ZENN, {"zenn": "", "note": ""}, single_request=True)
+        assert set(results.values()) == {"---\ntitle: t\nstatus: draft\n---\n> メモ\n"}
+        llm.optimize_content.assert_not_called()
+
+        llm.optimize_content.return_value = (
+            "=====TARGET: zenn=====\n:::message\nA\n:::\n=====TARGET: note=====\n:::message\nB\n:::\n"
+        )
+        post = ContentConverter(llm_provider=llm, config={"rules": "zenn-to-note", "rules_mode": "post"})
+        results = post.convert_targets("入力", {"zenn": "Z", "note": "N"}, single_request=True)
+        assert results == {"zenn": "> A\n", "note": "> B\n"}
+
+    def test_invalid_rules_mode(self):
+        """不明な適用段階はエラーになることを確認"""
+        with pytest.raises(ValueError):
+            ContentConverter(llm_provider=MagicMock(), config={"rules": "zenn-to-note", "rules_mode": "x"})
+
+
+class TestMasking:
+    """マスクを使った変換のテスト"""
+
+    def test_code_is_masked_and_restored(self):
+        """LLMにはプレースホルダーだけが送られ、出力で元のコードに戻ることを確認"""
+        llm = MagicMock()
+        llm.optimize_content.side_effect = lambda prompt, options=None: "変換後\n\n[[M1]]\n"
+        converter = ContentConverter(llm_provider=llm, config={"mask": True})
+
+        result = converter.convert("本文\n\n```python\nsecret_code()\n```\n", "テンプレート")
+
+        prompt = llm.optimize_content.call_args[0][0]
+        assert "secret_code" not in prompt
+        assert "[[M1]]" in prompt
+        assert result == "変換後\n\n```python\nsecret_code()\n```\n"
+        assert converter.masking_stats.documents == 1
+
+
+class TestMinify:
+    """縮小を使った変換のテスト"""
+
+    def test_input_is_minified_and_saving_recorded(self):
+        """入力の余分な空白とコメントを取り除き、推定トークン数を記録することを確認"""
+        llm = MagicMock()
+        llm.optimize_content.return_value = "out"
+        converter = ContentConverter(llm_provider=llm, config={"minify": True})
+
+        converter.convert("本文   です<!-- TODO -->\n\n\n\n続き\n", "テンプレート")
+
+        prompt = llm.optimize_content.call_args[0][0]
+        assert "本文 です\n\n続き" in prompt
+        assert "TODO" not in prompt
+        stats = converter.minify_stats
+        assert stats.documents == 1
+        assert stats.tokens_after < stats.tokens_before
+
+
+class TestOutputBudget:
+    """出力トークン数の予算を使った変換のテスト"""
+
+    def test_max_tokens_follows_input_size_and_learns(self):
+        """max_tokens が入力の大きさから決まり、変換結果から比を学習することを確認"""
+        llm = MagicMock()
+        llm.model_name = "gemini-2.5-flash"
+        llm.optimize_content.return_value = "出力" * 1000
+        converter = ContentConverter(llm_provider=llm, config={"output_budget": True})
+
+        converter.convert("短い入力", "テンプレート")
+        first = llm.optimize_content.call_args[1]["options"]["max_tokens"]
+        converter.convert("短い入力", "テンプレート")
+        second = llm.optimize_content.call_args[1]["options"]["max_tokens"]
+
+        assert first == converter.output_budget.min_tokens
+        assert second > first
+        assert converter.output_budget.requests == 2
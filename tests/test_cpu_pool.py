@@ -0,0 +1,93 @@
+"""
+CPUプールのテスト
+"""
+
+from content_converter.core.masking import MASK_KINDS
+from content_converter.cpu_pool import CPUStagePool, benchmark_scaling, format_scaling
+from content_converter.stages import StageSettings, finish_document, prepare_document
+
+ZENN_TEXT = """---
+title: "記事"
+emoji: "🐍"
+topics: ["python"]
+published: false
+---
+
+本文   です
+
+```python:hello.py
+print("hello")
+```
+"""
+
+
+def _llm_echo(prepared):
+    """LLMの代わりに、送信された入力をそのまま返す"""
+    return prepared.text
+
+
+class TestStages:
+    """LLM前後のCPU処理のテスト"""
+
+    def test_rules_only_skips_llm(self):
+        """ルールだけで変換する設定では、準備の段階で結果が確定することを確認"""
+        prepared = prepare_document(ZENN_TEXT, None, StageSettings(rules="zenn-to-note"))
+        assert prepared.final is not None
+        assert "status: draft" in prepared.final
+        assert finish_document(prepared, "ignored", StageSettings(rules="zenn-to-note")) == (
+            prepared.final, None
+        )
+
+    def test_prepare_and_finish_round_trip(self):
+        """縮小・マスクした入力が、LLMの出力から元の内容に戻ることを確認"""
+        settings = StageSettings(minify=True, mask_kinds=MASK_KINDS)
+        prepared = prepare_document(ZENN_TEXT, "プロンプト   です<!-- メモ -->", settings)
+
+        assert 'print("hello")' not in prepared.text
+        assert "本文 です" in prepared.text
+        assert prepared.prompt == "プロンプト です"
+        assert prepared.minify_tokens[1] < prepared.minify_tokens[0]
+        result, report = finish_document(prepared, _llm_echo(prepared), settings)
+        assert 'print("hello")' in result
+        assert not report.repaired
+
+
+class TestCPUStagePool:
+    """CPUStagePoolのテスト"""
+
+    def test_process_pool_matches_in_process_results(self):
+        """ワーカープロセスでの処理結果が、呼び出し元での処理結果と同じになることを確認"""
+        settings = StageSettings(rules="zenn-to-note", rules_mode="pre", minify=True, mask_kinds=MASK_KINDS)
+        texts = [ZENN_TEXT.replace("本文", f"本文{i}") for i in range(10)]
+        expected = [
+            finish_document(p, _llm_echo(p), settings)[0]
+            for p in (prepare_document(text, None, settings) for text in texts)
+        ]
+
+        with CPUStagePool(settings, max_workers=2, chunksize=3) as pool:
+            prepared = list(pool.prepare_many([(text, None) for text in texts]))
+            results = [text for text, _ in pool.finish_many([(p, _llm_echo(p)) for p in prepared])]
+            single = pool.finish(pool.prepare(texts[0]), _llm_echo(prepared[0]))[0]
+
+        assert results == expected
+        assert single == expected[0]
+
+    def test_single_worker_runs_in_process(self):
+        """ワーカー数が1の場合はプロセスを作らないことを確認"""
+        with CPUStagePool(StageSettings(), max_workers=1) as pool:
+            assert pool._executor is None
+            assert pool.prepare("text").text == "text"
+
+    def test_benchmark_scaling(self):
+        """ワーカー数ごとの計測結果が得られ、表形式で出力できることを確認"""
+        results = benchmark_scaling([ZENN_TEXT] * 4, StageSettings(minify=True), [1, 2])
+        assert [r.workers for r in results] == [1, 2]
+        assert all(r.documents == 4 for r in results)
+        assert format_scaling(results).splitlines()[0].startswith("workers")
+
+    def test_benchmark_scaling_chunked(self):
+        """チャンク単位の送信も計測できることを確認"""
+        results = benchmark_scaling(
+            [ZENN_TEXT] * 4, StageSettings(minify=True), [2], chunksize=2, chunked=True
+        )
+        assert [(r.workers, r.documents) for r in results] == [(2, 4)]
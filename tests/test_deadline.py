@@ -0,0 +1,97 @@
+"""
+期限と協調的なキャンセルのテスト
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from content_converter.deadline import (
+    Cancelled,
+    Deadline,
+    DeadlineExceeded,
+    bind_deadline,
+    check_deadline,
+    current_deadline,
+    deadline_scope,
+    request_timeout,
+    run_cancellable,
+)
+
+
+class TestDeadline:
+    """Deadlineのテスト"""
+
+    def test_child_inherits_parent_expiry_and_cancel(self):
+        """親の期限切れ・キャンセルが子にも及び、どの期限を過ぎたかが分かることを確認"""
+        parent = Deadline(0.05)
+        child = Deadline(10, parent=parent)
+        assert 0 < child.remaining() <= 0.05
+        time.sleep(0.06)
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            child.check()
+        assert exc_info.value.deadline is parent
+
+        root = Deadline()
+        job = Deadline(parent=root)
+        assert job.remaining() is None
+        job.check()
+        root.cancel()
+        with pytest.raises(Cancelled):
+            job.check()
+
+    def test_request_timeout_is_capped_by_remaining_time(self):
+        """リクエストのタイムアウトが期限の残り時間以下に切り詰められることを確認"""
+        assert request_timeout(300) == 300
+        with deadline_scope(Deadline(5)):
+            assert request_timeout(300) <= 5
+            assert request_timeout(1) == 1
+        with deadline_scope(Deadline(0)):
+            with pytest.raises(DeadlineExceeded):
+                request_timeout(300)
+
+    def test_bind_deadline_propagates_to_threads(self):
+        """スレッドプールで実行する関数にも呼び出し元の期限が引き継がれることを確認"""
+        deadline = Deadline(60)
+        with deadline_scope(deadline):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                seen = list(executor.map(bind_deadline(lambda _: current_deadline()), range(4)))
+        assert seen == [deadline] * 4
+        assert current_deadline() is None
+        check_deadline()
+
+
+class TestRunCancellable:
+    """run_cancellableのテスト"""
+
+    def test_returns_result_and_raises_errors(self):
+        """期限内に終わった呼び出しの戻り値・例外がそのまま返ることを確認"""
+        with deadline_scope(Deadline(5)):
+            assert run_cancellable(lambda: 42) == 42
+            with pytest.raises(ValueError):
+                run_cancellable(lambda: int("x"))
+
+    def test_cancel_aborts_blocked_call_within_a_second(self):
+        """ブロック中の呼び出しがキャンセルから1秒以内に中断され、on_cancel が呼ばれることを確認"""
+        release = threading.Event()
+        aborted = []
+        deadline = Deadline()
+        threading.Timer(0.1, deadline.cancel).start()
+
+        start = time.monotonic()
+        with deadline_scope(deadline):
+            with pytest.raises(Cancelled):
+                run_cancellable(lambda: release.wait(10), on_cancel=lambda: aborted.append(True))
+        release.set()
+        assert time.monotonic() - start < 1.0
+        assert aborted == [True]
+
+    def test_deadline_aborts_blocked_call(self):
+        """期限を過ぎたブロック中の呼び出しが DeadlineExceeded で中断されることを確認"""
+        release = threading.Event()
+        with deadline_scope(Deadline(0.1)):
+            with pytest.raises(DeadlineExceeded):
+                run_cancellable(lambda: release.wait(10))
+        release.set()
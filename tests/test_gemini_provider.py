@@ -34,7 +34,8 @@ class TestGeminiProvider:
         with patch.dict(os.environ, {"GOOGLE_API_KEY": "test_key"}):
             provider = GeminiProvider()
             assert provider.api_key == "test_key"
-            mock_genai.configure.assert_called_once_with(api_key="test_key")
+            mock_genai.configure.assert_not_called()
+            assert provider.model._client is provider.client
 
     def test_init_with_model(self, mock_genai):
         """モデル指定のテスト"""
@@ -47,7 +48,23 @@ class TestGeminiProvider:
         """APIキーを直接指定するテスト"""
         provider = GeminiProvider(api_key="direct_key")
         assert provider.api_key == "direct_key"
-        mock_genai.configure.assert_called_once_with(api_key="direct_key")
+        mock_genai.configure.assert_not_called()
+
+    def test_instances_use_isolated_clients(self, mock_genai):
+        """異なるAPIキーのインスタンスが互いのクライアントを上書きしないことを確認"""
+        mock_genai.GenerativeModel.side_effect = lambda name: Mock()
+        first = GeminiProvider(api_key="key_a")
+        second = GeminiProvider(api_key="key_b")
+        assert first.client is not second.client
+        assert first.model._client is first.client
+        assert second.model._client is second.client
+
+    def test_model_without_client_attribute_raises(self, mock_genai):
+        """クライアントを差し替えられないSDKではグローバル設定に頼らずエラーにすることを確認"""
+        mock_genai.GenerativeModel.return_value = Mock(spec=[])
+        with pytest.raises(RuntimeError, match="クライアントを設定できません"):
+            GeminiProvider(api_key="key_a")
+        mock_genai.configure.assert_not_called()
 
     def test_init_without_api_key(self):
         """APIキーが設定されていない場合のテスト"""
@@ -0,0 +1,72 @@
+"""
+セクション単位の差分変換のテスト
+"""
+
+from unittest.mock import MagicMock
+
+from content_converter.converter import ContentConverter
+from content_converter.core.sections import split_sections
+from content_converter.incremental import (
+    IncrementalState,
+    SectionRecord,
+    default_state_path,
+)
+
+ARTICLE = "".join(f"# 見出し{i}\n\n本文{i}です。\n\n" for i in range(30))
+
+
+def _converter():
+    llm = MagicMock()
+    # 入力セクションの本文の先頭を含む変換結果を返す
+    llm.optimize_content.side_effect = lambda prompt, options=None: "OUT:" + prompt.split("本文")[-1][:3]
+    return ContentConverter(llm_provider=llm, config={}), llm
+
+
+def test_default_state_path():
+    """出力ファイルと同じディレクトリの隠しファイルになることを確認"""
+    assert default_state_path("out/article.md") == "out/.article.md.sections.json"
+
+
+def test_match_prefers_heading_path_then_hash():
+    """見出しパスと内容ハッシュで前回の出力を対応付けることを確認"""
+    old = split_sections("# A\nx\n# B\ny\n")
+    state = IncrementalState("ctx", [SectionRecord(s.key, s.content_hash, s.key) for s in old])
+    new = split_sections("# B\ny\n# A\nchanged\n")
+    assert state.match(new) == ["B", None]
+
+
+def test_only_edited_section_is_reconverted(tmp_path):
+    """1セクションだけ編集した場合に、そのセクションだけがLLMで変換されることを確認"""
+    state_path = str(tmp_path / ".article.md.sections.json")
+    converter, llm = _converter()
+
+    first = converter.convert_incremental(ARTICLE, "テンプレート", state_path=state_path)
+    assert (first.reused, first.converted) == (0, 30)
+    assert llm.optimize_content.call_count == 30
+
+    edited = ARTICLE.replace("本文7です。", "本文7を書き直しました。")
+    second = converter.convert_incremental(edited, "テンプレート", state_path=state_path)
+    assert (second.reused, second.converted) == (29, 1)
+    assert llm.optimize_content.call_count == 31
+    assert "本文7を書き直しました。" in llm.optimize_content.call_args[0][0]
+    assert second.text.split("\n\n") == first.text.split("\n\n")[:7] + ["OUT:7を書"] + first.text.split("\n\n")[8:]
+
+
+def test_template_change_reconverts_everything(tmp_path):
+    """テンプレートが変わった場合は前回の出力を使わないことを確認"""
+    state_path = str(tmp_path / "state.json")
+    converter, llm = _converter()
+    converter.convert_incremental(ARTICLE, "テンプレートA", state_path=state_path)
+    result = converter.convert_incremental(ARTICLE, "テンプレートB", state_path=state_path)
+    assert result.converted == 30
+    assert llm.optimize_content.call_count == 60
+
+
+def test_corrupt_state_is_ignored(tmp_path):
+    """壊れた状態ファイルは無視して全セクションを変換することを確認"""
+    state_path = tmp_path / "state.json"
+    state_path.write_text("{", encoding="utf-8")
+    converter, _ = _converter()
+    result = converter.convert_incremental("# A\nx\n", "テンプレート", state_path=str(state_path))
+    assert result.converted == 1
+    assert IncrementalState.load(str(state_path)).records[0].key == "A"
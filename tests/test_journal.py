@@ -0,0 +1,82 @@
+"""
+ジョブジャーナルのテスト
+"""
+
+from content_converter.journal import DONE, FAILED, PENDING, RUNNING, JobJournal, JournalJob
+from content_converter.writer import file_sha256
+
+
+def _job(job_id, input_hash="h1", output_path=None):
+    output_path = output_path or f"out/{job_id}"
+    return JournalJob(job_id, f"in/{job_id}", output_path, input_hash, PENDING, None, None, 0)
+
+
+class TestJobJournal:
+    """JobJournalのテスト"""
+
+    def test_state_transitions_are_persisted(self, tmp_path):
+        """状態遷移がファイルに永続化され、再オープン後も参照できることを確認"""
+        path = str(tmp_path / "journal.sqlite")
+        with JobJournal(path) as journal:
+            journal.add_jobs([_job("a"), _job("b"), _job("c")])
+            journal.mark_running("a")
+            journal.mark_done("a", "outhash")
+            journal.mark_running("b")
+            journal.mark_failed("b", "boom")
+            journal.mark_running("c")
+
+        with JobJournal(path) as journal:
+            assert journal.counts() == {PENDING: 0, RUNNING: 1, DONE: 1, FAILED: 1}
+            job_a = journal.get("a")
+            assert job_a.output_hash == "outhash"
+            assert job_a.attempts == 1
+            assert journal.get("b").error == "boom"
+
+    def test_resume_keeps_done_and_resets_unfinished(self, tmp_path):
+        """再開時は完了済みを残し、実行中・失敗をpendingに戻すことを確認"""
+        output = tmp_path / "a.md"
+        output.write_text("出力", encoding="utf-8")
+        jobs = [_job("a", output_path=str(output)), _job("b"), _job("c")]
+        with JobJournal(str(tmp_path / "journal.sqlite")) as journal:
+            journal.add_jobs(jobs)
+            journal.mark_done("a", file_sha256(str(output)))
+            journal.mark_running("b")
+            journal.mark_failed("c", "boom")
+
+            journal.add_jobs(jobs, resume=True)
+
+            assert journal.get("a").state == DONE
+            assert [job.job_id for job in journal.unfinished()] == ["b", "c"]
+            assert all(job.state == PENDING for job in journal.unfinished())
+
+    def test_resume_reruns_changed_input(self, tmp_path):
+        """入力ハッシュが変わった完了済みジョブは再実行対象になることを確認"""
+        with JobJournal(str(tmp_path / "journal.sqlite")) as journal:
+            journal.add_jobs([_job("a", "h1")])
+            journal.mark_done("a", "x")
+            journal.add_jobs([_job("a", "h2")], resume=True)
+            assert journal.get("a").state == PENDING
+
+    def test_resume_reruns_deleted_or_edited_output(self, tmp_path):
+        """出力ファイルが削除・編集された完了済みジョブは再実行対象になることを確認"""
+        edited, deleted = tmp_path / "edited.md", tmp_path / "deleted.md"
+        jobs = [_job("edited", output_path=str(edited)), _job("deleted", output_path=str(deleted))]
+        with JobJournal(str(tmp_path / "journal.sqlite")) as journal:
+            journal.add_jobs(jobs)
+            for job, path in zip(jobs, (edited, deleted)):
+                path.write_text("出力", encoding="utf-8")
+            journal.mark_done_many([(job.job_id, file_sha256(job.output_path)) for job in jobs])
+            assert journal.counts()[DONE] == 2
+
+            edited.write_text("手で編集", encoding="utf-8")
+            deleted.unlink()
+            journal.add_jobs(jobs, resume=True)
+            assert [job.job_id for job in journal.unfinished()] == ["edited", "deleted"]
+
+    def test_without_resume_everything_is_pending(self, tmp_path):
+        """再開しない場合は完了済みも含めてpendingに戻ることを確認"""
+        with JobJournal(str(tmp_path / "journal.sqlite")) as journal:
+            journal.add_jobs([_job("a")])
+            journal.mark_done("a", "x")
+            journal.add_jobs([_job("a")])
+            assert journal.get("a").state == PENDING
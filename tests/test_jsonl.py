@@ -0,0 +1,109 @@
+"""
+JSON Lines ストリーミング変換のテスト
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+from content_converter.cli import main
+from content_converter.jsonl import JsonlRunner
+
+
+class SlowConverter:
+    """入力テキストに含まれる秒数だけ待ってから大文字にして返すコンバーター"""
+
+    rules_mode = "only"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def convert(self, input_text, template, prompt=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            delay = float(input_text.split(":")[1]) if ":" in input_text else 0.0
+            time.sleep(delay)
+            if input_text.startswith("fail"):
+                raise RuntimeError("変換に失敗しました")
+            return f"{template}{input_text.upper()}"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _lines(*records):
+    return [json.dumps(r, ensure_ascii=False) + "\n" for r in records]
+
+
+def _run(runner, lines):
+    out = []
+    result = runner.run(lines, out.append)
+    return result, [json.loads(line) for line in out]
+
+
+def test_streams_results_in_completion_order():
+    """完了したジョブから結果を出力し、失敗したジョブも1件の結果レコードにすることを確認"""
+    runner = JsonlRunner(SlowConverter(), template="T:", max_workers=4)
+    result, records = _run(runner, _lines(
+        {"id": "slow", "text": "a:0.2"},
+        {"id": "fast", "text": "b:0"},
+        {"id": "bad", "text": "fail:0"},
+    ))
+
+    assert records[-1]["id"] == "slow"
+    by_id = {r["id"]: r for r in records}
+    assert by_id["fast"] == {**by_id["fast"], "ok": True, "output": "T:B:0", "line": 2}
+    assert by_id["bad"]["ok"] is False and "変換に失敗しました" in by_id["bad"]["error"]
+    assert (result.done, result.failed) == (2, 1)
+
+
+def test_ordered_preserves_input_order_with_bounded_window():
+    """--ordered では入力順に出力し、並べ直しを待つ結果が枠の大きさを超えないことを確認"""
+    converter = SlowConverter()
+    runner = JsonlRunner(converter, template="", max_workers=4, queue_size=2, ordered=True, reorder_window=3)
+    delays = [0.05, 0, 0, 0, 0.03, 0, 0, 0]
+    result, records = _run(runner, _lines(*({"id": i, "text": f"x:{d}"} for i, d in enumerate(delays))))
+
+    assert [r["id"] for r in records] == list(range(len(delays)))
+    assert result.done == len(delays)
+    assert converter.peak <= 3
+
+
+def test_invalid_records_and_file_references(tmp_path):
+    """不正な行は失敗として報告し、入力・テンプレートはファイルのパスでも指定できることを確認"""
+    (tmp_path / "in.md").write_text("file", encoding="utf-8")
+    (tmp_path / "t.md").write_text("FT:", encoding="utf-8")
+    runner = JsonlRunner(SlowConverter())
+    lines = ["not json\n", "\n"] + _lines(
+        {"input": str(tmp_path / "in.md"), "template_path": str(tmp_path / "t.md")},
+        {"text": "x", "options": {"retries": 3}},
+        {"id": 9},
+    )
+    result, records = _run(runner, lines)
+
+    by_line = {r["line"]: r for r in records}
+    assert by_line[1]["ok"] is False and "JSON" in by_line[1]["error"]
+    assert by_line[3]["output"] == "FT:FILE"
+    assert "retries" in by_line[4]["error"]
+    assert by_line[5]["id"] is None and "text" in by_line[5]["error"]
+    assert (result.done, result.failed) == (1, 3)
+
+
+def test_cli_jsonl_reads_stdin(capsys):
+    """--jsonl で標準入力のジョブを変換し、結果レコードだけを標準出力に書き出すことを確認"""
+    stdin = io.StringIO("".join(_lines({"id": "a", "text": "本文"}, {"id": "b", "text": "本文2"})))
+    argv = ["content_converter", "--jsonl", "--ordered", "--rules", "zenn-to-note"]
+    with patch.object(sys, "argv", argv), patch.object(sys, "stdin", stdin):
+        assert main() == 0
+
+    captured = capsys.readouterr()
+    records = [json.loads(line) for line in captured.out.splitlines()]
+    assert [(r["id"], r["output"]) for r in records] == [("a", "本文"), ("b", "本文2")]
+    assert "成功 2 / 失敗 0" in captured.err
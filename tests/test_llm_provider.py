@@ -9,6 +9,7 @@ import pytest
 from unittest.mock import Mock, patch
 
 from content_converter.llm import LLMProvider
+from content_converter.llm.base import usage_scope
 
 
 class TestLLMProvider:
@@ -40,4 +41,56 @@ class TestLLMProvider:
 
         result = mock_provider.generate_summary("test content")
         mock_provider.generate_summary.assert_called_once_with("test content")
-        assert result == "summary" 
\ No newline at end of file
+        assert result == "summary" 
+    def test_chat_default_joins_messages(self):
+        """chatのデフォルト実装がメッセージを連結してoptimize_contentに渡すことを確認"""
+
+        class EchoProvider(LLMProvider):
+            def optimize_content(self, content, options=None):
+                return content
+
+            def generate_summary(self, content, max_length=100):
+                return content
+
+        provider = EchoProvider()
+        result = provider.chat([
+            {"role": "system", "content": "a"},
+            {"role": "user", "content": "b", "cache": True},
+        ])
+        assert result == "a\n\nb"
+
+    def test_record_usage_accumulates(self):
+        """record_usageが直近と累計の使用量を記録することを確認"""
+
+        class EchoProvider(LLMProvider):
+            def optimize_content(self, content, options=None):
+                return content
+
+            def generate_summary(self, content, max_length=100):
+                return content
+
+        provider = EchoProvider()
+        provider.record_usage(prompt_tokens=10, completion_tokens=2, cached_tokens=8)
+        provider.record_usage(prompt_tokens=5, completion_tokens=1)
+        assert provider.last_usage == {"prompt_tokens": 5, "completion_tokens": 1, "cached_tokens": 0}
+        assert provider.usage_totals == {"prompt_tokens": 15, "completion_tokens": 3, "cached_tokens": 8}
+        assert EchoProvider().usage_totals == {}
+
+    def test_usage_scope_collects_usage_of_the_calls_in_the_block(self):
+        """usage_scopeがブロック内で記録された使用量だけを集計し、外側のスコープにも加算することを確認"""
+
+        class EchoProvider(LLMProvider):
+            def optimize_content(self, content, options=None):
+                return content
+
+            def generate_summary(self, content, max_length=100):
+                return content
+
+        first, second = EchoProvider(), EchoProvider()
+        first.record_usage(prompt_tokens=100)
+        with usage_scope() as outer:
+            first.record_usage(prompt_tokens=10, completion_tokens=2)
+            with usage_scope() as inner:
+                second.record_usage(prompt_tokens=5, cached_tokens=3)
+        assert inner == {"prompt_tokens": 5, "completion_tokens": 0, "cached_tokens": 3}
+        assert outer == {"prompt_tokens": 15, "completion_tokens": 2, "cached_tokens": 3}
@@ -0,0 +1,87 @@
+"""
+ストリーミングパイプラインのテスト
+"""
+
+import threading
+import time
+
+from content_converter.pipeline import Pipeline, Stage
+
+
+class TestPipeline:
+    """Pipelineのテスト"""
+
+    def test_all_items_pass_through_stages(self):
+        """全ての入力が各ステージを順に通過することを確認"""
+        pipeline = Pipeline([Stage("double", lambda x: x * 2, 3), Stage("inc", lambda x: x + 1, 2)])
+        results = list(pipeline.run(range(100)))
+        assert sorted(r.value for r in results) == [x * 2 + 1 for x in range(100)]
+        assert all(r.ok for r in results)
+        assert [s.processed for s in pipeline.stats] == [100, 100]
+
+    def test_source_is_read_lazily_with_backpressure(self):
+        """下流が詰まっている間は入力を読み進めず、同時に保持する件数が上限に収まることを確認"""
+        read = []
+
+        def source():
+            for i in range(1000):
+                read.append(i)
+                yield i
+
+        pipeline = Pipeline([Stage("a", lambda x: x), Stage("b", lambda x: x)], queue_size=2)
+        results = pipeline.run(source())
+        next(results)
+        time.sleep(0.2)
+        # 各キュー（2件）と出力キュー・スレッドが保持する分を超えて読み進めない
+        assert len(read) < 20
+        assert max(s.max_depth for s in pipeline.stats) <= 2
+        assert len(list(results)) == 999
+
+    def test_failed_item_skips_later_stages(self):
+        """例外が発生した項目は後続のステージを飛ばして失敗として出力されることを確認"""
+        calls = []
+
+        def fail_on_odd(x):
+            if x % 2:
+                raise ValueError(f"odd {x}")
+            return x
+
+        pipeline = Pipeline([Stage("check", fail_on_odd), Stage("record", calls.append)])
+        results = list(pipeline.run(range(4)))
+
+        failed = [r for r in results if r.error is not None]
+        assert sorted(r.value for r in failed) == [1, 3]
+        assert {r.stage for r in failed} == {"check"}
+        assert sorted(calls) == [0, 2]
+        assert pipeline.stats[0].failed == 2
+
+    def test_stop_cancels_unstarted_items_but_finishes_non_cancellable_stages(self):
+        """停止要求後は取り消し可能なステージの未処理の項目だけが取り消されることを確認"""
+        written = []
+
+        def convert(x):
+            if x == 0:
+                pipeline.stop()
+            return x
+
+        pipeline = Pipeline(
+            [Stage("convert", convert), Stage("write", written.append, cancellable=False)],
+            queue_size=4,
+        )
+        results = list(pipeline.run(range(100)))
+
+        assert written == [0]
+        assert [r.ok for r in results].count(True) == 1
+        assert all(r.cancelled for r in results if not r.ok)
+        # 投入済みの項目だけが取り消され、残りの入力は読み出されない
+        assert len(results) < 100
+
+    def test_closing_early_stops_threads(self):
+        """結果を途中まで読んで閉じた場合でもスレッドが終了することを確認"""
+        before = threading.active_count()
+        pipeline = Pipeline([Stage("a", lambda x: x, 4)], queue_size=2)
+        results = pipeline.run(iter(range(10000)))
+        next(results)
+        results.close()
+        assert pipeline.stopped
+        assert threading.active_count() == before
@@ -0,0 +1,124 @@
+"""
+プロファイラーのテスト
+"""
+
+import pstats
+import threading
+import tracemalloc
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from content_converter.batch import BatchRunner, discover_jobs
+from content_converter.converter import ContentConverter
+from content_converter import profiling
+from content_converter.profiling import SUMMARY_NAME, Profiler
+
+_kept = []
+
+
+def _allocate(size):
+    """size 要素のリストを確保して呼び出しの後も保持する"""
+    block = [object() for _ in range(size)]
+    _kept.append(block)
+    return len(block)
+
+
+class TestProfiler:
+    """Profilerのテスト"""
+
+    def test_stage_records_cpu_and_memory(self, tmp_path):
+        """ステージごとに .pstats と、ステージの関数からのメモリ確保が記録されることを確認"""
+        _kept.clear()
+        profiler = Profiler(str(tmp_path / "profile"))
+        allocate = profiler.wrap("allocate", _allocate)
+        with profiler:
+            assert allocate(2000) == 2000
+            assert allocate(10) == 10
+        _kept.clear()
+
+        stage = profiler.stages["allocate"]
+        assert stage.calls == stage.profiled == 2
+        site, (size, count) = max(stage.allocations.items(), key=lambda item: item[1][0])
+        assert site[0] == __file__
+        assert size > 2000 * 16 and count >= 2000
+        assert profiler.traced_peak >= size
+        assert not tracemalloc.is_tracing()
+
+        summary_path = profiler.write()
+        stats = pstats.Stats(str(tmp_path / "profile" / "allocate.pstats"))
+        assert any(func[2] == "_allocate" for func in stats.stats)  # type: ignore[attr-defined]
+        summary = (tmp_path / "profile" / SUMMARY_NAME).read_text(encoding="utf-8")
+        assert summary_path.endswith(SUMMARY_NAME)
+        assert "== allocate: 呼び出し 2 / 計測 2" in summary
+        assert "test_profiling.py" in summary and "メモリ確保の上位" in summary
+
+    def test_sampling_profiles_every_nth_call_without_tracemalloc(self, tmp_path):
+        """サンプリングでは N 回に1回だけ計測し、tracemalloc を使わないことを確認"""
+        profiler = Profiler(str(tmp_path), sample_every=3)
+        allocate = profiler.wrap("allocate", _allocate)
+        with profiler:
+            assert not tracemalloc.is_tracing()
+            for _ in range(7):
+                allocate(10)
+        _kept.clear()
+
+        stage = profiler.stages["allocate"]
+        assert (stage.calls, stage.profiled) == (7, 3)
+        assert stage.allocations == {}
+        assert "3回に1回の呼び出し" in profiler.summary()
+
+    @pytest.mark.parametrize("exclusive", [profiling.EXCLUSIVE_PROFILING, True])
+    def test_concurrent_stages(self, tmp_path, exclusive):
+        """複数のスレッドで同時にステージを計測でき、cProfile を同時に1つしか有効にできない場合は
+        重なった呼び出しを失敗させずに計測しないことを確認"""
+        profiler = Profiler(str(tmp_path), memory=False)
+        barrier = threading.Barrier(3)
+        errors = []
+
+        def work(name):
+            try:
+                with profiler.stage(name):
+                    barrier.wait(5)
+                    _allocate(10)
+                    barrier.wait(5)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(name,)) for name in ["a", "b", "a"]]
+        with patch.object(profiling, "EXCLUSIVE_PROFILING", exclusive), profiler:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        _kept.clear()
+
+        assert errors == []
+        stages = profiler.stages.values()
+        assert sum(stage.calls for stage in stages) == 3
+        assert sum(stage.profiled for stage in stages) == (1 if exclusive else 3)
+        assert sum(stage.overlapped for stage in stages) == (2 if exclusive else 0)
+        assert ("重なって計測しなかった呼び出し" in profiler.summary()) is exclusive
+
+
+def test_batch_runner_profiles_each_stage(tmp_path):
+    """BatchRunner のパイプラインの各ステージが計測されることを確認"""
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    for name in ["a.md", "b.md", "c.md"]:
+        (input_dir / name).write_text(f"# {name}", encoding="utf-8")
+    template = tmp_path / "template.md"
+    template.write_text("TEMPLATE {{content}}", encoding="utf-8")
+    output_dir = tmp_path / "out"
+    converter = ContentConverter(llm_provider=MagicMock(), config={"use_llm": False})
+    profiler = Profiler(str(tmp_path / "profile"))
+    runner = BatchRunner(converter, str(template), profiler=profiler)
+    with profiler:
+        result = runner.run(discover_jobs(str(input_dir), str(output_dir)))
+    profiler.write()
+
+    assert result.done == 3
+    assert list(profiler.stages) == ["read", "prepare", "llm", "finish", "write"]
+    assert all(stage.calls == 3 for stage in profiler.stages.values())
+    assert (tmp_path / "profile" / "llm.pstats").exists()
@@ -57,4 +57,10 @@ class TestGenerateSummaryTemplate:
         assert "50文字以内" in result
 
     def test_singleton_instance(self):
-        pass 
\ No newline at end of file
+        pass 
+
+def test_templates_are_dedented():
+    """組み込みテンプレートに余分なインデントが含まれないことを確認"""
+    prompt = OPTIMIZE_CONTENT_TEMPLATE.format(content="x")
+    assert not any(line.startswith(" ") for line in prompt.splitlines())
+    assert "    " not in GENERATE_SUMMARY_TEMPLATE.template
@@ -0,0 +1,83 @@
+"""
+HTMLレンダリングのテスト
+"""
+
+import threading
+
+import markdown
+import pytest
+
+from content_converter.cpu_pool import format_scaling
+from content_converter.render import (
+    HtmlRenderer,
+    RenderSettings,
+    benchmark_rendering,
+    main,
+    render_many,
+)
+from content_converter.stages import StageSettings, finish_document, prepare_document
+
+ARTICLE = """# 見出し
+
+本文[^1]です。
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+[^1]: 脚注
+"""
+
+
+def test_renderer_matches_fresh_instance_and_resets_state():
+    """再利用したレンダラーの結果が文書ごとに作成した場合と同じで、脚注などが次の文書に残らないことを確認"""
+    renderer = HtmlRenderer()
+    expected = markdown.markdown(ARTICLE, extensions=["extra", "sane_lists", "toc"], output_format="html")
+
+    assert renderer.render(ARTICLE) == expected
+    assert "footnote" not in renderer.render("脚注なし")
+    assert renderer.render(ARTICLE) == expected
+    assert (renderer.stats.documents, renderer.stats.renderers) == (3, 1)
+
+
+def test_renderer_is_created_once_per_thread():
+    """スレッドごとに1つのレンダラーを作成し、拡張機能の設定がそれぞれに反映されることを確認"""
+    renderer = HtmlRenderer(RenderSettings.create(["toc"], {"toc": {"permalink": True}}))
+    outputs = []
+
+    def work():
+        outputs.extend(renderer.render("# A") for _ in range(3))
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert renderer.stats.renderers == 3 and renderer.stats.documents == 9
+    assert len(set(outputs)) == 1 and 'class="headerlink"' in outputs[0]
+    with pytest.raises(ValueError):
+        HtmlRenderer(RenderSettings.create(["extra"], {"toc": {}}))
+
+
+def test_render_many_in_processes_and_finish_stage():
+    """ワーカープロセスでのレンダリング結果が入力の順に得られ、LLM後処理でもレンダリングされることを確認"""
+    texts = [f"# 記事{i}\n\n本文" for i in range(6)]
+    expected = list(render_many(texts))
+
+    assert list(render_many(texts, max_workers=2, chunksize=2)) == expected
+    settings = StageSettings(html=RenderSettings())
+    prepared = prepare_document(texts[0], None, settings)
+    assert finish_document(prepared, texts[0], settings)[0] == expected[0]
+
+
+def test_benchmark_reports_throughput(tmp_path, capsys):
+    """ワーカー数ごとの処理量を計測し、コーパスのディレクトリから表を出力できることを確認"""
+    results = benchmark_rendering([ARTICLE] * 4, worker_counts=[1, 2])
+    assert [r.workers for r in results] == [1, 2]
+    assert format_scaling(results).splitlines()[0].startswith("workers")
+
+    (tmp_path / "a.md").write_text(ARTICLE, encoding="utf-8")
+    assert main([str(tmp_path), "--max-workers", "1", "--repeat", "2"]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("workers") and "文書ごとに作成した場合" in out
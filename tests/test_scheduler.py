@@ -0,0 +1,116 @@
+"""
+優先度スケジューラーのテスト
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+from content_converter.llm.scheduled import DEFAULT_OUTPUT_TOKENS, ScheduledProvider
+from content_converter.scheduler import BULK, INTERACTIVE, PriorityScheduler, priority_scope
+
+
+class FakeClock:
+    """手動で進める時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _acquire_in_thread(scheduler, priority, tokens, order):
+    def run():
+        ticket = scheduler.acquire(priority, tokens)
+        order.append(priority)
+        scheduler.release(ticket)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for_waiters(scheduler, count):
+    deadline = time.monotonic() + 2
+    while sum(s.waiting for s in scheduler.stats.values()) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class TestPriorityScheduler:
+    """PrioritySchedulerのテスト"""
+
+    def test_interactive_share_is_reserved_from_bulk(self):
+        """bulk が予約分を使えず、interactive は待たずに開始できることを確認"""
+        scheduler = PriorityScheduler(max_concurrency=4)
+        tickets = [scheduler.acquire(BULK) for _ in range(3)]
+        order = []
+        waiting_bulk = _acquire_in_thread(scheduler, BULK, 0, order)
+        _wait_for_waiters(scheduler, 1)
+
+        interactive = scheduler.acquire(INTERACTIVE)
+        assert order == []
+        scheduler.release(tickets.pop())
+        waiting_bulk.join(2)
+        assert order == [BULK]
+
+        for ticket in tickets + [interactive]:
+            scheduler.release(ticket)
+        assert scheduler.stats[BULK].max_wait_seconds > 0
+        assert scheduler.stats[INTERACTIVE].max_wait_seconds < scheduler.stats[BULK].max_wait_seconds
+
+    def test_waiting_classes_are_served_by_weight(self):
+        """複数のクラスが待っている場合、重みの大きい interactive が bulk より多く通ることを確認"""
+        scheduler = PriorityScheduler(max_concurrency=1)
+        held = scheduler.acquire(BULK, 100)
+        order = []
+        threads = []
+        for _ in range(4):
+            threads.append(_acquire_in_thread(scheduler, BULK, 100, order))
+            _wait_for_waiters(scheduler, len(threads))
+        for _ in range(4):
+            threads.append(_acquire_in_thread(scheduler, INTERACTIVE, 100, order))
+            _wait_for_waiters(scheduler, len(threads))
+
+        scheduler.release(held)
+        for thread in threads:
+            thread.join(2)
+        # interactive（重み4）は bulk（重み1）の1件ごとに4件ずつ通る
+        assert order[:5].count(INTERACTIVE) == 4
+        assert len(order) == 8
+
+    def test_tokens_per_minute_keeps_reserved_tokens(self):
+        """トークン数/分の上限に近づくと bulk が待ち、interactive の予約分は使えることを確認"""
+        clock = FakeClock()
+        scheduler = PriorityScheduler(max_concurrency=8, tokens_per_minute=100, clock=clock)
+        scheduler.release(scheduler.acquire(BULK, 70))
+        order = []
+        waiting_bulk = _acquire_in_thread(scheduler, BULK, 20, order)
+        _wait_for_waiters(scheduler, 1)
+
+        scheduler.release(scheduler.acquire(INTERACTIVE, 25))
+        assert order == []
+        clock.now += 61
+        waiting_bulk.join(2)
+        assert order == [BULK]
+        assert scheduler.stats[BULK].tokens == 90
+
+
+def test_scheduled_provider_uses_priority_scope():
+    """ScheduledProvider が priority_scope の優先度と推定トークン数でスケジュールすることを確認"""
+    inner = MagicMock()
+    inner.optimize_content.return_value = "converted"
+    inner.usage_totals = {"prompt_tokens": 10}
+    provider = ScheduledProvider(inner, PriorityScheduler(max_concurrency=2))
+
+    with priority_scope(INTERACTIVE):
+        assert provider.optimize_content("本文", options={"max_tokens": 500}) == "converted"
+    provider.generate_summary("本文")
+
+    stats = provider.scheduler.stats
+    assert stats[INTERACTIVE].requests == 1
+    assert 500 < stats[INTERACTIVE].tokens < DEFAULT_OUTPUT_TOKENS
+    assert stats[BULK].requests == 1
+    assert provider.usage_totals == {"prompt_tokens": 10}
+    assert "interactive: 1件" in provider.scheduler.summary()
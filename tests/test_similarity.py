@@ -0,0 +1,45 @@
+"""
+類似キャッシュのテスト
+"""
+
+from content_converter.similarity import SimilarityCache, context_key
+
+SECTION = "## インストール\n\npipでパッケージをインストールし、APIキーを環境変数に設定します。" * 5
+
+
+def test_exact_and_similar_hits():
+    """完全一致と近似一致で過去の結果を返すことを確認"""
+    cache = SimilarityCache()
+    ctx = context_key("template", None, "model")
+    cache.add(ctx, SECTION, "converted")
+
+    assert cache.lookup(ctx, SECTION) == "converted"
+    assert cache.lookup(ctx, SECTION.replace("設定します", "設定する", 1)) == "converted"
+    assert cache.lookup(ctx, "全く別の内容のセクションです。" * 20) is None
+    assert (cache.exact_hits, cache.similar_hits, cache.misses) == (1, 1, 1)
+
+
+def test_context_isolation():
+    """テンプレートなどの文脈が異なる場合はヒットしないことを確認"""
+    cache = SimilarityCache()
+    cache.add(context_key("template A"), SECTION, "converted")
+    assert cache.lookup(context_key("template B"), SECTION) is None
+
+
+def test_short_sections_match_exactly_only():
+    """短いセクションは近似一致で再利用しないことを確認"""
+    cache = SimilarityCache()
+    cache.add("ctx", "公開日: 2024-01-01", "old")
+    assert cache.lookup("ctx", "公開日: 2024-01-01") == "old"
+    assert cache.lookup("ctx", "公開日: 2024-01-02") is None
+
+
+def test_persistence(tmp_path):
+    """履歴ファイルから再構築できることを確認（壊れた行は無視する）"""
+    path = tmp_path / "history.jsonl"
+    SimilarityCache(path=str(path)).add("ctx", SECTION, "converted")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"context": "ctx", "ha')
+
+    cache = SimilarityCache(path=str(path))
+    assert cache.lookup("ctx", SECTION + "。") == "converted"
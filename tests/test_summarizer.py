@@ -0,0 +1,81 @@
+"""
+map-reduce 要約のテスト
+"""
+
+import threading
+import zlib
+from unittest.mock import MagicMock
+
+from content_converter.similarity import SimilarityCache
+from content_converter.summarizer import MapReduceSummarizer, chunk_document
+
+
+def _document(sections, words=40):
+    return "".join(f"# 見出し{i}\n\n" + f"section{i} body " * words + "\n\n" for i in range(sections))
+
+
+def _provider():
+    """入力の先頭の行とチェックサムを要約として返すプロバイダー（呼び出しを記録する）"""
+    provider = MagicMock()
+    calls = []
+    lock = threading.Lock()
+
+    def generate_summary(content, max_length=100):
+        with lock:
+            calls.append((content, max_length))
+        return f"summary of {content.splitlines()[0][:20]} ({zlib.crc32(content.encode()):08x})"
+
+    provider.generate_summary.side_effect = generate_summary
+    provider.calls = calls
+    return provider
+
+
+def test_chunk_document_packs_sections_and_splits_oversized():
+    """セクションの境界でチャンクに詰め、上限を超えるセクションは分割することを確認"""
+    text = _document(6) + "# 長い節\n\n" + "x" * 4000 + "\n"
+    chunks = chunk_document(text, chunk_tokens=300)
+    assert "".join(chunks) == text
+    assert chunks[0].startswith("# 見出し0") and "# 見出し1" in chunks[0]
+    assert all(chunk.startswith("# ") or chunk.startswith("x") for chunk in chunks)
+    assert sum(1 for chunk in chunks if chunk.startswith("x")) >= 3
+
+
+class TestMapReduceSummarizer:
+    """MapReduceSummarizerのテスト"""
+
+    def test_short_document_is_summarized_in_one_request(self):
+        """1チャンクに収まる文書は1回のリクエストで要約することを確認"""
+        provider = _provider()
+        summarizer = MapReduceSummarizer(provider)
+        assert summarizer.summarize("短い文書", max_length=50).startswith("summary of 短い文書")
+        assert provider.calls == [("短い文書", 50)]
+
+    def test_partial_summaries_are_reduced_hierarchically(self):
+        """部分要約を fan_in 件ずつ階層的にまとめ、最後に指定の文字数で要約することを確認"""
+        provider = _provider()
+        summarizer = MapReduceSummarizer(provider, chunk_tokens=200, partial_length=80, fan_in=3)
+        summarizer.summarize(_document(9), max_length=60)
+
+        lengths = [max_length for _, max_length in provider.calls]
+        # チャンク9件 → 中間3件 → 最終1件
+        assert lengths.count(80) == 12 and lengths[-1] == 60
+        assert summarizer.stats.chunks == 9 and summarizer.stats.levels == 3
+
+    def test_cache_redoes_only_changed_branch(self, tmp_path):
+        """軽く編集した文書の要約では、変更されたチャンクとその上の階層だけをやり直すことを確認"""
+        cache_path = str(tmp_path / "summaries.jsonl")
+        text = _document(9)
+        MapReduceSummarizer(
+            _provider(), chunk_tokens=200, fan_in=3, cache=SimilarityCache(cache_path, similarity=1.0)
+        ).summarize(text)
+
+        provider = _provider()
+        summarizer = MapReduceSummarizer(
+            provider, chunk_tokens=200, fan_in=3, cache=SimilarityCache(cache_path, similarity=1.0)
+        )
+        summarizer.summarize(text.replace("section7 body", "section7 edited", 1))
+
+        # 変更されたチャンク・その中間要約・最終要約の3件だけを要約し直す
+        assert len(provider.calls) == 3
+        assert "section7 edited" in provider.calls[0][0]
+        assert summarizer.stats.cached == 10
@@ -0,0 +1,69 @@
+"""
+出力ライターのテスト
+"""
+
+import os
+import stat
+from unittest.mock import patch
+
+import pytest
+
+from content_converter.writer import UNCHANGED, WRITTEN, OutputWriter
+
+
+class TestOutputWriter:
+    """OutputWriterのテスト"""
+
+    def test_write_new_file(self, tmp_path):
+        """新規ファイルが書き込まれ、一時ファイルが残らないことを確認"""
+        path = tmp_path / "out.md"
+        writer = OutputWriter()
+        assert writer.write(str(path), "内容") == WRITTEN
+        assert path.read_text(encoding="utf-8") == "内容"
+        assert os.listdir(tmp_path) == ["out.md"]
+
+    def test_unchanged_content_is_not_rewritten(self, tmp_path):
+        """内容が同じ場合は書き込まず、mtimeが変わらないことを確認"""
+        path = tmp_path / "out.md"
+        path.write_text("内容", encoding="utf-8")
+        os.utime(path, (1_000_000, 1_000_000))
+        writer = OutputWriter()
+
+        assert writer.write(str(path), "内容") == UNCHANGED
+        assert os.stat(path).st_mtime == 1_000_000
+        assert (writer.written, writer.unchanged) == (0, 1)
+
+    def test_changed_content_keeps_permissions(self, tmp_path):
+        """内容が変わった場合は置き換え、既存ファイルの権限を維持することを確認"""
+        path = tmp_path / "out.md"
+        path.write_text("古い内容", encoding="utf-8")
+        os.chmod(path, 0o640)
+        OutputWriter().write(str(path), "新しい内容")
+        assert path.read_text(encoding="utf-8") == "新しい内容"
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+    def test_failed_write_keeps_existing_file(self, tmp_path):
+        """書き込み途中で失敗しても既存ファイルが壊れないことを確認"""
+        path = tmp_path / "out.md"
+        path.write_text("元の内容", encoding="utf-8")
+        with patch("content_converter.writer.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                OutputWriter().write(str(path), "新しい内容")
+        assert path.read_text(encoding="utf-8") == "元の内容"
+        assert os.listdir(tmp_path) == ["out.md"]
+
+    def test_batch_mode_defers_fsync(self, tmp_path):
+        """batchモードでは指定件数ごとにまとめてfsyncすることを確認"""
+        writer = OutputWriter(fsync="batch", batch_size=3)
+        with patch("content_converter.writer.os.fsync") as mock_fsync:
+            writer.write(str(tmp_path / "a.md"), "a")
+            writer.write(str(tmp_path / "b.md"), "b")
+            assert mock_fsync.call_count == 0
+            writer.write(str(tmp_path / "c.md"), "c")
+            # 3ファイル + ディレクトリ1つ
+            assert mock_fsync.call_count == 4
+
+    def test_invalid_fsync_mode(self):
+        """不正なfsyncモードはValueErrorになることを確認"""
+        with pytest.raises(ValueError):
+            OutputWriter(fsync="sometimes")